@@ -3,6 +3,7 @@
 import json
 from typing import Dict, Any, Optional
 from datetime import datetime
+from functools import lru_cache
 from dateutil import parser as date_parser
 
 
@@ -18,7 +19,7 @@ FUNCTION_TOOLS = [
                 "properties": {
                     "when_iso": {
                         "type": "string",
-                        "description": f"Время в формате ISO 8601 в UTC. Текущая дата: {datetime.now().strftime('%Y-%m-%d')}. Пример: '2025-11-03T15:00:00Z'"
+                        "description": "Время в формате ISO 8601 в UTC, считая от текущей даты из контекста. Пример: '2025-11-03T15:00:00Z'"
                     },
                     "text": {
                         "type": "string",
@@ -139,6 +140,24 @@ def get_function_schema() -> list:
     return FUNCTION_TOOLS
 
 
+@lru_cache(maxsize=1)
+def _claude_tools() -> tuple:
+    """FUNCTION_TOOLS translated to Anthropic format (built once)"""
+    return tuple(
+        {
+            "name": tool["function"]["name"],
+            "description": tool["function"]["description"],
+            "input_schema": tool["function"]["parameters"],
+        }
+        for tool in FUNCTION_TOOLS
+    )
+
+
+def get_claude_tool_schema() -> list:
+    """Get function tools schema in Anthropic format (name/description/input_schema)"""
+    return list(_claude_tools())
+
+
 class FunctionHandler:
     """Handle function calls from AI"""
     
@@ -161,8 +180,8 @@ class FunctionHandler:
             return {"error": f"Unknown function: {function_name}"}
         
         try:
-            # Для create_reminder и add_note передаём user_id и chat_id
-            if function_name in ["create_reminder", "add_note"]:
+            # Функциям, которым нужен пользователь (его заметки, таймзона), передаём user_id и chat_id
+            if function_name in ["create_reminder", "add_note", "parse_time_ru"]:
                 return await handler(arguments, user_id, chat_id)
             return await handler(arguments)
         except Exception as e:
@@ -172,7 +191,9 @@ class FunctionHandler:
     
     async def handle_create_reminder(self, args: Dict[str, Any], user_id: int = 0, chat_id: int = 0) -> Dict[str, Any]:
         """Handle create_reminder function call"""
-        from db_helpers import create_reminder, get_or_create_user
+        from db_helpers import create_reminder
+        from identity import resolve_user_id
+        from user_time import get_user_timezone
         from datetime import datetime
         import dateutil.parser
         import pytz
@@ -205,15 +226,15 @@ class FunctionHandler:
                     "message": f"Указанное время уже прошло: {when_datetime_utc.strftime('%d.%m.%Y %H:%M')}"
                 }
             
-            # Получаем или создаём пользователя для получения внутреннего ID
-            user = await get_or_create_user(chat_id, None, None)
+            # user_id - внутренний ID (users.id), chat_id - Telegram ID
+            user_id = user_id or await resolve_user_id(chat_id)
             
-            # Сохраняем в БД (используем внутренний user.id, не telegram_id)
-            reminder = await create_reminder(user.id, text, when_datetime_utc.replace(tzinfo=None))
+            # Сохраняем в БД (используем внутренний user_id, не telegram_id)
+            reminder = await create_reminder(user_id, text, when_datetime_utc.replace(tzinfo=None))
             
             # Получаем язык пользователя
             from db_helpers import get_user_language_code
-            lang_code = await get_user_language_code(user.id)
+            lang_code = await get_user_language_code(user_id)
             
             # Добавляем в планировщик
             if self.scheduler and self.bot:
@@ -221,9 +242,9 @@ class FunctionHandler:
                 await self.scheduler.add_reminder(chat_id, text, when_datetime_utc, lang_code)
             
             # Показываем время в таймзоне пользователя
-            from config import USER_TIMEZONE
             from translations import translate
-            user_tz = pytz.timezone(USER_TIMEZONE)
+            from user_time import get_tz
+            user_tz = get_tz(await get_user_timezone(user_id))
             when_local = when_datetime_utc.astimezone(user_tz)
             formatted_date_local = when_local.strftime("%d.%m.%Y %H:%M")
             
@@ -257,7 +278,8 @@ class FunctionHandler:
     
     async def handle_add_note(self, args: Dict[str, Any], user_id: int = 0, chat_id: int = 0) -> Dict[str, Any]:
         """Handle add_note function call"""
-        from db_helpers import save_note, get_or_create_user
+        from db_helpers import save_note
+        from identity import resolve_user_id
         
         text = args.get('text', '')
         if not text or not text.strip():
@@ -267,11 +289,8 @@ class FunctionHandler:
             }
         
         try:
-            # Получаем или создаём пользователя
-            user = await get_or_create_user(chat_id, None, None)
-            
-            # Сохраняем заметку
-            await save_note(user.id, text.strip())
+            # Сохраняем заметку (user_id - внутренний ID, chat_id - Telegram ID)
+            await save_note(user_id or await resolve_user_id(chat_id), text.strip())
             
             return {
                 "success": True,
@@ -297,76 +316,25 @@ class FunctionHandler:
             "topic": topic
         }
     
-    async def handle_parse_time(self, args: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_parse_time(self, args: Dict[str, Any], user_id: int = 0, chat_id: int = 0) -> Dict[str, Any]:
         """Handle parse_time_ru function call"""
-        import dateparser
-        from datetime import datetime
-        
-        text = args.get('text', '')
-        
-        # Парсим время относительно текущей даты
-        # Для относительных времен ("через минуту", "через 10 секунд") используем текущее время
         import pytz
-        from datetime import timedelta
         from config import USER_TIMEZONE
+        from date_parsing import parse_when
+        from identity import resolve_user_id
+        from user_time import get_user_timezone
         
-        # Получаем текущее время в таймзоне пользователя
-        user_tz = pytz.timezone(USER_TIMEZONE)
-        now_local_naive = datetime.now()  # Naive datetime для dateparser
-        now_local = user_tz.localize(now_local_naive.replace(tzinfo=None))  # Timezone-aware для вычислений
-        now_utc = datetime.now(pytz.UTC)
+        text = args.get('text', '')
         
-        # Специальная обработка для "через X секунд/минут/часов"
-        if "через" in text.lower():
-            # Парсим относительное время начиная с СЕЙЧАС (используем naive для dateparser)
-            parsed_date = dateparser.parse(
-                text,
-                languages=['ru', 'en'],
-                settings={
-                    'RELATIVE_BASE': now_local_naive,  # Базовое время - СЕЙЧАС (naive)
-                    'PREFER_DATES_FROM': 'future',  # Предпочитаем будущие даты
-                    'STRICT_PARSING': False,
-                    'TIMEZONE': USER_TIMEZONE  # Используем таймзону пользователя
-                }
-            )
-        else:
-            # Для абсолютных времен используем обычный парсинг
-            parsed_date = dateparser.parse(
-                text,
-                languages=['ru', 'en'],
-                settings={
-                    'RELATIVE_BASE': now_local_naive,
-                    'PREFER_DATES_FROM': 'future',
-                    'TIMEZONE': USER_TIMEZONE
-                }
-            )
+        # «завтра в 15:00» - по часам пользователя; без пользователя - таймзона по умолчанию
+        user_id = user_id or (await resolve_user_id(chat_id) if chat_id else 0)
+        tz_name = await get_user_timezone(user_id) if user_id else USER_TIMEZONE
         
-        # Если парсинг не удался и это "через X", пробуем ручной парсинг
-        if not parsed_date and "через" in text.lower():
-            # Простой парсинг для "через N секунд/минут"
-            import re
-            match = re.search(r'через\s+(\d+)\s+(секунд[ыу]?|минут[ыу]?|час[аов]?)', text.lower())
-            if match:
-                value = int(match.group(1))
-                unit = match.group(2)
-                if 'секунд' in unit:
-                    parsed_date = now_local + timedelta(seconds=value)
-                elif 'минут' in unit:
-                    parsed_date = now_local + timedelta(minutes=value)
-                elif 'час' in unit:
-                    parsed_date = now_local + timedelta(hours=value)
-                else:
-                    parsed_date = None
+        # Частые формы («через 10 минут», «завтра в 15:00») - без dateparser, в таймзоне пользователя
+        parsed_date = parse_when(text, tz_name)
+        now_utc = datetime.now(pytz.UTC)
         
         if parsed_date:
-            # Делаем timezone-aware если не указан
-            if parsed_date.tzinfo is None:
-                # Используем таймзону пользователя из конфига
-                import pytz
-                from config import USER_TIMEZONE
-                local_tz = pytz.timezone(USER_TIMEZONE)
-                parsed_date = local_tz.localize(parsed_date)
-            
             # Конвертируем в UTC
             parsed_date_utc = parsed_date.astimezone(pytz.UTC)
             
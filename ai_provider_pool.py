@@ -0,0 +1,248 @@
+"""AI provider pool: EWMA latency, circuit breaker, hedged requests and failover"""
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from config import (
+    AI_HEDGING, AI_HEDGE_MIN_DELAY, AI_HEDGE_MAX_DELAY,
+    AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# z-оценка для 95-го перцентиля нормального распределения
+_P95_Z = 1.645
+
+
+class ProviderStats:
+    """Latency (EWMA mean/variance) and circuit breaker state of one provider"""
+
+    def __init__(self, name: str, alpha: float = 0.2,
+                 failure_threshold: int = AI_BREAKER_FAILURES, cooldown: float = AI_BREAKER_COOLDOWN):
+        self.name = name
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latency_ewma: Optional[float] = None
+        self.latency_var = 0.0
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+
+    def observe_latency(self, latency: float):
+        """Update exponentially weighted mean and variance"""
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+            return
+        diff = latency - self.latency_ewma
+        increment = self.alpha * diff
+        self.latency_ewma += increment
+        self.latency_var = (1 - self.alpha) * (self.latency_var + diff * increment)
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.observe_latency(latency)
+        self.consecutive_failures = 0
+        if self.opened_at is not None:
+            logger.info(f"AI provider {self.name}: circuit closed")
+        self.opened_at = None
+
+    def record_failure(self):
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"AI provider {self.name}: circuit opened after {self.consecutive_failures} errors")
+            self.opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    @property
+    def available(self) -> bool:
+        """May take requests (closed or half-open); read-only, for ranking"""
+        return self.state != "open"
+
+    def allow_request(self) -> bool:
+        """Closed: always. Half-open: one trial request per cooldown. Open: never."""
+        state = self.state
+        if state == "half_open":
+            # Пробный запрос; следующий - только после ещё одного cooldown
+            self.opened_at = time.monotonic()
+            return True
+        return state == "closed"
+
+    @property
+    def p95(self) -> Optional[float]:
+        if self.latency_ewma is None:
+            return None
+        return self.latency_ewma + _P95_Z * math.sqrt(self.latency_var)
+
+
+class ProviderPool:
+    """
+    Routes AI requests over several providers.
+
+    call() sends the request to the fastest healthy provider and, if it is
+    still running after that provider's p95 latency, sends one hedged copy
+    to the next provider; the first success wins and the other is cancelled.
+    Errors fail over to the next provider. Requests must be side-effect free
+    (tool calls are executed by the caller after the winner is known).
+    """
+
+    def __init__(self, providers: List[str], hedging: bool = AI_HEDGING,
+                 min_delay: float = AI_HEDGE_MIN_DELAY, max_delay: float = AI_HEDGE_MAX_DELAY,
+                 failure_threshold: int = AI_BREAKER_FAILURES, cooldown: float = AI_BREAKER_COOLDOWN):
+        self.providers = list(providers)
+        self.hedging = hedging
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.stats: Dict[str, ProviderStats] = {
+            name: ProviderStats(name, failure_threshold=failure_threshold, cooldown=cooldown)
+            for name in self.providers
+        }
+        self.hedges = 0
+        self.hedges_won = 0
+        self.failovers = 0
+
+    def ranked(self) -> List[str]:
+        """
+        Providers allowed to take a request, fastest first.
+
+        Unmeasured providers go first on purpose (exploration, declared order):
+        each one serves a request and gets a latency before the pool settles
+        on the fastest, and a provider that only fails keeps being tried until
+        its breaker opens.
+        """
+        ranked = [name for name in self.providers if self.stats[name].available]
+        if not ranked:
+            # Все отключены - пробуем всё равно, лучше попытка, чем гарантированный отказ
+            return list(self.providers)
+        # Без замера - задержка 0: такой провайдер получит следующий запрос и свой замер
+        return sorted(ranked, key=lambda name: self.stats[name].latency_ewma or 0.0)
+
+    def acquire(self, candidates: List[str]) -> Optional[str]:
+        """
+        Pop candidates until one's breaker admits a request and return it.
+
+        Only here allow_request() is called, so a half-open provider spends its
+        trial on a request it actually gets. When every breaker is open (ranked()
+        fell back to all providers) the first candidate is taken anyway.
+        """
+        forced = not any(stats.available for stats in self.stats.values())
+        while candidates:
+            name = candidates.pop(0)
+            if self.stats[name].allow_request() or forced:
+                return name
+        return None
+
+    def hedge_delay(self, name: str) -> float:
+        """Latency budget before a hedged request: provider p95, clamped"""
+        p95 = self.stats[name].p95
+        if p95 is None:
+            return self.max_delay
+        return min(max(p95, self.min_delay), self.max_delay)
+
+    async def call(self, request: Callable[[str], Awaitable[T]]) -> T:
+        """Run request(provider) with hedging and failover"""
+        candidates = self.ranked()
+        primary = self.acquire(candidates)
+        pending: Dict[asyncio.Task, tuple] = {}
+        hedge_task: Optional[asyncio.Task] = None
+        last_error: Optional[BaseException] = None
+
+        def launch(name: str) -> asyncio.Task:
+            task = asyncio.create_task(request(name))
+            pending[task] = (name, time.monotonic())
+            return task
+
+        launch(primary)
+        try:
+            while pending:
+                timeout = self.hedge_delay(primary) if self.hedging and hedge_task is None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Бюджет p95 превышен - хеджируем (на другого провайдера, если есть)
+                    self.hedges += 1
+                    target = self.acquire(candidates) or primary
+                    logger.info(f"AI request on {primary} exceeded {timeout:.2f}s, hedging to {target}")
+                    hedge_task = launch(target)
+                    continue
+
+                for task in done:
+                    name, started = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self.stats[name].record_failure()
+                        last_error = e
+                        logger.warning(f"AI provider {name} failed: {e}")
+                        continue
+                    self.stats[name].record_success(time.monotonic() - started)
+                    if task is hedge_task:
+                        self.hedges_won += 1
+                    return result
+
+                if not pending:
+                    failover = self.acquire(candidates)
+                    if failover is not None:
+                        self.failovers += 1
+                        primary = failover
+                        launch(primary)
+        finally:
+            now = time.monotonic()
+            for task, (name, started) in pending.items():
+                task.cancel()
+                # Проигравший запрос был как минимум настолько медленным
+                self.stats[name].observe_latency(now - started)
+            # Дождаться отмены, чтобы проигравший запрос не висел задачей без владельца
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        raise last_error
+
+    async def failover(self, request: Callable[[str], Awaitable[T]],
+                       can_retry: Callable[[], bool] = lambda: True) -> T:
+        """Run request(provider) on providers in turn, without hedging (for streams)"""
+        last_error: Optional[BaseException] = None
+        candidates = self.ranked()
+        attempts = 0
+        while (name := self.acquire(candidates)) is not None:
+            if attempts:
+                self.failovers += 1
+            attempts += 1
+            started = time.monotonic()
+            try:
+                result = await request(name)
+            except Exception as e:
+                self.stats[name].record_failure()
+                last_error = e
+                logger.warning(f"AI provider {name} failed: {e}")
+                if not can_retry():
+                    raise
+                continue
+            self.stats[name].record_success(time.monotonic() - started)
+            return result
+        raise last_error
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "state": stats.state,
+                "latency_ewma": stats.latency_ewma,
+                "p95": stats.p95,
+                "requests": stats.requests,
+                "failures": stats.failures,
+            }
+            for name, stats in self.stats.items()
+        }
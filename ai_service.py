@@ -1,52 +1,73 @@
 """AI service for OpenAI/Claude integration"""
 import os
 import json
-from typing import Optional, List, Dict, Any
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
-try:
-    from anthropic import Anthropic
-except ImportError:
-    Anthropic = None
-from prompts import get_conversation_history, get_low_energy_prompt, get_high_energy_prompt
-from ai_functions import get_function_schema
+from importlib.util import find_spec
+from types import SimpleNamespace
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Tuple
+from prompts import build_openai_messages, build_claude_request
+from ai_functions import get_function_schema, get_claude_tool_schema
+from ai_usage import RequestUsage, usage_tracker
+from ai_provider_pool import ProviderPool
+from conversation_memory import DialogMemory, memory_store
+from config import MEMORY_ENABLED
 import ai_functions as af_module
 
+OPENAI_MODEL = "gpt-4o-mini"  # Cheaper model
+CLAUDE_MODEL = "claude-3-haiku-20240307"  # Cheapest Claude model
+
+# SDK провайдеров импортируются при первом запросе: вместе они грузятся секунды
+_SDK_MODULES = {'openai': 'openai', 'claude': 'anthropic'}
+
 
 class AIService:
     """Service for AI interactions"""
     
     def __init__(self):
-        self.openai_client = None
-        self.claude_client = None
-        self.current_provider = None
+        providers = []
         
-        # Try OpenAI first
         openai_key = os.getenv('OPENAI_API_KEY')
-        if openai_key and OpenAI:
-            try:
-                self.openai_client = OpenAI(api_key=openai_key)
-                self.current_provider = 'openai'
-            except Exception as e:
-                print(f"OpenAI init error: {e}")
+        claude_key = os.getenv('ANTHROPIC_API_KEY')
+        # С двумя провайдерами повторы делает пул (failover), а не SDK с его backoff
+        self._max_retries = 0 if openai_key and claude_key else 2
+        self._keys = {'openai': openai_key, 'claude': claude_key}
+        
+        # OpenAI first, Claude as the second provider of the pool
+        for provider, key in self._keys.items():
+            if key and find_spec(_SDK_MODULES[provider]):
+                providers.append(provider)
+        
+        self.pool = ProviderPool(providers)
+        self.memory = memory_store if MEMORY_ENABLED else None
+    
+    def __getattr__(self, name: str):
+        # openai_client / claude_client создаются при первом обращении
+        if name == 'openai_client':
+            client = self._create_client('openai')
+        elif name == 'claude_client':
+            client = self._create_client('claude')
         else:
-            # Try Claude
-            claude_key = os.getenv('ANTHROPIC_API_KEY')
-            if claude_key and Anthropic:
-                try:
-                    self.claude_client = Anthropic(api_key=claude_key)
-                    self.current_provider = 'claude'
-                except Exception as e:
-                    print(f"Claude init error: {e}")
-        
-        if not self.current_provider:
-            raise ValueError(
-                "❌ AI provider is required!\n"
-                "Set OPENAI_API_KEY or ANTHROPIC_API_KEY in .env file.\n"
-                "Get keys from: https://platform.openai.com or https://console.anthropic.com"
-            )
+            raise AttributeError(name)
+        setattr(self, name, client)
+        return client
+    
+    def warm_up(self):
+        """Создать клиентов заранее - при старте бота, а не на первом сообщении"""
+        for provider in self.pool.providers:
+            getattr(self, f'{provider}_client')
+    
+    def _create_client(self, provider: str):
+        key = self._keys.get(provider)
+        if not key:
+            return None
+        try:
+            if provider == 'openai':
+                from openai import AsyncOpenAI
+                return AsyncOpenAI(api_key=key, max_retries=self._max_retries)
+            from anthropic import AsyncAnthropic
+            return AsyncAnthropic(api_key=key, max_retries=self._max_retries)
+        except Exception as e:
+            print(f"{provider.capitalize()} init error: {e}")
+            return None
     
     async def process_message(self, user_message: str, user_id: int, energy_level: Optional[int] = None) -> str:
         """
@@ -61,13 +82,18 @@ class AIService:
             AI response
         """
         
+        if not self.pool.providers:
+            return "AI сервис недоступен. Используй команды /goal, /plan, /reminders 💛"
+        
         try:
-            if self.current_provider == 'openai':
-                return await self._process_openai(user_message, user_id, energy_level)
-            elif self.current_provider == 'claude':
-                return await self._process_claude(user_message, user_id, energy_level)
-            else:
-                return "AI сервис недоступен. Используй команды /goal, /plan, /reminders 💛"
+            memory = await self._load_memory(user_id)
+            # Запрос к модели хеджируется; функции выполняются один раз, после выбора победителя
+            text, tool_calls = await self.pool.call(
+                lambda provider: self._complete(provider, user_message, user_id, energy_level, memory)
+            )
+            response = await self._finish(text, tool_calls, user_id)
+            await self._remember(user_id, memory, user_message, response)
+            return response
         except Exception as e:
             import traceback
             import logging
@@ -79,86 +105,251 @@ class AIService:
             error_msg = str(e)[:150] if str(e) else "Неизвестная ошибка"
             return f"Упс, что-то пошло не так 😅\n\n💡 Попробуй:\n• Написать короче\n• Использовать команды: /goal, /plan, /note, /reminders\n• Или просто: 'запиши купить молоко'\n\n💛"
     
-    async def _process_openai(self, user_message: str, user_id: int, energy_level: Optional[int]) -> str:
+    async def process_message_stream(
+        self,
+        user_message: str,
+        user_id: int,
+        energy_level: Optional[int] = None,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
+        """
+        Process user message with AI, streaming the answer as it is generated
+        
+        Args:
+            user_message: User's message
+            user_id: Telegram user ID
+            energy_level: Optional current energy level (40, 60, 80)
+            on_delta: Async callback called with the accumulated text after each token chunk
+        
+        Returns:
+            Final AI response (text, or the tool call results)
+        """
+        if not self.pool.providers:
+            return "AI сервис недоступен. Используй команды /goal, /plan, /reminders 💛"
+        
+        emitted = False
+        
+        async def forward(text: str):
+            nonlocal emitted
+            emitted = True
+            if on_delta:
+                await on_delta(text)
+        
+        try:
+            memory = await self._load_memory(user_id)
+            # Стрим не хеджируется: пользователь уже видит текст. Failover - только до первого токена
+            text, tool_calls = await self.pool.failover(
+                lambda provider: self._stream(provider, user_message, user_id, energy_level, forward, memory),
+                can_retry=lambda: not emitted
+            )
+            response = await self._finish(text, tool_calls, user_id)
+            await self._remember(user_id, memory, user_message, response)
+            return response
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"AI streaming error for message '{user_message[:50]}...': {e}", exc_info=True)
+            return f"Упс, что-то пошло не так 😅\n\n💡 Попробуй:\n• Написать короче\n• Использовать команды: /goal, /plan, /note, /reminders\n• Или просто: 'запиши купить молоко'\n\n💛"
+    
+    async def _load_memory(self, user_id: int) -> Optional[DialogMemory]:
+        """Conversation memory of the user (user_id 0 = internal prompts, no memory)"""
+        if not self.memory or not user_id:
+            return None
+        return await self.memory.get(user_id)
+    
+    async def _remember(self, user_id: int, memory: Optional[DialogMemory], user_message: str, response: str):
+        if memory is None:
+            return
+        memory.add_exchange(user_message, response)
+        await self.memory.save(user_id, memory)
+    
+    def _build_messages(self, user_message: str, energy_level: Optional[int],
+                        memory: Optional[DialogMemory] = None) -> List[Dict]:
+        """Build conversation: cached static prefix, then date/energy context, memory and user message"""
+        return build_openai_messages(user_message, energy_level, **_memory_context(memory))
+    
+    async def _complete(self, provider: str, user_message: str, user_id: int, energy_level: Optional[int],
+                        memory: Optional[DialogMemory] = None) -> Tuple[Optional[str], List[Any]]:
+        """One model request on the given provider: (text, tool calls)"""
+        if provider == 'openai':
+            return await self._process_openai(user_message, user_id, energy_level, memory)
+        return await self._process_claude(user_message, user_id, energy_level, memory)
+    
+    async def _stream(self, provider: str, user_message: str, user_id: int, energy_level: Optional[int],
+                      on_delta: Optional[Callable[[str], Awaitable[None]]],
+                      memory: Optional[DialogMemory] = None) -> Tuple[str, List[Any]]:
+        """One streamed model request on the given provider: (text, tool calls)"""
+        if provider == 'openai':
+            return await self._stream_openai(user_message, user_id, energy_level, on_delta, memory)
+        return await self._stream_claude(user_message, user_id, energy_level, on_delta, memory)
+    
+    async def _process_openai(self, user_message: str, user_id: int, energy_level: Optional[int],
+                              memory: Optional[DialogMemory] = None) -> Tuple[Optional[str], List[Any]]:
         """Process with OpenAI"""
         import logging
         logger = logging.getLogger(__name__)
         
         try:
-            messages = get_conversation_history()
-            
-            # Add energy level context if available
-            if energy_level:
-                if energy_level < 40:
-                    messages.append({"role": "system", "content": get_low_energy_prompt()})
-                elif energy_level > 80:
-                    messages.append({"role": "system", "content": get_high_energy_prompt()})
-            
-            # Add user message
-            messages.append({"role": "user", "content": user_message})
+            messages = self._build_messages(user_message, energy_level, memory)
             
             # Get function tools
             tools = get_function_schema()
             
             # Call OpenAI
             logger.debug(f"Calling OpenAI with {len(messages)} messages, user_id={user_id}")
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",  # Cheaper model
+            response = await self.openai_client.chat.completions.create(
+                model=OPENAI_MODEL,
                 messages=messages,
                 tools=tools,
                 tool_choice="auto",
                 temperature=0.7,
                 max_tokens=500
             )
+            if getattr(response, "usage", None):
+                usage_tracker.record(RequestUsage.from_openai(OPENAI_MODEL, response.usage))
             
             choice = response.choices[0]
             message = choice.message
             
-            # Handle function calls
             if message.tool_calls:
                 logger.debug(f"OpenAI returned {len(message.tool_calls)} tool calls")
-                return await self._handle_tool_calls(message.tool_calls, messages, user_id)
-            
-            # Return text response
-            response_text = message.content or "Понял тебя 💛"
-            logger.debug(f"OpenAI text response: {response_text[:50]}...")
-            return response_text
+            return message.content, message.tool_calls or []
         except Exception as e:
             import traceback
             logger.error(f"Error in _process_openai: {e}", exc_info=True)
             traceback.print_exc()
             raise
     
-    async def _process_claude(self, user_message: str, user_id: int, energy_level: Optional[int]) -> str:
+    async def _process_claude(self, user_message: str, user_id: int, energy_level: Optional[int],
+                              memory: Optional[DialogMemory] = None) -> Tuple[str, List[Any]]:
         """Process with Claude"""
-        messages = get_conversation_history()
+        system, messages = build_claude_request(user_message, energy_level, **_memory_context(memory))
         
-        # Add energy level context if available
-        if energy_level:
-            if energy_level < 40:
-                messages.append({"role": "system", "content": get_low_energy_prompt()})
-            elif energy_level > 80:
-                messages.append({"role": "system", "content": get_high_energy_prompt()})
+        # Call Claude
+        response = await self.claude_client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=500,
+            messages=messages,
+            system=system,  # Статичный промпт помечен cache_control
+            tools=get_claude_tool_schema()
+        )
+        if getattr(response, "usage", None):
+            usage_tracker.record(RequestUsage.from_anthropic(CLAUDE_MODEL, response.usage))
         
-        # Add user message
-        messages.append({"role": "user", "content": user_message})
+        text = "".join(block.text for block in response.content if block.type == "text")
+        tool_calls = [
+            _tool_call(block.id, block.name, json.dumps(block.input, ensure_ascii=False))
+            for block in response.content if block.type == "tool_use"
+        ]
+        return text, tool_calls
+    
+    async def _stream_openai(self, user_message: str, user_id: int, energy_level: Optional[int],
+                             on_delta: Optional[Callable[[str], Awaitable[None]]],
+                             memory: Optional[DialogMemory] = None) -> Tuple[str, List[Any]]:
+        """Stream with OpenAI, assembling tool call deltas by index"""
+        import logging
+        logger = logging.getLogger(__name__)
         
-        # Call Claude
-        # Note: Claude's tools are slightly different, adapt as needed
-        response = self.claude_client.messages.create(
-            model="claude-3-haiku-20240307",  # Cheapest Claude model
+        messages = self._build_messages(user_message, energy_level, memory)
+        stream = await self.openai_client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            tools=get_function_schema(),
+            tool_choice="auto",
+            temperature=0.7,
             max_tokens=500,
-            messages=[msg for msg in messages if msg["role"] != "system"],  # System messages handled differently
-            system=get_conversation_history()[0]["content"]
+            stream=True,
+            stream_options={"include_usage": True}
         )
         
-        return response.content[0].text
+        text = ""
+        partial_calls: Dict[int, Dict[str, str]] = {}
+        async for chunk in stream:
+            # Последний чанк с include_usage: пустые choices и заполненный usage
+            if getattr(chunk, "usage", None):
+                usage_tracker.record(RequestUsage.from_openai(OPENAI_MODEL, chunk.usage))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                text += delta.content
+                if on_delta:
+                    await on_delta(text)
+            # Аргументы функции приходят кусками JSON, склеиваем по index
+            for call_delta in delta.tool_calls or []:
+                call = partial_calls.setdefault(call_delta.index, {"id": "", "name": "", "arguments": ""})
+                if call_delta.id:
+                    call["id"] = call_delta.id
+                if call_delta.function:
+                    if call_delta.function.name:
+                        call["name"] += call_delta.function.name
+                    if call_delta.function.arguments:
+                        call["arguments"] += call_delta.function.arguments
+        
+        if partial_calls:
+            logger.debug(f"OpenAI stream returned {len(partial_calls)} tool calls")
+        return text, _assemble_tool_calls(partial_calls)
     
-    async def _handle_tool_calls(self, tool_calls: List[Any], messages: List[Dict], user_id: int) -> str:
-        """Handle tool/function calls from AI"""
+    async def _stream_claude(self, user_message: str, user_id: int, energy_level: Optional[int],
+                             on_delta: Optional[Callable[[str], Awaitable[None]]],
+                             memory: Optional[DialogMemory] = None) -> Tuple[str, List[Any]]:
+        """Stream with Claude, assembling tool_use blocks from input_json deltas"""
+        system, messages = build_claude_request(user_message, energy_level, **_memory_context(memory))
+        stream = await self.claude_client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=500,
+            messages=messages,
+            system=system,
+            tools=get_claude_tool_schema(),
+            stream=True
+        )
+        
+        text = ""
+        partial_calls: Dict[int, Dict[str, str]] = {}
+        usage = None
+        async for event in stream:
+            # Входные токены (в т.ч. кеш) приходят в message_start, выходные - в message_delta
+            if event.type == "message_start" and getattr(event, "message", None):
+                usage = RequestUsage.from_anthropic(CLAUDE_MODEL, event.message.usage)
+            elif event.type == "message_delta" and usage and getattr(event, "usage", None):
+                usage.output_tokens = event.usage.output_tokens
+            elif event.type == "content_block_start" and event.content_block.type == "tool_use":
+                partial_calls[event.index] = {
+                    "id": event.content_block.id,
+                    "name": event.content_block.name,
+                    "arguments": ""
+                }
+            elif event.type == "content_block_delta":
+                if event.delta.type == "text_delta":
+                    text += event.delta.text
+                    if on_delta:
+                        await on_delta(text)
+                elif event.delta.type == "input_json_delta":
+                    partial_calls[event.index]["arguments"] += event.delta.partial_json
+        usage_tracker.record(usage)
+        
+        return text, _assemble_tool_calls(partial_calls)
+    
+    async def _finish(self, text: Optional[str], tool_calls: List[Any], user_id: int) -> str:
+        """
+        Provider-agnostic end of a request.
+        
+        Tool results already are the final answer ("✅ Заметка сохранена: ..."),
+        so there is no second round-trip to the model after executing tools.
+        """
+        if tool_calls:
+            return await self._handle_tool_calls(tool_calls, user_id)
+        return text or "Понял тебя 💛"
+    
+    async def _handle_tool_calls(self, tool_calls: List[Any], user_id: int) -> str:
+        """Handle tool/function calls from AI (normalized to OpenAI tool call shape)"""
         import logging
         logger = logging.getLogger(__name__)
         results = []
+        # user_id здесь - Telegram ID (в личном чате он же chat_id); обработчикам нужен ещё users.id
+        from identity import resolve_user_id
+        chat_id = user_id
+        internal_id = await resolve_user_id(chat_id) if chat_id else 0
         
         for tool_call in tool_calls:
             try:
@@ -172,21 +363,10 @@ class AIService:
                     logger.error("Function handler not initialized!")
                     result = {"success": False, "message": "Функции не инициализированы. Попробуй перезапустить бота."}
                 else:
-                    # Для create_reminder нужен chat_id (telegram user_id)
-                    # user_id - это внутренний ID из БД, chat_id - это telegram user_id
-                    chat_id = user_id  # В нашей схеме они совпадают
-                    result = await function_handler.handle_function_call(function_name, arguments, user_id, chat_id)
+                    result = await function_handler.handle_function_call(function_name, arguments, internal_id, chat_id)
                     logger.debug(f"Function {function_name} returned: success={result.get('success')}")
                 
                 results.append(result)
-                
-                # Add result back to conversation
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": function_name,
-                    "content": json.dumps(result)
-                })
             except Exception as e:
                 import traceback
                 logger.error(f"Error handling tool call {tool_call.function.name if hasattr(tool_call, 'function') else 'unknown'}: {e}", exc_info=True)
@@ -242,6 +422,26 @@ class AIService:
             return "Ты не обязан быть идеальным 💛"
 
 
+def _memory_context(memory: Optional[DialogMemory]) -> Dict[str, Any]:
+    """Prompt builder kwargs for the conversation memory"""
+    if memory is None:
+        return {}
+    return {"history": memory.history(), "summary": memory.summary_prompt()}
+
+
+def _tool_call(call_id: str, name: str, arguments: str) -> Any:
+    """Tool call shaped like OpenAI's, the common format for both providers"""
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=arguments or "{}"))
+
+
+def _assemble_tool_calls(partial_calls: Dict[int, Dict[str, str]]) -> List[Any]:
+    """Turn streamed tool call fragments into normalized tool calls"""
+    return [
+        _tool_call(call["id"], call["name"], call["arguments"])
+        for _, call in sorted(partial_calls.items())
+    ]
+
+
 # Global AI service instance
 ai_service = AIService()
 
@@ -0,0 +1,130 @@
+"""Token and cost accounting for AI requests"""
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# USD за 1M токенов. cached_input - чтение из кеша промпта, cache_write - запись в кеш (Anthropic)
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "cache_write": 0.15, "output": 0.60},
+    "claude-3-haiku-20240307": {"input": 0.25, "cached_input": 0.03, "cache_write": 0.30, "output": 1.25},
+}
+
+
+class RequestUsage:
+    """Token usage of a single AI request, normalized across providers"""
+
+    def __init__(self, provider: str, model: str, input_tokens: int = 0, cached_tokens: int = 0,
+                 cache_write_tokens: int = 0, output_tokens: int = 0):
+        self.provider = provider
+        self.model = model
+        self.input_tokens = input_tokens            # uncached prompt tokens (full price)
+        self.cached_tokens = cached_tokens          # prompt tokens read from the provider cache
+        self.cache_write_tokens = cache_write_tokens  # prompt tokens written to the cache
+        self.output_tokens = output_tokens
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.input_tokens + self.cached_tokens + self.cache_write_tokens
+
+    @property
+    def cost(self) -> float:
+        """Actual cost in USD"""
+        price = MODEL_PRICING.get(self.model)
+        if not price:
+            return 0.0
+        return (
+            self.input_tokens * price["input"]
+            + self.cached_tokens * price["cached_input"]
+            + self.cache_write_tokens * price["cache_write"]
+            + self.output_tokens * price["output"]
+        ) / 1_000_000
+
+    @property
+    def uncached_cost(self) -> float:
+        """What the request would cost without prompt caching"""
+        price = MODEL_PRICING.get(self.model)
+        if not price:
+            return 0.0
+        return (self.prompt_tokens * price["input"] + self.output_tokens * price["output"]) / 1_000_000
+
+    @property
+    def saved(self) -> float:
+        return self.uncached_cost - self.cost
+
+    @classmethod
+    def from_openai(cls, model: str, usage: Any) -> "RequestUsage":
+        """Build from OpenAI `usage` (prompt_tokens include cached ones)"""
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        return cls(
+            "openai", model,
+            input_tokens=prompt - cached,
+            cached_tokens=cached,
+            output_tokens=getattr(usage, "completion_tokens", 0) or 0
+        )
+
+    @classmethod
+    def from_anthropic(cls, model: str, usage: Any) -> "RequestUsage":
+        """Build from Anthropic `usage` (input_tokens exclude cached ones)"""
+        return cls(
+            "claude", model,
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            cached_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+            cache_write_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0
+        )
+
+
+class UsageTracker:
+    """Accumulates per-request usage for the running process"""
+
+    def __init__(self):
+        self.requests = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.saved = 0.0
+        self.last: Optional[RequestUsage] = None
+
+    def record(self, usage: Optional[RequestUsage]):
+        """Add one request to the totals"""
+        if usage is None:
+            return
+        self.requests += 1
+        self.input_tokens += usage.input_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.cache_write_tokens += usage.cache_write_tokens
+        self.output_tokens += usage.output_tokens
+        self.cost += usage.cost
+        self.saved += usage.saved
+        self.last = usage
+        logger.info(
+            f"AI usage [{usage.provider}/{usage.model}]: prompt={usage.prompt_tokens} "
+            f"(cached={usage.cached_tokens}, cache_write={usage.cache_write_tokens}) "
+            f"output={usage.output_tokens} cost=${usage.cost:.6f} saved=${usage.saved:.6f}"
+        )
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        prompt = self.input_tokens + self.cached_tokens + self.cache_write_tokens
+        return self.cached_tokens / prompt if prompt else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_hit_ratio": round(self.cache_hit_ratio, 3),
+            "cost_usd": round(self.cost, 6),
+            "saved_usd": round(self.saved, 6),
+        }
+
+
+# Global usage tracker
+usage_tracker = UsageTracker()
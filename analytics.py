@@ -0,0 +1,186 @@
+"""Тренды энергии и продуктивности по истории пользователя
+
+История читается одним запросом из daily_rollups (строка на день) и
+раскладывается по колонкам numpy: день, энергия, план, помидоры, оценка.
+Все метрики считаются над массивами целиком - скользящие средние, профиль
+энергии по дням недели, связь энергии с выполнением плана и точность
+оценки помидоров - без циклов по дням.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from config import STATS_HISTORY_DAYS
+from database import async_session, DailyRollup
+from user_time import shift_day, user_local_day
+
+# Минимум точек, чтобы корреляция или наклон что-то значили
+MIN_POINTS = 5
+# Оценка помидоров «попала», если сделано в пределах ±25% от запланированного
+POMODORO_TOLERANCE = 0.25
+
+
+@dataclass
+class DayHistory:
+    """Per-day columns, sorted by day; NaN where nothing was recorded"""
+    days: np.ndarray  # datetime64[D]
+    energy: np.ndarray  # средний уровень за день
+    plan_total: np.ndarray
+    plan_done: np.ndarray
+    estimated_pomodoros: np.ndarray
+    completed_pomodoros: np.ndarray
+    rating: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+@dataclass
+class TrendReport:
+    days_tracked: int  # дней с отметкой энергии
+    energy_avg: Optional[float]
+    energy_week: Optional[float]  # среднее за последние 7 календарных дней
+    energy_trend: Optional[float]  # изменение энергии в неделю (по последним 28 дням)
+    energy_rolling: np.ndarray  # скользящее 7-дневное среднее по календарным дням
+    weekday_energy: np.ndarray  # (7,), пн..вс, NaN - нет данных
+    plan_completion: Optional[float]  # доля выполненных пунктов
+    energy_plan_correlation: Optional[float]  # Пирсон: энергия дня vs доля выполненного плана
+    pomodoro_ratio: Optional[float]  # медиана сделано/запланировано
+    pomodoro_on_target: Optional[float]  # доля дней, где оценка попала в ±25%
+
+
+def day_keys_to_dates(keys: np.ndarray) -> np.ndarray:
+    """YYYYMMDD integer keys -> datetime64[D], vectorized"""
+    keys = np.asarray(keys, dtype=np.int64)
+    months = (keys // 10000 - 1970) * 12 + keys // 100 % 100 - 1
+    return months.astype('datetime64[M]').astype('datetime64[D]') + (keys % 100 - 1)
+
+
+def history_from_rows(rows) -> DayHistory:
+    """DayHistory from (local_day, energy_sum, energy_count, plan_total, plan_done,
+    estimated_pomodoros, completed_pomodoros, day_rating) rows"""
+    table = np.array(rows, dtype=np.float64).reshape(-1, 8)  # None -> NaN
+    energy_count = table[:, 2]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        energy = np.where(energy_count > 0, table[:, 1] / energy_count, np.nan)
+    return DayHistory(
+        days=day_keys_to_dates(table[:, 0]),
+        energy=energy,
+        plan_total=np.nan_to_num(table[:, 3]).astype(np.int64),
+        plan_done=np.nan_to_num(table[:, 4]).astype(np.int64),
+        estimated_pomodoros=table[:, 5],
+        completed_pomodoros=table[:, 6],
+        rating=table[:, 7],
+    )
+
+
+async def load_history(user_id: int, days: int = STATS_HISTORY_DAYS, until: int = None) -> DayHistory:
+    """Last `days` local days of the user up to `until` (default: today), one query"""
+    until = until or await user_local_day(user_id)
+    async with async_session() as session:
+        result = await session.execute(
+            select(
+                DailyRollup.local_day, DailyRollup.energy_sum, DailyRollup.energy_count,
+                DailyRollup.plan_total, DailyRollup.plan_done,
+                DailyRollup.estimated_pomodoros, DailyRollup.completed_pomodoros, DailyRollup.day_rating,
+            )
+            .where(DailyRollup.user_id == user_id)
+            .where(DailyRollup.local_day > shift_day(until, -days), DailyRollup.local_day <= until)
+            .order_by(DailyRollup.local_day)
+        )
+        # Row -> tuple: иначе numpy опрашивает каждую Row как возможный массив (в разы медленнее)
+        return history_from_rows([tuple(row) for row in result])
+
+
+def calendar_series(days: np.ndarray, values: np.ndarray, start: np.datetime64, end: np.datetime64) -> np.ndarray:
+    """Values placed on every calendar day from start to end inclusive, NaN for days without a row"""
+    series = np.full(int((end - start).astype(np.int64)) + 1, np.nan)
+    inside = (days >= start) & (days <= end)
+    series[(days[inside] - start).astype(np.int64)] = values[inside]
+    return series
+
+
+def rolling_mean(series: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` points ignoring NaN; NaN where the window has no values"""
+    present = ~np.isnan(series)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(present, series, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    lower = np.maximum(np.arange(1, len(series) + 1) - window, 0)
+    window_sums = sums[1:] - sums[lower]
+    window_counts = counts[1:] - counts[lower]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+
+def weekday_profile(days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Mean of values per weekday (0 = Monday), NaN for weekdays without data"""
+    present = ~np.isnan(values)
+    weekdays = (days[present].astype(np.int64) + 3) % 7  # 1970-01-01 - четверг
+    sums = np.bincount(weekdays, weights=values[present], minlength=7)
+    counts = np.bincount(weekdays, minlength=7)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def correlation(x: np.ndarray, y: np.ndarray) -> Optional[float]:
+    """Pearson r over points where both are known; None with too few points or no variance"""
+    present = ~(np.isnan(x) | np.isnan(y))
+    if present.sum() < MIN_POINTS:
+        return None
+    x, y = x[present], y[present]
+    if np.ptp(x) == 0 or np.ptp(y) == 0:
+        return None
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def slope_per_week(series: np.ndarray) -> Optional[float]:
+    """Least-squares slope of a calendar-day series, per 7 days"""
+    present = ~np.isnan(series)
+    if present.sum() < MIN_POINTS:
+        return None
+    x = np.flatnonzero(present).astype(np.float64)
+    return float(np.polyfit(x, series[present], 1)[0] * 7)
+
+
+def _mean(values: np.ndarray) -> Optional[float]:
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+
+def trend_report(history: DayHistory, today: np.datetime64 = None) -> TrendReport:
+    """All metrics over a history; `today` closes the calendar (default: the last day in it)"""
+    if len(history) == 0:
+        return TrendReport(0, None, None, None, np.array([]), np.full(7, np.nan), None, None, None, None)
+    end = today if today is not None else history.days[-1]
+    energy = calendar_series(history.days, history.energy, history.days[0], end)
+    rolling = rolling_mean(energy, 7)
+
+    planned = history.plan_total > 0
+    total = history.plan_total[planned].sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        completion = np.where(planned, history.plan_done / history.plan_total, np.nan)
+        estimated = history.estimated_pomodoros > 0
+        ratio = np.where(estimated, np.nan_to_num(history.completed_pomodoros) / history.estimated_pomodoros, np.nan)
+    ratio = ratio[~np.isnan(ratio)]
+
+    return TrendReport(
+        days_tracked=int((~np.isnan(history.energy)).sum()),
+        energy_avg=_mean(history.energy),
+        energy_week=None if np.isnan(rolling[-1]) else float(rolling[-1]),
+        energy_trend=slope_per_week(energy[-28:]),
+        energy_rolling=rolling,
+        weekday_energy=weekday_profile(history.days, history.energy),
+        plan_completion=float(history.plan_done[planned].sum() / total) if total else None,
+        energy_plan_correlation=correlation(history.energy, completion),
+        pomodoro_ratio=float(np.median(ratio)) if len(ratio) else None,
+        pomodoro_on_target=float((np.abs(ratio - 1) <= POMODORO_TOLERANCE).mean()) if len(ratio) else None,
+    )
+
+
+async def get_trends(user_id: int, days: int = STATS_HISTORY_DAYS) -> TrendReport:
+    """TrendReport of the user's last `days` local days"""
+    today = await user_local_day(user_id)
+    history = await load_history(user_id, days, today)
+    return trend_report(history, day_keys_to_dates([today])[0])
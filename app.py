@@ -0,0 +1,59 @@
+"""Сборка приложения: бот, планировщик и диспетчер по запросу
+
+Импорт модулей не создаёт клиентов и не проверяет окружение: всё, что требует
+токена или тянет тяжёлые зависимости, создаётся здесь один раз при первом
+обращении. Сервисы берут бота и планировщик отсюда, а не из bot.py, поэтому
+их можно импортировать (и тестировать) без загрузки всех обработчиков.
+"""
+from typing import Optional, Tuple, TYPE_CHECKING
+
+from config import validate_config
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+    from scheduler import ReminderScheduler
+
+_bot: Optional["Bot"] = None
+_scheduler: Optional["ReminderScheduler"] = None
+
+
+def get_bot() -> "Bot":
+    """Telegram Bot (проверяет конфигурацию при первом вызове)"""
+    global _bot
+    if _bot is None:
+        validate_config()
+        from aiogram import Bot
+        from config import BOT_TOKEN
+        _bot = Bot(token=BOT_TOKEN)
+    return _bot
+
+
+def get_scheduler() -> "ReminderScheduler":
+    """Планировщик напоминаний, тишины и вечерних чек-инов"""
+    global _scheduler
+    if _scheduler is None:
+        from scheduler import ReminderScheduler
+        _scheduler = ReminderScheduler(get_bot())
+    return _scheduler
+
+
+def create_app(dispatcher: Optional["Dispatcher"] = None) -> Tuple["Bot", "Dispatcher"]:
+    """
+    Bot and a Dispatcher with every handler registered.
+
+    Imports bot.py (handlers register on import) unless its dispatcher is
+    passed in - bot.main() does, since under `python bot.py` the module is
+    __main__ and importing bot would run it a second time. Wires the AI
+    function handler and builds the menu button table. Database and scheduler
+    start stay in bot.main(), which needs a running event loop.
+    """
+    if dispatcher is None:
+        import bot as bot_module
+        dispatcher = bot_module.dp
+    import ai_functions
+    from ai_functions import FunctionHandler
+
+    if ai_functions.function_handler is None:
+        ai_functions.function_handler = FunctionHandler(scheduler=get_scheduler(), bot=get_bot())
+    dispatcher["button_router"].build()
+    return get_bot(), dispatcher
@@ -0,0 +1,143 @@
+"""
+Tail latency of AIService against a local fault-injecting stub server.
+
+Starts an aiohttp server that speaks the OpenAI chat completions and Anthropic
+messages APIs with injected latency spikes and errors, points both SDKs at it
+(OPENAI_BASE_URL / ANTHROPIC_BASE_URL) and compares a single provider without
+hedging against the provider pool with hedging and failover.
+
+    python benchmarks/bench_ai_hedging.py --requests 400 --tail-rate 0.05 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+
+def make_app(args, rng):
+    """Stub API: base latency, rare slow responses (tail) and 500 errors"""
+
+    async def inject_faults():
+        await asyncio.sleep(rng.uniform(args.base_latency * 0.5, args.base_latency * 1.5))
+        if rng.random() < args.tail_rate:
+            await asyncio.sleep(args.tail_latency)
+        if rng.random() < args.error_rate:
+            raise web.HTTPInternalServerError(text='{"error": {"message": "injected"}}',
+                                              content_type="application/json")
+
+    async def openai_completions(request):
+        await inject_faults()
+        return web.json_response({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Ты молодец 💛"}}],
+            "usage": {"prompt_tokens": 1500, "completion_tokens": 20, "total_tokens": 1520,
+                      "prompt_tokens_details": {"cached_tokens": 1280}},
+        })
+
+    async def anthropic_messages(request):
+        await inject_faults()
+        return web.json_response({
+            "id": "msg_bench", "type": "message", "role": "assistant", "model": "claude-3-haiku-20240307",
+            "content": [{"type": "text", "text": "Ты молодец 💛"}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": 200, "output_tokens": 20,
+                      "cache_read_input_tokens": 1300, "cache_creation_input_tokens": 0},
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", openai_completions)
+    app.router.add_post("/v1/messages", anthropic_messages)
+    return app
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_mode(name, service, args):
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            text = await service.process_message("привет", 0)
+            latencies.append(time.perf_counter() - started)
+            if text.startswith("Упс"):
+                failures += 1
+
+    # Прогрев: EWMA/p95 пула набирают статистику
+    for _ in range(args.warmup):
+        await service.process_message("привет", 0)
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    pool = service.pool
+    print(
+        f"{name:<28} p50={statistics.median(latencies) * 1000:7.1f}ms "
+        f"p95={percentile(latencies, 0.95) * 1000:7.1f}ms p99={percentile(latencies, 0.99) * 1000:7.1f}ms "
+        f"max={max(latencies) * 1000:7.1f}ms errors={failures} hedges={pool.hedges} "
+        f"hedges_won={pool.hedges_won} failovers={pool.failovers}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--base-latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="seconds added to slow responses")
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--hedge-min-delay", type=float, default=0.1,
+                        help="floor of the hedge budget (AI_HEDGE_MIN_DELAY, scaled to the stub latency)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    runner = web.AppRunner(make_app(args, random.Random(args.seed)))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    os.environ.setdefault("BOT_TOKEN", "0:bench")
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    os.environ.pop("ANTHROPIC_API_KEY", None)
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    from ai_service import AIService
+    from ai_provider_pool import ProviderPool
+    import traceback
+    traceback.print_exc = lambda *a, **k: None  # AIService печатает трейсбеки инъецированных ошибок
+
+    print(f"requests={args.requests} concurrency={args.concurrency} tail_rate={args.tail_rate} "
+          f"tail={args.tail_latency}s error_rate={args.error_rate}")
+    try:
+        # Как раньше: один провайдер, повторы только внутри SDK
+        single = AIService()
+        single.pool = ProviderPool(["openai"], hedging=False)
+        await run_mode("single provider, no hedge", single, args)
+
+        os.environ["ANTHROPIC_API_KEY"] = "sk-ant-bench"
+        pooled = AIService()
+        pooled.pool.min_delay = args.hedge_min_delay
+        await run_mode("pool + hedging + failover", pooled, args)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
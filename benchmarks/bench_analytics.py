@@ -0,0 +1,155 @@
+"""
+/stats trend computation over 5 years of synthetic history per user.
+
+  before - the same metrics with per-day Python loops over ORM-style rows
+  after  - analytics.trend_report on numpy columns
+
+Both get the same rows (what load_history reads from daily_rollups) and the
+results are checked against each other. --db also times the end-to-end
+analytics.get_trends (one query + vectorized metrics) on a seeded SQLite file.
+
+    python benchmarks/bench_analytics.py --users 200 --years 5 --db
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "bench_analytics.db"))
+
+import numpy as np
+
+import analytics
+from user_time import day_key
+
+TODAY = date(2026, 10, 19)
+
+
+def synthetic_rows(rng, years: int):
+    """Rollup rows for one user: ~80% of days tracked, weekly energy rhythm, noisy plans and estimates"""
+    rows = []
+    for offset in range(years * 365, 0, -1):
+        day = TODAY - timedelta(days=offset - 1)
+        if rng.random() > 0.8:
+            continue
+        energy = int(np.clip(60 + 15 * np.sin(day.weekday()) + rng.normal(0, 12), 0, 100))
+        total = int(rng.integers(0, 6))
+        estimated = int(rng.integers(0, 7)) or None
+        rows.append((day_key(day), energy, 1, total, int(rng.binomial(total, energy / 100)),
+                     estimated, int(rng.integers(0, 8)) if estimated else None, int(rng.integers(1, 11))))
+    return rows
+
+
+def loop_report(rows):
+    """The metrics the straightforward way: dict per calendar day, Python loops"""
+    by_day = {date(key // 10000, key // 100 % 100, key % 100): row for key, *row in rows}
+    first, last = min(by_day), TODAY
+    calendar = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    energy = [by_day[d][0] / by_day[d][1] if d in by_day and by_day[d][1] else None for d in calendar]
+
+    rolling = []
+    for i in range(len(energy)):
+        window = [e for e in energy[max(0, i - 6):i + 1] if e is not None]
+        rolling.append(sum(window) / len(window) if window else None)
+
+    weekday_sums, weekday_counts = [0.0] * 7, [0] * 7
+    for d, e in zip(calendar, energy):
+        if e is not None:
+            weekday_sums[d.weekday()] += e
+            weekday_counts[d.weekday()] += 1
+
+    pairs = [(row[0] / row[1], row[3] / row[2]) for row in by_day.values() if row[1] and row[2]]
+    xs, ys = [p[0] for p in pairs], [p[1] for p in pairs]
+    mx, my = statistics.fmean(xs), statistics.fmean(ys)
+    cov = sum((x - mx) * (y - my) for x, y in pairs)
+    r = cov / (sum((x - mx) ** 2 for x in xs) * sum((y - my) ** 2 for y in ys)) ** 0.5
+
+    recent = [(i, e) for i, e in enumerate(energy[-28:]) if e is not None]
+    n = len(recent)
+    sx, sy = sum(i for i, _ in recent), sum(e for _, e in recent)
+    slope = (n * sum(i * e for i, e in recent) - sx * sy) / (n * sum(i * i for i, _ in recent) - sx * sx)
+
+    ratios = [(row[5] or 0) / row[4] for row in by_day.values() if row[4]]
+    return {
+        'energy_avg': statistics.fmean(e for e in energy if e is not None),
+        'energy_week': rolling[-1],
+        'energy_trend': slope * 7,
+        'weekday_energy': [s / c if c else None for s, c in zip(weekday_sums, weekday_counts)],
+        'plan_completion': sum(row[3] for row in by_day.values()) / sum(row[2] for row in by_day.values()),
+        'energy_plan_correlation': r,
+        'pomodoro_ratio': statistics.median(ratios),
+        'pomodoro_on_target': sum(abs(x - 1) <= 0.25 for x in ratios) / len(ratios),
+    }
+
+
+def check(expected: dict, report: analytics.TrendReport):
+    for name, value in expected.items():
+        got = getattr(report, name)
+        assert np.allclose(np.asarray(got, dtype=float), np.asarray(value, dtype=float)), name
+
+
+def timed(fn, histories):
+    started = time.perf_counter()
+    results = [fn(history) for history in histories]
+    return (time.perf_counter() - started) / len(histories), results
+
+
+async def end_to_end(user_rows, repeat: int):
+    """Seed daily_rollups for one user and time get_trends (query + metrics)"""
+    from sqlalchemy import delete
+    from database import async_session, init_db, DailyRollup
+    import user_time
+
+    await init_db()
+    user_id = 1
+    user_time.remember_timezone(user_id, "UTC")
+    columns = ('local_day', 'energy_sum', 'energy_count', 'plan_total', 'plan_done',
+               'estimated_pomodoros', 'completed_pomodoros', 'day_rating')
+    async with async_session() as session:
+        await session.execute(delete(DailyRollup).where(DailyRollup.user_id == user_id))
+        session.add_all(DailyRollup(user_id=user_id, **dict(zip(columns, row))) for row in user_rows)
+        await session.commit()
+    days = (TODAY - date(TODAY.year - 5, TODAY.month, TODAY.day)).days + 1
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await analytics.get_trends(user_id, days)
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="histories to compute")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="also time get_trends against SQLite")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(48)
+    rows = [synthetic_rows(rng, args.years) for _ in range(args.users)]
+    histories = [analytics.history_from_rows(user_rows) for user_rows in rows]
+    today = np.datetime64(TODAY.isoformat(), 'D')
+    print(f"{args.users} users x {args.years} years, {len(rows[0])} tracked days each")
+
+    before, expected = timed(loop_report, rows)
+    after, reports = timed(lambda history: analytics.trend_report(history, today), histories)
+    convert, _ = timed(analytics.history_from_rows, rows)
+    for values, report in zip(expected, reports):
+        check(values, report)
+    print(f"before {before * 1e3:7.2f} ms/user (Python loops)")
+    print(f"after  {after * 1e3:7.2f} ms/user (numpy) + {convert * 1e3:.2f} ms rows -> columns")
+    print(f"speedup: {before / (after + convert):.1f}x")
+
+    if args.db:
+        latency = asyncio.run(end_to_end(rows[0], 20))
+        print(f"get_trends end-to-end (SQLite, {args.years} years): {latency * 1e3:.1f} ms median")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Dispatch cost of inline-button callbacks through aiogram.
+
+Feeds CallbackQuery updates for every button the bot sends into two
+Dispatchers with no-op handlers: one with the previous per-handler filters
+(F.data == ..., startswith/endswith lambdas, ids parsed by split) and one
+with the single callbacks.CallbackRouter handler. Also compares the
+callback_data sizes (Telegram allows 64 bytes).
+
+    python benchmarks/bench_callback_dispatch.py --rounds 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher, F
+from aiogram.types import Update
+
+from callbacks import Action, CallbackRouter, pack
+from utils.pagination import encode_cursor
+
+CURSOR = encode_cursor(datetime(2025, 6, 1, 9, 30, 0, 123456), 104729)
+
+# (старый callback_data, новый) для всех кнопок бота
+BUTTONS = [
+    ("pomodoro_continue", pack(Action.POMODORO_CONTINUE)),
+    ("pomodoro_stop", pack(Action.POMODORO_STOP)),
+    ("goal_confirm", pack(Action.GOAL_CONFIRM)),
+    ("goal_edit", pack(Action.GOAL_EDIT)),
+    ("goal_done", pack(Action.GOAL_DONE)),
+    ("goal_skip", pack(Action.GOAL_SKIP)),
+    ("quick_goal", pack(Action.QUICK_GOAL)),
+    ("quick_plan", pack(Action.QUICK_PLAN)),
+    ("quick_focus", pack(Action.QUICK_FOCUS)),
+    ("quick_quiet", pack(Action.QUICK_QUIET)),
+    ("rem_view_104729", pack(Action.REMINDER_VIEW, 104729)),
+    ("rem_104729_done", pack(Action.REMINDER_DONE, 104729)),
+    ("rem_104729_delete_confirm", pack(Action.REMINDER_DELETE_CONFIRM, 104729)),
+    ("rem_104729_delete", pack(Action.REMINDER_DELETE, 104729)),
+    ("rem_add", pack(Action.REMINDER_ADD)),
+    ("rem_list_0", pack(Action.REMINDER_LIST)),
+    (f"rem_list_n_{CURSOR}", pack(Action.REMINDER_NEXT, CURSOR)),
+    ("plan_view_104729", pack(Action.PLAN_VIEW, 104729)),
+    ("plan_104729_done", pack(Action.PLAN_DONE, 104729)),
+    ("plan_104729_delete_confirm", pack(Action.PLAN_DELETE_CONFIRM, 104729)),
+    ("plan_104729_delete", pack(Action.PLAN_DELETE, 104729)),
+    ("plan_add", pack(Action.PLAN_ADD)),
+    ("plan_list", pack(Action.PLAN_LIST)),
+]
+
+
+async def noop(callback, *args, **kwargs):
+    pass
+
+
+async def parse_id_1(callback):
+    int(callback.data.split("_")[1])
+
+
+async def parse_id_2(callback):
+    int(callback.data.split("_")[2])
+
+
+def legacy_dispatcher() -> Dispatcher:
+    """Filters in bot.py registration order before the callback codec"""
+    dp = Dispatcher()
+    cb = dp.callback_query
+    for data in ("pomodoro_continue", "pomodoro_stop", "goal_confirm", "goal_edit", "goal_done", "goal_skip"):
+        cb.register(noop, F.data == data)
+    cb.register(parse_id_2, F.data.startswith("rem_view_"))
+    cb.register(noop, F.data.startswith("rem_list_"))
+    cb.register(parse_id_1, F.data.startswith("rem_") and F.data.endswith("_done"))
+    cb.register(parse_id_1, lambda c: c.data and c.data.startswith("rem_") and c.data.endswith("_delete_confirm"))
+    cb.register(parse_id_1, lambda c: c.data and c.data.startswith("rem_") and c.data.endswith("_delete")
+                and not c.data.endswith("_delete_confirm"))
+    cb.register(noop, F.data == "rem_add")
+    cb.register(noop, F.data == "plan_add")
+    cb.register(noop, F.data.startswith("quick_"))
+    cb.register(noop, F.data.startswith("plan_list"))
+    cb.register(parse_id_2, F.data.startswith("plan_view_"))
+    cb.register(parse_id_1, F.data.startswith("plan_") and F.data.endswith("_done"))
+    cb.register(parse_id_1, lambda c: c.data and c.data.startswith("plan_") and c.data.endswith("_delete_confirm"))
+    cb.register(parse_id_1, lambda c: c.data and c.data.startswith("plan_") and c.data.endswith("_delete")
+                and not c.data.endswith("_delete_confirm"))
+    return dp
+
+
+def codec_dispatcher() -> Dispatcher:
+    router = CallbackRouter()
+    codes = [value for name, value in vars(Action).items() if name.isupper()]
+    router.handler(*codes)(noop)
+    dp = Dispatcher()
+    dp.callback_query.register(router.dispatch)
+    return dp
+
+
+def make_update(update_id: int, data: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id), "chat_instance": "1", "data": data,
+            "from": {"id": 42, "is_bot": False, "first_name": "Bench"},
+            "message": {"message_id": 1, "date": 0, "chat": {"id": 42, "type": "private"}, "text": "x"},
+        },
+    })
+
+
+async def run(dp: Dispatcher, bot: Bot, updates: list) -> float:
+    """Microseconds per callback update"""
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / len(updates) * 1e6
+
+
+async def run_observer(dp: Dispatcher, bot: Bot, updates: list) -> float:
+    """Microseconds per callback in the callback_query observer only (filters + handler)"""
+    events = [update.callback_query.as_(bot) for update in updates]
+    started = time.perf_counter()
+    for event in events:
+        await dp.callback_query.trigger(event, bot=bot, state=None)
+    return (time.perf_counter() - started) / len(events) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000, help="passes over all buttons")
+    args = parser.parse_args()
+
+    bot = Bot("123:bench")
+    legacy_updates = [make_update(i, old) for i in range(args.rounds) for old, _ in BUTTONS]
+    codec_updates = [make_update(i, new) for i in range(args.rounds) for _, new in BUTTONS]
+
+    before = await run(legacy_dispatcher(), bot, legacy_updates)
+    after = await run(codec_dispatcher(), bot, codec_updates)
+    observer_before = await run_observer(legacy_dispatcher(), bot, legacy_updates)
+    observer_after = await run_observer(codec_dispatcher(), bot, codec_updates)
+    await bot.session.close()
+
+    old_sizes = [len(old.encode()) for old, _ in BUTTONS]
+    new_sizes = [len(new.encode()) for _, new in BUTTONS]
+    print(f"feed_update before: {before:.1f} µs per callback")
+    print(f"feed_update after:  {after:.1f} µs per callback  ({before / after:.1f}x)")
+    print(f"handler resolution before: {observer_before:.1f} µs per callback")
+    print(f"handler resolution after:  {observer_after:.1f} µs per callback  ({observer_before / observer_after:.1f}x)")
+    print(f"callback_data bytes: before avg {sum(old_sizes) / len(old_sizes):.1f} max {max(old_sizes)}, "
+          f"after avg {sum(new_sizes) / len(new_sizes):.1f} max {max(new_sizes)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
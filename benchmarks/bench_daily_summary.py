@@ -0,0 +1,145 @@
+"""
+"детали <дата>" summary latency: three queries per day vs one statement.
+
+Seeds --users users with --days days of history each (a goal, three plan
+items, an energy log and a check-in per day) into a SQLite file, then asks
+for the summary of random past days, --concurrency at a time.
+
+  before - goal, plan items and check-in as three sequential queries
+  after  - get_daily_summary: one statement on the (user_id, local_day) indexes
+
+The seeded file is kept between runs (same --users/--days reuse it).
+
+    python benchmarks/bench_daily_summary.py --users 10000 --days 365
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "bench_summary.db"))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import db_helpers
+import today
+import user_time
+from database import Base, DailyGoal, DailyPlanItem, EveningCheckIn, tune_sqlite
+from user_time import day_key, key_to_date
+
+FIRST_DAY = date(2024, 1, 1)
+
+
+def seed(path: str, users: int, days: int):
+    """Bulk insert with the stdlib driver: a year of 10k users is tens of millions of rows"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for user_id in range(1, users + 1):
+        keys = [day_key(FIRST_DAY + timedelta(days=d)) for d in range(days)]
+        conn.executemany(
+            "INSERT INTO daily_goals (user_id, goal_text, completed, estimated_pomodoros, completed_pomodoros, "
+            "day_rating, local_day) VALUES (?, ?, ?, 4, 2, 7, ?)",
+            ((user_id, f"goal {key}", key % 2, key) for key in keys))
+        conn.executemany(
+            'INSERT INTO daily_plan_items (user_id, text, completed, "order", local_day) VALUES (?, ?, ?, ?, ?)',
+            ((user_id, f"task {n}", n % 2, n, key) for key in keys for n in range(3)))
+        conn.executemany(
+            "INSERT INTO energy_logs (user_id, energy_level, local_day) VALUES (?, 60, ?)",
+            ((user_id, key) for key in keys))
+        conn.executemany(
+            "INSERT INTO evening_checkins (user_id, what_worked, what_tired, what_helped, local_day) "
+            "VALUES (?, 'worked', 'tired', 'helped', ?)",
+            ((user_id, key) for key in keys))
+        if user_id % 1000 == 0:
+            conn.commit()
+            print(f"  seeded {user_id}/{users} users", flush=True)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def legacy_summary(user_id: int, day: int):
+    """get_daily_summary before: three queries in one session"""
+    async with db_helpers.async_session() as session:
+        goal = (await session.execute(
+            select(DailyGoal).where(DailyGoal.user_id == user_id).where(DailyGoal.local_day == day)
+            .order_by(DailyGoal.id.desc()).limit(1)
+        )).scalar_one_or_none()
+        plan_items = (await session.execute(
+            select(DailyPlanItem).where(DailyPlanItem.user_id == user_id).where(DailyPlanItem.local_day == day)
+            .order_by(DailyPlanItem.order.asc())
+        )).scalars().all()
+        checkin = (await session.execute(
+            select(EveningCheckIn).where(EveningCheckIn.user_id == user_id).where(EveningCheckIn.local_day == day)
+            .order_by(EveningCheckIn.id.desc()).limit(1)
+        )).scalar_one_or_none()
+    return goal, list(plan_items), checkin
+
+
+async def combined_summary(user_id: int, day: int):
+    return await db_helpers.get_daily_summary(user_id, key_to_date(day))
+
+
+async def run(label: str, summary, requests: list, concurrency: int):
+    latencies = []
+
+    async def call(user_id: int, day: int):
+        started = time.perf_counter()
+        await summary(user_id, day)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for i in range(0, len(requests), concurrency):
+        await asyncio.gather(*(call(*request) for request in requests[i:i + concurrency]))
+    elapsed = time.perf_counter() - started
+    p50, p99 = (statistics.quantiles(latencies, n=100)[q] * 1e3 for q in (49, 98))
+    print(f"{label:6s} p50 {p50:6.2f} ms   p99 {p99:6.2f} ms   {len(latencies) / elapsed:6.0f} summaries/s")
+    return len(latencies) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"bench_summary_{args.users}x{args.days}.db")
+    fresh = not os.path.exists(path)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    tune_sqlite(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    if fresh:
+        print(f"seeding {args.users} users x {args.days} days into {path}")
+        seed(path, args.users, args.days)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    for module in (db_helpers, today, user_time):
+        module.async_session = session_factory
+    for user_id in range(1, args.users + 1):
+        user_time.remember_timezone(user_id, "UTC")  # сводка не должна ходить за часовым поясом
+
+    rng = random.Random(46)
+    requests = [(rng.randint(1, args.users), day_key(FIRST_DAY + timedelta(days=rng.randrange(args.days))))
+                for _ in range(args.requests)]
+    print(f"{args.requests} summaries of random past days, {args.concurrency} at a time")
+    before = await run("before", legacy_summary, requests, args.concurrency)
+    after = await run("after", combined_summary, requests, args.concurrency)
+    print(f"throughput: {after / before:.1f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Reminder time parsing: previous handle_parse_time logic vs date_parsing.parse_when.
+
+The corpus is the phrases from tests/test_date_parsing.py and
+tests/test_ai_functions.py plus two forms only dateparser understands, cycled
+as the AI sends them. Before: dateparser.parse with a fresh parser per call
+and a per-call regex fallback. After: fast path with the LRU cache, warmed
+DateDataParser for the rest.
+
+    python benchmarks/bench_date_parsing.py --calls 5000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+
+CORPUS = [
+    "через 1 час", "завтра в 15:00", "завтра",
+    "через 10 минут", "Через 1 час 30 минут", "через полчаса", "через 2 години", "in an hour",
+    "dentro de 10 minutos", "завтра о 15:00", "tomorrow at 3pm", "mañana a las 9", "в 16:30", "в 9:00",
+    "сегодня в 10:00", "через 5 минут",
+    "15 декабря в 10:00", "через год",
+]
+TIMEZONE = "Europe/Madrid"
+
+
+def legacy_parse(text: str):
+    """handle_parse_time before date_parsing.py"""
+    import dateparser
+    import re
+    user_tz = pytz.timezone(TIMEZONE)
+    now_local_naive = datetime.now()
+    now_local = user_tz.localize(now_local_naive.replace(tzinfo=None))
+    settings = {'RELATIVE_BASE': now_local_naive, 'PREFER_DATES_FROM': 'future', 'TIMEZONE': TIMEZONE}
+    if "через" in text.lower():
+        settings['STRICT_PARSING'] = False
+    parsed_date = dateparser.parse(text, languages=['ru', 'en'], settings=settings)
+    if not parsed_date and "через" in text.lower():
+        match = re.search(r'через\s+(\d+)\s+(секунд[ыу]?|минут[ыу]?|час[аов]?)', text.lower())
+        if match:
+            value = int(match.group(1))
+            unit = match.group(2)
+            if 'секунд' in unit:
+                parsed_date = now_local + timedelta(seconds=value)
+            elif 'минут' in unit:
+                parsed_date = now_local + timedelta(minutes=value)
+            elif 'час' in unit:
+                parsed_date = now_local + timedelta(hours=value)
+    if parsed_date and parsed_date.tzinfo is None:
+        parsed_date = pytz.timezone(TIMEZONE).localize(parsed_date)
+    return parsed_date
+
+
+def run(fn, calls: int, corpus=CORPUS) -> float:
+    """Microseconds per phrase"""
+    batch = corpus * (calls // len(corpus))
+    started = time.perf_counter()
+    for text in batch:
+        fn(text)
+    return (time.perf_counter() - started) / len(batch) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    from date_parsing import fast_spec, normalize, parse_when, warm_up
+
+    started = time.perf_counter()
+    warm_up(TIMEZONE)
+    print(f"warm-up (startup, once): {(time.perf_counter() - started) * 1e3:.0f} ms")
+
+    fast = [text for text in CORPUS if fast_spec(normalize(text))]
+    print(f"fast path covers {len(fast)} of {len(CORPUS)} corpus phrases")
+
+    for label, corpus in (("whole corpus", CORPUS), ("fast-path phrases", fast)):
+        before = run(legacy_parse, args.calls, corpus)
+        after = run(lambda text: parse_when(text, TIMEZONE), args.calls, corpus)
+        print(f"{label} before: {before:.1f} µs per phrase")
+        print(f"{label} after:  {after:.1f} µs per phrase  ({before / after:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
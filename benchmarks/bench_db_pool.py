@@ -0,0 +1,130 @@
+"""
+get_or_create_user latency under concurrent updates: previous engine setup vs the tuned pool.
+
+Every round fires --concurrency get_or_create_user calls at once for
+existing users with a changed language_code (a read and an UPDATE each).
+Before: pool_pre_ping=True (a SELECT 1 round-trip per checkout), statements
+built on every call. After: database.engine_options() (no pre-ping, sized
+pool with checkout metrics, asyncpg statement cache) and the lambda_stmt
+queries in db_helpers.
+
+Point --url at a local PostgreSQL (or a Postgres-compatible server) for the
+real comparison; without it a SQLite file with the same pool options is used.
+
+    python benchmarks/bench_db_pool.py --url postgresql+asyncpg://bench@localhost/bench --concurrency 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "bench_pool.db"))
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import db_helpers
+from database import Base, User, engine_options, tune_sqlite
+from translations import get_language_code
+from utils.pool_metrics import MeasuredQueuePool, PoolMetrics
+
+FIRST_ID = 910_000_000
+LANGUAGES = ["en", "es", "ru", "uk"]
+
+
+async def legacy_get_or_create_user(telegram_id: int, username: str = None, name: str = None,
+                                    language_code: str = None) -> User:
+    """get_or_create_user before the pool changes"""
+    async with db_helpers.async_session() as session:
+        result = await session.execute(select(User).where(User.telegram_id == telegram_id))
+        user = result.scalar_one_or_none()
+        if not user:
+            lang = get_language_code(language_code) if language_code else 'en'
+            user = User(telegram_id=telegram_id, username=username, name=name, language_code=lang)
+            session.add(user)
+            await session.commit()
+        elif language_code:
+            new_lang = get_language_code(language_code)
+            if user.language_code != new_lang:
+                user.language_code = new_lang
+                await session.commit()
+        return user
+
+
+def make_engine(url: str, tuned: bool, metrics: PoolMetrics):
+    postgres = url.startswith("postgres")
+    options = engine_options(postgres=True)
+    if not postgres:
+        options.pop("connect_args")  # кэш подготовленных запросов - параметр asyncpg
+    if not tuned:
+        options["pool_pre_ping"] = True
+    options["poolclass"] = type("BenchPool", (MeasuredQueuePool,), {"metrics": metrics})
+    engine = create_async_engine(url, **options)
+    if not postgres:
+        tune_sqlite(engine)
+    return engine
+
+
+async def run(label: str, url: str, tuned: bool, users: int, concurrency: int, rounds: int):
+    metrics = PoolMetrics()
+    engine = make_engine(url, tuned, metrics)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(User).where(User.telegram_id >= FIRST_ID))
+    db_helpers.async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    get_or_create_user = db_helpers.get_or_create_user if tuned else legacy_get_or_create_user
+    for i in range(users):
+        await get_or_create_user(FIRST_ID + i, "bench", "Bench", "en")
+    metrics.reset()
+
+    latencies, errors = [], []
+
+    async def call(i: int, round_no: int):
+        started = time.perf_counter()
+        try:
+            await get_or_create_user(FIRST_ID + i % users, language_code=LANGUAGES[(i + round_no + 1) % 4])
+        except Exception as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for round_no in range(rounds):
+        await asyncio.gather(*(call(i, round_no) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    p50, p99 = (statistics.quantiles(latencies, n=100)[q] * 1e3 for q in (49, 98))
+    line = (f"{label:6s} p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   {len(latencies) / elapsed:6.0f} calls/s   "
+            f"pool: {metrics.checkouts} checkouts, wait avg {metrics.avg_wait_ms:.2f} ms max "
+            f"{metrics.max_wait_seconds * 1e3:.1f} ms")
+    if errors:
+        line += f"   errors {len(errors)} ({type(errors[0]).__name__})"
+    print(line)
+    return p99
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("BENCH_POSTGRES_URL"), help="database URL (default: SQLite file)")
+    parser.add_argument("--concurrency", type=int, default=500, help="simultaneous get_or_create_user calls")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        url = "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_pool.db")
+        print("no --url: SQLite file (pool options only; use PostgreSQL for the pre-ping/statement cache effect)")
+    print(f"{args.concurrency} concurrent updates x {args.rounds} rounds, {args.users} users")
+    before = await run("before", url, False, args.users, args.concurrency, args.rounds)
+    after = await run("after", url, True, args.users, args.concurrency, args.rounds)
+    print(f"p99: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
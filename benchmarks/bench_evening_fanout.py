@@ -0,0 +1,114 @@
+"""
+Evening check-in fan-out for many users.
+
+Fills a temporary SQLite database with N users spread over several timezones
+and runs one tick of ReminderScheduler.run_evening_fanout against a fake bot.
+For comparison it also measures the old approach: one cron job per user.
+
+    python benchmarks/bench_evening_fanout.py --users 100000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_DB_DIR = tempfile.mkdtemp(prefix="bench_fanout_")
+os.environ.setdefault("BOT_TOKEN", "123:bench")
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_DIR}/bench.db"
+
+TIMEZONES = ["Europe/Madrid", "Europe/Kyiv", "Europe/Moscow", "America/New_York",
+             "America/Mexico_City", "Asia/Kolkata", "Asia/Kathmandu", "Australia/Adelaide"]
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+
+async def fill(users: int):
+    from sqlalchemy import insert
+    from database import init_db, async_session, User
+
+    await init_db()
+    async with async_session() as session:
+        batch = []
+        for i in range(users):
+            batch.append({"telegram_id": 10_000_000 + i, "name": f"user{i}",
+                          "language_code": "ru", "timezone": TIMEZONES[i % len(TIMEZONES)]})
+            if len(batch) == 10_000:
+                await session.execute(insert(User), batch)
+                batch = []
+        if batch:
+            await session.execute(insert(User), batch)
+        await session.commit()
+
+
+def per_user_jobs(users: int):
+    """Old approach: one CronTrigger job per chat"""
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    async def noop(chat_id):
+        pass
+
+    scheduler = AsyncIOScheduler()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i in range(users):
+        scheduler.add_job(noop, trigger=CronTrigger(hour=20, minute=0, timezone="UTC"),
+                          id=f"evening_{i}", args=[i], replace_existing=True)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(scheduler.get_jobs()), elapsed, peak
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--legacy-users", type=int, default=20_000,
+                        help="users for the per-user job comparison (it is slow)")
+    args = parser.parse_args()
+
+    from scheduler import ReminderScheduler
+    from utils.broadcast import RateLimitedSender
+    from config import BROADCAST_RATE
+
+    started = time.perf_counter()
+    await fill(args.users)
+    print(f"Filled {args.users} users in {time.perf_counter() - started:.1f}s")
+
+    bot = FakeBot()
+    scheduler = ReminderScheduler(bot)
+    scheduler.schedule_evening_checkins(hour=20, minute=0)
+    # 17:05 UTC = 20:05 в Москве; без ограничения скорости, меряем сам проход
+    now_utc = datetime(2025, 6, 1, 17, 5)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    stats = await scheduler.run_evening_fanout(now_utc=now_utc, sender=RateLimitedSender(bot, rate=1e9))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\nFan-out: jobs={len(scheduler.scheduler.get_jobs())} sent={stats['sent']} "
+          f"time={elapsed:.2f}s peak_mem={peak / 1e6:.1f}MB")
+    print(f"At {BROADCAST_RATE:.0f} msg/s the same tick takes ~{stats['sent'] / BROADCAST_RATE / 60:.0f} min of sending")
+
+    jobs, elapsed, peak = per_user_jobs(args.legacy_users)
+    print(f"Per-user jobs ({args.legacy_users} users): jobs={jobs} add_time={elapsed:.2f}s "
+          f"peak_mem={peak / 1e6:.1f}MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Import time of the bot's entry points, with a budget.
+
+Each module is imported in a fresh interpreter (median wall time of --runs),
+and one `python -X importtime` run lists the slowest packages it pulls in.
+With --baseline-rev the same is measured on that git revision (extracted with
+`git archive` into a temp dir) for a before/after comparison. Exits with
+status 1 if a module is over its budget.
+
+    python benchmarks/bench_import_time.py --runs 5 --baseline-rev HEAD~1
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджет импорта (мс, wall time); bot.py ограничен снизу импортом aiogram
+BUDGETS_MS = {
+    "config": 100,
+    "ai_service": 1000,
+    "services.reminder_service": 1500,
+    "bot": 5000,
+}
+
+ENV = {
+    "BOT_TOKEN": "123:bench",
+    "OPENAI_API_KEY": "sk-bench",
+    "DATABASE_URL": "sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "bench_import.db"),
+}
+
+
+def run_python(cwd: str, code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, **ENV}
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def wall_ms(cwd: str, module: str, runs: int) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    run_python(cwd, code)  # прогрев: .pyc и кэш файловой системы
+    return statistics.median(float(run_python(cwd, code).stdout.split()[-1]) * 1e3 for _ in range(runs))
+
+
+def slowest_packages(cwd: str, module: str, limit: int) -> list:
+    """Packages by cumulative -X importtime of their outermost import"""
+    stderr = run_python(cwd, f"import {module}", "-X", "importtime").stderr
+    totals = {}
+    for line in stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # заголовок таблицы
+        package = name.strip().split(".")[0]
+        totals[package] = max(totals.get(package, 0), int(cumulative))
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [(package, us / 1e3) for package, us in ranked if package != module.split(".")[0]][:limit]
+
+
+def measure(cwd: str, runs: int) -> dict:
+    return {module: wall_ms(cwd, module, runs) for module in BUDGETS_MS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--baseline-rev", help="git revision to compare against")
+    parser.add_argument("--top", type=int, default=6, help="slowest packages to list for bot")
+    args = parser.parse_args()
+
+    before = None
+    if args.baseline_rev:
+        with tempfile.TemporaryDirectory() as baseline_dir:
+            archive = subprocess.run(["git", "archive", args.baseline_rev], cwd=ROOT, capture_output=True, check=True)
+            subprocess.run(["tar", "-x", "-C", baseline_dir], input=archive.stdout, check=True)
+            before = measure(baseline_dir, args.runs)
+    after = measure(ROOT, args.runs)
+
+    over_budget = False
+    for module, budget in BUDGETS_MS.items():
+        line = f"{module:28s} {after[module]:8.0f} ms  (budget {budget} ms)"
+        if before:
+            line += f"  before {before[module]:.0f} ms ({before[module] / after[module]:.1f}x)"
+        if after[module] > budget:
+            line += "  OVER BUDGET"
+            over_budget = True
+        print(line)
+
+    print("\nslowest packages imported by bot (-X importtime, cumulative):")
+    for package, ms in slowest_packages(ROOT, "bot", args.top):
+        print(f"  {package:24s} {ms:8.0f} ms")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Keyboard-building cost per update.
+
+A typical update builds the main or cancel keyboard and, for reminder/plan
+screens, an item keyboard. Compares building validated pydantic models on
+every reply (the previous keyboards.py) against the memoized static
+keyboards and template-built item keyboards.
+
+    python benchmarks/bench_keyboards.py --updates 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+
+import keyboards
+from translations import translate
+
+
+def legacy_main_keyboard(lang_code='en'):
+    return ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="💚 Помощь сейчас"), KeyboardButton(text="🎯 Главная цель")],
+            [KeyboardButton(text="📋 План"), KeyboardButton(text="🍅 Фокус")],
+            [KeyboardButton(text="📝 Заметки"), KeyboardButton(text="🔋 Энергия")]
+        ],
+        resize_keyboard=True
+    )
+
+
+def legacy_cancel_keyboard(lang_code='en'):
+    return ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton(text=translate("cancel", lang_code))]],
+        resize_keyboard=True,
+        one_time_keyboard=True
+    )
+
+
+def legacy_reminder_keyboard(reminder_id, page=0):
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✅ Выполнено", callback_data=f"rem_{reminder_id}_done"),
+                InlineKeyboardButton(text="✏️ Изменить", callback_data=f"rem_{reminder_id}_edit")
+            ],
+            [InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"rem_{reminder_id}_delete_confirm")],
+            [InlineKeyboardButton(text="🔙 Назад", callback_data=f"rem_list_{page}")]
+        ]
+    )
+
+
+def legacy_plan_item_keyboard(item_id):
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✅ Сделано", callback_data=f"plan_{item_id}_done"),
+                InlineKeyboardButton(text="✏️ Изменить", callback_data=f"plan_{item_id}_edit")
+            ],
+            [InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"plan_{item_id}_delete_confirm")],
+            [InlineKeyboardButton(text="🔙 Назад", callback_data="plan_list")]
+        ]
+    )
+
+
+def texts(markup):
+    return [[button.text for button in row] for row in markup.inline_keyboard]
+
+
+def run(main_kb, cancel_kb, reminder_kb, plan_kb, updates: int) -> float:
+    """Microseconds of keyboard building per update (4 update kinds in rotation)"""
+    started = time.perf_counter()
+    for i in range(updates // 4):
+        main_kb("ru")
+        cancel_kb("en")
+        reminder_kb(i)
+        plan_kb(i)
+    return (time.perf_counter() - started) / (updates // 4 * 4) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # callback_data с тех пор сменил формат (callbacks.py), сравниваем раскладку и тексты
+    assert texts(keyboards.get_reminder_keyboard(1)) == texts(legacy_reminder_keyboard(1))
+    assert texts(keyboards.get_plan_item_keyboard(1)) == texts(legacy_plan_item_keyboard(1))
+
+    before = run(legacy_main_keyboard, legacy_cancel_keyboard, legacy_reminder_keyboard,
+                 legacy_plan_item_keyboard, args.updates)
+    after = run(keyboards.get_main_keyboard, keyboards.get_cancel_keyboard, keyboards.get_reminder_keyboard,
+                keyboards.get_plan_item_keyboard, args.updates)
+    print(f"before: {before:.1f} µs per update")
+    print(f"after:  {after:.1f} µs per update  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
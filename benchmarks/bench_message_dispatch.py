@@ -0,0 +1,150 @@
+"""
+Dispatch cost of text messages through aiogram's message handlers.
+
+Builds two Dispatchers with no-op handlers registered in bot.py order: one
+with the previous per-button lambda filters (`"План" in m.text`), one with
+the exact-match button table (buttons.ButtonRouter) in front. Feeds menu
+button presses and free text that ends in the AI catch-all, then prints the
+per-filter profile of the previous chain (utils.filter_profiler).
+
+    python benchmarks/bench_message_dispatch.py --rounds 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher, F
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Update
+
+from buttons import Button, ButtonRouter
+from utils.filter_profiler import FilterProfiler
+
+BUTTON_PRESSES = ["💚 Помощь сейчас", "🎯 Главная цель", "📋 План", "🍅 Фокус", "📝 Заметки"]
+FREE_TEXT = ["напомни завтра в 10 позвонить маме", "я устал и ничего не успеваю", "сохрани идею про подарок",
+             "что у меня сегодня?", "привет"]
+
+
+class States(StatesGroup):
+    goal = State()
+    goal_pomodoros = State()
+    note = State()
+    evening_worked = State()
+    evening_tired = State()
+    evening_helped = State()
+    day_rating = State()
+    energy = State()
+    reminder_text = State()
+    plan_item = State()
+
+
+async def noop(message, *args, **kwargs):
+    pass
+
+
+# (фильтры, кнопка) в порядке регистрации bot.py; кнопка - для варианта с таблицей
+HANDLERS = [
+    ((Command("start"),), None),
+    ((Command("help"),), None),
+    ((lambda m: m.text and "💚 Помощь сейчас" in m.text,), Button.HELP_NOW),
+    ((Command("goal"),), None),
+    ((lambda m: m.text and ("🎯 Главная цель" in m.text or "Главная цель" in m.text),), Button.GOAL),
+    ((StateFilter(States.goal),), None),
+    ((StateFilter(States.goal_pomodoros),), None),
+    ((Command("focus"),), None),
+    ((lambda m: m.text and ("🍅 Фокус" in m.text or "Фокус" in m.text),), Button.FOCUS),
+    ((Command("note"),), None),
+    ((lambda m: m.text and ("📝 Заметки" in m.text or "Заметки" in m.text),), Button.NOTES),
+    ((StateFilter(States.note),), None),
+    ((Command("notes"),), None),
+    ((Command("evening"),), None),
+    ((StateFilter(States.evening_worked),), None),
+    ((StateFilter(States.evening_tired),), None),
+    ((StateFilter(States.evening_helped),), None),
+    ((StateFilter(States.day_rating),), None),
+    ((Command("rating"),), None),
+    ((Command("history"),), None),
+    ((Command("quiet"),), None),
+    ((Command("timezone"),), None),
+    ((Command("energy"),), None),
+    ((StateFilter(States.energy),), None),
+    ((Command("reminders"),), None),
+    ((StateFilter(States.reminder_text),), None),
+    ((Command("plan"),), None),
+    ((lambda m: m.text and ("📋 План" in m.text or "План" in m.text),), Button.PLAN),
+    ((StateFilter(States.plan_item),), None),
+    ((F.voice, StateFilter(None)), None),
+    ((StateFilter(None),), None),
+]
+
+
+def legacy_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+    for filters, _ in HANDLERS:
+        dp.message.register(noop, *filters)
+    return dp
+
+
+def table_dispatcher() -> Dispatcher:
+    router = ButtonRouter()
+    dp = Dispatcher()
+    dp.message.register(router.dispatch, router.match)
+    for filters, button in HANDLERS:
+        if button:
+            router.handler(button)(noop)
+        else:
+            dp.message.register(noop, *filters)
+    router.build()
+    return dp
+
+
+def make_update(update_id: int, text: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Bench"},
+        },
+    })
+
+
+async def run(dp: Dispatcher, bot: Bot, updates: list) -> float:
+    """Microseconds per message update"""
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / len(updates) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000, help="passes over all sample messages")
+    args = parser.parse_args()
+
+    bot = Bot("123:bench")
+    presses = [make_update(i, text) for i in range(args.rounds) for text in BUTTON_PRESSES]
+    free_text = [make_update(i, text) for i in range(args.rounds) for text in FREE_TEXT]
+
+    for label, updates in (("button press", presses), ("free text", free_text)):
+        before = await run(legacy_dispatcher(), bot, updates)
+        after = await run(table_dispatcher(), bot, updates)
+        print(f"{label} before: {before:.1f} µs per message")
+        print(f"{label} after:  {after:.1f} µs per message  ({before / after:.1f}x)")
+
+    dp = legacy_dispatcher()
+    profiler = FilterProfiler()
+    profiler.instrument(dp)
+    await run(dp, bot, presses + free_text)
+    await bot.session.close()
+    print("\nprevious filter chain, top filters by total time:")
+    print(profiler.report(limit=10))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+SQLite write throughput under concurrent simulated users.
+
+Each simulated user saves notes and energy levels in a loop through
+db_helpers (save_note / save_energy_level), all users at once. Three setups
+on a fresh database file each:
+
+  before   - default engine: rollback journal, a transaction per write
+  pragmas  - WAL + synchronous=NORMAL, mmap, cache, busy_timeout (tune_sqlite)
+  after    - pragmas + one writer committing concurrent writes in batches
+
+    python benchmarks/bench_sqlite_writes.py --users 50 --writes 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "bench_sqlite.db"))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import database
+import db_helpers
+import user_time
+from database import Base, tune_sqlite
+from utils.group_commit import GroupCommitWriter
+
+
+async def setup(path: str, tuned: bool, group_commit: bool):
+    """Fresh database; db_helpers and user_time switched to it"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    if tuned:
+        tune_sqlite(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    for module in (database, db_helpers, user_time):
+        module.async_session = session_factory
+    database.writer = GroupCommitWriter(session_factory) if group_commit else None
+    return engine
+
+
+async def simulated_user(user_id: int, writes: int, latencies: list, errors: list):
+    for i in range(writes):
+        started = time.perf_counter()
+        try:
+            if i % 2:
+                await db_helpers.save_energy_level(user_id, (40, 60, 80)[i % 3])
+            else:
+                await db_helpers.save_note(user_id, f"note {i} from user {user_id}")
+        except Exception as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(label: str, users: int, writes: int, tuned: bool, group_commit: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = await setup(os.path.join(tmp, "bench.db"), tuned, group_commit)
+        for user_id in range(1, users + 1):
+            user_time.remember_timezone(user_id, "Europe/Madrid")  # без чтения users на каждую запись
+        latencies, errors = [], []
+        started = time.perf_counter()
+        await asyncio.gather(*(simulated_user(user_id, writes, latencies, errors)
+                               for user_id in range(1, users + 1)))
+        elapsed = time.perf_counter() - started
+        await engine.dispose()
+
+    p50, p95 = (statistics.quantiles(latencies, n=100)[q] * 1e3 for q in (49, 94))
+    throughput = (len(latencies) - len(errors)) / elapsed
+    line = f"{label:8s} {throughput:8.0f} writes/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms"
+    if errors:
+        line += f"   errors {len(errors)} ({type(errors[0]).__name__})"
+    if group_commit:
+        writer = database.writer
+        line += f"   {writer.writes / max(writer.batches, 1):.1f} writes per commit"
+    print(line)
+    return throughput
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="concurrent simulated users")
+    parser.add_argument("--writes", type=int, default=20, help="writes per user")
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.writes} writes")
+    before = await run("before", args.users, args.writes, tuned=False, group_commit=False)
+    await run("pragmas", args.users, args.writes, tuned=True, group_commit=False)
+    after = await run("after", args.users, args.writes, tuned=True, group_commit=True)
+    print(f"throughput: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Lookups per second of translations.translate.
+
+Compares the compiled tables and render cache against the previous
+implementation (normalize the language, two dict lookups, str.format on
+every call) on a mix of plain and formatted keys, as handlers call them.
+
+    python benchmarks/bench_translations.py --calls 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translations import TRANSLATIONS, translate
+
+
+def legacy_get_language_code(telegram_lang_code: str = None) -> str:
+    if not telegram_lang_code:
+        return 'en'
+    lang = telegram_lang_code.lower().split('-')[0]
+    supported = {'en': 'en', 'es': 'es', 'ru': 'ru', 'uk': 'uk', 'ua': 'uk'}
+    return supported.get(lang, 'en')
+
+
+def legacy_translate(key: str, lang_code: str = 'en', **kwargs) -> str:
+    lang_code = legacy_get_language_code(lang_code)
+    translations = TRANSLATIONS.get(key, {})
+    text = translations.get(lang_code, translations.get('en', key))
+    if kwargs:
+        try:
+            text = text.format(**kwargs)
+        except KeyError:
+            pass
+    return text
+
+
+CALLS = [
+    ("greeting_simple", "ru", {}),
+    ("energy_question", "en-US", {}),
+    ("pomodoros_question", "es", {}),
+    ("goal_understood", "ru", {"goal": "Разобрать почту"}),
+    ("timezone_set", "uk", {"tz": "Europe/Kyiv"}),
+    ("evening_checkin_prompt", "ru-RU", {}),
+]
+
+
+def run(fn, calls: int) -> float:
+    batch = CALLS * (calls // len(CALLS))
+    started = time.perf_counter()
+    for key, lang, kwargs in batch:
+        fn(key, lang, **kwargs)
+    return len(batch) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500_000)
+    args = parser.parse_args()
+
+    for key, lang, kwargs in CALLS:
+        assert translate(key, lang, **kwargs) == legacy_translate(key, lang, **kwargs), key
+
+    before = run(legacy_translate, args.calls)
+    after = run(translate, args.calls)
+    print(f"before: {before / 1e6:.2f}M lookups/s")
+    print(f"after:  {after / 1e6:.2f}M lookups/s  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 import pytz
 
 # Aiogram
-from aiogram import Bot, Dispatcher, F
+from aiogram import Dispatcher, F
 from aiogram.filters import Command, StateFilter, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -14,13 +14,15 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery, Voice
 
 # Config and initialization
-from config import BOT_TOKEN, POMODORO_WORK_TIME, POMODORO_BREAK_TIME, QUIET_MODE_DURATION
-from database import init_db
+from config import (
+    POMODORO_WORK_TIME, POMODORO_BREAK_TIME, QUIET_MODE_DURATION, AI_STREAMING, EVENING_CHECKIN_ENABLED,
+    PROFILE_FILTERS, PROFILE_FILTERS_INTERVAL, DATABASE_BACKEND, DB_METRICS_INTERVAL, RETENTION_DAYS,
+    RETENTION_INTERVAL
+)
+from database import init_db, log_db_metrics
 
 # Database helpers - grouped by domain
 from db_helpers import (
-    # User
-    get_or_create_user,
     # Goals
     save_energy_level, save_goal, get_todays_goal, complete_goal,
     # Notes
@@ -32,9 +34,9 @@ from db_helpers import (
     # User state
     get_user_state, set_quiet_mode, disable_quiet_mode,
     # Reminders
-    get_all_reminders, delete_reminder, complete_reminder,
+    get_reminder, get_reminders_page, delete_reminder, complete_reminder,
     # Plan
-    get_plan_items, add_plan_item, delete_plan_item, toggle_plan_item,
+    get_plan_items, get_plan_item, get_plan_page, add_plan_item, delete_plan_item, toggle_plan_item,
     # Rating and history
     set_day_rating, get_daily_summary, get_days_history
 )
@@ -44,31 +46,47 @@ from keyboards import (
     get_energy_keyboard, get_day_type_keyboard, get_pomodoro_keyboard,
     get_main_keyboard, get_goal_confirmation_keyboard, get_goal_completion_keyboard,
     get_reminders_list_keyboard, get_reminder_keyboard, get_reminder_delete_confirm_keyboard,
-    get_plan_list_keyboard, get_plan_item_keyboard, get_plan_delete_confirm_keyboard, get_cancel_keyboard
+    get_plan_list_keyboard, get_plan_item_keyboard, get_plan_delete_confirm_keyboard, get_cancel_keyboard,
+    get_quick_help_keyboard
 )
 
 # Services
 from ai_service import ai_service
-from scheduler import ReminderScheduler
-from ai_functions import FunctionHandler
+from date_parsing import warm_up as warm_up_date_parsing
+from app import get_bot, get_scheduler, create_app
 from translations import translate, get_user_language
 from bot_helpers import get_user_and_lang, get_lang_from_user_id
+from identity import identities, resolve_user, resolve_user_id
+from utils.message_stream import ThrottledMessageEditor
+from utils.pagination import decode_cursor
+from callbacks import Action, CallbackRouter
+from buttons import Button, ButtonRouter
+from utils.filter_profiler import filter_profiler
+from utils.pool_metrics import pool_metrics
 
 # Logger
 logger = logging.getLogger(__name__)
 
 
-# Инициализация бота и диспетчера
-bot = Bot(token=BOT_TOKEN)
+# Инициализация бота и диспетчера (бот и планировщик - общие с сервисами, см. app.py)
+bot = get_bot()
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
+# Все inline-кнопки - через один обработчик с таблицей действий (callbacks.py).
+# Таблица своя у диспетчера, а не общая на процесс: повторный импорт модуля её не перепишет
+callback_router = CallbackRouter().setup(dp)
+# Кнопки главного меню - первым обработчиком сообщений, точное совпадение текста (buttons.py)
+button_router = ButtonRouter().setup(dp)
 
-# Инициализация планировщика
-scheduler = ReminderScheduler(bot)
 
-# Инициализация function handler с scheduler и bot
-import ai_functions as af_module
-af_module.function_handler = FunctionHandler(scheduler=scheduler, bot=bot)
+@dp.update.outer_middleware()
+async def count_updates(handler, event, data):
+    """Счётчик апдейтов для отчёта «запросов в БД на апдейт» (log_db_metrics)"""
+    pool_metrics.updates += 1
+    return await handler(event, data)
+
+# Инициализация планировщика
+scheduler = get_scheduler()
 
 
 # Состояния FSM
@@ -131,7 +149,7 @@ async def cmd_help(message: Message, state: FSMContext):
     await message.answer(help_text, reply_markup=get_main_keyboard())
 
 
-@dp.message(lambda m: m.text and "💚 Помощь сейчас" in m.text)
+@button_router.handler(Button.HELP_NOW)
 async def quick_help(message: Message, state: FSMContext):
     """Мгновенная помощь при стрессе/перегрузке"""
     await state.clear()
@@ -139,7 +157,7 @@ async def quick_help(message: Message, state: FSMContext):
     # Проверяем контекст - есть ли задачи, цели
     from db_helpers import get_todays_goal, get_plan_items, get_user_notes
     
-    user = await get_or_create_user(message.from_user.id, None, None)
+    user = await resolve_user(message.from_user)
     goal = await get_todays_goal(user.id)
     plan_items = await get_plan_items(user.id)
     completed_today = sum(1 for item in plan_items if item.completed)
@@ -164,22 +182,11 @@ async def quick_help(message: Message, state: FSMContext):
     support_text += "\n💚 Просто напиши что чувствуешь, я поддержу."
     
     # Inline кнопки для быстрых действий
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    
-    quick_help_keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="🎯 Поставить цель", callback_data="quick_goal")],
-            [InlineKeyboardButton(text="📋 Добавить задачу", callback_data="quick_plan")],
-            [InlineKeyboardButton(text="🍅 Запустить фокус", callback_data="quick_focus")],
-            [InlineKeyboardButton(text="😌 Отдохнуть (тишина)", callback_data="quick_quiet")],
-        ]
-    )
-    
-    await message.answer(support_text, reply_markup=quick_help_keyboard)
+    await message.answer(support_text, reply_markup=get_quick_help_keyboard())
 
 
 @dp.message(Command("goal"))
-@dp.message(lambda m: m.text and ("🎯 Главная цель" in m.text or "Главная цель" in m.text))
+@button_router.handler(Button.GOAL)
 async def cmd_goal(message: Message, state: FSMContext):
     """Set daily goal"""
     user, lang = await get_user_and_lang(message.from_user)
@@ -296,7 +303,7 @@ async def process_goal_pomodoros(message: Message, state: FSMContext):
         data = await state.get_data()
         goal_text = data.get("goal_text", "")
         if goal_text:
-            goal = await save_goal(message.from_user.id, goal_text)
+            goal = await save_goal(await resolve_user_id(message.from_user), goal_text)
             await message.answer(
                 f"✅ Цель сохранена:\n\n{goal.goal_text}\n\n💡 Можешь позже добавить оценку в помидорах через /goal",
                 reply_markup=get_main_keyboard()
@@ -338,7 +345,7 @@ async def process_goal_pomodoros(message: Message, state: FSMContext):
             await state.clear()
             return
         
-        goal = await save_goal(message.from_user.id, goal_text, estimated_pomodoros)
+        goal = await save_goal(await resolve_user_id(message.from_user), goal_text, estimated_pomodoros)
         
         if estimated_pomodoros:
             text = f"""✅ Цель сохранена! 🎯
@@ -365,7 +372,7 @@ async def process_goal_pomodoros(message: Message, state: FSMContext):
 
 
 @dp.message(Command("focus"))
-@dp.message(lambda m: m.text and ("🍅 Фокус" in m.text or "Фокус" in m.text))
+@button_router.handler(Button.FOCUS)
 async def cmd_focus(message: Message, state: FSMContext):
     """Запустить Pomodoro таймер"""
     user_id = message.from_user.id
@@ -375,15 +382,14 @@ async def cmd_focus(message: Message, state: FSMContext):
         await message.answer("У тебя уже есть активный таймер! ⏱️", reply_markup=get_main_keyboard())
         return
     
-    # Проверяем режим тишины
-    user_state = await get_user_state(user_id)
-    if user_state.in_quiet_mode and user_state.quiet_mode_until > datetime.utcnow():
+    # Проверяем режим тишины (кеш планировщика, без запроса в БД)
+    if scheduler.is_quiet(message.chat.id):
         await message.answer("Ты в режиме тишины. Отдыхай 😌", reply_markup=get_main_keyboard())
         return
     
     # Проверяем есть ли цель или задачи
     from db_helpers import get_todays_goal, get_plan_items
-    user = await get_or_create_user(user_id, None, None)
+    user = await resolve_user(user_id)
     goal = await get_todays_goal(user.id)
     plan_items = await get_plan_items(user.id, completed=False)
     
@@ -404,7 +410,7 @@ async def start_pomodoro(user_id: int, chat_id: int):
     
     # Увеличиваем счетчик помидоров для цели
     from db_helpers import increment_goal_pomodoro, get_todays_goal
-    user = await get_or_create_user(user_id, None, None)
+    user = await resolve_user(user_id)
     goal = await get_todays_goal(user.id)
     
     # Рабочее время
@@ -444,7 +450,7 @@ async def start_pomodoro(user_id: int, chat_id: int):
     await bot.send_message(chat_id, continue_msg, reply_markup=get_pomodoro_keyboard())
 
 
-@dp.callback_query(F.data == "pomodoro_continue")
+@callback_router.handler(Action.POMODORO_CONTINUE)
 async def pomodoro_continue(callback: CallbackQuery):
     """Продолжить Pomodoro"""
     await callback.message.edit_text("Снова 25 минут фокуса 🍅")
@@ -452,7 +458,7 @@ async def pomodoro_continue(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(F.data == "pomodoro_stop")
+@callback_router.handler(Action.POMODORO_STOP)
 async def pomodoro_stop(callback: CallbackQuery):
     """Остановить Pomodoro"""
     user_id = callback.from_user.id
@@ -464,7 +470,7 @@ async def pomodoro_stop(callback: CallbackQuery):
 
 
 @dp.message(Command("note"))
-@dp.message(lambda m: m.text and ("📝 Заметки" in m.text or "Заметки" in m.text))
+@button_router.handler(Button.NOTES)
 async def cmd_note(message: Message, state: FSMContext):
     """Добавить заметку"""
     await message.answer(
@@ -524,7 +530,7 @@ async def process_note(message: Message, state: FSMContext):
             return
         
         # Сохраняем заметку
-        note = await save_note(message.from_user.id, message.text.strip())
+        note = await save_note(await resolve_user_id(message.from_user), message.text.strip())
         await message.answer(f"✅ Запомнил:\n\n{note.text}", reply_markup=get_main_keyboard())
         
     except Exception as e:
@@ -537,7 +543,7 @@ async def process_note(message: Message, state: FSMContext):
 @dp.message(Command("notes"))
 async def cmd_notes(message: Message, state: FSMContext):
     """Показать все заметки"""
-    user = await get_or_create_user(message.from_user.id, None, None)
+    user = await resolve_user(message.from_user)
     notes = await get_user_notes(user.id)
     
     if not notes:
@@ -668,7 +674,7 @@ async def process_evening_helped(message: Message, state: FSMContext):
         user, lang = await get_user_and_lang(message.from_user)
         
         await save_evening_checkin(
-            message.from_user.id,
+            user.id,
             what_worked=data.get('what_worked', ''),
             what_tired=data.get('what_tired', ''),
             what_helped=message.text.strip()
@@ -703,7 +709,7 @@ async def process_day_rating(message: Message, state: FSMContext):
         cancel_texts = ["❌ Отмена", "отмена", "Отмена", "/cancel", "/start", "пропустить", "skip"]
         if message.text and message.text.strip().lower() in cancel_texts:
             await state.clear()
-            user = await get_or_create_user(message.from_user.id, None, None)
+            user = await resolve_user(message.from_user)
             todays_goal = await get_todays_goal(user.id)
             
             if todays_goal and not todays_goal.completed:
@@ -737,7 +743,7 @@ async def process_day_rating(message: Message, state: FSMContext):
             return
         
         # Сохраняем оценку
-        user = await get_or_create_user(message.from_user.id, None, None)
+        user = await resolve_user(message.from_user)
         await set_day_rating(user.id, date=None, rating=rating)
         
         # Генерируем сообщение в зависимости от оценки
@@ -829,10 +835,10 @@ async def cmd_history(message: Message, state: FSMContext):
     await state.update_data(history_format="short")
 
 
-@dp.callback_query(F.data == "goal_confirm")
+@callback_router.handler(Action.GOAL_CONFIRM)
 async def goal_confirm(callback: CallbackQuery):
     """Подтвердить текущую цель"""
-    user = await get_or_create_user(callback.from_user.id, None, None)
+    user = await resolve_user(callback.from_user)
     goal = await get_todays_goal(user.id)
     if goal:
         await callback.message.edit_text(
@@ -844,7 +850,7 @@ async def goal_confirm(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(F.data == "goal_edit")
+@callback_router.handler(Action.GOAL_EDIT)
 async def goal_edit(callback: CallbackQuery, state: FSMContext):
     """Изменить цель"""
     await callback.message.edit_text("Так, какое главное дело на сегодня? 🎯", reply_markup=None)
@@ -852,10 +858,10 @@ async def goal_edit(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@dp.callback_query(F.data == "goal_done")
+@callback_router.handler(Action.GOAL_DONE)
 async def goal_done(callback: CallbackQuery):
     """Цель выполнена"""
-    user = await get_or_create_user(callback.from_user.id, None, None)
+    user = await resolve_user(callback.from_user)
     goal = await get_todays_goal(user.id)
     if goal:
         await complete_goal(goal.id, True)
@@ -864,7 +870,7 @@ async def goal_done(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(F.data == "goal_skip")
+@callback_router.handler(Action.GOAL_SKIP)
 async def goal_skip(callback: CallbackQuery):
     """Цель не выполнена"""
     await callback.message.edit_text(
@@ -877,24 +883,52 @@ async def goal_skip(callback: CallbackQuery):
 @dp.message(Command("quiet"))
 async def cmd_quiet(message: Message):
     """Режим тишины"""
-    await set_quiet_mode(message.from_user.id, QUIET_MODE_DURATION)
+    user_id = await resolve_user_id(message.from_user)
+    until = await set_quiet_mode(user_id, QUIET_MODE_DURATION)
+    # Окончание тишины - задача планировщика; напоминания до тех пор откладываются
+    scheduler.start_quiet_mode(message.chat.id, user_id, until)
     
     text = """Это твоё время перезагрузки 😌
 
 Я подожду 30 минут и не буду беспокоить."""
     
     await message.answer(text, reply_markup=get_main_keyboard())
+
+
+@dp.message(Command("timezone"))
+async def cmd_timezone(message: Message, state: FSMContext):
+    """Show or set the user's timezone: /timezone Europe/Madrid"""
+    from user_time import get_user_timezone, set_user_timezone, is_valid_timezone, local_now
+    
+    await state.clear()
+    user, lang = await get_user_and_lang(message.from_user)
+    parts = (message.text or "").split(maxsplit=1)
     
-    # Планируем отключение тишины
-    await asyncio.sleep(QUIET_MODE_DURATION)
-    await disable_quiet_mode(message.from_user.id)
-    await bot.send_message(message.chat.id, "Режим тишины завершён. Как дела? 👋")
+    if len(parts) < 2:
+        tz_name = await get_user_timezone(user.id)
+        await message.answer(
+            translate("timezone_current", lang, tz=tz_name, time=local_now(tz_name).strftime("%H:%M")),
+            reply_markup=get_main_keyboard(lang)
+        )
+        return
+    
+    tz_name = parts[1].strip()
+    if not is_valid_timezone(tz_name):
+        await message.answer(translate("timezone_invalid", lang, tz=tz_name), reply_markup=get_main_keyboard(lang))
+        return
+    
+    await set_user_timezone(user.id, tz_name)
+    await message.answer(
+        translate("timezone_set", lang, tz=tz_name, time=local_now(tz_name).strftime("%H:%M")),
+        reply_markup=get_main_keyboard(lang)
+    )
 
 
 @dp.message(Command("energy"))
+@button_router.handler(Button.ENERGY)
 async def cmd_energy(message: Message, state: FSMContext):
     """Статистика энергии"""
-    stats = await get_energy_stats_week(message.from_user.id)
+    stats = await get_energy_stats_week(await resolve_user_id(message.from_user))
     
     if stats['days_count'] == 0:
         text = """Статистики пока нет 📊
@@ -922,6 +956,15 @@ async def cmd_energy(message: Message, state: FSMContext):
     await message.answer(text, reply_markup=get_main_keyboard())
 
 
+@dp.message(Command("stats"))
+async def cmd_stats(message: Message, state: FSMContext):
+    """Тренды энергии и продуктивности за историю"""
+    from services.analytics_service import AnalyticsService
+    user, lang = await get_user_and_lang(message.from_user)
+    report = await AnalyticsService.get_trends(user.id)
+    await message.answer(await AnalyticsService.format_report(report, lang), reply_markup=get_main_keyboard())
+
+
 # ==================== ОБРАБОТЧИКИ УТРЕННЕГО ДИАЛОГА ====================
 
 @dp.message(StateFilter(BotStates.waiting_energy))
@@ -970,36 +1013,34 @@ async def process_energy(message: Message, state: FSMContext):
 async def cmd_reminders(message: Message):
     """Показать все напоминания"""
     try:
-        reminders = await get_all_reminders(message.from_user.id, completed=False)
+        page = await get_reminders_page(await resolve_user_id(message.from_user))
         
-        if not reminders:
+        if not page.items:
             # Показываем кнопку "Добавить" даже если напоминаний нет
             await message.answer(
                 "Напоминаний пока нет 📭\n\n"
                 "✨ Можешь добавить напоминание:\n"
                 "• Нажми кнопку '➕ Добавить' ниже\n"
                 "• Или просто напиши: 'напомни позвонить маме завтра в 15:00'",
-                reply_markup=get_reminders_list_keyboard(reminders)
+                reply_markup=get_reminders_list_keyboard(page.items)
             )
             return
         
-        text = f"Напоминания ({len(reminders)}) ⏰\n\n"
-        for i, rem in enumerate(reminders[:5], 1):
+        text = f"Напоминания ({page.total}) ⏰\n\n"
+        for i, rem in enumerate(page.items, 1):
             text += f"{i}. {rem.text}\n"
         
-        await message.answer(text, reply_markup=get_reminders_list_keyboard(reminders))
+        await message.answer(text, reply_markup=get_reminders_list_keyboard(page.items, page.has_prev, page.has_next))
     except Exception as e:
         logger.error(f"Error in /reminders: {e}", exc_info=True)
         await message.answer("Упс, не получилось загрузить напоминания 😅 Попробуй ещё раз?", reply_markup=get_main_keyboard())
 
 
-@dp.callback_query(F.data.startswith("rem_view_"))
-async def callback_reminder_view(callback: CallbackQuery):
+@callback_router.handler(Action.REMINDER_VIEW)
+async def callback_reminder_view(callback: CallbackQuery, reminder_id: int):
     """Просмотр напоминания"""
     try:
-        reminder_id = int(callback.data.split("_")[2])
-        reminders = await get_all_reminders(callback.from_user.id)
-        reminder = next((r for r in reminders if r.id == reminder_id), None)
+        reminder = await get_reminder(reminder_id, await resolve_user_id(callback.from_user))
         
         if not reminder:
             await callback.answer("Напоминание не найдено")
@@ -1016,34 +1057,38 @@ async def callback_reminder_view(callback: CallbackQuery):
         await callback.answer("Ошибка ⚠️", show_alert=True)
 
 
-@dp.callback_query(F.data.startswith("rem_list_"))
-async def callback_reminders_list(callback: CallbackQuery):
-    """Список напоминаний"""
-    page = int(callback.data.split("_")[2])
-    reminders = await get_all_reminders(callback.from_user.id, completed=False)
+@callback_router.handler(Action.REMINDER_LIST, Action.REMINDER_NEXT, Action.REMINDER_PREV)
+async def callback_reminders_list(callback: CallbackQuery, cursor: str = None, action: str = Action.REMINDER_LIST):
+    """Список напоминаний (страница по курсору из callback_data)"""
+    key = decode_cursor(cursor, datetime, int) if cursor else None
+    page = await get_reminders_page(
+        await resolve_user_id(callback.from_user),
+        after=key if action == Action.REMINDER_NEXT else None,
+        before=key if action == Action.REMINDER_PREV else None
+    )
     
-    if not reminders:
+    if not page.items:
         await callback.message.edit_text("Напоминаний нет 📭", reply_markup=get_main_keyboard())
         await callback.answer()
         return
     
-    text = f"Напоминания ({len(reminders)}) ⏰\n\n"
-    await callback.message.edit_text(text, reply_markup=get_reminders_list_keyboard(reminders, page))
+    text = f"Напоминания ({page.total}) ⏰\n\n"
+    await callback.message.edit_text(text, reply_markup=get_reminders_list_keyboard(page.items, page.has_prev, page.has_next))
     await callback.answer()
 
 
-@dp.callback_query(F.data.startswith("rem_") and F.data.endswith("_done"))
-async def callback_reminder_done(callback: CallbackQuery):
+@callback_router.handler(Action.REMINDER_DONE)
+async def callback_reminder_done(callback: CallbackQuery, reminder_id: int):
     """Отметить напоминание выполненным"""
     try:
-        reminder_id = int(callback.data.split("_")[1])
-        success = await complete_reminder(reminder_id, callback.from_user.id)
+        user_id = await resolve_user_id(callback.from_user)
+        success = await complete_reminder(reminder_id, user_id)
         
         if success:
             await callback.answer("✅ Выполнено!")
             # Refresh list
-            reminders = await get_all_reminders(callback.from_user.id, completed=False)
-            await callback.message.edit_text("Напоминание выполнено ✅", reply_markup=get_reminders_list_keyboard(reminders))
+            page = await get_reminders_page(user_id)
+            await callback.message.edit_text("Напоминание выполнено ✅", reply_markup=get_reminders_list_keyboard(page.items, page.has_prev, page.has_next))
         else:
             await callback.answer("Ошибка ⚠️")
     except Exception as e:
@@ -1051,12 +1096,10 @@ async def callback_reminder_done(callback: CallbackQuery):
         await callback.answer("Ошибка ⚠️", show_alert=True)
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("rem_") and c.data.endswith("_delete_confirm"))
-async def callback_reminder_delete_confirm(callback: CallbackQuery):
+@callback_router.handler(Action.REMINDER_DELETE_CONFIRM)
+async def callback_reminder_delete_confirm(callback: CallbackQuery, reminder_id: int):
     """Подтверждение удаления напоминания"""
-    reminder_id = int(callback.data.split("_")[1])
-    reminders = await get_all_reminders(callback.from_user.id)
-    reminder = next((r for r in reminders if r.id == reminder_id), None)
+    reminder = await get_reminder(reminder_id, await resolve_user_id(callback.from_user))
     
     if not reminder:
         await callback.answer("Напоминание не найдено")
@@ -1069,24 +1112,24 @@ async def callback_reminder_delete_confirm(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("rem_") and c.data.endswith("_delete") and not c.data.endswith("_delete_confirm"))
-async def callback_reminder_delete(callback: CallbackQuery):
+@callback_router.handler(Action.REMINDER_DELETE)
+async def callback_reminder_delete(callback: CallbackQuery, reminder_id: int):
     """Удалить напоминание"""
     try:
-        reminder_id = int(callback.data.split("_")[1])
-        success = await delete_reminder(reminder_id, callback.from_user.id)
+        user_id = await resolve_user_id(callback.from_user)
+        success = await delete_reminder(reminder_id, user_id)
         
         if success:
             await callback.answer("🗑️ Удалено")
-            reminders = await get_all_reminders(callback.from_user.id, completed=False)
-            if reminders:
-                await callback.message.edit_text("✅ Напоминание удалено", reply_markup=get_reminders_list_keyboard(reminders))
+            page = await get_reminders_page(user_id)
+            if page.items:
+                await callback.message.edit_text("✅ Напоминание удалено", reply_markup=get_reminders_list_keyboard(page.items, page.has_prev, page.has_next))
             else:
                 await callback.message.edit_text(
                     "✅ Напоминание удалено\n\n"
                     "Напоминаний больше нет 📭\n"
                     "Хочешь добавить новое?",
-                    reply_markup=get_reminders_list_keyboard(reminders)
+                    reply_markup=get_reminders_list_keyboard(page.items)
                 )
         else:
             await callback.answer("Ошибка ⚠️")
@@ -1095,7 +1138,7 @@ async def callback_reminder_delete(callback: CallbackQuery):
         await callback.answer("Ошибка ⚠️", show_alert=True)
 
 
-@dp.callback_query(F.data == "rem_add")
+@callback_router.handler(Action.REMINDER_ADD)
 async def callback_reminder_add(callback: CallbackQuery, state: FSMContext):
     """Добавить напоминание"""
     await callback.message.edit_text("Напиши текст напоминания и время.\n\nНапример: 'Позвонить маме завтра в 15:00' или 'Выпить воду через час'", reply_markup=None)
@@ -1197,12 +1240,13 @@ async def process_reminder_text(message: Message, state: FSMContext):
 # ==================== DAILY PLAN ====================
 
 @dp.message(Command("plan"))
-@dp.message(lambda m: m.text and ("📋 План" in m.text or "План" in m.text))
+@button_router.handler(Button.PLAN)
 async def cmd_plan(message: Message, state: FSMContext):
     """Show daily plan"""
     try:
         user, lang = await get_user_and_lang(message.from_user)
-        items = await get_plan_items(user.id, completed=None)
+        page = await get_plan_page(user.id)
+        items = page.items
         
         # Get energy to suggest appropriate number of tasks
         from db_helpers import get_todays_energy
@@ -1227,28 +1271,28 @@ async def cmd_plan(message: Message, state: FSMContext):
             # Не устанавливаем состояние здесь - пользователь должен нажать кнопку
         else:
             # Add energy-based comment if needed
-            if energy and energy < 40 and len(items) > 2:
+            if energy and energy < 40 and page.total > 2:
                 energy_note = "\n\n" + translate("plan_energy_note_low", lang)
-            elif energy and energy >= 80 and len(items) < 3:
+            elif energy and energy >= 80 and page.total < 3:
                 energy_note = "\n\n" + translate("plan_energy_note_high", lang)
             
-            completed = sum(1 for item in items if item.completed)
+            completed = page.done
             # Показываем прогресс визуально
-            progress_emoji = "🎉" if completed == len(items) else "💪" if completed > 0 else "✨"
-            text = translate("plan_title", lang) + f"\n\n{progress_emoji} {translate('plan_completed', lang)}: {completed}/{len(items)}\n"
+            progress_emoji = "🎉" if completed == page.total else "💪" if completed > 0 else "✨"
+            text = translate("plan_title", lang) + f"\n\n{progress_emoji} {translate('plan_completed', lang)}: {completed}/{page.total}\n"
             
             # Если есть прогресс - хвалим!
             if completed > 0:
-                if completed == len(items):
+                if completed == page.total:
                     text += translate("plan_all_done", lang) + "\n\n"
-                elif completed >= len(items) / 2:
+                elif completed >= page.total / 2:
                     text += translate("plan_half_done", lang, count=completed) + "\n\n"
                 else:
                     text += translate("plan_some_done", lang, count=completed) + "\n\n"
             
             text += energy_note
             
-            await message.answer(text, reply_markup=get_plan_list_keyboard(items))
+            await message.answer(text, reply_markup=get_plan_list_keyboard(items, page.has_prev, page.has_next))
     except Exception as e:
         logger.error(f"Error in /plan: {e}", exc_info=True)
         user, lang = await get_user_and_lang(message.from_user)
@@ -1304,7 +1348,7 @@ async def process_plan_item(message: Message, state: FSMContext):
         task_text = message.text.strip()
         
         # Если задача большая (более 5 слов), можем предложить разбить
-        user = await get_or_create_user(message.from_user.id, None, None)
+        user = await resolve_user(message.from_user)
         word_count = len(task_text.split())
         if word_count > 5:  # Большая задача
             # Добавляем как есть, но можем предложить разбить позже
@@ -1324,7 +1368,7 @@ async def process_plan_item(message: Message, state: FSMContext):
         await state.clear()
 
 
-@dp.callback_query(F.data == "plan_add")
+@callback_router.handler(Action.PLAN_ADD)
 async def callback_plan_add(callback: CallbackQuery, state: FSMContext):
     """Добавить пункт в план"""
     await callback.message.edit_text("Что добавим? 📋", reply_markup=None)
@@ -1337,12 +1381,10 @@ async def callback_plan_add(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@dp.callback_query(F.data.startswith("quick_"))
-async def callback_quick_help(callback: CallbackQuery, state: FSMContext):
+@callback_router.handler(Action.QUICK_GOAL, Action.QUICK_PLAN, Action.QUICK_FOCUS, Action.QUICK_QUIET)
+async def callback_quick_help(callback: CallbackQuery, state: FSMContext, action: str):
     """Обработка быстрых действий из помощи"""
-    action = callback.data.replace("quick_", "")
-    
-    if action == "goal":
+    if action == Action.QUICK_GOAL:
         await callback.message.edit_text("Какое главное дело на сегодня? 🎯", reply_markup=None)
         await bot.send_message(
             callback.from_user.id,
@@ -1350,7 +1392,7 @@ async def callback_quick_help(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_cancel_keyboard()
         )
         await state.set_state(BotStates.waiting_goal)
-    elif action == "plan":
+    elif action == Action.QUICK_PLAN:
         await callback.message.edit_text("Что добавим в план? 📋", reply_markup=None)
         await bot.send_message(
             callback.from_user.id,
@@ -1358,7 +1400,7 @@ async def callback_quick_help(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_cancel_keyboard()
         )
         await state.set_state(BotStates.waiting_plan_item)
-    elif action == "focus":
+    elif action == Action.QUICK_FOCUS:
         # Запускаем фокус
         user_id = callback.from_user.id
         if user_id not in active_pomodoros:
@@ -1367,39 +1409,43 @@ async def callback_quick_help(callback: CallbackQuery, state: FSMContext):
         else:
             await callback.answer("У тебя уже есть активный таймер! ⏱️")
             return
-    elif action == "quiet":
+    elif action == Action.QUICK_QUIET:
         # Режим тишины
-        from db_helpers import set_quiet_mode
-        await set_quiet_mode(callback.from_user.id, 30 * 60)  # 30 минут
+        user_id = await resolve_user_id(callback.from_user)
+        until = await set_quiet_mode(user_id, QUIET_MODE_DURATION)
+        scheduler.start_quiet_mode(callback.message.chat.id, user_id, until)
         await callback.message.edit_text("😌 Режим тишины включен на 30 минут\n\nОтдыхай 💛", reply_markup=None)
     
     await callback.answer()
 
 
-@dp.callback_query(F.data == "plan_list")
-async def callback_plan_list(callback: CallbackQuery):
-    """Список плана"""
-    user = await get_or_create_user(callback.from_user.id, None, None)
-    items = await get_plan_items(user.id, completed=None)
+@callback_router.handler(Action.PLAN_LIST, Action.PLAN_NEXT, Action.PLAN_PREV)
+async def callback_plan_list(callback: CallbackQuery, cursor: str = None, action: str = Action.PLAN_LIST):
+    """Список плана (страница по курсору из callback_data)"""
+    user = await resolve_user(callback.from_user)
+    key = decode_cursor(cursor, int, int) if cursor else None
+    page = await get_plan_page(
+        user.id,
+        after=key if action == Action.PLAN_NEXT else None,
+        before=key if action == Action.PLAN_PREV else None
+    )
     
-    if not items:
-        await callback.message.edit_text("План пуст 📋", reply_markup=get_plan_list_keyboard(items))
+    if not page.items:
+        await callback.message.edit_text("План пуст 📋", reply_markup=get_plan_list_keyboard(page.items))
     else:
-        completed = sum(1 for item in items if item.completed)
-        progress_emoji = "🎉" if completed == len(items) else "💪" if completed > 0 else "✨"
-        text = f"План на день 📋\n\n{progress_emoji} Выполнено: {completed}/{len(items)}"
-        await callback.message.edit_text(text, reply_markup=get_plan_list_keyboard(items))
+        completed = page.done
+        progress_emoji = "🎉" if completed == page.total else "💪" if completed > 0 else "✨"
+        text = f"План на день 📋\n\n{progress_emoji} Выполнено: {completed}/{page.total}"
+        await callback.message.edit_text(text, reply_markup=get_plan_list_keyboard(page.items, page.has_prev, page.has_next))
     
     await callback.answer()
 
 
-@dp.callback_query(F.data.startswith("plan_view_"))
-async def callback_plan_item_view(callback: CallbackQuery):
+@callback_router.handler(Action.PLAN_VIEW)
+async def callback_plan_item_view(callback: CallbackQuery, item_id: int):
     """Просмотр пункта плана"""
-    item_id = int(callback.data.split("_")[2])
-    user = await get_or_create_user(callback.from_user.id, None, None)
-    items = await get_plan_items(user.id)
-    item = next((i for i in items if i.id == item_id), None)
+    user = await resolve_user(callback.from_user)
+    item = await get_plan_item(item_id, user.id)
     
     if not item:
         await callback.answer("Пункт не найден")
@@ -1410,19 +1456,18 @@ async def callback_plan_item_view(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(F.data.startswith("plan_") and F.data.endswith("_done"))
-async def callback_plan_item_done(callback: CallbackQuery):
+@callback_router.handler(Action.PLAN_DONE)
+async def callback_plan_item_done(callback: CallbackQuery, item_id: int):
     """Переключить выполненность"""
     try:
-        item_id = int(callback.data.split("_")[1])
-        user = await get_or_create_user(callback.from_user.id, None, None)
+        user = await resolve_user(callback.from_user)
         success = await toggle_plan_item(item_id, user.id)
         
         if success:
             await callback.answer("✅ Обновлено!")
-            items = await get_plan_items(user.id, completed=None)
-            completed_count = sum(1 for i in items if i.completed)
-            total_count = len(items)
+            page = await get_plan_page(user.id)
+            completed_count = page.done
+            total_count = page.total
             progress_text = f"Выполнено: {completed_count}/{total_count}"
             if total_count > 0:
                 percentage = int((completed_count / total_count) * 100)
@@ -1434,7 +1479,7 @@ async def callback_plan_item_done(callback: CallbackQuery):
                     progress_text += " 👍 Хорошо!"
             await callback.message.edit_text(
                 f"План обновлен 📋\n\n{progress_text}", 
-                reply_markup=get_plan_list_keyboard(items)
+                reply_markup=get_plan_list_keyboard(page.items, page.has_prev, page.has_next)
             )
         else:
             await callback.answer("Ошибка ⚠️", show_alert=True)
@@ -1443,13 +1488,11 @@ async def callback_plan_item_done(callback: CallbackQuery):
         await callback.answer("Ошибка ⚠️", show_alert=True)
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("plan_") and c.data.endswith("_delete_confirm"))
-async def callback_plan_delete_confirm(callback: CallbackQuery):
+@callback_router.handler(Action.PLAN_DELETE_CONFIRM)
+async def callback_plan_delete_confirm(callback: CallbackQuery, item_id: int):
     """Подтверждение удаления пункта плана"""
-    item_id = int(callback.data.split("_")[1])
-    user = await get_or_create_user(callback.from_user.id, None, None)
-    items = await get_plan_items(user.id)
-    item = next((i for i in items if i.id == item_id), None)
+    user = await resolve_user(callback.from_user)
+    item = await get_plan_item(item_id, user.id)
     
     if not item:
         await callback.answer("Пункт не найден")
@@ -1462,28 +1505,26 @@ async def callback_plan_delete_confirm(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("plan_") and c.data.endswith("_delete") and not c.data.endswith("_delete_confirm"))
-async def callback_plan_item_delete(callback: CallbackQuery):
+@callback_router.handler(Action.PLAN_DELETE)
+async def callback_plan_item_delete(callback: CallbackQuery, item_id: int):
     """Удалить пункт"""
     try:
-        item_id = int(callback.data.split("_")[1])
-        user = await get_or_create_user(callback.from_user.id, None, None)
+        user = await resolve_user(callback.from_user)
         success = await delete_plan_item(item_id, user.id)
         
         if success:
             await callback.answer("🗑️ Удалено")
-            items = await get_plan_items(user.id, completed=None)
-            if items:
-                completed = sum(1 for i in items if i.completed)
+            page = await get_plan_page(user.id)
+            if page.items:
                 await callback.message.edit_text(
-                    f"✅ Задача удалена\n\nПлан: {completed}/{len(items)} выполнено",
-                    reply_markup=get_plan_list_keyboard(items)
+                    f"✅ Задача удалена\n\nПлан: {page.done}/{page.total} выполнено",
+                    reply_markup=get_plan_list_keyboard(page.items, page.has_prev, page.has_next)
                 )
             else:
                 await callback.message.edit_text(
                     "✅ Задача удалена\n\nПлан пуст 📋\n"
                     "Хочешь добавить задачу?",
-                    reply_markup=get_plan_list_keyboard(items)
+                    reply_markup=get_plan_list_keyboard(page.items)
                 )
         else:
             await callback.answer("Ошибка ⚠️")
@@ -1575,7 +1616,7 @@ async def handle_ai_message(message: Message, state: FSMContext):
     
     # "детали" + дата для подробной информации о дне
     if text_lower.startswith("детали "):
-        user = await get_or_create_user(message.from_user.id, None, None)
+        user = await resolve_user(message.from_user)
         date_text = message.text[len("детали "):].strip()
         
         # Парсим дату
@@ -1629,7 +1670,7 @@ async def handle_ai_message(message: Message, state: FSMContext):
     
     # "длинно" для полного формата истории
     if text_lower in ["длинно", "полный формат", "полная история"]:
-        user = await get_or_create_user(message.from_user.id, None, None)
+        user = await resolve_user(message.from_user)
         days = await get_days_history(user.id, limit=30)
         
         if not days:
@@ -1699,7 +1740,7 @@ async def handle_ai_message(message: Message, state: FSMContext):
     # Handle note deletion commands directly
     text_lower = message.text.lower() if message.text else ""
     if any(phrase in text_lower for phrase in ["удали все заметки", "очисти заметки", "удалить все заметки", "очистить заметки", "все"]):
-        user = await get_or_create_user(message.from_user.id, None, None)
+        user = await resolve_user(message.from_user)
         count = await delete_all_notes(user.id)
         if count > 0:
             await message.answer(f"✅ Удалено {count} заметок", reply_markup=get_main_keyboard())
@@ -1709,7 +1750,7 @@ async def handle_ai_message(message: Message, state: FSMContext):
     
     # Поиск по заметкам
     if text_lower.startswith("найди ") or text_lower.startswith("найти ") or text_lower.startswith("поиск "):
-        user = await get_or_create_user(message.from_user.id, None, None)
+        user = await resolve_user(message.from_user)
         notes = await get_user_notes(user.id)
         
         if not notes:
@@ -1945,8 +1986,8 @@ async def handle_ai_message(message: Message, state: FSMContext):
             for part in parts:
                 if part and len(part.strip()) > 0 and part.strip() != "ее" and part.strip() != "его":
                     try:
-                        from db_helpers import save_note, get_or_create_user
-                        user = await get_or_create_user(message.from_user.id, None, None)
+                        from db_helpers import save_note
+                        user = await resolve_user(message.from_user)
                         await save_note(user.id, part.strip())
                         saved_count += 1
                         saved_parts.append(part.strip())
@@ -1967,8 +2008,8 @@ async def handle_ai_message(message: Message, state: FSMContext):
             # Фильтруем пустые заметки и местоимения
             if note_text.strip() not in ["ее", "его", "её", "его", "и"]:
                 try:
-                    from db_helpers import save_note, get_or_create_user
-                    user = await get_or_create_user(message.from_user.id, None, None)
+                    from db_helpers import save_note
+                    user = await resolve_user(message.from_user)
                     await save_note(user.id, note_text.strip())
                     await message.answer(f"✅ Заметка сохранена: {note_text.strip()}\n\nПосмотреть все: /notes", reply_markup=get_main_keyboard())
                     return
@@ -1977,7 +2018,7 @@ async def handle_ai_message(message: Message, state: FSMContext):
                     # Продолжаем обработку через AI
     
     # Get user's current energy level
-    user_state = await get_user_state(message.from_user.id)
+    user_state = await get_user_state(await resolve_user_id(message.from_user))
     energy = None  # Could fetch latest energy from DB
     
     # Process with AI
@@ -2003,15 +2044,32 @@ async def handle_ai_message(message: Message, state: FSMContext):
             # Короткое сообщение похожее на задачу - предлагаем сохранить
             ai_prompt = f"Пользователь упомянул задачу '{message.text}'. Предложи сохранить её как заметку или создать напоминание. Используй функцию add_note если пользователь согласится сохранить."
         
+        stream_editor = None
+        
+        async def send_response(text: str):
+            """Финальный ответ (и ошибка): правка заглушки при стриминге или новое сообщение"""
+            if stream_editor:
+                await stream_editor.finish(text)
+            else:
+                await message.answer(text, reply_markup=get_main_keyboard())
+        
         try:
-            response = await ai_service.process_message(ai_prompt, message.from_user.id, energy)
+            if AI_STREAMING:
+                # Сначала заглушка, потом правим её по мере генерации ответа
+                placeholder = await message.answer("💭 ...")
+                stream_editor = ThrottledMessageEditor(placeholder)
+                response = await ai_service.process_message_stream(
+                    ai_prompt, message.from_user.id, energy, on_delta=stream_editor.update
+                )
+            else:
+                response = await ai_service.process_message(ai_prompt, message.from_user.id, energy)
             
             # Проверяем, создал ли AI заметку или напоминание
             if "заметка сохранена" in response.lower() or "напоминание создано" in response.lower() or "✅" in response:
-                await message.answer(response, reply_markup=get_main_keyboard())
+                await send_response(response)
             elif "указанное время уже прошло" in response.lower():
                 # Проблема с парсингом времени - попробуем исправить
-                await message.answer(response + "\n\n💡 Попробуй указать время точнее, например:\n• через 10 секунд\n• через 5 минут\n• завтра в 15:00", reply_markup=get_main_keyboard())
+                await send_response(response + "\n\n💡 Попробуй указать время точнее, например:\n• через 10 секунд\n• через 5 минут\n• завтра в 15:00")
             else:
                 # Если AI не создал заметку, но была команда "запиши", пробуем создать напрямую
                 if any(keyword in text_lower for keyword in ["запиши", "запомни", "сохрани"]) and "запиши" not in response.lower():
@@ -2028,15 +2086,15 @@ async def handle_ai_message(message: Message, state: FSMContext):
                     
                     if note_text and note_text != message.text and len(note_text.strip()) > 2:
                         try:
-                            from db_helpers import save_note, get_or_create_user
-                            user = await get_or_create_user(message.from_user.id, None, None)
+                            from db_helpers import save_note
+                            user = await resolve_user(message.from_user)
                             await save_note(user.id, note_text.strip())
-                            await message.answer(f"✅ Заметка сохранена: {note_text.strip()}\n\nПосмотреть все заметки: /notes", reply_markup=get_main_keyboard())
+                            await send_response(f"✅ Заметка сохранена: {note_text.strip()}\n\nПосмотреть все заметки: /notes")
                             return
                         except Exception as e:
                             logger.error(f"Fallback note save error: {e}", exc_info=True)
                 
-                await message.answer(response, reply_markup=get_main_keyboard())
+                await send_response(response)
         except Exception as ai_error:
             logger.error(f"AI processing error: {ai_error}", exc_info=True)
             # Если AI упал, но была команда "запиши", пробуем сохранить напрямую
@@ -2053,17 +2111,17 @@ async def handle_ai_message(message: Message, state: FSMContext):
                                     break
                     
                     if note_text and note_text != message.text and len(note_text.strip()) > 2:
-                        from db_helpers import save_note, get_or_create_user
-                        user = await get_or_create_user(message.from_user.id, None, None)
+                        from db_helpers import save_note
+                        user = await resolve_user(message.from_user)
                         await save_note(user.id, note_text.strip())
-                        await message.answer(f"✅ Заметка сохранена: {note_text.strip()}\n\nПосмотреть все заметки: /notes", reply_markup=get_main_keyboard())
+                        await send_response(f"✅ Заметка сохранена: {note_text.strip()}\n\nПосмотреть все заметки: /notes")
                         return
                 except Exception as e:
                     logger.error(f"Fallback note save after AI error: {e}", exc_info=True)
             
-            await message.answer(
-                "Упс, что-то пошло не так 😅\n\n💡 Попробуй:\n• Написать короче\n• Использовать команды: /goal, /plan, /note, /reminders\n• Или просто: 'запиши купить молоко'\n\n💛",
-                reply_markup=get_main_keyboard()
+            # Заглушка «💭 ...» (или оборванный ответ) заменяется ошибкой, а не остаётся висеть
+            await send_response(
+                "Упс, что-то пошло не так 😅\n\n💡 Попробуй:\n• Написать короче\n• Использовать команды: /goal, /plan, /note, /reminders\n• Или просто: 'запиши купить молоко'\n\n💛"
             )
             
     except Exception as e:
@@ -2082,8 +2140,8 @@ async def handle_ai_message(message: Message, state: FSMContext):
                             break
             
             try:
-                from db_helpers import save_note, get_or_create_user
-                user = await get_or_create_user(message.from_user.id, None, None)
+                from db_helpers import save_note
+                user = await resolve_user(message.from_user)
                 await save_note(user.id, note_text.strip())
                 await message.answer(f"✅ Заметка сохранена: {note_text.strip()}\n\nПосмотреть все заметки: /notes", reply_markup=get_main_keyboard())
                 return
@@ -2142,35 +2200,63 @@ async def load_existing_reminders():
 async def main():
     """Главная функция"""
     print("Запуск бота SDVGaid... 🤖")
+    print(DATABASE_BACKEND)
     
     # Register new handlers
     try:
         from handlers.register import register_all_handlers
-        register_all_handlers()
+        register_all_handlers(dp, BotStates)
         print("Новые обработчики зарегистрированы ✅")
     except Exception as e:
         print(f"Предупреждение: не удалось зарегистрировать новые обработчики: {e}")
     
-    # Инициализация AI
-    print(f"AI провайдер: {ai_service.current_provider.upper()} 🤖")
+    # Сборка приложения: function handler, таблица кнопок меню
+    create_app(dp)
+    print("Обработчики зарегистрированы ✅")
+    if PROFILE_FILTERS:
+        print(f"Профилирование фильтров: {filter_profiler.instrument(dp)} фильтров 📈")
+    
+    # Инициализация AI: SDK провайдеров и dateparser грузятся в фоне, пока поднимается БД
+    print(f"AI провайдеры: {', '.join(ai_service.pool.providers).upper()} 🤖")
+    warm_up = asyncio.gather(asyncio.to_thread(ai_service.warm_up), asyncio.to_thread(warm_up_date_parsing))
     
     # Инициализация БД
     await init_db()
     print("База данных инициализирована ✅")
+    print(f"Пользователей в памяти: {await identities.warm_up()} 👤")
     
     # Загружаем существующие напоминания в планировщик
     await load_existing_reminders()
+    await scheduler.load_quiet_modes()
+    if EVENING_CHECKIN_ENABLED:
+        scheduler.schedule_evening_checkins()
     
     # Запуск планировщика
+    if PROFILE_FILTERS:
+        scheduler.scheduler.add_job(filter_profiler.log_report, "interval", minutes=PROFILE_FILTERS_INTERVAL,
+                                    id="filter_profile", replace_existing=True)
+    if DB_METRICS_INTERVAL:
+        scheduler.scheduler.add_job(log_db_metrics, "interval", minutes=DB_METRICS_INTERVAL,
+                                    id="db_metrics", replace_existing=True)
+    if RETENTION_DAYS:
+        # Старые строки - в архивные таблицы, пачками; первый проход сразу после старта
+        from retention import run_retention
+        scheduler.scheduler.add_job(run_retention, "interval", minutes=RETENTION_INTERVAL, id="retention",
+                                    replace_existing=True, next_run_time=datetime.now())
     scheduler.start()
     print("Планировщик запущен ⏰")
     
     # Запуск бота
+    await warm_up
     print("Бот запущен! 🚀")
     try:
         await dp.start_polling(bot)
     finally:
         scheduler.stop()
+        if PROFILE_FILTERS:
+            filter_profiler.log_report()
+        if DB_METRICS_INTERVAL:
+            log_db_metrics()
 
 
 if __name__ == "__main__":
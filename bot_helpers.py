@@ -1,6 +1,7 @@
 """Helper functions for bot handlers"""
 
-from db_helpers import get_or_create_user, get_user_language_code
+from db_helpers import get_user_language_code
+from identity import resolve_user
 from translations import translate, get_user_language
 
 
@@ -13,22 +14,10 @@ async def get_user_and_lang(telegram_user, telegram_id: int = None):
         telegram_id: Optional telegram_id (if telegram_user not available)
     
     Returns:
-        tuple: (user object, language_code)
+        tuple: (identity.UserIdentity with .id = users.id, language_code)
     """
-    if telegram_id:
-        user = await get_or_create_user(
-            telegram_id,
-            getattr(telegram_user, 'username', None),
-            getattr(telegram_user, 'full_name', None),
-            language_code=getattr(telegram_user, 'language_code', None) if telegram_user else None
-        )
-    else:
-        user = await get_or_create_user(
-            telegram_user.id,
-            telegram_user.username,
-            telegram_user.full_name,
-            language_code=getattr(telegram_user, 'language_code', None)
-        )
+    # Из памяти процесса; в БД - только при первом контакте или смене языка в Telegram
+    user = await resolve_user(telegram_id or telegram_user)
     
     lang = user.language_code if user.language_code else get_user_language(telegram_user)
     return user, lang
@@ -0,0 +1,98 @@
+"""Кнопки главного меню: точный текст кнопки -> обработчик
+
+Раньше каждая кнопка была отдельным обработчиком с lambda-фильтром
+(`"План" in m.text`), и любое сообщение проверялось всеми фильтрами по очереди,
+а свободный текст со словом «план» уходил в /plan. Теперь при старте строится
+таблица текст -> кнопка по translations.py для всех языков, и один обработчик
+в начале списка находит нужный за O(1).
+"""
+import inspect
+import logging
+from typing import Callable, Dict, Tuple, Union
+
+from aiogram import Dispatcher
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+
+from translations import TRANSLATIONS, SUPPORTED_LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+
+class Button:
+    """Кнопки главного меню (ключи в translations.py)"""
+    HELP_NOW = "menu_help_now"
+    GOAL = "menu_goal"
+    PLAN = "menu_plan"
+    FOCUS = "menu_focus"
+    NOTES = "menu_notes"
+    ENERGY = "menu_energy"
+
+
+def button_texts(key: str) -> set:
+    """Все тексты кнопки: перевод на каждый язык и он же без эмодзи в начале"""
+    texts = set()
+    for lang_code in set(SUPPORTED_LANGUAGES.values()):
+        text = TRANSLATIONS[key].get(lang_code)
+        if not text:
+            continue
+        texts.add(text)
+        prefix, _, label = text.partition(" ")
+        if label and not any(char.isalnum() for char in prefix):
+            texts.add(label)
+    return texts
+
+
+class ButtonRouter:
+    """
+    Exact-match text -> handler table behind a single aiogram message handler.
+
+    `match` is the filter (async, so aiogram does not run it in an executor)
+    and `dispatch` the handler; register both first so button presses win
+    over state handlers. `state` is passed as a keyword argument to handlers
+    that declare it. The table belongs to one dispatcher (setup) and a button
+    has exactly one handler: a second registration raises instead of replacing it.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Tuple[Callable, bool]] = {}
+        self._table: Dict[str, str] = {}
+
+    def handler(self, *buttons: str):
+        def decorator(func):
+            wants_state = "state" in inspect.signature(func).parameters
+            for button in buttons:
+                if button in self._handlers:
+                    raise ValueError(f"Button {button!r} is already handled by {self._handlers[button][0].__qualname__}")
+                self._handlers[button] = (func, wants_state)
+            return func
+        return decorator
+
+    def setup(self, dispatcher: Dispatcher) -> "ButtonRouter":
+        """Зарегистрировать таблицу у диспетчера (dispatcher["button_router"]); вызывать до остальных обработчиков"""
+        if "button_router" in dispatcher.workflow_data:
+            raise ValueError("Dispatcher already has a button router")
+        dispatcher["button_router"] = self
+        dispatcher.message.register(self.dispatch, self.match)
+        return self
+
+    def build(self) -> int:
+        """Собрать таблицу текстов для всех зарегистрированных кнопок (при старте бота)"""
+        table = {}
+        for button in self._handlers:
+            for text in button_texts(button):
+                if table.setdefault(text, button) != button:
+                    raise ValueError(f"Button text {text!r} is shared by {table[text]} and {button}")
+        self._table = table
+        return len(table)
+
+    async def match(self, message: Message) -> Union[bool, Dict[str, str]]:
+        button = self._table.get(message.text) if message.text else None
+        return {"button": button} if button else False
+
+    async def dispatch(self, message: Message, state: FSMContext, button: str):
+        func, wants_state = self._handlers[button]
+        if wants_state:
+            await func(message, state=state)
+        else:
+            await func(message)
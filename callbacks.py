@@ -0,0 +1,201 @@
+"""Callback data для inline-кнопок: компактный версионированный формат и диспетчер
+
+Формат: '<версия><действие>[:<аргумент>...]', например '1rd:2n' - «выполнено»
+для напоминания 95 (id в base36). Диспетчер - одна таблица действие -> обработчик,
+поэтому callback разбирается один раз и находит обработчик за O(1), а не
+перебором фильтров aiogram. Старые кнопки ('rem_95_done', 'plan_list', ...)
+остаются в истории чатов и разбираются через legacy-путь.
+"""
+import inspect
+import logging
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from aiogram import Dispatcher
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+
+from utils.pagination import to_base36
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_VERSION = "1"
+
+
+class Action:
+    """Коды действий (2 символа)"""
+    POMODORO_CONTINUE = "fc"
+    POMODORO_STOP = "fs"
+    GOAL_CONFIRM = "gc"
+    GOAL_EDIT = "ge"
+    GOAL_DONE = "gd"
+    GOAL_SKIP = "gs"
+    QUICK_GOAL = "qg"
+    QUICK_PLAN = "qp"
+    QUICK_FOCUS = "qf"
+    QUICK_QUIET = "qq"
+    REMINDER_VIEW = "rv"
+    REMINDER_DONE = "rd"
+    REMINDER_EDIT = "re"
+    REMINDER_DELETE_CONFIRM = "rc"
+    REMINDER_DELETE = "rx"
+    REMINDER_ADD = "ra"
+    REMINDER_LIST = "rl"
+    REMINDER_NEXT = "rn"
+    REMINDER_PREV = "rp"
+    PLAN_VIEW = "pv"
+    PLAN_DONE = "pd"
+    PLAN_EDIT = "pe"
+    PLAN_DELETE_CONFIRM = "pc"
+    PLAN_DELETE = "px"
+    PLAN_ADD = "pa"
+    PLAN_LIST = "pl"
+    PLAN_NEXT = "pn"
+    PLAN_PREV = "pp"
+
+
+# Типы аргументов: int передаётся в base36, str (курсор страницы) - как есть
+ARG_TYPES: Dict[str, Tuple[type, ...]] = {
+    Action.REMINDER_VIEW: (int,),
+    Action.REMINDER_DONE: (int,),
+    Action.REMINDER_EDIT: (int,),
+    Action.REMINDER_DELETE_CONFIRM: (int,),
+    Action.REMINDER_DELETE: (int,),
+    Action.REMINDER_NEXT: (str,),
+    Action.REMINDER_PREV: (str,),
+    Action.PLAN_VIEW: (int,),
+    Action.PLAN_DONE: (int,),
+    Action.PLAN_EDIT: (int,),
+    Action.PLAN_DELETE_CONFIRM: (int,),
+    Action.PLAN_DELETE: (int,),
+    Action.PLAN_NEXT: (str,),
+    Action.PLAN_PREV: (str,),
+}
+_ACTIONS = frozenset(value for name, value in vars(Action).items() if name.isupper())
+
+
+def pack(action: str, *args) -> str:
+    """callback_data для действия с аргументами"""
+    if not args:
+        return CALLBACK_VERSION + action
+    parts = [to_base36(arg) if isinstance(arg, int) else arg for arg in args]
+    return CALLBACK_VERSION + action + ":" + ":".join(parts)
+
+
+def unpack(data: str) -> Optional[Tuple[str, tuple]]:
+    """(действие, аргументы) из callback_data; None - неизвестный формат"""
+    if data[:1] == CALLBACK_VERSION:
+        action = data[1:3]
+        if action in _ACTIONS:
+            raw_args = data[4:].split(":") if len(data) > 3 else []
+            types = ARG_TYPES.get(action, ())
+            if len(raw_args) == len(types) and (not raw_args or data[3] == ":"):
+                try:
+                    return action, tuple(
+                        int(arg, 36) if arg_type is int else arg for arg, arg_type in zip(raw_args, types)
+                    )
+                except ValueError:
+                    return None
+        return None
+    return _unpack_legacy(data)
+
+
+# Кнопки, отправленные до появления версионированного формата
+_LEGACY_STATIC = {
+    "pomodoro_continue": Action.POMODORO_CONTINUE,
+    "pomodoro_stop": Action.POMODORO_STOP,
+    "goal_confirm": Action.GOAL_CONFIRM,
+    "goal_edit": Action.GOAL_EDIT,
+    "goal_done": Action.GOAL_DONE,
+    "goal_skip": Action.GOAL_SKIP,
+    "quick_goal": Action.QUICK_GOAL,
+    "quick_plan": Action.QUICK_PLAN,
+    "quick_focus": Action.QUICK_FOCUS,
+    "quick_quiet": Action.QUICK_QUIET,
+    "rem_add": Action.REMINDER_ADD,
+    "plan_add": Action.PLAN_ADD,
+    "plan_list": Action.PLAN_LIST,
+}
+_LEGACY_ITEM_ACTIONS = {
+    "rem": {"done": Action.REMINDER_DONE, "edit": Action.REMINDER_EDIT,
+            "delete_confirm": Action.REMINDER_DELETE_CONFIRM, "delete": Action.REMINDER_DELETE},
+    "plan": {"done": Action.PLAN_DONE, "edit": Action.PLAN_EDIT,
+             "delete_confirm": Action.PLAN_DELETE_CONFIRM, "delete": Action.PLAN_DELETE},
+}
+_LEGACY_VIEW = {"rem": Action.REMINDER_VIEW, "plan": Action.PLAN_VIEW}
+_LEGACY_LIST = {
+    "rem": (Action.REMINDER_LIST, Action.REMINDER_NEXT, Action.REMINDER_PREV),
+    "plan": (Action.PLAN_LIST, Action.PLAN_NEXT, Action.PLAN_PREV),
+}
+_LEGACY_ITEM_RE = re.compile(r"(rem|plan)_(\d+)_(done|edit|delete_confirm|delete)")
+_LEGACY_VIEW_RE = re.compile(r"(rem|plan)_view_(\d+)")
+_LEGACY_LIST_RE = re.compile(r"(rem|plan)_list(?:_(n|p)_([0-9a-z.\-]+)|_\d+)?")
+
+
+def _unpack_legacy(data: str) -> Optional[Tuple[str, tuple]]:
+    action = _LEGACY_STATIC.get(data)
+    if action:
+        return action, ()
+    match = _LEGACY_ITEM_RE.fullmatch(data)
+    if match:
+        return _LEGACY_ITEM_ACTIONS[match[1]][match[3]], (int(match[2]),)
+    match = _LEGACY_VIEW_RE.fullmatch(data)
+    if match:
+        return _LEGACY_VIEW[match[1]], (int(match[2]),)
+    match = _LEGACY_LIST_RE.fullmatch(data)
+    if match:
+        first, next_page, prev_page = _LEGACY_LIST[match[1]]
+        if match[2]:
+            return (next_page if match[2] == "n" else prev_page), (match[3],)
+        return first, ()
+    return None
+
+
+class CallbackRouter:
+    """
+    Action -> handler table behind a single aiogram callback handler.
+
+    Handlers get the decoded arguments positionally; `state` and `action`
+    are passed as keyword arguments to handlers that declare them.
+    The table belongs to one dispatcher (setup) and an action has exactly
+    one handler: a second registration raises instead of replacing it.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Tuple[Callable, bool, bool]] = {}
+
+    def handler(self, *actions: str):
+        def decorator(func):
+            params = inspect.signature(func).parameters
+            for action in actions:
+                if action in self._handlers:
+                    raise ValueError(
+                        f"Callback action {action!r} is already handled by {self._handlers[action][0].__qualname__}"
+                    )
+                self._handlers[action] = (func, "state" in params, "action" in params)
+            return func
+        return decorator
+
+    def setup(self, dispatcher: Dispatcher) -> "CallbackRouter":
+        """Сделать таблицу единственным обработчиком callback-ов диспетчера (dispatcher["callback_router"])"""
+        if "callback_router" in dispatcher.workflow_data:
+            raise ValueError("Dispatcher already has a callback router")
+        dispatcher["callback_router"] = self
+        dispatcher.callback_query.register(self.dispatch)
+        return self
+
+    async def dispatch(self, callback: CallbackQuery, state: FSMContext):
+        decoded = unpack(callback.data or "")
+        entry = self._handlers.get(decoded[0]) if decoded else None
+        if entry is None:
+            logger.debug(f"Unhandled callback data: {callback.data!r}")
+            await callback.answer()
+            return
+        action, args = decoded
+        func, wants_state, wants_action = entry
+        kwargs = {}
+        if wants_state:
+            kwargs["state"] = state
+        if wants_action:
+            kwargs["action"] = action
+        await func(callback, *args, **kwargs)
@@ -0,0 +1,314 @@
+"""Когортная аналитика по всем пользователям: офлайн-выгрузка и метрики
+
+Отдельный процесс, не бот. Выгрузка читает таблицы страницами по id
+(WHERE id > последний ORDER BY id LIMIT n), каждая страница - своя короткая
+транзакция на чтение, так что job не держит ни блокировок, ни открытой
+транзакции на всё время работы и не мешает записям бота. Таблица с архивом
+(retention.py) читается вместе с ним: страница - один UNION ALL обеих по
+тому же id, так что строка, уехавшая в архив между страницами, попадает в
+выгрузку ровно один раз. Страница сразу
+уходит в колоночный файл (Parquet, если установлен pyarrow, иначе .npz):
+в памяти одна страница, тексты заметок и целей не выгружаются.
+
+Метрики считаются по файлам, тоже по одной части за раз: когорта - месяц
+регистрации, по ней доля поставивших цель, выполнение целей и плана,
+средняя энергия, напоминания (сработали / выполнены) и энергия по месяцам.
+
+    python cohorts.py --out analytics_export                  # выгрузка + метрики
+    python cohorts.py --out analytics_export --skip-export    # метрики по готовой выгрузке
+    python cohorts.py --url postgresql+asyncpg://replica/...  # читать с реплики
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+import numpy as np
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import ARCHIVES, DailyGoal, DailyPlanItem, EnergyLog, EveningCheckIn, Note, Reminder, User
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CHUNK_ROWS = 50_000
+
+# Таблица -> (модель, [(колонка, вид)]); виды: int, nint (NULL -> NaN), bool, time (NULL -> NaT), str
+EXPORT_TABLES = {
+    'users': (User, [('id', 'int'), ('created_at', 'time'), ('language_code', 'str')]),
+    'daily_goals': (DailyGoal, [('id', 'int'), ('user_id', 'int'), ('local_day', 'nint'), ('completed', 'bool'),
+                                ('estimated_pomodoros', 'nint'), ('completed_pomodoros', 'nint'),
+                                ('day_rating', 'nint')]),
+    'daily_plan_items': (DailyPlanItem, [('id', 'int'), ('user_id', 'int'), ('local_day', 'nint'),
+                                         ('completed', 'bool')]),
+    'energy_logs': (EnergyLog, [('id', 'int'), ('user_id', 'int'), ('local_day', 'nint'), ('energy_level', 'int')]),
+    'evening_checkins': (EveningCheckIn, [('id', 'int'), ('user_id', 'int'), ('local_day', 'nint')]),
+    'reminders': (Reminder, [('id', 'int'), ('user_id', 'int'), ('created_at', 'time'), ('when_datetime', 'time'),
+                             ('completed', 'bool'), ('recurring', 'bool')]),
+    'notes': (Note, [('id', 'int'), ('user_id', 'int'), ('created_at', 'time')]),
+}
+
+
+def to_columns(rows: list, spec: list) -> Dict[str, np.ndarray]:
+    """Rows of one page -> numpy column per spec entry"""
+    values = list(zip(*rows)) if rows else [()] * len(spec)
+    columns = {}
+    for (name, kind), column in zip(spec, values):
+        if kind == 'int':
+            columns[name] = np.fromiter(column, dtype=np.int64, count=len(column))
+        elif kind == 'nint':
+            columns[name] = np.array(column, dtype=np.float64).reshape(-1)
+        elif kind == 'bool':
+            columns[name] = np.fromiter((bool(v) for v in column), dtype=np.bool_, count=len(column))
+        elif kind == 'time':
+            columns[name] = np.array(column, dtype='datetime64[s]').reshape(-1)
+        else:
+            columns[name] = np.array(['' if v is None else v for v in column], dtype=np.str_).reshape(-1)
+    return columns
+
+
+def write_part(directory: str, number: int, columns: Dict[str, np.ndarray], fmt: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    if fmt == 'parquet':
+        path = os.path.join(directory, f"part-{number:05d}.parquet")
+        pq.write_table(pa.table(columns), path)
+    else:
+        path = os.path.join(directory, f"part-{number:05d}.npz")
+        np.savez_compressed(path, **columns)
+    return path
+
+
+def read_parts(directory: str) -> Iterator[Dict[str, np.ndarray]]:
+    """Columns of every part file of a table, one part at a time"""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith('.parquet'):
+            table = pq.read_table(path)
+            yield {column: table.column(column).to_numpy() for column in table.column_names}
+        elif name.endswith('.npz'):
+            with np.load(path) as data:
+                yield {column: data[column] for column in data.files}
+
+
+def page_query(name: str, after: int = None, limit: int = CHUNK_ROWS):
+    """
+    One page of a table by id, its archive included: the next `limit` rows of
+    each (on their primary keys), merged by id in the same statement
+    """
+    model, spec = EXPORT_TABLES[name]
+
+    def side(source):
+        query = select(*(getattr(source, column) for column, _ in spec)).order_by(source.id).limit(limit)
+        return query if after is None else query.where(source.id > after)
+
+    if model not in ARCHIVES:
+        return side(model)
+    # LIMIT внутри UNION ALL SQLite не принимает: каждая сторона - подзапрос
+    sides = [side(source).subquery() for source in (model, ARCHIVES[model])]
+    merged = union_all(*(select(*page.c) for page in sides)).subquery()
+    return select(*merged.c).order_by(merged.c.id).limit(limit)
+
+
+async def export_table(engine, name: str, out_dir: str, chunk_rows: int = CHUNK_ROWS, fmt: str = None,
+                       pause: float = 0.0) -> int:
+    """
+    Page through one table (with its archive) by id into part files; returns the row count.
+
+    Parts go to a fresh directory that replaces the previous export of the
+    table only when done: a shorter re-run leaves no stale parts behind.
+    """
+    fmt = fmt or ('parquet' if PARQUET_AVAILABLE else 'npz')
+    _, spec = EXPORT_TABLES[name]
+    directory = os.path.join(out_dir, name)
+    staging = directory + '.partial'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    last_id, total, part = None, 0, 0
+    while True:
+        async with engine.connect() as conn:  # транзакция на одну страницу
+            rows = (await conn.execute(page_query(name, last_id, chunk_rows))).all()
+        if not rows:
+            break
+        write_part(staging, part, to_columns(rows, spec), fmt)
+        last_id, total, part = rows[-1][0], total + len(rows), part + 1
+        if len(rows) < chunk_rows:
+            break
+        if pause:
+            await asyncio.sleep(pause)  # отдать базу боту между страницами
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    return total
+
+
+async def export_all(engine, out_dir: str, chunk_rows: int = CHUNK_ROWS, fmt: str = None,
+                     pause: float = 0.0) -> dict:
+    """Export every table in EXPORT_TABLES and write export.json (as_of, format, row counts)"""
+    fmt = fmt or ('parquet' if PARQUET_AVAILABLE else 'npz')
+    manifest = {'as_of': datetime.utcnow().isoformat(timespec='seconds'), 'format': fmt, 'rows': {}}
+    for name in EXPORT_TABLES:
+        started = time.perf_counter()
+        manifest['rows'][name] = await export_table(engine, name, out_dir, chunk_rows, fmt, pause)
+        logger.info(f"Exported {name}: {manifest['rows'][name]} rows in {time.perf_counter() - started:.1f}s")
+    with open(os.path.join(out_dir, 'export.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+COUNTERS = (
+    'goal_users', 'goals', 'goals_completed', 'plan_items', 'plan_done', 'energy_logs', 'energy_sum',
+    'reminders', 'reminders_fired', 'reminders_completed',
+)
+
+
+@dataclass
+class CohortMetrics:
+    """
+    Per signup-month cohort counters, arrays aligned with `cohorts`:
+    goal_users (set at least one goal), goals / goals_completed, plan_items /
+    plan_done, energy_logs / energy_sum, reminders / reminders_fired (due by
+    the export time) / reminders_completed. Plus energy by calendar month.
+    """
+    cohorts: np.ndarray  # datetime64[M]
+    users: np.ndarray
+    energy_by_month: Dict[int, List[float]] = field(default_factory=dict)  # YYYYMM -> [сумма, количество]
+
+    def __post_init__(self):
+        for name in COUNTERS:
+            setattr(self, name, np.zeros(len(self.cohorts)))
+
+    def to_dict(self) -> dict:
+        def share(part, whole):
+            return [round(float(p) / w, 3) if w else None for p, w in zip(part, whole)]
+
+        return {
+            'cohorts': [
+                {'cohort': str(cohort), 'users': int(users), 'goal_users': int(goal_users)}
+                for cohort, users, goal_users in zip(self.cohorts, self.users, self.goal_users)
+            ],
+            'goal_user_share': share(self.goal_users, self.users),
+            'goal_completion': share(self.goals_completed, self.goals),
+            'plan_completion': share(self.plan_done, self.plan_items),
+            'energy_avg': share(self.energy_sum, self.energy_logs),
+            'reminders': [int(n) for n in self.reminders],
+            'reminders_fired': [int(n) for n in self.reminders_fired],
+            'reminder_completion': share(self.reminders_completed, self.reminders_fired),
+            'energy_by_month': {str(month): round(total / count, 1)
+                                for month, (total, count) in sorted(self.energy_by_month.items())},
+        }
+
+
+def cohort_metrics(out_dir: str, as_of: np.datetime64 = None) -> CohortMetrics:
+    """Cohort metrics from an export, reading one part file at a time"""
+    if as_of is None:
+        with open(os.path.join(out_dir, 'export.json')) as f:
+            as_of = np.datetime64(json.load(f)['as_of'], 's')
+
+    def parts(table: str):
+        return read_parts(os.path.join(out_dir, table))
+
+    users = list(parts('users'))
+    user_ids = np.concatenate([part['id'] for part in users] or [np.array([], dtype=np.int64)])
+    signup = np.concatenate([part['created_at'] for part in users] or [np.array([], dtype='datetime64[s]')])
+    cohorts, user_cohort = np.unique(signup.astype('datetime64[M]'), return_inverse=True)
+    metrics = CohortMetrics(cohorts, np.bincount(user_cohort, minlength=len(cohorts)))
+
+    # users.id -> индекс когорты; -1 - строки пользователя, которого нет в выгрузке
+    cohort_of = np.full(int(user_ids.max()) + 1 if len(user_ids) else 1, -1, dtype=np.int64)
+    cohort_of[user_ids] = user_cohort
+
+    def per_cohort(ids: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+        """Row count (or sum of weights) per cohort"""
+        index = np.where(ids < len(cohort_of), cohort_of[np.minimum(ids, len(cohort_of) - 1)], -1)
+        known = index >= 0
+        weights = None if weights is None else np.asarray(weights, dtype=np.float64)[known]
+        return np.bincount(index[known], weights=weights, minlength=len(cohorts))
+
+    goal_user = np.zeros(len(cohort_of), dtype=np.bool_)
+    for part in parts('daily_goals'):
+        ids = part['user_id']
+        metrics.goals += per_cohort(ids)
+        metrics.goals_completed += per_cohort(ids, part['completed'])
+        goal_user[ids[ids < len(goal_user)]] = True
+    metrics.goal_users = np.bincount(user_cohort, weights=goal_user[user_ids], minlength=len(cohorts))
+
+    for part in parts('daily_plan_items'):
+        metrics.plan_items += per_cohort(part['user_id'])
+        metrics.plan_done += per_cohort(part['user_id'], part['completed'])
+
+    for part in parts('energy_logs'):
+        metrics.energy_logs += per_cohort(part['user_id'])
+        metrics.energy_sum += per_cohort(part['user_id'], part['energy_level'])
+        known = ~np.isnan(part['local_day'])
+        months, index = np.unique((part['local_day'][known] // 100).astype(np.int64), return_inverse=True)
+        sums = np.bincount(index, weights=part['energy_level'][known].astype(np.float64))
+        for month, total, count in zip(months.tolist(), sums, np.bincount(index)):
+            entry = metrics.energy_by_month.setdefault(month, [0.0, 0])
+            entry[0] += float(total)
+            entry[1] += int(count)
+
+    for part in parts('reminders'):
+        ids = part['user_id']
+        metrics.reminders += per_cohort(ids)
+        metrics.reminders_fired += per_cohort(ids[part['when_datetime'] <= as_of])
+        metrics.reminders_completed += per_cohort(ids, part['completed'])
+    return metrics
+
+
+def print_report(metrics: CohortMetrics):
+    report = metrics.to_dict()
+    print(f"{'cohort':8s} {'users':>7s} {'goal%':>6s} {'goals✓':>7s} {'plan✓':>6s} {'energy':>6s} "
+          f"{'remind':>7s} {'fired':>6s} {'done%':>6s}")
+    for i, cohort in enumerate(report['cohorts']):
+        def pct(values):
+            return f"{values[i] * 100:.0f}%" if values[i] is not None else "—"
+        energy = report['energy_avg'][i]
+        print(f"{cohort['cohort']:8s} {cohort['users']:7d} {pct(report['goal_user_share']):>6s} "
+              f"{pct(report['goal_completion']):>7s} {pct(report['plan_completion']):>6s} "
+              f"{(f'{energy:.0f}' if energy is not None else '—'):>6s} {report['reminders'][i]:7d} "
+              f"{report['reminders_fired'][i]:6d} {pct(report['reminder_completion']):>6s}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="analytics_export", help="export directory")
+    parser.add_argument("--url", help="database URL to read from (default: DATABASE_URL; a replica is best)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows per page / part file")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between pages")
+    parser.add_argument("--format", choices=("parquet", "npz"), help="default: parquet if pyarrow is installed")
+    parser.add_argument("--skip-export", action="store_true", help="only compute metrics from an existing export")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.format == 'parquet' and not PARQUET_AVAILABLE:
+        parser.error("pyarrow not installed. Install with: pip install pyarrow (or use --format npz)")
+    if not args.skip_export:
+        if args.url:
+            engine = create_async_engine(args.url)
+        else:
+            from database import engine
+        await export_all(engine, args.out, args.chunk_rows, args.format, args.pause)
+        await engine.dispose()
+
+    metrics = cohort_metrics(args.out)
+    with open(os.path.join(args.out, 'metrics.json'), 'w') as f:
+        json.dump(metrics.to_dict(), f, indent=2)
+    print_report(metrics)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -23,25 +23,22 @@ if POSTGRES_URL:
         POSTGRES_URL = f'postgresql+asyncpg://{POSTGRES_URL}'
     
     DATABASE_URL = POSTGRES_URL
-    print("🗄️  Using PostgreSQL (production mode)")
+    DATABASE_BACKEND = "🗄️  Using PostgreSQL (production mode)"
 elif DATABASE_URL.startswith('postgres'):
     # Уже правильный формат PostgreSQL
     if DATABASE_URL.startswith('postgres://'):
         DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql+asyncpg://', 1)
     elif not 'asyncpg' in DATABASE_URL:
         DATABASE_URL = DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://', 1)
-    print("🗄️  Using PostgreSQL")
+    DATABASE_BACKEND = "🗄️  Using PostgreSQL"
 else:
     # SQLite для локальной разработки
-    print("💾 Using SQLite (local development)")
+    DATABASE_BACKEND = "💾 Using SQLite (local development)"
 
 # AI configuration (optional)
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
 
-if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN не установлен! Создай файл .env с токеном бота.")
-
 # Настройки Pomodoro
 POMODORO_WORK_TIME = 25 * 60  # 25 минут в секундах
 POMODORO_BREAK_TIME = 5 * 60  # 5 минут в секундах
@@ -52,4 +49,87 @@ QUIET_MODE_DURATION = 30 * 60  # 30 минут в секундах
 # Настройки таймзоны
 # По умолчанию Испания (Europe/Madrid), можно переопределить через переменную окружения
 USER_TIMEZONE = os.getenv('USER_TIMEZONE', 'Europe/Madrid')
+# Разбор времени через dateparser: парсер на каждую таймзону пользователей (~40 мс и ~200 КБ на зону),
+# держим столько последних; больше разных зон - парсеры пересоздаются по кругу
+DATEPARSER_ZONES = int(os.getenv('DATEPARSER_ZONES', '64'))
+
+
+# Настройки стриминга ответов AI
+# Ответ показывается по мере генерации: сначала заглушка, потом правки сообщения
+AI_STREAMING = os.getenv('AI_STREAMING', 'true').lower() in ('1', 'true', 'yes')
+# Telegram ограничивает частоту правок: не чаще ~1 раза в секунду на чат
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))
+STREAM_EDIT_MIN_CHARS = int(os.getenv('STREAM_EDIT_MIN_CHARS', '20'))
+
+# Пул AI провайдеров (OpenAI + Claude, если заданы оба ключа)
+# Хедж: второй запрос, если первый дольше p95 задержки провайдера
+AI_HEDGING = os.getenv('AI_HEDGING', 'true').lower() in ('1', 'true', 'yes')
+AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', '1.5'))  # секунды, нижняя граница бюджета
+AI_HEDGE_MAX_DELAY = float(os.getenv('AI_HEDGE_MAX_DELAY', '10.0'))  # секунды, верхняя граница бюджета
+# Circuit breaker: после N ошибок подряд провайдер отключается на время
+AI_BREAKER_FAILURES = int(os.getenv('AI_BREAKER_FAILURES', '3'))
+AI_BREAKER_COOLDOWN = float(os.getenv('AI_BREAKER_COOLDOWN', '30'))
+
+# Память диалога с AI (на пользователя)
+MEMORY_ENABLED = os.getenv('MEMORY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+MEMORY_MAX_TURNS = int(os.getenv('MEMORY_MAX_TURNS', '12'))  # кольцевой буфер реплик (6 обменов)
+MEMORY_TOKEN_BUDGET = int(os.getenv('MEMORY_TOKEN_BUDGET', '800'))  # примерный бюджет токенов на память
+MEMORY_SUMMARY_TOKENS = int(os.getenv('MEMORY_SUMMARY_TOKENS', '200'))  # из них на краткое содержание
+MEMORY_CACHE_USERS = int(os.getenv('MEMORY_CACHE_USERS', '1000'))  # сколько пользователей держать в памяти процесса
+
+# Вечерний чек-ин для всех пользователей (в их часовом поясе); по умолчанию выключен
+EVENING_CHECKIN_ENABLED = os.getenv('EVENING_CHECKIN_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+EVENING_CHECKIN_HOUR = int(os.getenv('EVENING_CHECKIN_HOUR', '20'))
+EVENING_CHECKIN_MINUTE = int(os.getenv('EVENING_CHECKIN_MINUTE', '0'))
+# Массовые рассылки: сообщений в секунду (лимит Telegram ~30/с на бота)
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '25'))
+
+# Постраничный вывод списков (кнопок на странице)
+REMINDERS_PAGE_SIZE = int(os.getenv('REMINDERS_PAGE_SIZE', '5'))
+PLAN_PAGE_SIZE = int(os.getenv('PLAN_PAGE_SIZE', '8'))
+
+# Профилирование фильтров обработчиков: время и доля срабатываний, отчёт в лог
+PROFILE_FILTERS = os.getenv('PROFILE_FILTERS', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_FILTERS_INTERVAL = int(os.getenv('PROFILE_FILTERS_INTERVAL', '60'))  # минуты между отчётами
+
+# Снимок «сегодня» (цель, энергия, план, чек-ин) в памяти: сколько пользователей держать
+TODAY_CACHE_USERS = int(os.getenv('TODAY_CACHE_USERS', '5000'))
+
+# /stats: за сколько последних дней считать тренды
+STATS_HISTORY_DAYS = int(os.getenv('STATS_HISTORY_DAYS', '365'))
+
+# Хранение: заметки, энергия, план, чек-ины и выполненные напоминания старше горизонта уходят в архивные таблицы
+RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', '365'))  # 0 - не архивировать
+RETENTION_BATCH = int(os.getenv('RETENTION_BATCH', '1000'))  # строк в одной транзакции переноса
+RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', '360'))  # минуты между проходами в боте
+
+# PostgreSQL: пул соединений и кэш подготовленных запросов asyncpg
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # секунды ожидания свободного соединения
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '3600'))  # секунды жизни соединения
+# Проверка соединения SELECT 1 перед каждой выдачей из пула; по умолчанию выключена - разрыв ловит retry_on_disconnect
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'false').lower() in ('1', 'true', 'yes')
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '256'))  # 0 - без подготовленных запросов (pgbouncer)
+DB_METRICS_INTERVAL = int(os.getenv('DB_METRICS_INTERVAL', '0'))  # минуты между отчётами БД (пул, запросов на апдейт, кэш «сегодня») в лог, 0 - выкл
+
+# SQLite (локальный режим): WAL и PRAGMA на каждое соединение
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'true').lower() in ('1', 'true', 'yes')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))  # ждать блокировку записи, а не падать
+SQLITE_CACHE_KB = int(os.getenv('SQLITE_CACHE_KB', '20000'))  # кэш страниц на соединение
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', '256'))  # чтение файла базы через mmap
+# Мелкие записи (заметки, энергия) - через одного писателя, пачкой в одной транзакции
+SQLITE_GROUP_COMMIT = os.getenv('SQLITE_GROUP_COMMIT', 'true').lower() in ('1', 'true', 'yes')
+SQLITE_WRITE_BATCH = int(os.getenv('SQLITE_WRITE_BATCH', '100'))  # записей в одной транзакции, не больше
+
 
+def validate_config():
+    """Проверка обязательных настроек - при сборке приложения, а не при импорте"""
+    if not BOT_TOKEN:
+        raise ValueError("BOT_TOKEN не установлен! Создай файл .env с токеном бота.")
+    if not (OPENAI_API_KEY or ANTHROPIC_API_KEY):
+        raise ValueError(
+            "❌ AI provider is required!\n"
+            "Set OPENAI_API_KEY or ANTHROPIC_API_KEY in .env file.\n"
+            "Get keys from: https://platform.openai.com or https://console.anthropic.com"
+        )
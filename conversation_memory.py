@@ -0,0 +1,149 @@
+"""Per-user conversation memory for the AI assistant"""
+import json
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from database import async_session, ConversationMemory
+from db_helpers import _upsert
+from config import MEMORY_MAX_TURNS, MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_TOKENS, MEMORY_CACHE_USERS
+
+logger = logging.getLogger(__name__)
+
+# Сколько символов реплики попадает в строку краткого содержания
+_SUMMARY_LINE_CHARS = 120
+_ROLE_LABELS = {"user": "Пользователь", "assistant": "Ты"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~3 chars per token for mixed Cyrillic/Latin text)"""
+    return len(text) // 3 + 1 if text else 0
+
+
+class DialogMemory:
+    """
+    Recent turns in a ring buffer plus a rolling extractive summary.
+
+    When the turns exceed the token budget (or the ring is full), the oldest
+    turns are folded into the summary as one short line each, no LLM calls.
+    The summary itself is capped: its oldest lines are dropped first.
+    """
+
+    def __init__(self, turns: Optional[List[List[str]]] = None, summary: str = "",
+                 max_turns: int = MEMORY_MAX_TURNS, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 summary_tokens: int = MEMORY_SUMMARY_TOKENS):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.turns = deque(maxlen=max_turns)
+        self.summary_lines = deque(summary.splitlines() if summary else ())
+        self._turn_tokens = 0
+        for role, content in turns or ():
+            self.turns.append((role, content))
+            self._turn_tokens += estimate_tokens(content)
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    @property
+    def tokens(self) -> int:
+        return self._turn_tokens + estimate_tokens(self.summary)
+
+    def add_exchange(self, user_text: str, assistant_text: str):
+        """Remember one user message and the answer to it"""
+        for role, content in (("user", user_text), ("assistant", assistant_text)):
+            if len(self.turns) == self.max_turns:
+                self._fold_oldest()
+            self.turns.append((role, content))
+            self._turn_tokens += estimate_tokens(content)
+        self._compact()
+
+    def _fold_oldest(self):
+        role, content = self.turns.popleft()
+        self._turn_tokens -= estimate_tokens(content)
+        line = " ".join(content.split())[:_SUMMARY_LINE_CHARS]
+        self.summary_lines.append(f"{_ROLE_LABELS.get(role, role)}: {line}")
+
+    def _compact(self):
+        # Сворачиваем парами, чтобы в буфере диалог всегда начинался с реплики пользователя
+        while self._turn_tokens + estimate_tokens(self.summary) > self.token_budget and len(self.turns) > 2:
+            self._fold_oldest()
+            self._fold_oldest()
+        while self.summary_lines and estimate_tokens(self.summary) > self.summary_tokens:
+            self.summary_lines.popleft()
+
+    def history(self) -> List[Dict[str, str]]:
+        """Recent turns as chat messages (alternating, starting with the user)"""
+        return [{"role": role, "content": content} for role, content in self.turns]
+
+    def summary_prompt(self) -> Optional[str]:
+        if not self.summary_lines:
+            return None
+        return "Кратко о предыдущем разговоре с пользователем:\n" + self.summary
+
+    def dump_turns(self) -> str:
+        return json.dumps([list(turn) for turn in self.turns], ensure_ascii=False)
+
+
+class MemoryStore:
+    """
+    Process-wide LRU cache of DialogMemory backed by conversation_memories.
+
+    A cache miss costs one SELECT by primary key; a save is one INSERT ...
+    ON CONFLICT DO UPDATE, so concurrent first saves and users evicted from
+    the cache and seen again never collide on the key. The number of users
+    held in process memory is capped.
+    """
+
+    def __init__(self, max_users: int = MEMORY_CACHE_USERS):
+        self.max_users = max_users
+        self._cache: "OrderedDict[int, DialogMemory]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int) -> DialogMemory:
+        memory = self._cache.get(user_id)
+        if memory is not None:
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return memory
+
+        self.misses += 1
+        memory = DialogMemory()
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(ConversationMemory.summary, ConversationMemory.turns)
+                    .where(ConversationMemory.user_id == user_id)
+                )
+                row = result.first()
+            if row:
+                memory = DialogMemory(json.loads(row.turns or "[]"), row.summary or "")
+        except Exception as e:
+            # Без памяти бот всё равно ответит
+            logger.error(f"Error loading conversation memory for {user_id}: {e}")
+        self._remember(user_id, memory)
+        return memory
+
+    async def save(self, user_id: int, memory: DialogMemory):
+        self._remember(user_id, memory)
+        values = {"user_id": user_id, "summary": memory.summary, "turns": memory.dump_turns(),
+                  "updated_at": datetime.utcnow()}
+        try:
+            async with async_session() as session:
+                await _upsert(session, ConversationMemory, 'user_id', values, ('summary', 'turns', 'updated_at'))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Error saving conversation memory for {user_id}: {e}")
+
+    def _remember(self, user_id: int, memory: DialogMemory):
+        self._cache[user_id] = memory
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_users:
+            self._cache.popitem(last=False)
+
+
+# Global memory store
+memory_store = MemoryStore()
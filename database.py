@@ -1,9 +1,17 @@
 """Модели базы данных"""
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, LargeBinary
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, LargeBinary, Index, and_, event, inspect, select, update, bindparam
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
-from config import DATABASE_URL
+from functools import wraps
+from config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE, SQLITE_TUNING, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_KB, SQLITE_MMAP_MB,
+    SQLITE_GROUP_COMMIT, SQLITE_WRITE_BATCH,
+)
+from utils.group_commit import GroupCommitWriter
+from utils.pool_metrics import MeasuredQueuePool, pool_metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,6 +31,7 @@ class User(Base):
     username = Column(String(255))
     name = Column(String(255))
     language_code = Column(String(10), default='en')  # 'en', 'es', 'ru', 'uk'
+    timezone = Column(String(64), default=None, index=True)  # IANA, например 'Europe/Madrid'; None = USER_TIMEZONE
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
@@ -34,6 +43,10 @@ class EnergyLog(Base):
     user_id = Column(Integer, nullable=False)
     energy_level = Column(Integer, nullable=False)  # 40, 60, 80
     date = Column(DateTime, default=datetime.utcnow)
+    local_day = Column(Integer)  # YYYYMMDD в таймзоне пользователя
+    
+    # AUTOINCREMENT (SQLite): id не переиспользуется после переноса в архив
+    __table_args__ = (Index('ix_energy_logs_user_day', 'user_id', 'local_day'), {'sqlite_autoincrement': True})
 
 
 class DailyGoal(Base):
@@ -48,6 +61,9 @@ class DailyGoal(Base):
     estimated_pomodoros = Column(Integer, default=None)  # Сколько помидоров нужно
     completed_pomodoros = Column(Integer, default=0)  # Сколько помидоров уже сделано
     day_rating = Column(Integer, default=None)  # Оценка дня (1-10)
+    local_day = Column(Integer)  # YYYYMMDD в таймзоне пользователя
+    
+    __table_args__ = (Index('ix_daily_goals_user_day', 'user_id', 'local_day'),)
 
 
 class Note(Base):
@@ -58,6 +74,8 @@ class Note(Base):
     user_id = Column(Integer, nullable=False)
     text = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = {'sqlite_autoincrement': True}
 
 
 class EveningCheckIn(Base):
@@ -70,6 +88,9 @@ class EveningCheckIn(Base):
     what_tired = Column(Text)
     what_helped = Column(Text)
     date = Column(DateTime, default=datetime.utcnow)
+    local_day = Column(Integer)  # YYYYMMDD в таймзоне пользователя
+    
+    __table_args__ = (Index('ix_evening_checkins_user_day', 'user_id', 'local_day'), {'sqlite_autoincrement': True})
 
 
 class UserState(Base):
@@ -95,6 +116,21 @@ class Reminder(Base):
     completed = Column(Boolean, default=False)
     recurring = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Постраничный список: WHERE user_id, completed + keyset по (when_datetime, id)
+    __table_args__ = (
+        Index('ix_reminders_user_when', 'user_id', 'completed', 'when_datetime', 'id'), {'sqlite_autoincrement': True}
+    )
+
+
+class DeferredMessage(Base):
+    """Сообщение, отложенное на время режима тишины (переживает перезапуск бота)"""
+    __tablename__ = 'deferred_messages'
+    
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, nullable=False, index=True)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class NoteEmbedding(Base):
@@ -118,33 +154,317 @@ class DailyPlanItem(Base):
     completed = Column(Boolean, default=False)
     date = Column(DateTime, default=datetime.utcnow)
     order = Column(Integer, default=0)  # Порядок отображения
+    local_day = Column(Integer)  # YYYYMMDD в таймзоне пользователя
+    
+    __table_args__ = (Index('ix_daily_plan_items_user_day', 'user_id', 'local_day'), {'sqlite_autoincrement': True})
 
 
-# Создание движка и сессии
-# Для PostgreSQL добавляем pool_pre_ping для автоматического восстановления соединений
-engine_kwargs = {
-    "echo": False,
-    "pool_pre_ping": True,  # Автоматическое восстановление соединений
+class DailyRollup(Base):
+    """Сводка дня: цель, помидоры, план, энергия (пересчитывается при записи, см. rollups.py)"""
+    __tablename__ = 'daily_rollups'
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    local_day = Column(Integer, nullable=False)  # YYYYMMDD в таймзоне пользователя
+    has_goal = Column(Boolean, default=False)
+    goal_text = Column(Text)
+    goal_completed = Column(Boolean, default=False)
+    estimated_pomodoros = Column(Integer)
+    completed_pomodoros = Column(Integer)
+    day_rating = Column(Integer)
+    plan_total = Column(Integer, default=0)
+    plan_done = Column(Integer, default=0)
+    energy_sum = Column(Integer, default=0)
+    energy_count = Column(Integer, default=0)
+    
+    __table_args__ = (Index('ix_daily_rollups_user_day', 'user_id', 'local_day', unique=True),)
+
+
+class ConversationMemory(Base):
+    """Память диалога с AI: последние реплики + краткое содержание старых"""
+    __tablename__ = 'conversation_memories'
+    
+    user_id = Column(Integer, primary_key=True, autoincrement=False)  # Telegram user ID (как в AIService)
+    summary = Column(Text, default='')
+    turns = Column(Text, default='[]')  # JSON: [[role, content], ...]
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+def archive_model(model, class_name: str, *indexes: Index):
+    """
+    Архивная копия таблицы model (<таблица>_archive): те же колонки и id,
+    индексы рабочей таблицы (под архивными именами) плюс indexes и archived_at.
+    Строки туда переносит retention.py.
+    """
+    table = model.__table__
+    name = f"{table.name}_archive"
+    copied = tuple(
+        Index(index.name.replace(table.name, name), *(column.name for column in index.columns), unique=index.unique)
+        for index in table.indexes
+    )
+    return type(class_name, (Base,), {
+        '__tablename__': name,
+        '__table_args__': copied + indexes,
+        **{column.key: column._copy() for column in table.columns},
+        'archived_at': Column(DateTime, default=datetime.utcnow),
+    })
+
+
+ArchivedNote = archive_model(Note, 'ArchivedNote', Index('ix_notes_archive_user', 'user_id', 'id'))
+ArchivedEnergyLog = archive_model(EnergyLog, 'ArchivedEnergyLog')
+ArchivedPlanItem = archive_model(DailyPlanItem, 'ArchivedPlanItem')
+ArchivedCheckIn = archive_model(EveningCheckIn, 'ArchivedCheckIn')
+ArchivedReminder = archive_model(Reminder, 'ArchivedReminder')
+
+# Рабочая таблица -> архив; цели и сводки дней не архивируются
+ARCHIVES = {
+    Note: ArchivedNote,
+    EnergyLog: ArchivedEnergyLog,
+    DailyPlanItem: ArchivedPlanItem,
+    EveningCheckIn: ArchivedCheckIn,
+    Reminder: ArchivedReminder,
 }
 
+
+# Создание движка и сессии
+def engine_options(postgres: bool = IS_POSTGRES) -> dict:
+    """
+    Keyword arguments for create_async_engine.
+
+    PostgreSQL: pool sized from config with checkout metrics, asyncpg prepared
+    statement cache, no pre-ping round-trip on checkout (a dropped connection
+    is handled by retry_on_disconnect instead). SQLite keeps pre-ping.
+    """
+    if not postgres:
+        return {"echo": False, "pool_pre_ping": True}
+    return {
+        "echo": False,
+        "poolclass": MeasuredQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,  # Переиспользование соединений не дольше этого
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    }
+
+
+engine_kwargs = engine_options()
 if IS_POSTGRES:
-    # Для PostgreSQL добавляем дополнительные настройки надёжности
-    engine_kwargs.update({
-        "pool_size": 5,
-        "max_overflow": 10,
-        "pool_recycle": 3600,  # Переиспользование соединений каждый час
-    })
     logger.info("🗄️  Database: PostgreSQL (persistent, reliable)")
 
+
+def sqlite_pragmas() -> list:
+    """PRAGMA для каждого соединения SQLite (настройки из config)"""
+    return [
+        "PRAGMA journal_mode=WAL",  # читатели не ждут писателя
+        "PRAGMA synchronous=NORMAL",  # в WAL fsync только на checkpoint, без потери целостности
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_KB}",  # отрицательное значение - в КБ
+        f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def tune_sqlite(target_engine):
+    """Применять sqlite_pragmas() к каждому новому соединению движка"""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(target_engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 engine = create_async_engine(DATABASE_URL, **engine_kwargs)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+if not IS_POSTGRES and SQLITE_TUNING:
+    tune_sqlite(engine)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    pool_metrics.queries += 1
+
+# Один писатель для мелких записей SQLite; у PostgreSQL свои транзакции на каждую запись
+writer = GroupCommitWriter(async_session, max_batch=SQLITE_WRITE_BATCH) \
+    if not IS_POSTGRES and SQLITE_GROUP_COMMIT else None
+
+
+def log_db_metrics():
+    """Pool checkouts and wait (PostgreSQL), queries per Telegram update and the today cache to the log"""
+    from today import today_cache
+    pool_metrics.log_report(engine.pool)
+    today_cache.log_report()
+
+
+def retry_on_disconnect(func):
+    """
+    Retry a database call once if its pooled connection turned out to be dead.
+
+    Replaces pool_pre_ping: SQLAlchemy invalidates the pool on a disconnect
+    error, so the second attempt gets a fresh connection. Only for reads and
+    idempotent writes.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await func(*args, **kwargs)
+        except DBAPIError as e:
+            if not e.connection_invalidated:
+                raise
+            pool_metrics.disconnects += 1
+            logger.warning(f"{func.__name__}: database connection lost, retrying once")
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+async def run_write(op):
+    """
+    Run a small write `op(session)` (no commit inside) and return its result.
+
+    On SQLite it goes through the shared writer and is committed together with
+    other writes submitted at the same time; otherwise in its own session.
+    """
+    if writer is not None:
+        return await writer.submit(op)
+    async with async_session() as session:
+        result = await op(session)
+        await session.commit()
+        return result
+
+
+# Колонки, добавленные после первых релизов: create_all не меняет существующие таблицы
+_ADDED_COLUMNS = [
+    (User, 'timezone', 'VARCHAR(64)'),
+    (EnergyLog, 'local_day', 'INTEGER'),
+    (DailyGoal, 'local_day', 'INTEGER'),
+    (EveningCheckIn, 'local_day', 'INTEGER'),
+    (DailyPlanItem, 'local_day', 'INTEGER'),
+]
+_LOCAL_DAY_MODELS = [EnergyLog, DailyGoal, EveningCheckIn, DailyPlanItem]
+
+
+def _add_missing_columns(sync_conn):
+    """ALTER TABLE ... ADD COLUMN for columns missing in existing tables, then their indexes"""
+    inspector = inspect(sync_conn)
+    for model, column, ddl_type in _ADDED_COLUMNS:
+        existing = {c['name'] for c in inspector.get_columns(model.__tablename__)}
+        if column not in existing:
+            sync_conn.exec_driver_sql(f'ALTER TABLE {model.__tablename__} ADD COLUMN {column} {ddl_type}')
+            logger.info(f"Added column {model.__tablename__}.{column}")
+    for model in [User, Reminder] + _LOCAL_DAY_MODELS:
+        for index in model.__table__.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+def _enable_sqlite_autoincrement(sync_conn):
+    """
+    Rebuild archived SQLite tables created without AUTOINCREMENT (ids and rows kept).
+
+    Without it SQLite hands out max(id) + 1, so the id of a row moved to the
+    archive could be given to a new row. PostgreSQL sequences never go back.
+    """
+    for model in ARCHIVES:
+        table = model.__table__
+        ddl = sync_conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+        ).scalar()
+        if ddl is None or 'AUTOINCREMENT' in ddl.upper():
+            continue
+        old = f"{table.name}_before_autoincrement"
+        sync_conn.exec_driver_sql(f'ALTER TABLE {table.name} RENAME TO {old}')
+        for index in table.indexes:
+            sync_conn.exec_driver_sql(f'DROP INDEX IF EXISTS {index.name}')
+        table.create(sync_conn)
+        columns = ", ".join(f'"{column.name}"' for column in table.columns)
+        sync_conn.exec_driver_sql(f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old}')
+        sync_conn.exec_driver_sql(f'DROP TABLE {old}')
+        # Счётчик выше и уже уехавших в архив id
+        archive = ARCHIVES[model].__tablename__
+        sync_conn.exec_driver_sql('DELETE FROM sqlite_sequence WHERE name = ?', (table.name,))
+        sync_conn.exec_driver_sql(
+            f'INSERT INTO sqlite_sequence (name, seq) SELECT ?, max(coalesce((SELECT max(id) FROM {table.name}), 0), '
+            f'coalesce((SELECT max(id) FROM {archive}), 0))', (table.name,)
+        )
+        logger.info(f"Rebuilt {table.name} with AUTOINCREMENT")
+
+
+# До identity.py эти записи сохранялись под Telegram ID вместо users.id
+_TELEGRAM_KEYED_MODELS = [Note, DailyGoal, EveningCheckIn]
+
+
+async def _remap_telegram_ids(conn) -> set:
+    """
+    user_id = users.id for rows saved under the owner's Telegram ID; returns
+    the users.id that got rows. Idempotent: once remapped nothing matches.
+    A user_id that is also some users.id is ambiguous and left alone.
+    """
+    remapped = set()
+    for model in _TELEGRAM_KEYED_MODELS:
+        stale = and_(model.user_id.in_(select(User.telegram_id)), model.user_id.not_in(select(User.id)))
+        owners = (await conn.execute(
+            select(User.id).where(User.telegram_id.in_(select(model.user_id).where(stale)))
+        )).scalars().all()
+        if not owners:
+            continue
+        result = await conn.execute(
+            update(model.__table__)
+            .where(stale)
+            .values(user_id=select(User.id).where(User.telegram_id == model.user_id).scalar_subquery())
+        )
+        remapped.update(owners)
+        logger.info(f"Remapped {result.rowcount} rows in {model.__tablename__} from Telegram ID to users.id")
+    return remapped
+
+
+async def _backfill_local_day(conn):
+    """Fill local_day for rows written before it existed (by user's timezone)"""
+    from user_time import local_day
+    from config import USER_TIMEZONE
+    
+    tz_rows = await conn.execute(select(User.id, User.timezone))
+    timezones = {user_id: tz or USER_TIMEZONE for user_id, tz in tz_rows}
+    for model in _LOCAL_DAY_MODELS:
+        rows = (await conn.execute(
+            select(model.id, model.user_id, model.date).where(model.local_day.is_(None))
+        )).all()
+        if not rows:
+            continue
+        params = [
+            {"row_id": row_id, "day": local_day(timezones.get(user_id, USER_TIMEZONE), at or datetime.utcnow())}
+            for row_id, user_id, at in rows
+        ]
+        await conn.execute(
+            update(model.__table__)
+            .where(model.__table__.c.id == bindparam('row_id'))
+            .values(local_day=bindparam('day')),
+            params
+        )
+        logger.info(f"Backfilled local_day for {len(rows)} rows in {model.__tablename__}")
+
 
 async def init_db():
     """Инициализация базы данных"""
     try:
         async with engine.begin() as conn:
+            had_rollups = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table('daily_rollups'))
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_missing_columns)
+            if not IS_POSTGRES:
+                await conn.run_sync(_enable_sqlite_autoincrement)
+            remapped = await _remap_telegram_ids(conn)
+            await _backfill_local_day(conn)
+        if not had_rollups:
+            # Новая таблица сводок: заполняем из истории один раз
+            from rollups import rebuild_rollups
+            await rebuild_rollups()
+        elif remapped:
+            from rollups import rebuild_rollups
+            await rebuild_rollups(user_ids=sorted(remapped))
         
         if IS_POSTGRES:
             logger.info("✅ PostgreSQL database initialized and ready")
@@ -0,0 +1,173 @@
+"""Разбор времени напоминаний: быстрый путь для частых фраз, dateparser для остальных
+
+Фразы вида «через 10 минут», «завтра в 15:00», «in 2 hours», «mañana a las 9»
+на четырёх языках бота разбираются регулярками за микросекунды. Разобранная
+фраза кэшируется как смещение относительно «сейчас» (LRU), так что повторная
+фраза не разбирается вовсе. Остальное уходит в dateparser: один экземпляр
+парсера на таймзону (не больше DATEPARSER_ZONES последних), прогретый при старте
+(первый разбор у dateparser долгий).
+"""
+import re
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from config import DATEPARSER_ZONES, USER_TIMEZONE
+from user_time import get_tz
+
+DATEPARSER_LANGUAGES = ['ru', 'uk', 'en', 'es']
+
+# Формы единиц времени -> аргумент timedelta
+_UNIT_WORDS = {
+    "seconds": "с сек секунда секунды секунд секунду секунди s sec secs second seconds segundo segundos",
+    "minutes": "м мин минута минуты минут минуту хв хвилина хвилини хвилин хвилину "
+               "min mins minute minutes minuto minutos",
+    "hours": "ч час часа часов година години годин годину h hr hrs hour hours hora horas",
+    "days": "день дня дней дні днів добу доби day days día días dia dias",
+    "weeks": "неделя недели недель неделю тиждень тижні тижнів week weeks semana semanas",
+}
+_UNITS = {word: unit for unit, words in _UNIT_WORDS.items() for word in words.split()}
+_ONE = {"a", "an", "one", "un", "una", "uno", "один", "одна", "одну"}
+_HALF_HOUR = {"полчаса": "30 минут", "пів години": "30 хвилин", "півгодини": "30 хвилин",
+              "half an hour": "30 minutes", "media hora": "30 minutos"}
+_DAY_WORDS = {
+    "сегодня": 0, "сьогодні": 0, "today": 0, "hoy": 0,
+    "завтра": 1, "tomorrow": 1, "mañana": 1,
+    "послезавтра": 2, "післязавтра": 2, "pasado mañana": 2,
+}
+
+
+def _alternation(words) -> str:
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+_SPACES_RE = re.compile(r"\s+")
+_HALF_HOUR_RE = re.compile(_alternation(_HALF_HOUR))
+_RELATIVE_RE = re.compile(r"(?:через|in|en|dentro de)\s+(.+)")
+_RELATIVE_PART_RE = re.compile(
+    rf"(?:(\d+|{_alternation(_ONE)})\s*)?({_alternation(_UNITS)})\b\s*(?:(?:и|і|й|and|y|,)\s*)?"
+)
+_DAY = _alternation(_DAY_WORDS)
+_ABSOLUTE_RE = re.compile(
+    rf"(?:(?P<day>{_DAY})\s*)?(?:(?P<prep>в|во|о|об|at|a las|a la)\s+)?"
+    rf"(?P<hour>\d{{1,2}})(?:[:.](?P<minute>\d{{2}}))?\s*(?P<ampm>am|pm)?(?:\s+(?P<day_after>{_DAY}))?"
+)
+_DAY_ONLY_RE = re.compile(_DAY)
+
+# Разобранная фраза: ("delta", календарных дней, timedelta) или ("at", дней вперёд, час, минута, переносить ли на завтра).
+# Дни и недели - календарные (то же время на часах), а не 24 часа: через переход на летнее время
+# «завтра» остаётся завтра в то же время
+Spec = Tuple
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё -> е, одиночные пробелы, без точки/восклицания в конце"""
+    text = _SPACES_RE.sub(" ", text.lower().replace("ё", "е")).strip().rstrip(".!?")
+    return _HALF_HOUR_RE.sub(lambda match: _HALF_HOUR[match[0]], text)
+
+
+def _relative_spec(rest: str) -> Optional[Spec]:
+    days, delta = 0, timedelta()
+    position = 0
+    while position < len(rest):
+        match = _RELATIVE_PART_RE.match(rest, position)
+        if not match:
+            return None
+        count = match[1]
+        value = int(count) if count and count.isdigit() else 1
+        unit = _UNITS[match[2]]
+        if unit == "days":
+            days += value
+        elif unit == "weeks":
+            days += 7 * value
+        else:
+            delta += timedelta(**{unit: value})
+        position = match.end()
+    return ("delta", days, delta) if days or delta else None
+
+
+def _absolute_spec(match) -> Optional[Spec]:
+    day_word = match["day"] or match["day_after"]
+    if match["day"] and match["day_after"]:
+        return None
+    # Голое число («15») - не время: нужен день, предлог или минуты
+    if not (day_word or match["prep"] or match["minute"] or match["ampm"]):
+        return None
+    hour, minute = int(match["hour"]), int(match["minute"] or 0)
+    if match["ampm"]:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match["ampm"] == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    days = _DAY_WORDS[day_word] if day_word else 0
+    return "at", days, hour, minute, day_word is None
+
+
+@lru_cache(maxsize=2048)
+def fast_spec(phrase: str) -> Optional[Spec]:
+    """Смещение для нормализованной фразы; None - не частая форма (нужен dateparser)"""
+    match = _RELATIVE_RE.fullmatch(phrase)
+    if match:
+        return _relative_spec(match[1])
+    if _DAY_ONLY_RE.fullmatch(phrase):
+        return "delta", _DAY_WORDS[phrase], timedelta()
+    match = _ABSOLUTE_RE.fullmatch(phrase)
+    if match:
+        return _absolute_spec(match)
+    return None
+
+
+def resolve(spec: Spec, now: datetime) -> datetime:
+    """Время по смещению относительно now (aware, pytz)"""
+    tz = now.tzinfo
+    if spec[0] == "delta":
+        _, days, delta = spec
+        # Дни прибавляются к времени на часах, часы и минуты - к абсолютному времени
+        when = tz.normalize(tz.localize(now.replace(tzinfo=None) + timedelta(days=days))) if days else now
+        return tz.normalize(when + delta)
+    _, days, hour, minute, roll_forward = spec
+    local_date = now.date() + timedelta(days=days)
+    when = tz.localize(datetime.combine(local_date, time(hour, minute)))
+    if roll_forward and when <= now:
+        # Только время без дня: уже прошло - значит завтра (как PREFER_DATES_FROM='future')
+        when = tz.localize(datetime.combine(local_date + timedelta(days=1), time(hour, minute)))
+    return when
+
+
+@lru_cache(maxsize=DATEPARSER_ZONES)
+def _dateparser(tz_name: str):
+    """
+    Один DateDataParser на таймзону: сейчас он берёт сам, уже в этой таймзоне.
+
+    Таймзоны приходят от пользователей (/timezone), поэтому кэш - по числу зон
+    в ходу, а не по горстке: при вытеснении парсер создаётся заново (~40 мс).
+    """
+    from dateparser.date import DateDataParser
+    return DateDataParser(languages=DATEPARSER_LANGUAGES,
+                          settings={'PREFER_DATES_FROM': 'future', 'TIMEZONE': tz_name})
+
+
+def warm_up(tz_name: str = USER_TIMEZONE):
+    """Загрузить dateparser и данные языков заранее (при старте бота)"""
+    _dateparser(tz_name).get_date_data("15 декабря в 10:00")
+
+
+def parse_when(text: str, tz_name: str = USER_TIMEZONE, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Aware datetime (in tz_name) for a reminder time phrase, None if not recognised.
+
+    `now` only affects the fast path; dateparser always parses relative to the
+    current time.
+    """
+    tz = get_tz(tz_name)
+    phrase = normalize(text)
+    if not phrase:
+        return None
+    spec = fast_spec(phrase)
+    if spec:
+        return resolve(spec, now or datetime.now(tz))
+    parsed = _dateparser(tz.zone).get_date_data(phrase).date_obj
+    if parsed is None:
+        return None
+    return parsed if parsed.tzinfo else tz.localize(parsed)
@@ -1,51 +1,120 @@
 """Вспомогательные функции для работы с БД"""
-from database import async_session, User, EnergyLog, DailyGoal, Note, EveningCheckIn, UserState, Reminder, DailyPlanItem
+from database import IS_POSTGRES, async_session, retry_on_disconnect, run_write, User, EnergyLog, DailyGoal, Note, EveningCheckIn, UserState, Reminder, DailyPlanItem, DailyRollup, ArchivedNote, ArchivedReminder
 from datetime import datetime, timedelta
-from sqlalchemy import select, func, Integer
-
-
+from typing import NamedTuple, Optional, Tuple
+from sqlalchemy import select, update, delete, func, or_, tuple_, lambda_stmt
+from sqlalchemy.dialects import postgresql, sqlite
+from identity import InternalUserId, identities, internal_user_id
+from rollups import refresh_rollup
+from today import load_day, today_cache
+from user_time import user_local_day, day_key, key_to_date, shift_day, remember_timezone
+from config import REMINDERS_PAGE_SIZE, PLAN_PAGE_SIZE
+
+
+class Page(NamedTuple):
+    """Страница списка: строки, всего строк (выполнено) и есть ли соседние страницы"""
+    items: list
+    total: int
+    done: int
+    has_prev: bool
+    has_next: bool
+
+
+def _keyset(query, columns: tuple, after: Optional[Tuple] = None, before: Optional[Tuple] = None):
+    """
+    Keyset-пагинация по columns (последняя колонка уникальна, например id).
+    
+    after - строки строго после курсора по возрастанию, before - строго до него
+    (по убыванию, вызывающий разворачивает). Без OFFSET: индекс сразу встаёт на курсор.
+    """
+    key = tuple_(*columns)
+    if before is not None:
+        return query.where(key < tuple_(*before)).order_by(*(c.desc() for c in columns))
+    if after is not None:
+        query = query.where(key > tuple_(*after))
+    return query.order_by(*(c.asc() for c in columns))
+
+
+def _page(rows: list, page_size: int, after, before) -> Tuple[list, bool, bool]:
+    """Строки страницы (запрошено page_size + 1) и флаги соседних страниц"""
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before is not None:
+        return rows[::-1], more, True
+    return rows, after is not None, more
+
+
+async def _upsert(session, model, key: str, values: dict, update_columns: tuple = ()):
+    """
+    INSERT ... ON CONFLICT (key) DO UPDATE ... RETURNING: the row, inserted or existing.
+
+    update_columns are overwritten with `values` on conflict; without them the
+    update is a no-op that only makes RETURNING give back the existing row. One
+    statement, so simultaneous first calls cannot hit the unique constraint.
+    """
+    insert = postgresql.insert if IS_POSTGRES else sqlite.insert
+    stmt = insert(model).values(**values)
+    set_ = {column: stmt.excluded[column] for column in update_columns or (key,)}
+    stmt = stmt.on_conflict_do_update(index_elements=[key], set_=set_).returning(model)
+    result = await session.scalars(stmt, execution_options={"populate_existing": True})
+    return result.one()
+
+
+@retry_on_disconnect
 async def get_or_create_user(telegram_id: int, username: str = None, name: str = None, language_code: str = None) -> User:
     """Получить или создать пользователя"""
     from translations import get_language_code
+    if isinstance(telegram_id, InternalUserId):
+        raise TypeError(f"get_or_create_user() expects a Telegram ID, got users.id {int(telegram_id)}")
     
     async with async_session() as session:
-        result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            lang = get_language_code(language_code) if language_code else 'en'
-            user = User(telegram_id=telegram_id, username=username, name=name, language_code=lang)
-            session.add(user)
-            await session.commit()
-        else:
-            # Update language if provided and different
-            if language_code:
-                new_lang = get_language_code(language_code)
-                if user.language_code != new_lang:
-                    user.language_code = new_lang
-                    await session.commit()
-        
+        if not language_code:
+            # Частый случай - пользователь уже есть: только чтение
+            result = await session.execute(lambda_stmt(lambda: select(User).where(User.telegram_id == telegram_id)))
+            user = result.scalar_one_or_none()
+            if user:
+                remember_timezone(user.id, user.timezone)
+                identities.remember(user.id, user.telegram_id, user.language_code)
+                return user
+        
+        # Новый пользователь или язык из Telegram: вставка и обновление языка одним запросом
+        lang = get_language_code(language_code) if language_code else 'en'
+        user = await _upsert(
+            session, User, 'telegram_id',
+            {'telegram_id': telegram_id, 'username': username, 'name': name, 'language_code': lang},
+            update_columns=('language_code',) if language_code else (),
+        )
+        await session.commit()
+        remember_timezone(user.id, user.timezone)
+        identities.remember(user.id, user.telegram_id, user.language_code)
         return user
 
 
+@internal_user_id
 async def get_user_language_code(user_id: int) -> str:
     """Get user's language code"""
+    known = identities.by_internal(user_id)
+    if known:
+        return known.language_code
     async with async_session() as session:
-        result = await session.execute(select(User).where(User.id == user_id))
+        result = await session.execute(lambda_stmt(lambda: select(User).where(User.id == user_id)))
         user = result.scalar_one_or_none()
         return user.language_code if user and user.language_code else 'en'
 
 
+@internal_user_id
 async def save_energy_level(user_id: int, energy_level: int):
     """Сохранить уровень энергии"""
-    async with async_session() as session:
+    today = await user_local_day(user_id)
+
+    async def write(session):
         # Check if there's already an energy log for today
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         result = await session.execute(
             select(EnergyLog)
             .where(EnergyLog.user_id == user_id)
-            .where(EnergyLog.date >= today_start)
+            .where(EnergyLog.local_day == today)
             .order_by(EnergyLog.date.desc())
+            .limit(1)
         )
         existing = result.scalar_one_or_none()
         
@@ -54,46 +123,39 @@ async def save_energy_level(user_id: int, energy_level: int):
             existing.energy_level = energy_level
         else:
             # Create new
-            energy_log = EnergyLog(user_id=user_id, energy_level=energy_level)
+            energy_log = EnergyLog(user_id=user_id, energy_level=energy_level, local_day=today)
             session.add(energy_log)
-        
-        await session.commit()
+        await refresh_rollup(session, user_id, today)
 
+    await run_write(write)
+    today_cache.set_energy(user_id, today, energy_level)
 
+
+@retry_on_disconnect
+@internal_user_id
 async def get_todays_energy(user_id: int) -> int:
     """Получить уровень энергии на сегодня"""
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    async with async_session() as session:
-        result = await session.execute(
-            select(EnergyLog)
-            .where(EnergyLog.user_id == user_id)
-            .where(EnergyLog.date >= today_start)
-            .order_by(EnergyLog.date.desc())
-        )
-        energy_log = result.scalar_one_or_none()
-        return energy_log.energy_level if energy_log else None
+    return (await today_cache.get(user_id)).energy
 
 
+@retry_on_disconnect
+@internal_user_id
 async def get_todays_goal(user_id: int) -> DailyGoal:
     """Получить цель на сегодня"""
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    async with async_session() as session:
-        result = await session.execute(
-            select(DailyGoal)
-            .where(DailyGoal.user_id == user_id)
-            .where(DailyGoal.date >= today_start)
-            .order_by(DailyGoal.id.desc())
-        )
-        return result.scalar_one_or_none()
+    return (await today_cache.get(user_id)).goal
 
 
+@internal_user_id
 async def save_goal(user_id: int, goal_text: str, estimated_pomodoros: int = None) -> DailyGoal:
     """Сохранить цель дня"""
+    today = await user_local_day(user_id)
     async with async_session() as session:
-        goal = DailyGoal(user_id=user_id, goal_text=goal_text, estimated_pomodoros=estimated_pomodoros)
+        goal = DailyGoal(user_id=user_id, goal_text=goal_text, estimated_pomodoros=estimated_pomodoros, local_day=today)
         session.add(goal)
+        await refresh_rollup(session, user_id, today)
         await session.commit()
-        return goal
+    today_cache.set_goal(goal)
+    return goal
 
 
 async def update_goal_pomodoros(goal_id: int, estimated: int = None, completed: int = None):
@@ -105,9 +167,12 @@ async def update_goal_pomodoros(goal_id: int, estimated: int = None, completed:
             goal.estimated_pomodoros = estimated
         if completed is not None:
             goal.completed_pomodoros = completed
+        await refresh_rollup(session, goal.user_id, goal.local_day)
         await session.commit()
+    today_cache.set_goal(goal)
 
 
+@internal_user_id
 async def increment_goal_pomodoro(user_id: int):
     """Увеличить счетчик выполненных помидоров для сегодняшней цели"""
     goal = await get_todays_goal(user_id)
@@ -123,22 +188,25 @@ async def complete_goal(goal_id: int, completed: bool = True):
         result = await session.execute(select(DailyGoal).where(DailyGoal.id == goal_id))
         goal = result.scalar_one()
         goal.completed = completed
+        await refresh_rollup(session, goal.user_id, goal.local_day)
         await session.commit()
+    today_cache.set_goal(goal)
 
 
+@internal_user_id
 async def set_day_rating(user_id: int, date: datetime = None, rating: int = None):
-    """Установить оценку дня (1-10)"""
-    if date is None:
-        date = datetime.now()
-    date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    """Установить оценку дня (1-10), date - локальная дата пользователя"""
+    day = day_key(date) if date else await user_local_day(user_id)
+    date_start = datetime.combine(key_to_date(day), datetime.min.time())
     
     async with async_session() as session:
         # Находим цель на этот день
         result = await session.execute(
             select(DailyGoal)
             .where(DailyGoal.user_id == user_id)
-            .where(DailyGoal.date >= date_start)
+            .where(DailyGoal.local_day == day)
             .order_by(DailyGoal.id.desc())
+            .limit(1)
         )
         goal = result.scalar_one_or_none()
         
@@ -151,170 +219,91 @@ async def set_day_rating(user_id: int, date: datetime = None, rating: int = None
                 goal_text="",
                 completed=False,
                 date=date_start,
-                day_rating=rating
+                day_rating=rating,
+                local_day=day
             )
             session.add(goal)
         
+        await refresh_rollup(session, user_id, day)
         await session.commit()
-        return goal
+    today_cache.set_goal(goal)
+    return goal
 
 
+@internal_user_id
 async def get_daily_summary(user_id: int, date: datetime = None):
-    """Получить сводку дня: цель, план, оценка"""
-    if date is None:
-        date = datetime.now()
-    date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-    date_end = date_start + timedelta(days=1)
-    
-    async with async_session() as session:
-        # Цель дня
-        goal_result = await session.execute(
-            select(DailyGoal)
-            .where(DailyGoal.user_id == user_id)
-            .where(DailyGoal.date >= date_start)
-            .where(DailyGoal.date < date_end)
-            .order_by(DailyGoal.id.desc())
-        )
-        goal = goal_result.scalar_one_or_none()
-        
-        # План
-        plan_result = await session.execute(
-            select(DailyPlanItem)
-            .where(DailyPlanItem.user_id == user_id)
-            .where(DailyPlanItem.date >= date_start)
-            .where(DailyPlanItem.date < date_end)
-            .order_by(DailyPlanItem.order.asc())
-        )
-        plan_items = plan_result.scalars().all()
-        
-        # Вечерний чек-ин
-        checkin_result = await session.execute(
-            select(EveningCheckIn)
-            .where(EveningCheckIn.user_id == user_id)
-            .where(EveningCheckIn.date >= date_start)
-            .where(EveningCheckIn.date < date_end)
-            .order_by(EveningCheckIn.id.desc())
-        )
-        checkin = checkin_result.scalar_one_or_none()
-        
-        return {
-            'goal': goal,
-            'plan_items': list(plan_items),
-            'checkin': checkin,
-            'date': date_start
-        }
-
-
+    """Получить сводку дня: цель, план, оценка (date - локальная дата пользователя)"""
+    today = await user_local_day(user_id)
+    day = day_key(date) if date else today
+    # Сегодня - из кэша, прошлые дни - одним запросом по индексу (user_id, local_day), старые - из архива
+    snapshot = await today_cache.get(user_id) if day == today else await load_day(user_id, day)
+    return {
+        'goal': snapshot.goal,
+        'plan_items': list(snapshot.plan_items),
+        'checkin': snapshot.checkin,
+        'energy': snapshot.energy,
+        'date': datetime.combine(key_to_date(day), datetime.min.time())
+    }
+
+
+@internal_user_id
 async def get_days_history(user_id: int, limit: int = 30):
     """Получить историю дней"""
     async with async_session() as session:
-        # Получаем все цели (используем простой select без func.date для совместимости)
-        goals_result = await session.execute(
-            select(DailyGoal)
-            .where(DailyGoal.user_id == user_id)
-            .order_by(DailyGoal.date.desc())
-            .limit(limit * 2)
-        )
-        goals = goals_result.scalars().all()
-        
-        # Группируем по дням
-        days_map = {}
-        for goal in goals:
-            # Нормализуем дату (убираем время)
-            goal_date = goal.date.replace(hour=0, minute=0, second=0, microsecond=0) if goal.date else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            day_key = goal_date.isoformat()[:10]  # Используем только дату без времени
-            
-            if day_key not in days_map:
-                days_map[day_key] = {
-                    'date': goal_date,
-                    'goal': goal.goal_text if goal.goal_text else None,
-                    'goal_completed': goal.completed,
-                    'rating': goal.day_rating,
-                    'pomodoros': f"{goal.completed_pomodoros or 0}/{goal.estimated_pomodoros or 0}" if goal.estimated_pomodoros else None,
-                    'plan_count': 0,
-                    'plan_completed': 0
-                }
-            else:
-                # Обновляем если есть более свежие данные
-                if goal.goal_text:
-                    days_map[day_key]['goal'] = goal.goal_text
-                if goal.day_rating:
-                    days_map[day_key]['rating'] = goal.day_rating
-                if goal.estimated_pomodoros:
-                    days_map[day_key]['pomodoros'] = f"{goal.completed_pomodoros or 0}/{goal.estimated_pomodoros or 0}"
-                days_map[day_key]['goal_completed'] = goal.completed
-        
-        # Добавляем данные о плане (используем более простой подход для совместимости)
-        all_plans_result = await session.execute(
-            select(DailyPlanItem)
-            .where(DailyPlanItem.user_id == user_id)
-            .order_by(DailyPlanItem.date.desc())
+        result = await session.execute(
+            select(DailyRollup)
+            .where(DailyRollup.user_id == user_id)
+            .where(or_(DailyRollup.has_goal == True, DailyRollup.plan_total > 0))
+            .order_by(DailyRollup.local_day.desc())
+            .limit(limit)
         )
-        all_plans = all_plans_result.scalars().all()
-        
-        # Группируем планы по дням
-        plans_by_day = {}
-        for plan_item in all_plans:
-            plan_date = plan_item.date.replace(hour=0, minute=0, second=0, microsecond=0) if plan_item.date else None
-            if plan_date:
-                day_key = plan_date.isoformat() if isinstance(plan_date, datetime) else str(plan_date)
-                if day_key not in plans_by_day:
-                    plans_by_day[day_key] = {'total': 0, 'completed': 0}
-                plans_by_day[day_key]['total'] += 1
-                if plan_item.completed:
-                    plans_by_day[day_key]['completed'] += 1
-        
-        for day_key, plan_data in plans_by_day.items():
-            if day_key in days_map:
-                days_map[day_key]['plan_count'] = plan_data['total']
-                days_map[day_key]['plan_completed'] = plan_data['completed']
-            elif day_key not in days_map:
-                # Парсим дату из ключа
-                try:
-                    if isinstance(day_key, str):
-                        day_date = datetime.fromisoformat(day_key.replace('Z', '+00:00')) if 'T' in day_key else datetime.strptime(day_key, '%Y-%m-%d')
-                    else:
-                        day_date = day_key
-                except:
-                    continue
-                days_map[day_key] = {
-                    'date': day_date,
-                    'goal': None,
-                    'goal_completed': False,
-                    'rating': None,
-                    'pomodoros': None,
-                    'plan_count': plan_data['total'],
-                    'plan_completed': plan_data['completed']
-                }
-        
-        # Сортируем по дате (новые первыми)
-        days_list = sorted(days_map.values(), key=lambda x: x['date'], reverse=True)
-        return days_list[:limit]
-
-
+        return [
+            {
+                'date': datetime.combine(key_to_date(day.local_day), datetime.min.time()),
+                'goal': day.goal_text,
+                'goal_completed': day.goal_completed,
+                'rating': day.day_rating,
+                'pomodoros': f"{day.completed_pomodoros or 0}/{day.estimated_pomodoros}" if day.estimated_pomodoros else None,
+                'plan_count': day.plan_total,
+                'plan_completed': day.plan_done
+            }
+            for day in result.scalars()
+        ]
+
+
+@internal_user_id
 async def save_note(user_id: int, text: str) -> Note:
     """Сохранить заметку"""
-    async with async_session() as session:
+    async def write(session):
         note = Note(user_id=user_id, text=text)
         session.add(note)
-        await session.commit()
+        await session.flush()  # id до коммита пачки
         return note
 
+    return await run_write(write)
+
 
+@internal_user_id
 async def get_user_notes(user_id: int, limit: int = 20) -> list[Note]:
-    """Получить последние заметки пользователя"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Note)
-            .where(Note.user_id == user_id)
-            .order_by(Note.id.desc())
-            .limit(limit)
-        )
-        return result.scalars().all()
+    """Получить последние заметки пользователя (не хватает рабочих - добираем из архива)"""
+    notes = []
+    async with async_session() as session:
+        for model in (Note, ArchivedNote):
+            result = await session.execute(
+                select(model)
+                .where(model.user_id == user_id)
+                .order_by(model.id.desc())
+                .limit(limit - len(notes))
+            )
+            notes.extend(result.scalars().all())
+            if len(notes) >= limit:
+                break
+    return notes
 
 
+@internal_user_id
 async def delete_note(note_id: int, user_id: int) -> bool:
-    """Удалить заметку"""
+    """Удалить заметку (рабочую или архивную)"""
     async with async_session() as session:
         result = await session.execute(
             select(Note)
@@ -324,15 +313,20 @@ async def delete_note(note_id: int, user_id: int) -> bool:
         note = result.scalar_one_or_none()
         
         if not note:
-            return False
+            archived = await session.execute(
+                delete(ArchivedNote).where(ArchivedNote.id == note_id, ArchivedNote.user_id == user_id)
+            )
+            await session.commit()
+            return archived.rowcount > 0
         
         await session.delete(note)
         await session.commit()
         return True
 
 
+@internal_user_id
 async def delete_all_notes(user_id: int) -> int:
-    """Удалить все заметки пользователя"""
+    """Удалить все заметки пользователя, включая архив"""
     async with async_session() as session:
         result = await session.execute(
             select(Note).where(Note.user_id == user_id)
@@ -342,79 +336,84 @@ async def delete_all_notes(user_id: int) -> int:
         
         for note in notes:
             await session.delete(note)
+        archived = await session.execute(delete(ArchivedNote).where(ArchivedNote.user_id == user_id))
         
         await session.commit()
-        return count
+        return count + archived.rowcount
 
 
+@retry_on_disconnect
+@internal_user_id
 async def get_user_state(user_id: int) -> UserState:
     """Получить состояние пользователя"""
     async with async_session() as session:
-        result = await session.execute(select(UserState).where(UserState.user_id == user_id))
+        result = await session.execute(lambda_stmt(lambda: select(UserState).where(UserState.user_id == user_id)))
         state = result.scalar_one_or_none()
         
         if not state:
-            state = UserState(user_id=user_id)
-            session.add(state)
+            state = await _upsert(session, UserState, 'user_id', {'user_id': user_id})
             await session.commit()
         
         return state
 
 
-async def set_quiet_mode(user_id: int, duration_seconds: int):
-    """Установить режим тишины"""
+@internal_user_id
+async def set_quiet_mode(user_id: int, duration_seconds: int) -> datetime:
+    """Установить режим тишины, возвращает время окончания (UTC)"""
+    until = datetime.utcnow() + timedelta(seconds=duration_seconds)
     async with async_session() as session:
-        result = await session.execute(select(UserState).where(UserState.user_id == user_id))
-        state = result.scalar_one_or_none()
-        
-        if not state:
-            state = UserState(user_id=user_id)
-            session.add(state)
-        
-        state.in_quiet_mode = True
-        state.quiet_mode_until = datetime.utcnow() + timedelta(seconds=duration_seconds)
+        await _upsert(session, UserState, 'user_id',
+                      {'user_id': user_id, 'in_quiet_mode': True, 'quiet_mode_until': until},
+                      update_columns=('in_quiet_mode', 'quiet_mode_until'))
         await session.commit()
+        return until
 
 
+@internal_user_id
 async def disable_quiet_mode(user_id: int):
     """Отключить режим тишины"""
     async with async_session() as session:
-        result = await session.execute(select(UserState).where(UserState.user_id == user_id))
-        state = result.scalar_one()
-        state.in_quiet_mode = False
-        state.quiet_mode_until = None
+        await session.execute(
+            update(UserState).where(UserState.user_id == user_id).values(in_quiet_mode=False, quiet_mode_until=None)
+        )
         await session.commit()
 
 
+@internal_user_id
 async def save_evening_checkin(user_id: int, what_worked: str = None, what_tired: str = None, what_helped: str = None):
     """Сохранить вечерний чек-ин"""
+    today = await user_local_day(user_id)
     async with async_session() as session:
-        checkin = EveningCheckIn(user_id=user_id, what_worked=what_worked, what_tired=what_tired, what_helped=what_helped)
+        checkin = EveningCheckIn(user_id=user_id, what_worked=what_worked, what_tired=what_tired,
+                                 what_helped=what_helped, local_day=today)
         session.add(checkin)
         await session.commit()
+    today_cache.set_checkin(checkin)
 
 
+@internal_user_id
 async def get_energy_stats_week(user_id: int) -> dict:
     """Получить статистику энергии за неделю"""
-    week_ago = datetime.utcnow() - timedelta(days=7)
+    week_start = shift_day(await user_local_day(user_id), -6)
     async with async_session() as session:
         result = await session.execute(
             select(
-                func.avg(EnergyLog.energy_level).label('avg_energy'),
-                func.count(EnergyLog.id).label('days_count')
+                func.sum(DailyRollup.energy_sum).label('energy_sum'),
+                func.sum(DailyRollup.energy_count).label('days_count')
             )
-            .where(EnergyLog.user_id == user_id)
-            .where(EnergyLog.date >= week_ago)
+            .where(DailyRollup.user_id == user_id)
+            .where(DailyRollup.local_day >= week_start)
         )
         row = result.first()
         return {
-            'avg_energy': round(row.avg_energy) if row.avg_energy else 0,
-            'days_count': row.days_count
+            'avg_energy': round(row.energy_sum / row.days_count) if row.days_count else 0,
+            'days_count': row.days_count or 0
         }
 
 
 # ==================== REMINDERS ====================
 
+@internal_user_id
 async def create_reminder(user_id: int, text: str, when_datetime: datetime, recurring: bool = False) -> Reminder:
     """Создать напоминание"""
     async with async_session() as session:
@@ -430,30 +429,67 @@ async def create_reminder(user_id: int, text: str, when_datetime: datetime, recu
         return reminder
 
 
-async def get_all_reminders(user_id: int, completed: bool = False, limit: int = 50) -> list[Reminder]:
-    """Получить все напоминания пользователя"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Reminder)
-            .where(Reminder.user_id == user_id)
-            .where(Reminder.completed == completed)
-            .order_by(Reminder.when_datetime.asc())
-            .limit(limit)
-        )
-        return result.scalars().all()
-
-
+@internal_user_id
+async def get_all_reminders(user_id: int, completed: bool = False, limit: int = 50,
+                            after: Tuple = None, before: Tuple = None) -> list[Reminder]:
+    """
+    Получить все напоминания пользователя (after/before - курсор (when_datetime, id)).
+    
+    Выполненные - вместе с архивом: та же страница из обеих таблиц, слитая по курсору.
+    """
+    models = (Reminder, ArchivedReminder) if completed else (Reminder,)
+    reminders = []
+    async with async_session() as session:
+        for model in models:
+            query = select(model).where(model.user_id == user_id).where(model.completed == completed)
+            query = _keyset(query, (model.when_datetime, model.id), after, before)
+            result = await session.execute(query.limit(limit))
+            reminders.extend(result.scalars().all())
+    reminders.sort(key=lambda reminder: (reminder.when_datetime, reminder.id), reverse=before is not None)
+    reminders = reminders[:limit]
+    return reminders[::-1] if before is not None else reminders
+
+
+@internal_user_id
+async def get_reminders_page(user_id: int, after: Tuple = None, before: Tuple = None,
+                             page_size: int = REMINDERS_PAGE_SIZE) -> Page:
+    """
+    Страница активных напоминаний одним запросом: строки страницы + общее число.
+    
+    Курсор устарел (строки удалены) - отдаём первую страницу.
+    """
+    total = (
+        select(func.count(Reminder.id))
+        .where(Reminder.user_id == user_id, Reminder.completed == False)
+        .scalar_subquery()
+    )
+    query = select(Reminder, total).where(Reminder.user_id == user_id, Reminder.completed == False)
+    query = _keyset(query, (Reminder.when_datetime, Reminder.id), after, before)
+    async with async_session() as session:
+        rows = (await session.execute(query.limit(page_size + 1))).all()
+    if not rows and (after is not None or before is not None):
+        return await get_reminders_page(user_id, page_size=page_size)
+    rows, has_prev, has_next = _page(rows, page_size, after, before)
+    return Page([row[0] for row in rows], rows[0][1] if rows else 0, 0, has_prev, has_next)
+
+
+@internal_user_id
 async def get_reminder(reminder_id: int, user_id: int) -> Reminder:
-    """Получить напоминание по ID"""
+    """Получить напоминание по ID (выполненное может быть уже в архиве)"""
     async with async_session() as session:
-        result = await session.execute(
-            select(Reminder)
-            .where(Reminder.id == reminder_id)
-            .where(Reminder.user_id == user_id)
-        )
-        return result.scalar_one_or_none()
+        for model in (Reminder, ArchivedReminder):
+            result = await session.execute(
+                select(model)
+                .where(model.id == reminder_id)
+                .where(model.user_id == user_id)
+            )
+            reminder = result.scalar_one_or_none()
+            if reminder is not None:
+                return reminder
+        return None
 
 
+@internal_user_id
 async def update_reminder(reminder_id: int, user_id: int, text: str = None, when_datetime: datetime = None) -> bool:
     """Обновить напоминание"""
     async with async_session() as session:
@@ -476,6 +512,7 @@ async def update_reminder(reminder_id: int, user_id: int, text: str = None, when
         return True
 
 
+@internal_user_id
 async def delete_reminder(reminder_id: int, user_id: int) -> bool:
     """Удалить напоминание"""
     async with async_session() as session:
@@ -487,13 +524,19 @@ async def delete_reminder(reminder_id: int, user_id: int) -> bool:
         reminder = result.scalar_one_or_none()
         
         if not reminder:
-            return False
+            archived = await session.execute(
+                delete(ArchivedReminder)
+                .where(ArchivedReminder.id == reminder_id, ArchivedReminder.user_id == user_id)
+            )
+            await session.commit()
+            return archived.rowcount > 0
         
         await session.delete(reminder)
         await session.commit()
         return True
 
 
+@internal_user_id
 async def complete_reminder(reminder_id: int, user_id: int) -> bool:
     """Отметить напоминание как выполненное"""
     async with async_session() as session:
@@ -514,44 +557,80 @@ async def complete_reminder(reminder_id: int, user_id: int) -> bool:
 
 # ==================== DAILY PLAN ====================
 
+@internal_user_id
 async def add_plan_item(user_id: int, text: str) -> DailyPlanItem:
     """Добавить пункт в план дня"""
+    today = await user_local_day(user_id)
     async with async_session() as session:
         # Get max order for today
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         result = await session.execute(
             select(func.max(DailyPlanItem.order))
             .where(DailyPlanItem.user_id == user_id)
-            .where(DailyPlanItem.date >= today_start)
+            .where(DailyPlanItem.local_day == today)
         )
         max_order = result.scalar() or 0
         
-        item = DailyPlanItem(user_id=user_id, text=text, order=max_order + 1)
+        item = DailyPlanItem(user_id=user_id, text=text, order=max_order + 1, local_day=today)
         session.add(item)
+        await refresh_rollup(session, user_id, today)
         await session.commit()
         await session.refresh(item)
-        return item
-
-
-async def get_plan_items(user_id: int, date: datetime = None, completed: bool = None) -> list[DailyPlanItem]:
-    """Получить пункты плана на день"""
-    if date is None:
-        date = datetime.now()
-    date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_cache.put_plan_item(item)
+    return item
+
+
+@internal_user_id
+async def get_plan_items(user_id: int, date: datetime = None, completed: bool = None, limit: int = None,
+                         after: Tuple = None, before: Tuple = None) -> list[DailyPlanItem]:
+    """Получить пункты плана на день (date - локальная дата пользователя, after/before - курсор (order, id))"""
+    if date is None and limit is None and after is None and before is None:
+        # Весь план на сегодня - из снимка дня
+        items = (await today_cache.get(user_id)).plan_items
+        return [item for item in items if completed is None or item.completed == completed]
+    day = day_key(date) if date else await user_local_day(user_id)
     
     async with async_session() as session:
         query = select(DailyPlanItem).where(
             DailyPlanItem.user_id == user_id,
-            DailyPlanItem.date >= date_start
+            DailyPlanItem.local_day == day
         )
         
         if completed is not None:
             query = query.where(DailyPlanItem.completed == completed)
         
-        result = await session.execute(query.order_by(DailyPlanItem.order.asc()))
-        return result.scalars().all()
-
-
+        query = _keyset(query, (DailyPlanItem.order, DailyPlanItem.id), after, before)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await session.execute(query)
+        items = result.scalars().all()
+        return items[::-1] if before is not None else items
+
+
+@internal_user_id
+async def get_plan_page(user_id: int, after: Tuple = None, before: Tuple = None,
+                        page_size: int = PLAN_PAGE_SIZE) -> Page:
+    """Страница плана на сегодня одним запросом: строки страницы + всего/выполнено за день"""
+    day = await user_local_day(user_id)
+    day_items = (DailyPlanItem.user_id == user_id, DailyPlanItem.local_day == day)
+    total = select(func.count(DailyPlanItem.id)).where(*day_items).scalar_subquery()
+    done = (
+        select(func.count(DailyPlanItem.id))
+        .where(*day_items, DailyPlanItem.completed == True)
+        .scalar_subquery()
+    )
+    query = _keyset(select(DailyPlanItem, total, done).where(*day_items),
+                    (DailyPlanItem.order, DailyPlanItem.id), after, before)
+    async with async_session() as session:
+        rows = (await session.execute(query.limit(page_size + 1))).all()
+    if not rows and (after is not None or before is not None):
+        return await get_plan_page(user_id, page_size=page_size)
+    rows, has_prev, has_next = _page(rows, page_size, after, before)
+    if not rows:
+        return Page([], 0, 0, False, False)
+    return Page([row[0] for row in rows], rows[0][1], rows[0][2], has_prev, has_next)
+
+
+@internal_user_id
 async def get_plan_item(item_id: int, user_id: int) -> DailyPlanItem:
     """Получить пункт плана по ID"""
     async with async_session() as session:
@@ -563,6 +642,7 @@ async def get_plan_item(item_id: int, user_id: int) -> DailyPlanItem:
         return result.scalar_one_or_none()
 
 
+@internal_user_id
 async def update_plan_item(item_id: int, user_id: int, text: str) -> bool:
     """Обновить пункт плана"""
     async with async_session() as session:
@@ -578,9 +658,11 @@ async def update_plan_item(item_id: int, user_id: int, text: str) -> bool:
         
         item.text = text
         await session.commit()
-        return True
+    today_cache.put_plan_item(item)
+    return True
 
 
+@internal_user_id
 async def delete_plan_item(item_id: int, user_id: int) -> bool:
     """Удалить пункт плана"""
     async with async_session() as session:
@@ -595,10 +677,13 @@ async def delete_plan_item(item_id: int, user_id: int) -> bool:
             return False
         
         await session.delete(item)
+        await refresh_rollup(session, user_id, item.local_day)
         await session.commit()
-        return True
+    today_cache.remove_plan_item(item)
+    return True
 
 
+@internal_user_id
 async def toggle_plan_item(item_id: int, user_id: int) -> bool:
     """Переключить выполненность пункта плана"""
     async with async_session() as session:
@@ -613,6 +698,8 @@ async def toggle_plan_item(item_id: int, user_id: int) -> bool:
             return False
         
         item.completed = not item.completed
+        await refresh_rollup(session, user_id, item.local_day)
         await session.commit()
-        return True
+    today_cache.put_plan_item(item)
+    return True
 
@@ -87,8 +87,8 @@ def handle_voice_message(func: Callable) -> Callable:
             processing_msg = await message.answer(translate("voice_processing", lang))
             
             try:
-                from bot import bot
-                text = await voice_service.process_voice_message(message, bot)
+                from app import get_bot
+                text = await voice_service.process_voice_message(message, get_bot())
                 
                 if text and text.strip():
                     message.text = text
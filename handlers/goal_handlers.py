@@ -1,5 +1,4 @@
 """Goal handlers - following Single Responsibility Principle"""
-from aiogram import F
 from aiogram.filters import Command, StateFilter
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -20,6 +19,8 @@ from utils.voice_utils import process_voice_to_text
 from utils.validation import validate_message_text, check_cancel_command
 from handlers.base import handle_voice_message, validate_text, handle_cancel
 from bot_helpers import get_user_and_lang
+from callbacks import Action
+from buttons import Button
 from translations import translate
 import logging
 
@@ -27,7 +28,7 @@ logger = logging.getLogger(__name__)
 
 
 @dp.message(Command("goal"))
-@dp.message(lambda m: m.text and ("🎯 Главная цель" in m.text or "Главная цель" in m.text))
+@dp["button_router"].handler(Button.GOAL)
 async def cmd_goal(message: Message, state: FSMContext):
     """Set daily goal"""
     user, lang = await get_user_and_lang(message.from_user)
@@ -144,7 +145,7 @@ async def process_goal_pomodoros(message: Message, state: FSMContext):
         await state.clear()
 
 
-@dp.callback_query(F.data == "goal_confirm")
+@dp["callback_router"].handler(Action.GOAL_CONFIRM)
 async def goal_confirm(callback: CallbackQuery):
     """Confirm current goal"""
     user, lang = await get_user_and_lang(callback.from_user)
@@ -156,7 +157,7 @@ async def goal_confirm(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(F.data == "goal_done")
+@dp["callback_router"].handler(Action.GOAL_DONE)
 async def goal_done(callback: CallbackQuery):
     """Goal completed"""
     user, lang = await get_user_and_lang(callback.from_user)
@@ -170,7 +171,7 @@ async def goal_done(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(F.data == "goal_skip")
+@dp["callback_router"].handler(Action.GOAL_SKIP)
 async def goal_skip(callback: CallbackQuery):
     """Goal not done"""
     user, lang = await get_user_and_lang(callback.from_user)
@@ -18,6 +18,7 @@ from utils.voice_utils import process_voice_to_text
 from utils.validation import validate_message_text, check_cancel_command
 from handlers.base import handle_voice_message, validate_text, handle_cancel
 from bot_helpers import get_user_and_lang
+from buttons import Button
 from translations import translate
 import logging
 
@@ -25,7 +26,7 @@ logger = logging.getLogger(__name__)
 
 
 @dp.message(Command("note"))
-@dp.message(lambda m: m.text and ("📝 Заметки" in m.text or "Заметки" in m.text))
+@dp["button_router"].handler(Button.NOTES)
 async def cmd_note(message: Message, state: FSMContext):
     """Add note"""
     user, lang = await get_user_and_lang(message.from_user)
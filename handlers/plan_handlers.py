@@ -1,5 +1,4 @@
 """Plan handlers - following Single Responsibility Principle"""
-from aiogram import F
 from aiogram.filters import Command, StateFilter
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -19,6 +18,8 @@ from utils.voice_utils import process_voice_to_text
 from utils.validation import validate_message_text, check_cancel_command
 from handlers.base import handle_voice_message, validate_text, handle_cancel
 from bot_helpers import get_user_and_lang
+from callbacks import Action
+from buttons import Button
 from translations import translate
 import logging
 
@@ -26,7 +27,7 @@ logger = logging.getLogger(__name__)
 
 
 @dp.message(Command("plan"))
-@dp.message(lambda m: m.text and ("📋 План" in m.text or "План" in m.text))
+@dp["button_router"].handler(Button.PLAN)
 async def cmd_plan(message: Message, state: FSMContext):
     """Show daily plan"""
     try:
@@ -99,7 +100,7 @@ async def process_plan_item(message: Message, state: FSMContext):
         await state.clear()
 
 
-@dp.callback_query(F.data == "plan_add")
+@dp["callback_router"].handler(Action.PLAN_ADD)
 async def callback_plan_add(callback: CallbackQuery, state: FSMContext):
     """Add plan item"""
     user, lang = await get_user_and_lang(callback.from_user)
@@ -113,7 +114,7 @@ async def callback_plan_add(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@dp.callback_query(F.data == "plan_list")
+@dp["callback_router"].handler(Action.PLAN_LIST)
 async def callback_plan_list(callback: CallbackQuery):
     """Show plan list"""
     user, lang = await get_user_and_lang(callback.from_user)
@@ -138,11 +139,10 @@ async def callback_plan_list(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(F.data.startswith("plan_") and F.data.endswith("_done"))
-async def callback_plan_item_done(callback: CallbackQuery):
+@dp["callback_router"].handler(Action.PLAN_DONE)
+async def callback_plan_item_done(callback: CallbackQuery, item_id: int):
     """Toggle plan item completion"""
     try:
-        item_id = int(callback.data.split("_")[1])
         user, lang = await get_user_and_lang(callback.from_user)
         plan_service = PlanService()
         
@@ -177,10 +177,9 @@ async def callback_plan_item_done(callback: CallbackQuery):
         await callback.answer(translate("error_generic", lang), show_alert=True)
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("plan_") and c.data.endswith("_delete_confirm"))
-async def callback_plan_delete_confirm(callback: CallbackQuery):
+@dp["callback_router"].handler(Action.PLAN_DELETE_CONFIRM)
+async def callback_plan_delete_confirm(callback: CallbackQuery, item_id: int):
     """Confirm plan item deletion"""
-    item_id = int(callback.data.split("_")[1])
     user, lang = await get_user_and_lang(callback.from_user)
     plan_service = PlanService()
     
@@ -199,11 +198,10 @@ async def callback_plan_delete_confirm(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("plan_") and c.data.endswith("_delete") and not c.data.endswith("_delete_confirm"))
-async def callback_plan_item_delete(callback: CallbackQuery):
+@dp["callback_router"].handler(Action.PLAN_DELETE)
+async def callback_plan_item_delete(callback: CallbackQuery, item_id: int):
     """Delete plan item"""
     try:
-        item_id = int(callback.data.split("_")[1])
         user, lang = await get_user_and_lang(callback.from_user)
         plan_service = PlanService()
         
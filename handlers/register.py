@@ -1,9 +1,13 @@
 """Register all handlers with dispatcher"""
-from bot import dp, BotStates
 
 
-def register_all_handlers():
-    """Register all handlers"""
+def register_all_handlers(dp, BotStates):
+    """
+    Register all handlers.
+
+    dp and BotStates are passed in by bot.main(): importing them from bot
+    would load bot.py a second time when it runs as __main__ (python bot.py).
+    """
     # Import handlers (will register themselves via decorators)
     from handlers import goal_handlers, plan_handlers, note_handlers, reminder_handlers, evening_handlers
     
@@ -13,4 +17,3 @@ def register_all_handlers():
     note_handlers.register_handlers(dp, BotStates)
     reminder_handlers.register_handlers(dp, BotStates)
     evening_handlers.register_handlers(dp, BotStates)
-
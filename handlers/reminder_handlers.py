@@ -1,5 +1,4 @@
 """Reminder handlers - following Single Responsibility Principle"""
-from aiogram import F
 from aiogram.filters import Command, StateFilter
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -20,6 +19,7 @@ from keyboards import (
 from services.reminder_service import ReminderService
 from handlers.base import handle_cancel
 from bot_helpers import get_user_and_lang
+from callbacks import Action
 from translations import translate
 import logging
 
@@ -33,20 +33,20 @@ async def cmd_reminders(message: Message):
         user, lang = await get_user_and_lang(message.from_user)
         reminder_service = ReminderService()
         
-        reminders = await reminder_service.list_all(user.id, completed=False, limit=50)
+        page = await reminder_service.page(user.id)
         
-        if not reminders:
+        if not page.items:
             await message.answer(
                 translate("reminders_empty", lang),
-                reply_markup=get_reminders_list_keyboard(reminders)
+                reply_markup=get_reminders_list_keyboard(page.items)
             )
             return
         
-        text = translate("reminders_title", lang, count=len(reminders)) + "\n\n"
-        for i, rem in enumerate(reminders[:5], 1):
+        text = translate("reminders_title", lang, count=page.total) + "\n\n"
+        for i, rem in enumerate(page.items, 1):
             text += f"{i}. {rem.text}\n"
         
-        await message.answer(text, reply_markup=get_reminders_list_keyboard(reminders))
+        await message.answer(text, reply_markup=get_reminders_list_keyboard(page.items, page.has_prev, page.has_next))
         
     except Exception as e:
         logger.error(f"Error in /reminders: {e}", exc_info=True)
@@ -54,11 +54,10 @@ async def cmd_reminders(message: Message):
         await message.answer(translate("error_generic", lang), reply_markup=get_main_keyboard(lang))
 
 
-@dp.callback_query(F.data.startswith("rem_view_"))
-async def callback_reminder_view(callback: CallbackQuery):
+@dp["callback_router"].handler(Action.REMINDER_VIEW)
+async def callback_reminder_view(callback: CallbackQuery, reminder_id: int):
     """View reminder details"""
     try:
-        reminder_id = int(callback.data.split("_")[2])
         user, lang = await get_user_and_lang(callback.from_user)
         reminder_service = ReminderService()
         
@@ -80,11 +79,10 @@ async def callback_reminder_view(callback: CallbackQuery):
         await callback.answer(translate("error_generic", lang), show_alert=True)
 
 
-@dp.callback_query(F.data.startswith("rem_") and F.data.endswith("_done"))
-async def callback_reminder_done(callback: CallbackQuery):
+@dp["callback_router"].handler(Action.REMINDER_DONE)
+async def callback_reminder_done(callback: CallbackQuery, reminder_id: int):
     """Mark reminder as completed"""
     try:
-        reminder_id = int(callback.data.split("_")[1])
         user, lang = await get_user_and_lang(callback.from_user)
         reminder_service = ReminderService()
         
@@ -92,10 +90,10 @@ async def callback_reminder_done(callback: CallbackQuery):
         
         if success:
             await callback.answer(translate("reminder_completed", lang))
-            reminders = await reminder_service.list_all(user.id, completed=False, limit=50)
+            page = await reminder_service.page(user.id)
             await callback.message.edit_text(
                 translate("reminder_completed_msg", lang),
-                reply_markup=get_reminders_list_keyboard(reminders)
+                reply_markup=get_reminders_list_keyboard(page.items, page.has_prev, page.has_next)
             )
         else:
             await callback.answer(translate("error_generic", lang))
@@ -105,10 +103,9 @@ async def callback_reminder_done(callback: CallbackQuery):
         await callback.answer(translate("error_generic", lang), show_alert=True)
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("rem_") and c.data.endswith("_delete_confirm"))
-async def callback_reminder_delete_confirm(callback: CallbackQuery):
+@dp["callback_router"].handler(Action.REMINDER_DELETE_CONFIRM)
+async def callback_reminder_delete_confirm(callback: CallbackQuery, reminder_id: int):
     """Confirm reminder deletion"""
-    reminder_id = int(callback.data.split("_")[1])
     user, lang = await get_user_and_lang(callback.from_user)
     reminder_service = ReminderService()
     
@@ -126,11 +123,10 @@ async def callback_reminder_delete_confirm(callback: CallbackQuery):
     await callback.answer()
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("rem_") and c.data.endswith("_delete") and not c.data.endswith("_delete_confirm"))
-async def callback_reminder_delete(callback: CallbackQuery):
+@dp["callback_router"].handler(Action.REMINDER_DELETE)
+async def callback_reminder_delete(callback: CallbackQuery, reminder_id: int):
     """Delete reminder"""
     try:
-        reminder_id = int(callback.data.split("_")[1])
         user, lang = await get_user_and_lang(callback.from_user)
         reminder_service = ReminderService()
         
@@ -138,17 +134,19 @@ async def callback_reminder_delete(callback: CallbackQuery):
         
         if success:
             await callback.answer(translate("deleted", lang))
-            reminders = await reminder_service.list_all(user.id, completed=False, limit=50)
+            page = await reminder_service.page(user.id)
             
-            if reminders:
-                text = translate("reminders_title", lang, count=len(reminders)) + "\n\n"
-                for i, rem in enumerate(reminders[:5], 1):
+            if page.items:
+                text = translate("reminders_title", lang, count=page.total) + "\n\n"
+                for i, rem in enumerate(page.items, 1):
                     text += f"{i}. {rem.text}\n"
-                await callback.message.edit_text(text, reply_markup=get_reminders_list_keyboard(reminders))
+                await callback.message.edit_text(
+                    text, reply_markup=get_reminders_list_keyboard(page.items, page.has_prev, page.has_next)
+                )
             else:
                 await callback.message.edit_text(
                     translate("reminders_empty_after_delete", lang),
-                    reply_markup=get_reminders_list_keyboard(reminders)
+                    reply_markup=get_reminders_list_keyboard(page.items)
                 )
         else:
             await callback.answer(translate("error_generic", lang))
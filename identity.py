@@ -0,0 +1,146 @@
+"""Идентификаторы пользователя: Telegram ID и внутренний ID (users.id)
+
+Telegram ID приходит в апдейтах (from_user.id; в личных чатах он же chat_id),
+внутренний ID - первичный ключ users, по нему связаны все таблицы (цели,
+заметки, напоминания, энергия, состояние). db_helpers принимает только
+внутренний ID: переданный туда TelegramId - TypeError, а не тихо пустая выборка.
+
+Соответствие хранится в памяти процесса в обе стороны вместе с языком и
+прогревается из users при старте, так что обработчикам не нужен запрос в БД
+ради одного user.id. В базу идём только при первом контакте и когда Telegram
+сообщает другой язык.
+"""
+import inspect
+import logging
+from functools import wraps
+from typing import Dict, NamedTuple, Optional, Union
+
+from sqlalchemy import select
+
+from database import async_session, User
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramId(int):
+    """Telegram user ID (from_user.id; in private chats also the chat_id)"""
+    __slots__ = ()
+
+
+class InternalUserId(int):
+    """users.id - the key every table uses for the user"""
+    __slots__ = ()
+
+
+class UserIdentity(NamedTuple):
+    """Both IDs and the language of a user (enough for most handlers instead of a User row)"""
+    id: InternalUserId
+    telegram_id: TelegramId
+    language_code: str
+
+
+class IdentityMap:
+    """telegram_id <-> users.id in process memory, with the user's language"""
+
+    def __init__(self):
+        self._by_telegram: Dict[int, UserIdentity] = {}
+        self._by_internal: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_telegram)
+
+    def remember(self, user_id: int, telegram_id: int, language_code: Optional[str]) -> UserIdentity:
+        identity = UserIdentity(InternalUserId(user_id), TelegramId(telegram_id), language_code or 'en')
+        self._by_telegram[telegram_id] = identity
+        self._by_internal[user_id] = telegram_id
+        return identity
+
+    def get(self, telegram_id: int) -> Optional[UserIdentity]:
+        return self._by_telegram.get(telegram_id)
+
+    def internal_id(self, telegram_id: int) -> Optional[InternalUserId]:
+        identity = self._by_telegram.get(telegram_id)
+        return identity.id if identity else None
+
+    def by_internal(self, user_id: int) -> Optional[UserIdentity]:
+        telegram_id = self._by_internal.get(user_id)
+        return self._by_telegram.get(telegram_id) if telegram_id is not None else None
+
+    def telegram_id(self, user_id: int) -> Optional[TelegramId]:
+        identity = self.by_internal(user_id)
+        return identity.telegram_id if identity else None
+
+    def clear(self):
+        self._by_telegram.clear()
+        self._by_internal.clear()
+
+    async def warm_up(self) -> int:
+        """Load every user (one query); timezones go to the user_time cache as well"""
+        from user_time import remember_timezone
+        async with async_session() as session:
+            result = await session.stream(select(User.id, User.telegram_id, User.language_code, User.timezone))
+            async for user_id, telegram_id, language_code, tz_name in result:
+                self.remember(user_id, telegram_id, language_code)
+                remember_timezone(user_id, tz_name)
+        return len(self)
+
+
+identities = IdentityMap()
+
+
+async def resolve_user(telegram_user: Union[int, object]) -> UserIdentity:
+    """
+    Identity of a Telegram user: aiogram User (from_user) or a bare Telegram ID.
+
+    From memory when known; otherwise (first contact, or Telegram reports a
+    different language) through get_or_create_user, which also updates the map.
+    """
+    from translations import get_language_code
+    telegram_id = TelegramId(getattr(telegram_user, 'id', telegram_user))
+    language_code = getattr(telegram_user, 'language_code', None)
+    known = identities.get(telegram_id)
+    if known and (not language_code or known.language_code == get_language_code(language_code)):
+        return known
+
+    from db_helpers import get_or_create_user
+    user = await get_or_create_user(
+        telegram_id,
+        getattr(telegram_user, 'username', None),
+        getattr(telegram_user, 'full_name', None),
+        language_code=language_code,
+    )
+    return identities.get(telegram_id) or identities.remember(user.id, user.telegram_id, user.language_code)
+
+
+async def resolve_user_id(telegram_user: Union[int, object]) -> InternalUserId:
+    """users.id of a Telegram user (aiogram User or Telegram ID); creates the user on first contact"""
+    return (await resolve_user(telegram_user)).id
+
+
+async def resolve_telegram_id(user_id: int) -> Optional[TelegramId]:
+    """Telegram ID (= private chat_id) of an internal user ID, None if there is no such user"""
+    telegram_id = identities.telegram_id(user_id)
+    if telegram_id is not None:
+        return telegram_id
+    async with async_session() as session:
+        result = await session.execute(
+            select(User.telegram_id, User.language_code).where(User.id == user_id)
+        )
+        row = result.first()
+    if row is None:
+        return None
+    return identities.remember(user_id, row.telegram_id, row.language_code).telegram_id
+
+
+def internal_user_id(func):
+    """Reject a TelegramId passed as `user_id`: db_helpers work with users.id"""
+    position = list(inspect.signature(func).parameters).index('user_id')
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        user_id = args[position] if len(args) > position else kwargs.get('user_id')
+        if isinstance(user_id, TelegramId):
+            raise TypeError(f"{func.__name__}() expects users.id, got Telegram ID {int(user_id)}; "
+                            f"use identity.resolve_user_id()")
+        return await func(*args, **kwargs)
+    return wrapper
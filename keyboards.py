@@ -1,8 +1,66 @@
-"""Клавиатуры для бота"""
+"""Клавиатуры для бота
+
+Статические клавиатуры создаются один раз (на язык) и переиспользуются:
+модели aiogram неизменяемые (frozen), так что один объект можно отдавать
+во все ответы. Клавиатуры для конкретного элемента собираются по шаблону
+без повторной валидации pydantic.
+"""
+from functools import lru_cache
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from translations import translate
+from callbacks import Action, ARG_TYPES, pack
+from utils.pagination import encode_cursor
 
 
+@lru_cache(maxsize=256)
+def _static_button(text: str, callback_data: str) -> InlineKeyboardButton:
+    """Кнопка без параметров (общая для всех клавиатур)"""
+    return InlineKeyboardButton(text=text, callback_data=callback_data)
+
+
+# Заготовки: копия готовой модели дешевле и создания с валидацией, и model_construct
+_BLANK_BUTTON = InlineKeyboardButton(text="", callback_data="")
+_BLANK_MARKUP = InlineKeyboardMarkup(inline_keyboard=[])
+
+
+def _button(text: str, callback_data: str) -> InlineKeyboardButton:
+    """Кнопка с параметрами: поля заведомо валидны, валидацию пропускаем"""
+    return _BLANK_BUTTON.model_copy(update={"text": text, "callback_data": callback_data})
+
+
+def _markup(rows: list) -> InlineKeyboardMarkup:
+    return _BLANK_MARKUP.model_copy(update={"inline_keyboard": rows})
+
+
+def _from_template(template: tuple, item_id: int) -> InlineKeyboardMarkup:
+    """Inline-клавиатура по шаблону: строки из (текст, действие); действиям с аргументом передаётся item_id"""
+    return _markup([
+        [_button(text, pack(action, item_id)) if action in ARG_TYPES else _static_button(text, pack(action))
+         for text, action in row]
+        for row in template
+    ])
+
+
+# Шаблоны клавиатур для конкретного элемента
+_REMINDER_TEMPLATE = (
+    (("✅ Выполнено", Action.REMINDER_DONE), ("✏️ Изменить", Action.REMINDER_EDIT)),
+    (("🗑️ Удалить", Action.REMINDER_DELETE_CONFIRM),),
+    (("🔙 Назад", Action.REMINDER_LIST),),
+)
+_REMINDER_DELETE_TEMPLATE = (
+    (("❌ Да, удалить", Action.REMINDER_DELETE), ("✅ Отмена", Action.REMINDER_VIEW)),
+)
+_PLAN_ITEM_TEMPLATE = (
+    (("✅ Сделано", Action.PLAN_DONE), ("✏️ Изменить", Action.PLAN_EDIT)),
+    (("🗑️ Удалить", Action.PLAN_DELETE_CONFIRM),),
+    (("🔙 Назад", Action.PLAN_LIST),),
+)
+_PLAN_DELETE_TEMPLATE = (
+    (("❌ Да, удалить", Action.PLAN_DELETE), ("✅ Отмена", Action.PLAN_VIEW)),
+)
+
+
+@lru_cache(maxsize=32)
 def get_energy_keyboard(lang_code: str = 'en') -> ReplyKeyboardMarkup:
     """Клавиатура выбора уровня энергии"""
     return ReplyKeyboardMarkup(
@@ -18,6 +76,7 @@ def get_energy_keyboard(lang_code: str = 'en') -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=None)
 def get_day_type_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура выбора типа дня"""
     return ReplyKeyboardMarkup(
@@ -31,16 +90,18 @@ def get_day_type_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=None)
 def get_pomodoro_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура управления Pomodoro"""
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Продолжить", callback_data="pomodoro_continue")],
-            [InlineKeyboardButton(text="🏁 Завершить", callback_data="pomodoro_stop")]
+            [InlineKeyboardButton(text="✅ Продолжить", callback_data=pack(Action.POMODORO_CONTINUE))],
+            [InlineKeyboardButton(text="🏁 Завершить", callback_data=pack(Action.POMODORO_STOP))]
         ]
     )
 
 
+@lru_cache(maxsize=32)
 def get_main_keyboard(lang_code: str = 'en') -> ReplyKeyboardMarkup:
     """Главная клавиатура с командами - упрощенная для СДВГ"""
     return ReplyKeyboardMarkup(
@@ -53,6 +114,7 @@ def get_main_keyboard(lang_code: str = 'en') -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=None)
 def get_quick_actions_keyboard() -> ReplyKeyboardMarkup:
     """Быстрые действия - для ситуаций перегрузки"""
     return ReplyKeyboardMarkup(
@@ -65,6 +127,7 @@ def get_quick_actions_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=32)
 def get_cancel_keyboard(lang_code: str = 'en') -> ReplyKeyboardMarkup:
     """Клавиатура с кнопкой отмены"""
     return ReplyKeyboardMarkup(
@@ -76,123 +139,106 @@ def get_cancel_keyboard(lang_code: str = 'en') -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=None)
+def get_quick_help_keyboard() -> InlineKeyboardMarkup:
+    """Быстрые действия из «Помощь сейчас»"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="🎯 Поставить цель", callback_data=pack(Action.QUICK_GOAL))],
+            [InlineKeyboardButton(text="📋 Добавить задачу", callback_data=pack(Action.QUICK_PLAN))],
+            [InlineKeyboardButton(text="🍅 Запустить фокус", callback_data=pack(Action.QUICK_FOCUS))],
+            [InlineKeyboardButton(text="😌 Отдохнуть (тишина)", callback_data=pack(Action.QUICK_QUIET))],
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
 def get_goal_confirmation_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура подтверждения цели"""
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Да, это моя цель", callback_data="goal_confirm")],
-            [InlineKeyboardButton(text="✏️ Изменить", callback_data="goal_edit")]
+            [InlineKeyboardButton(text="✅ Да, это моя цель", callback_data=pack(Action.GOAL_CONFIRM))],
+            [InlineKeyboardButton(text="✏️ Изменить", callback_data=pack(Action.GOAL_EDIT))]
         ]
     )
 
 
+@lru_cache(maxsize=None)
 def get_goal_completion_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура завершения цели"""
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Сделал(а)", callback_data="goal_done")],
-            [InlineKeyboardButton(text="⏭️ Не сегодня", callback_data="goal_skip")]
+            [InlineKeyboardButton(text="✅ Сделал(а)", callback_data=pack(Action.GOAL_DONE))],
+            [InlineKeyboardButton(text="⏭️ Не сегодня", callback_data=pack(Action.GOAL_SKIP))]
         ]
     )
 
 
-def get_reminder_keyboard(reminder_id: int, page: int = 0) -> InlineKeyboardMarkup:
+def get_reminder_keyboard(reminder_id: int) -> InlineKeyboardMarkup:
     """Клавиатура управления напоминанием"""
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Выполнено", callback_data=f"rem_{reminder_id}_done"),
-                InlineKeyboardButton(text="✏️ Изменить", callback_data=f"rem_{reminder_id}_edit")
-            ],
-            [InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"rem_{reminder_id}_delete_confirm")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data=f"rem_list_{page}")]
-        ]
-    )
+    return _from_template(_REMINDER_TEMPLATE, reminder_id)
 
 
-def get_reminder_delete_confirm_keyboard(reminder_id: int, page: int = 0) -> InlineKeyboardMarkup:
+def get_reminder_delete_confirm_keyboard(reminder_id: int) -> InlineKeyboardMarkup:
     """Клавиатура подтверждения удаления напоминания"""
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="❌ Да, удалить", callback_data=f"rem_{reminder_id}_delete"),
-                InlineKeyboardButton(text="✅ Отмена", callback_data=f"rem_view_{reminder_id}")
-            ]
-        ]
-    )
+    return _from_template(_REMINDER_DELETE_TEMPLATE, reminder_id)
+
+
+def _nav_row(prev_action: str, next_action: str, first_key: tuple, last_key: tuple,
+             has_prev: bool, has_next: bool) -> list:
+    """Кнопки ⬅️/➡️ с курсором первой/последней строки страницы"""
+    nav_row = []
+    if has_prev:
+        nav_row.append(_button("⬅️", pack(prev_action, encode_cursor(*first_key))))
+    if has_next:
+        nav_row.append(_button("➡️", pack(next_action, encode_cursor(*last_key))))
+    return nav_row
 
 
-def get_reminders_list_keyboard(reminders: list, page: int = 0) -> InlineKeyboardMarkup:
-    """Клавиатура списка напоминаний"""
+def get_reminders_list_keyboard(reminders: list, has_prev: bool = False, has_next: bool = False) -> InlineKeyboardMarkup:
+    """Клавиатура страницы списка напоминаний (reminders - строки страницы)"""
     keyboard = []
     
-    # Show 5 reminders per page
-    start = page * 5
-    end = min(start + 5, len(reminders))
-    
-    for rem in reminders[start:end]:
+    for rem in reminders:
         emoji = "✅" if rem.completed else "⏰"
-        keyboard.append([
-            InlineKeyboardButton(
-                text=f"{emoji} {rem.text[:30]}...",
-                callback_data=f"rem_view_{rem.id}"
-            )
-        ])
+        keyboard.append([_button(f"{emoji} {rem.text[:30]}...", pack(Action.REMINDER_VIEW, rem.id))])
     
     # Pagination
-    nav_row = []
-    if page > 0:
-        nav_row.append(InlineKeyboardButton(text="⬅️", callback_data=f"rem_list_{page-1}"))
-    if end < len(reminders):
-        nav_row.append(InlineKeyboardButton(text="➡️", callback_data=f"rem_list_{page+1}"))
-    
-    if nav_row:
-        keyboard.append(nav_row)
+    if reminders:
+        nav_row = _nav_row(Action.REMINDER_PREV, Action.REMINDER_NEXT, (reminders[0].when_datetime, reminders[0].id),
+                           (reminders[-1].when_datetime, reminders[-1].id), has_prev, has_next)
+        if nav_row:
+            keyboard.append(nav_row)
     
-    keyboard.append([InlineKeyboardButton(text="➕ Добавить", callback_data="rem_add")])
+    keyboard.append([_static_button("➕ Добавить", pack(Action.REMINDER_ADD))])
     
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+    return _markup(keyboard)
 
 
 def get_plan_item_keyboard(item_id: int) -> InlineKeyboardMarkup:
     """Клавиатура управления пунктом плана"""
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Сделано", callback_data=f"plan_{item_id}_done"),
-                InlineKeyboardButton(text="✏️ Изменить", callback_data=f"plan_{item_id}_edit")
-            ],
-            [InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"plan_{item_id}_delete_confirm")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="plan_list")]
-        ]
-    )
+    return _from_template(_PLAN_ITEM_TEMPLATE, item_id)
 
 
 def get_plan_delete_confirm_keyboard(item_id: int) -> InlineKeyboardMarkup:
     """Клавиатура подтверждения удаления пункта плана"""
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="❌ Да, удалить", callback_data=f"plan_{item_id}_delete"),
-                InlineKeyboardButton(text="✅ Отмена", callback_data=f"plan_view_{item_id}")
-            ]
-        ]
-    )
+    return _from_template(_PLAN_DELETE_TEMPLATE, item_id)
 
 
-def get_plan_list_keyboard(items: list) -> InlineKeyboardMarkup:
-    """Клавиатура списка плана на день"""
+def get_plan_list_keyboard(items: list, has_prev: bool = False, has_next: bool = False) -> InlineKeyboardMarkup:
+    """Клавиатура страницы плана на день (items - строки страницы)"""
     keyboard = []
     
     for item in items:
         emoji = "✅" if item.completed else "⭕"
-        keyboard.append([
-            InlineKeyboardButton(
-                text=f"{emoji} {item.text[:30]}...",
-                callback_data=f"plan_view_{item.id}"
-            )
-        ])
+        keyboard.append([_button(f"{emoji} {item.text[:30]}...", pack(Action.PLAN_VIEW, item.id))])
+    
+    if items:
+        nav_row = _nav_row(Action.PLAN_PREV, Action.PLAN_NEXT, (items[0].order, items[0].id), (items[-1].order, items[-1].id),
+                           has_prev, has_next)
+        if nav_row:
+            keyboard.append(nav_row)
     
-    keyboard.append([InlineKeyboardButton(text="➕ Добавить пункт", callback_data="plan_add")])
+    keyboard.append([_static_button("➕ Добавить пункт", pack(Action.PLAN_ADD))])
     
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+    return _markup(keyboard)
@@ -1,14 +1,15 @@
 """System prompts and few-shot examples for AI assistant"""
 
-# Main system prompt - warm friend persona
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
-_CURRENT_DATE = datetime.now().strftime("%d.%m.%Y")
-_CURRENT_YEAR = datetime.now().year
+# Main system prompt - warm friend persona.
+# Промпт статичный (без даты), чтобы провайдеры могли кешировать префикс запроса.
+# Текущая дата добавляется отдельным блоком на каждый запрос: get_date_context()
+SYSTEM_PROMPT = """Ты — "тёплый друг" пользователя с СДВГ. 
 
-SYSTEM_PROMPT = f"""Ты — "тёплый друг" пользователя с СДВГ. 
-
-ВАЖНО: Сегодня {_CURRENT_DATE} ({_CURRENT_YEAR} год). Всегда используй текущую дату при парсинге времени!
+ВАЖНО: Текущая дата передаётся отдельным сообщением. Всегда используй текущую дату при парсинге времени!
 
 Тон общения:
 - Короткие фразы, эмпатия, без моралей
@@ -55,7 +56,7 @@ SYSTEM_PROMPT = f"""Ты — "тёплый друг" пользователя с
   - Предложи одно крошечное действие (≤5 минут)
   - Не дави, просто поддержи
 
-Если запрос о времени неясен — уточни кнопками. Помни: сегодня {_CURRENT_DATE} ({_CURRENT_YEAR} год)!
+Если запрос о времени неясен — уточни кнопками. Помни про текущую дату!
 Если задача большая — разбей на микрошаги АВТОМАТИЧЕСКИ.
 Всегда предлагай действие "сейчас" — конкретное, ≤10 минут.
 
@@ -110,17 +111,83 @@ FEW_SHOT_EXAMPLES = [
 ]
 
 
+# Сколько few-shot примеров отправлять в каждом запросе
+FEW_SHOT_COUNT = 2
+
+# Static prefix as immutable (role, content) pairs: system prompt + few-shot.
+# Built once at import; identical bytes on every request keep provider caches warm.
+STATIC_PREFIX: Tuple[Tuple[str, str], ...] = (("system", SYSTEM_PROMPT),) + tuple(
+    pair
+    for example in FEW_SHOT_EXAMPLES[:FEW_SHOT_COUNT]
+    for pair in (("user", example["input"]), ("assistant", example["output"]))
+)
+
+
+@lru_cache(maxsize=4)
+def get_date_context(today: date) -> str:
+    """Per-request date block (cached per day)"""
+    return f"Сегодня {today.strftime('%d.%m.%Y')} ({today.year} год). Всегда используй эту дату при парсинге времени!"
+
+
+def get_energy_context(energy_level: Optional[int]) -> Optional[str]:
+    """Energy level prompt, if the level needs a special tone"""
+    if energy_level:
+        if energy_level < 40:
+            return get_low_energy_prompt()
+        if energy_level > 80:
+            return get_high_energy_prompt()
+    return None
+
+
+def build_openai_messages(user_message: str, energy_level: Optional[int] = None,
+                          today: Optional[date] = None, history: Optional[List[Dict[str, str]]] = None,
+                          summary: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Messages for OpenAI: static prefix first, dynamic context last.
+
+    OpenAI caches the longest identical prefix automatically, so the date,
+    energy context and conversation memory go after the few-shot examples.
+    """
+    messages = [{"role": role, "content": content} for role, content in STATIC_PREFIX]
+    messages.append({"role": "system", "content": get_date_context(today or datetime.now().date())})
+    energy_context = get_energy_context(energy_level)
+    if energy_context:
+        messages.append({"role": "system", "content": energy_context})
+    if summary:
+        messages.append({"role": "system", "content": summary})
+    messages.extend(history or ())
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def build_claude_request(user_message: str, energy_level: Optional[int] = None,
+                         today: Optional[date] = None, history: Optional[List[Dict[str, str]]] = None,
+                         summary: Optional[str] = None) -> Tuple[List[Dict], List[Dict[str, str]]]:
+    """
+    System blocks and messages for Claude.
+
+    The static system prompt carries a cache_control breakpoint; the date,
+    energy context and memory summary are separate blocks after it and never
+    invalidate the cache.
+    """
+    system = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    system.append({"type": "text", "text": get_date_context(today or datetime.now().date())})
+    energy_context = get_energy_context(energy_level)
+    if energy_context:
+        system.append({"type": "text", "text": energy_context})
+    if summary:
+        system.append({"type": "text", "text": summary})
+
+    messages = [{"role": role, "content": content} for role, content in STATIC_PREFIX if role != "system"]
+    messages.extend(history or ())
+    messages.append({"role": "user", "content": user_message})
+    return system, messages
+
+
 def get_conversation_history() -> list:
-    """Get conversation history with few-shot examples"""
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-    ]
-    
-    # Add few-shot examples for better understanding
-    for example in FEW_SHOT_EXAMPLES[:2]:  # Use first 2 examples
-        messages.append({"role": "user", "content": example["input"]})
-        messages.append({"role": "assistant", "content": example["output"]})
-    
+    """Get conversation history with few-shot examples and today's date"""
+    messages = [{"role": role, "content": content} for role, content in STATIC_PREFIX]
+    messages.append({"role": "system", "content": get_date_context(datetime.now().date())})
     return messages
 
 
@@ -0,0 +1,115 @@
+"""Хранение данных: старые строки уходят из рабочих таблиц в архивные
+
+Заметки, энергия, пункты плана, чек-ины и выполненные напоминания старше
+RETENTION_DAYS переносятся в <таблица>_archive (database.ARCHIVES) пачками
+по id: INSERT ... SELECT и DELETE одной короткой транзакцией на пачку, так что
+бот между пачками пишет как обычно. Рабочие таблицы и их индексы остаются
+размером в горизонт хранения, а чтения старых дней проваливаются в архив
+(db_helpers, today, rollups). Цели и сводки дней (daily_rollups) остаются на
+месте: история и /stats читают их как раньше.
+
+    python retention.py                      # один проход с горизонтом из конфига
+    python retention.py --days 180 --dry-run # только посчитать, что уедет
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import DateTime, and_, delete, func, insert, literal, select
+
+from config import RETENTION_BATCH, RETENTION_DAYS
+from database import ARCHIVES, async_session, Note, Reminder
+from user_time import day_key
+
+logger = logging.getLogger(__name__)
+
+
+def expired(model, cutoff: datetime):
+    """Condition for rows of model older than cutoff (UTC); rows without a day never expire"""
+    if model is Note:
+        return Note.created_at < cutoff
+    if model is Reminder:
+        # Активные и повторяющиеся нужны планировщику, уезжают только выполненные
+        return and_(Reminder.completed == True, Reminder.when_datetime < cutoff)
+    return model.local_day < day_key(cutoff.date())
+
+
+async def archive_batch(model, cutoff: datetime, batch_rows: int = RETENTION_BATCH) -> int:
+    """Move up to batch_rows oldest expired rows of model into its archive; one transaction"""
+    archive = ARCHIVES[model]
+    columns = list(model.__table__.columns)
+    async with async_session() as session:
+        ids = (await session.scalars(
+            select(model.id).where(expired(model, cutoff)).order_by(model.id).limit(batch_rows)
+        )).all()
+        if not ids:
+            return 0
+        await session.execute(
+            insert(archive.__table__).from_select(
+                [column.name for column in columns] + ['archived_at'],
+                select(*columns, literal(datetime.utcnow(), DateTime)).where(model.id.in_(ids)),
+            )
+        )
+        await session.execute(delete(model).where(model.id.in_(ids)))
+        await session.commit()
+    return len(ids)
+
+
+async def run_retention(days: int = RETENTION_DAYS, batch_rows: int = RETENTION_BATCH, pause: float = 0.0,
+                        now: datetime = None) -> Dict[str, int]:
+    """One pass over every archived table: {table: rows moved}; days <= 0 does nothing"""
+    if days <= 0:
+        return {}
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    moved = {}
+    for model in ARCHIVES:
+        started, total = time.perf_counter(), 0
+        while True:
+            count = await archive_batch(model, cutoff, batch_rows)
+            total += count
+            if count < batch_rows:
+                break
+            if pause:
+                await asyncio.sleep(pause)  # отдать базу боту между пачками
+        moved[model.__tablename__] = total
+        if total:
+            logger.info(f"Archived {total} rows of {model.__tablename__} in {time.perf_counter() - started:.1f}s")
+    return moved
+
+
+async def table_sizes(days: int = RETENTION_DAYS, now: datetime = None) -> Dict[str, dict]:
+    """{table: {'hot': rows, 'expired': rows due to move, 'archive': rows}}"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    sizes = {}
+    async with async_session() as session:
+        for model, archive in ARCHIVES.items():
+            sizes[model.__tablename__] = {
+                'hot': await session.scalar(select(func.count(model.id))),
+                'expired': await session.scalar(select(func.count(model.id)).where(expired(model, cutoff)))
+                if days > 0 else 0,
+                'archive': await session.scalar(select(func.count(archive.id))),
+            }
+    return sizes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="archive rows older than this")
+    parser.add_argument("--batch-rows", type=int, default=RETENTION_BATCH, help="rows per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="only print table sizes and rows due to move")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.dry_run:
+        moved = await run_retention(args.days, args.batch_rows, args.pause)
+        print(f"archived {sum(moved.values())} rows")
+    for table, size in (await table_sizes(args.days)).items():
+        print(f"{table:18s} hot {size['hot']:8d}  expired {size['expired']:8d}  archive {size['archive']:8d}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
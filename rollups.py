@@ -0,0 +1,199 @@
+"""Сводки дней (daily_rollups): одна строка на пользователя и день
+
+История (/history, «длинно») и недельная энергия читают готовые строки,
+а не пересчитывают агрегаты из целей, плана и энергии на каждый запрос.
+db_helpers пересчитывает строку дня в той же транзакции, что и запись;
+rebuild_rollups заполняет таблицу пачками пользователей (init_db вызывает
+его, когда таблица только что создана), check_rollups сверяет её с
+исходными таблицами. План и энергия считаются по рабочим таблицам вместе с
+архивными (retention.py): сводка старого дня не меняется после переноса.
+
+    python rollups.py --check          # только найти расхождения
+    python rollups.py --check --fix    # и пересобрать пользователей с расхождениями
+    python rollups.py --rebuild        # пересобрать всё
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, cast, delete, func, insert, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import IS_POSTGRES, ARCHIVES, async_session, DailyGoal, DailyPlanItem, DailyRollup, EnergyLog, User
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLUMNS = (
+    'has_goal', 'goal_text', 'goal_completed', 'estimated_pomodoros', 'completed_pomodoros', 'day_rating',
+    'plan_total', 'plan_done', 'energy_sum', 'energy_count',
+)
+BATCH_USERS = 500
+
+
+class RollupMismatch(NamedTuple):
+    user_id: int
+    local_day: int
+    stored: Optional[dict]  # None - строки нет
+    expected: Optional[dict]  # None - строки быть не должно
+
+
+def _empty(user_id: int, day: int) -> dict:
+    return {
+        'user_id': user_id, 'local_day': day, 'has_goal': False, 'goal_text': None, 'goal_completed': False,
+        'estimated_pomodoros': None, 'completed_pomodoros': None, 'day_rating': None,
+        'plan_total': 0, 'plan_done': 0, 'energy_sum': 0, 'energy_count': 0,
+    }
+
+
+async def compute_rollups(session, user_ids: Sequence[int], day: int = None) -> Dict[Tuple[int, int], dict]:
+    """Rollup values from the raw tables: {(user_id, local_day): row} for the users (and one day if given)"""
+    def scope(model):
+        conditions = [model.user_id.in_(user_ids), model.local_day.is_not(None)]
+        if day is not None:
+            conditions.append(model.local_day == day)
+        return conditions
+
+    rollups = {}
+
+    def row(user_id, local_day):
+        return rollups.setdefault((user_id, local_day), _empty(user_id, local_day))
+
+    goals = await session.execute(
+        select(DailyGoal.user_id, DailyGoal.local_day, DailyGoal.goal_text, DailyGoal.completed,
+               DailyGoal.estimated_pomodoros, DailyGoal.completed_pomodoros, DailyGoal.day_rating)
+        .where(*scope(DailyGoal))
+        .order_by(DailyGoal.id)
+    )
+    for goal in goals:
+        # Несколько целей за день: поля берутся из последней, пустые не затирают заполненные
+        values = row(goal.user_id, goal.local_day)
+        values['has_goal'] = True
+        values['goal_completed'] = bool(goal.completed)
+        if goal.goal_text:
+            values['goal_text'] = goal.goal_text
+        if goal.day_rating:
+            values['day_rating'] = goal.day_rating
+        if goal.estimated_pomodoros:
+            values['estimated_pomodoros'] = goal.estimated_pomodoros
+            values['completed_pomodoros'] = goal.completed_pomodoros or 0
+
+    def with_archive(model, *columns):
+        """Rows of model and of its archive as one subquery, each side on its (user_id, local_day) index"""
+        return union_all(*(
+            select(*(getattr(source, column) for column in columns)).where(*scope(source))
+            for source in (model, ARCHIVES[model])
+        )).subquery()
+
+    items = with_archive(DailyPlanItem, 'user_id', 'local_day', 'completed')
+    plans = await session.execute(
+        select(items.c.user_id, items.c.local_day, func.count(), func.sum(cast(items.c.completed, Integer)))
+        .group_by(items.c.user_id, items.c.local_day)
+    )
+    for user_id, local_day, total, done in plans:
+        values = row(user_id, local_day)
+        values['plan_total'], values['plan_done'] = total, done or 0
+
+    logs = with_archive(EnergyLog, 'user_id', 'local_day', 'energy_level')
+    energy = await session.execute(
+        select(logs.c.user_id, logs.c.local_day, func.sum(logs.c.energy_level), func.count())
+        .group_by(logs.c.user_id, logs.c.local_day)
+    )
+    for user_id, local_day, total, count in energy:
+        values = row(user_id, local_day)
+        values['energy_sum'], values['energy_count'] = int(total or 0), count
+
+    return rollups
+
+
+async def refresh_rollup(session, user_id: int, day: int):
+    """Recompute one (user, day) row inside the caller's transaction, before its commit"""
+    values = (await compute_rollups(session, [user_id], day)).get((user_id, day))
+    if values is None:
+        await session.execute(
+            delete(DailyRollup).where(DailyRollup.user_id == user_id, DailyRollup.local_day == day)
+        )
+        return
+    upsert = postgresql.insert if IS_POSTGRES else sqlite.insert
+    stmt = upsert(DailyRollup).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'local_day'],
+        set_={column: stmt.excluded[column] for column in ROLLUP_COLUMNS},
+    )
+    await session.execute(stmt)
+
+
+async def _user_batches(batch_users: int, user_ids: Sequence[int] = None):
+    if user_ids is None:
+        async with async_session() as session:
+            user_ids = (await session.scalars(select(User.id).order_by(User.id))).all()
+    for i in range(0, len(user_ids), batch_users):
+        yield user_ids[i:i + batch_users]
+
+
+async def _rebuild_users(user_ids: Sequence[int]) -> int:
+    """Replace the rollups of these users; one short transaction"""
+    async with async_session() as session:
+        rows = list((await compute_rollups(session, user_ids)).values())
+        await session.execute(delete(DailyRollup).where(DailyRollup.user_id.in_(user_ids)))
+        if rows:
+            await session.execute(insert(DailyRollup), rows)
+        await session.commit()
+    return len(rows)
+
+
+async def rebuild_rollups(batch_users: int = BATCH_USERS, user_ids: Sequence[int] = None) -> int:
+    """Rebuild rollups (of all users by default) from the raw tables, batch_users users per transaction"""
+    total = 0
+    async for batch in _user_batches(batch_users, user_ids):
+        total += await _rebuild_users(batch)
+    logger.info(f"Rebuilt {total} daily rollups")
+    return total
+
+
+async def check_rollups(fix: bool = False, batch_users: int = BATCH_USERS,
+                        user_ids: Sequence[int] = None) -> List[RollupMismatch]:
+    """Compare stored rollups (of all users by default) with the raw tables; fix=True rebuilds the users that differ"""
+    mismatches = []
+    async for batch in _user_batches(batch_users, user_ids):
+        async with async_session() as session:
+            expected = await compute_rollups(session, batch)
+            stored = {
+                (rollup.user_id, rollup.local_day): {'user_id': rollup.user_id, 'local_day': rollup.local_day,
+                                                     **{c: getattr(rollup, c) for c in ROLLUP_COLUMNS}}
+                for rollup in await session.scalars(select(DailyRollup).where(DailyRollup.user_id.in_(batch)))
+            }
+        found = [
+            RollupMismatch(user_id, day, stored.get((user_id, day)), expected.get((user_id, day)))
+            for user_id, day in sorted(stored.keys() | expected.keys())
+            if stored.get((user_id, day)) != expected.get((user_id, day))
+        ]
+        if fix and found:
+            await _rebuild_users(sorted({mismatch.user_id for mismatch in found}))
+        mismatches.extend(found)
+    if mismatches:
+        logger.warning(f"{len(mismatches)} daily rollups differ from the raw tables" + (" (fixed)" if fix else ""))
+    return mismatches
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild all rollups")
+    parser.add_argument("--check", action="store_true", help="compare rollups with the raw tables")
+    parser.add_argument("--fix", action="store_true", help="with --check: rebuild users that differ")
+    parser.add_argument("--batch-users", type=int, default=BATCH_USERS)
+    parser.add_argument("--user", type=int, action="append", dest="user_ids", help="users.id (repeatable)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.rebuild:
+        print(f"rebuilt {await rebuild_rollups(args.batch_users, args.user_ids)} rollups")
+    if args.check or not args.rebuild:
+        mismatches = await check_rollups(args.fix, args.batch_users, args.user_ids)
+        for mismatch in mismatches[:20]:
+            print(mismatch)
+        print(f"{len(mismatches)} mismatches" + (" fixed" if args.fix and mismatches else ""))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
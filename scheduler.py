@@ -3,11 +3,21 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 from datetime import datetime, timedelta
-from database import async_session
-from sqlalchemy import select
-from typing import Optional
+from database import async_session, DeferredMessage, UserState, User, EveningCheckIn
+from sqlalchemy import delete, select, or_
+from typing import Dict, List, Optional
+import logging
 import pytz
-from config import USER_TIMEZONE
+from config import USER_TIMEZONE, EVENING_CHECKIN_HOUR, EVENING_CHECKIN_MINUTE
+from user_time import local_now, local_day
+from utils.broadcast import RateLimitedSender
+
+# Шаг тика вечернего чек-ина: часовые пояса бывают со смещением :30 и :45
+EVENING_TICK_MINUTES = 15
+# Сколько пользователей читать одной короткой транзакцией
+EVENING_PAGE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
 
 
 class ReminderScheduler:
@@ -18,6 +28,10 @@ class ReminderScheduler:
         self.scheduler = AsyncIOScheduler()
         self.timezone = pytz.timezone('UTC')  # Храним в UTC
         self.user_timezone = pytz.timezone(USER_TIMEZONE)  # Таймзона пользователя для отображения
+        # Режим тишины: chat_id -> конец окна (UTC, naive), чтобы не ходить в БД на каждую отправку
+        self.quiet_until: Dict[int, datetime] = {}
+        # Общий лимит скорости для массовых рассылок
+        self.broadcaster = RateLimitedSender(bot)
     
     def start(self):
         """Start the scheduler"""
@@ -61,11 +75,8 @@ class ReminderScheduler:
             
             reminder_msg = translate("reminder_sent", lang_code, time=time_str, text=text)
             
-            await self.bot.send_message(
-                chat_id=chat_id,
-                text=reminder_msg,
-                parse_mode='HTML'
-            )
+            if not await self.send(chat_id, reminder_msg):
+                return  # Режим тишины - напоминание придёт после него
             
             # Отправляем дополнительное уведомление через 2 секунды для большей заметности
             # (это не звонок, но делает уведомление более заметным)
@@ -79,28 +90,196 @@ class ReminderScheduler:
         except Exception as e:
             print(f"Error sending reminder: {e}")
     
-    def schedule_evening_checkin(self, chat_id: int, hour: int = 20, minute: int = 0):
-        """Schedule daily evening check-in"""
+    def schedule_evening_checkins(self, hour: int = EVENING_CHECKIN_HOUR, minute: int = EVENING_CHECKIN_MINUTE):
+        """
+        Schedule the evening check-in for all users: one cron job for everyone.
+        
+        Every EVENING_TICK_MINUTES the job picks the timezone buckets where it is
+        now hour:minute local time and fans out to their users.
+        """
+        self.evening_time = (hour, minute)
         self.scheduler.add_job(
-            self.send_evening_checkin,
-            trigger=CronTrigger(hour=hour, minute=minute, timezone=self.timezone),
-            id=f"evening_{chat_id}",
-            args=[chat_id],
-            replace_existing=True
+            self.run_evening_fanout,
+            trigger=CronTrigger(minute=f"*/{EVENING_TICK_MINUTES}", timezone=self.timezone),
+            id="evening_fanout",
+            replace_existing=True,
+            # Рассылка большого пояса может идти дольше тика: следующий тик
+            # обрабатывает другие пояса, общий лимит скорости держит broadcaster
+            max_instances=4,
+            coalesce=True,
+            # Тик, запоздавший в пределах своего шага, ещё попадает в окно пояса
+            misfire_grace_time=EVENING_TICK_MINUTES * 60
         )
-        print(f"Evening check-in scheduled for {hour}:{minute:02d} ⏰")
+        print(f"Evening check-in scheduled for {hour}:{minute:02d} local time ⏰")
     
-    async def send_evening_checkin(self, chat_id: int):
-        """Send evening check-in reminder"""
-        try:
-            await self.bot.send_message(
-                chat_id=chat_id,
-                text="🌙 Привет! Как прошёл день?\n\nВремя для вечернего чек-ина 💛",
-                parse_mode='HTML'
+    def due_timezones(self, tz_names, now_utc: datetime, hour: int, minute: int) -> List[str]:
+        """Timezones whose local time is within the current tick after hour:minute"""
+        target = hour * 60 + minute
+        due = []
+        for tz_name in tz_names:
+            local = local_now(tz_name, now_utc)
+            elapsed = (local.hour * 60 + local.minute - target) % (24 * 60)
+            if elapsed < EVENING_TICK_MINUTES:
+                due.append(tz_name)
+        return due
+    
+    async def run_evening_fanout(self, now_utc: Optional[datetime] = None, sender=None) -> Dict[str, int]:
+        """
+        Send the evening check-in prompt to every eligible user in due timezones.
+        
+        Users are read in keyset pages by User.id, each page in its own short
+        transaction: memory stays flat and no read transaction stays open
+        while the rate-limited sends run. Users who already checked in today
+        (by their local_day) are filtered in SQL, users in quiet mode are skipped.
+        """
+        from translations import translate
+        
+        now_utc = now_utc or datetime.utcnow()
+        hour, minute = getattr(self, "evening_time", (EVENING_CHECKIN_HOUR, EVENING_CHECKIN_MINUTE))
+        sender = sender or self.broadcaster
+        stats = {"sent": 0, "skipped_quiet": 0, "failed": 0}
+        
+        async with async_session() as session:
+            result = await session.execute(select(User.timezone).distinct())
+            tz_names = {tz or USER_TIMEZONE for tz in result.scalars()}
+        
+        for tz_name in self.due_timezones(sorted(tz_names), now_utc, hour, minute):
+            day = local_day(tz_name, now_utc)
+            tz_filter = User.timezone == tz_name
+            if tz_name == USER_TIMEZONE:
+                tz_filter = or_(tz_filter, User.timezone.is_(None))
+            checked_in = (
+                select(EveningCheckIn.id)
+                .where(EveningCheckIn.user_id == User.id)
+                .where(EveningCheckIn.local_day == day)
+                .exists()
+            )
+            query = (
+                select(User.id, User.telegram_id, User.language_code)
+                .where(tz_filter)
+                .where(~checked_in)
+                .order_by(User.id)
+                .limit(EVENING_PAGE_SIZE)
             )
+            
+            last_id = None
+            while True:
+                page = query if last_id is None else query.where(User.id > last_id)
+                async with async_session() as session:
+                    rows = (await session.execute(page)).all()
+                for _, telegram_id, lang_code in rows:
+                    if self.is_quiet(telegram_id):
+                        stats["skipped_quiet"] += 1
+                        continue
+                    text = translate("evening_checkin_prompt", lang_code or 'en')
+                    if await sender.send(telegram_id, text, parse_mode='HTML'):
+                        stats["sent"] += 1
+                    else:
+                        stats["failed"] += 1
+                if len(rows) < EVENING_PAGE_SIZE:
+                    break
+                last_id = rows[-1][0]
+        
+        if stats["sent"] or stats["failed"]:
+            logger.info(f"Evening check-in fan-out: {stats}")
+        return stats
+    
+    async def send_evening_checkin(self, chat_id: int, lang_code: str = 'ru'):
+        """Send evening check-in reminder to one chat"""
+        try:
+            from translations import translate
+            await self.send(chat_id, translate("evening_checkin_prompt", lang_code))
         except Exception as e:
             print(f"Error sending evening check-in: {e}")
     
+    # ==================== РЕЖИМ ТИШИНЫ ====================
+    
+    def is_quiet(self, chat_id: int) -> bool:
+        """Is the chat inside a quiet window (in-memory check, no DB)"""
+        until = self.quiet_until.get(chat_id)
+        return until is not None and until > datetime.utcnow()
+    
+    async def send(self, chat_id: int, text: str) -> bool:
+        """
+        Outbound sender for scheduled messages.
+        
+        During quiet mode the message is deferred (not dropped): it is stored in
+        deferred_messages and delivered in one batch when the window ends, also
+        after a restart (load_quiet_modes). Returns True if sent right away.
+        """
+        if self.is_quiet(chat_id):
+            async with async_session() as session:
+                session.add(DeferredMessage(chat_id=chat_id, text=text))
+                await session.commit()
+            return False
+        await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+        return True
+    
+    def start_quiet_mode(self, chat_id: int, user_id: int, until: datetime):
+        """Enter quiet mode; the end is a scheduled job, not a sleeping handler"""
+        self.quiet_until[chat_id] = until
+        self.scheduler.add_job(
+            self.end_quiet_mode,
+            trigger=DateTrigger(run_date=self.timezone.localize(until), timezone=self.timezone),
+            id=f"quiet_end_{chat_id}",
+            args=[chat_id, user_id],
+            replace_existing=True
+        )
+    
+    async def end_quiet_mode(self, chat_id: int, user_id: int):
+        """Leave quiet mode and flush deferred messages as one message"""
+        from db_helpers import disable_quiet_mode
+        
+        self.quiet_until.pop(chat_id, None)
+        try:
+            await disable_quiet_mode(user_id)
+        except Exception as e:
+            logger.error(f"Error disabling quiet mode for {user_id}: {e}")
+        
+        text = "Режим тишины завершён. Как дела? 👋"
+        async with async_session() as session:
+            deferred = (await session.execute(
+                select(DeferredMessage.id, DeferredMessage.text)
+                .where(DeferredMessage.chat_id == chat_id)
+                .order_by(DeferredMessage.id)
+            )).all()
+        if deferred:
+            text += "\n\nПока было тихо:\n\n" + "\n\n".join(message for _, message in deferred)
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+        except Exception as e:
+            # Отложенные остаются в базе и уйдут с концом следующего окна
+            logger.error(f"Error sending quiet mode end to {chat_id}: {e}")
+            return
+        if deferred:
+            async with async_session() as session:
+                await session.execute(
+                    delete(DeferredMessage).where(DeferredMessage.id.in_([row_id for row_id, _ in deferred]))
+                )
+                await session.commit()
+    
+    async def load_quiet_modes(self):
+        """Restore quiet windows after restart (one query)"""
+        now = datetime.utcnow()
+        async with async_session() as session:
+            result = await session.execute(
+                select(User.telegram_id, UserState.user_id, UserState.quiet_mode_until)
+                .join(User, User.id == UserState.user_id)
+                .where(UserState.in_quiet_mode == True)
+            )
+            rows = result.all()
+        
+        for telegram_id, user_id, until in rows:
+            # В личных чатах chat_id совпадает с Telegram ID пользователя
+            if until and until > now:
+                self.start_quiet_mode(telegram_id, user_id, until)
+            else:
+                # Окно истекло, пока бот был выключен
+                self.scheduler.add_job(self.end_quiet_mode, args=[telegram_id, user_id],
+                                       id=f"quiet_end_{telegram_id}", replace_existing=True)
+        if rows:
+            logger.info(f"Restored {len(rows)} quiet mode windows")
+    
     def cancel_job(self, job_id: str):
         """Cancel a scheduled job"""
         try:
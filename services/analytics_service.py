@@ -0,0 +1,55 @@
+"""Analytics service - energy and productivity trends for /stats"""
+from typing import Optional
+
+import numpy as np
+
+from analytics import TrendReport, get_trends
+from config import STATS_HISTORY_DAYS
+from translations import translate
+
+
+class AnalyticsService:
+    """Service for history-based trends"""
+
+    @staticmethod
+    async def get_trends(user_id: int, days: int = STATS_HISTORY_DAYS) -> TrendReport:
+        """Get trends over the last `days` days"""
+        return await get_trends(user_id, days)
+
+    @staticmethod
+    async def best_weekday(report: TrendReport) -> Optional[int]:
+        """Weekday (0 = Monday) with the highest average energy"""
+        profile = report.weekday_energy
+        return None if np.isnan(profile).all() else int(np.nanargmax(profile))
+
+    @staticmethod
+    async def format_report(report: TrendReport, lang: str, days: int = STATS_HISTORY_DAYS) -> str:
+        """Format trends message"""
+        if report.days_tracked == 0 and report.plan_completion is None:
+            return translate("stats_empty", lang)
+
+        text = translate("stats_title", lang, days=days) + "\n\n"
+        if report.energy_avg is not None:
+            week = f"{report.energy_week:.0f}%" if report.energy_week is not None else "—"
+            text += translate("stats_energy", lang, avg=round(report.energy_avg), week=week,
+                              count=report.days_tracked) + "\n"
+        if report.energy_trend is not None and abs(report.energy_trend) >= 1:
+            arrow = "↗️" if report.energy_trend > 0 else "↘️"
+            text += translate("stats_energy_trend", lang, arrow=arrow, change=f"{report.energy_trend:+.0f}") + "\n"
+
+        profile = report.weekday_energy
+        if (~np.isnan(profile)).sum() >= 2:
+            weekdays = translate("weekdays_short", lang).split(",")
+            best = await AnalyticsService.best_weekday(report)
+            text += translate("stats_weekdays", lang, best=weekdays[best],
+                              worst=weekdays[int(np.nanargmin(profile))]) + "\n"
+
+        if report.plan_completion is not None:
+            text += "\n" + translate("stats_plan", lang, rate=round(report.plan_completion * 100)) + "\n"
+        if report.energy_plan_correlation is not None:
+            key = "stats_energy_plan_linked" if report.energy_plan_correlation >= 0.3 else "stats_energy_plan_unlinked"
+            text += translate(key, lang, r=f"{report.energy_plan_correlation:.2f}") + "\n"
+        if report.pomodoro_ratio is not None:
+            text += translate("stats_pomodoros", lang, ratio=round(report.pomodoro_ratio * 100),
+                              on_target=round(report.pomodoro_on_target * 100)) + "\n"
+        return text.rstrip()
@@ -2,10 +2,10 @@
 from datetime import datetime
 from typing import List, Optional
 from db_helpers import (
-    create_reminder, get_all_reminders, delete_reminder,
-    complete_reminder, get_user_language_code
+    create_reminder, get_all_reminders, get_reminders_page, delete_reminder,
+    complete_reminder, get_user_language_code, Page
 )
-from bot import scheduler
+from app import get_scheduler
 
 
 class ReminderService:
@@ -20,9 +20,8 @@ class ReminderService:
         # Get user language for reminder messages
         lang = await get_user_language_code(user_id)
         
-        # Schedule - import from bot to avoid circular import
-        from bot import scheduler
-        await scheduler.add_reminder(chat_id, text, when, lang)
+        # Schedule
+        await get_scheduler().add_reminder(chat_id, text, when, lang)
         
         return reminder
     
@@ -31,6 +30,11 @@ class ReminderService:
         """Get all reminders"""
         return await get_all_reminders(user_id, completed=completed, limit=limit)
     
+    @staticmethod
+    async def page(user_id: int, after: tuple = None, before: tuple = None) -> Page:
+        """Get one page of active reminders"""
+        return await get_reminders_page(user_id, after=after, before=before)
+    
     @staticmethod
     async def delete(reminder_id: int, user_id: int) -> bool:
         """Delete reminder"""
@@ -0,0 +1,37 @@
+"""Shared fixtures"""
+import os
+import runpy
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import Dispatcher
+
+BOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot.py")
+
+
+@pytest.fixture
+def bot_main(monkeypatch):
+    """
+    Run bot.py the way the Procfile does (as __main__) up to polling.
+
+    Returns the dispatcher main() would poll and the __main__ globals. The
+    scheduler is a stub, polling returns at once.
+    """
+    import ai_functions
+    import app
+
+    scheduler = MagicMock(load_quiet_modes=AsyncMock(), add_reminder=AsyncMock())
+    monkeypatch.setattr(app, "_scheduler", scheduler)
+    monkeypatch.setattr(ai_functions, "function_handler", None)
+    polled = []
+
+    async def start_polling(self, *bots, **kwargs):
+        polled.append(self)
+
+    monkeypatch.setattr(Dispatcher, "start_polling", start_polling)
+    imported_bot = sys.modules.get("bot")
+    namespace = runpy.run_path(BOT_PATH, run_name="__main__")
+    assert sys.modules.get("bot") is imported_bot, "bot.py was imported a second time as module 'bot'"
+    [dp] = polled
+    return dp, namespace
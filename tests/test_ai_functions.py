@@ -82,3 +82,22 @@ async def test_break_down_task(function_handler):
     assert "steps" in result
     assert len(result["steps"]) == 3
 
+
+
+@pytest.mark.asyncio
+async def test_parse_time_uses_user_timezone(function_handler):
+    """'завтра в 15:00' is 15:00 on the user's clock, not in the default timezone"""
+    from database import init_db
+    from db_helpers import get_or_create_user
+    from user_time import set_user_timezone
+    await init_db()
+    user = await get_or_create_user(880002, "ny_user", "NY")
+    await set_user_timezone(user.id, "America/New_York")
+
+    result = await function_handler.handle_function_call(
+        "parse_time_ru", {"text": "завтра в 15:00"}, user.id, 880002
+    )
+
+    assert result["success"]
+    parsed = datetime.fromisoformat(result["parsed_date"]).astimezone(pytz.timezone("America/New_York"))
+    assert (parsed.hour, parsed.minute) == (15, 0)
@@ -0,0 +1,134 @@
+"""Tests for AI provider pool (hedging, failover, circuit breaker)"""
+import asyncio
+import pytest
+
+from ai_provider_pool import ProviderPool, ProviderStats
+
+
+def make_request(delays, errors=()):
+    """Fake provider request: sleeps per provider, fails for providers in errors"""
+    calls = []
+
+    async def request(provider):
+        calls.append(provider)
+        await asyncio.sleep(delays[provider])
+        if provider in errors:
+            raise RuntimeError(f"{provider} down")
+        return provider
+
+    return request, calls
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_when_primary_is_slow():
+    """A request slower than the budget is hedged to the other provider"""
+    pool = ProviderPool(["openai", "claude"], min_delay=0.05, max_delay=0.05)
+    request, calls = make_request({"openai": 1.0, "claude": 0.01})
+
+    result = await asyncio.wait_for(pool.call(request), timeout=0.5)
+
+    assert result == "claude"
+    assert calls == ["openai", "claude"]
+    assert pool.hedges == 1 and pool.hedges_won == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    pool = ProviderPool(["openai", "claude"], min_delay=0.2, max_delay=0.2)
+    request, calls = make_request({"openai": 0.01, "claude": 0.01})
+
+    assert await pool.call(request) == "openai"
+    assert calls == ["openai"]
+    assert pool.stats["openai"].latency_ewma is not None
+
+
+@pytest.mark.asyncio
+async def test_failover_on_error():
+    pool = ProviderPool(["openai", "claude"], hedging=False)
+    request, calls = make_request({"openai": 0, "claude": 0}, errors={"openai"})
+
+    assert await pool.call(request) == "claude"
+    assert calls == ["openai", "claude"]
+    assert pool.stats["openai"].consecutive_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_skips_failing_provider():
+    """After repeated errors the provider is not tried until the cooldown passes"""
+    pool = ProviderPool(["openai", "claude"], hedging=False, failure_threshold=2, cooldown=60)
+    request, calls = make_request({"openai": 0, "claude": 0}, errors={"openai"})
+
+    await pool.call(request)
+    await pool.call(request)
+    calls.clear()
+    await pool.call(request)
+
+    assert pool.stats["openai"].state == "open"
+    assert calls == ["claude"]
+
+
+def test_unmeasured_providers_are_explored_first():
+    pool = ProviderPool(["openai", "claude", "gemini"])
+    assert pool.ranked() == ["openai", "claude", "gemini"]  # без замеров - порядок объявления
+    pool.stats["openai"].record_success(0.5)
+    assert pool.ranked() == ["claude", "gemini", "openai"]  # сначала получить замер остальных
+    pool.stats["claude"].record_success(2.0)
+    pool.stats["gemini"].record_success(1.0)
+    assert pool.ranked() == ["openai", "gemini", "claude"]
+
+
+@pytest.mark.asyncio
+async def test_ranking_does_not_spend_half_open_trial():
+    """Only the provider that actually gets the request takes the half-open trial"""
+    pool = ProviderPool(["openai", "claude"], hedging=False, failure_threshold=1, cooldown=60)
+    pool.stats["openai"].record_failure()
+    pool.stats["openai"].opened_at -= 60  # cooldown прошёл
+    pool.stats["claude"].record_success(0.01)
+    pool.stats["openai"].latency_ewma = 1.0  # claude быстрее и идёт первым
+    request, calls = make_request({"openai": 0, "claude": 0})
+
+    assert pool.ranked() == ["claude", "openai"]
+    assert await pool.call(request) == "claude"
+    assert await pool.failover(request) == "claude"
+    assert pool.stats["openai"].state == "half_open"
+
+    pool.stats["claude"].record_failure()  # claude закрыт на cooldown
+    assert await pool.call(request) == "openai"
+    assert calls == ["claude", "claude", "openai"]
+
+
+@pytest.mark.asyncio
+async def test_losing_hedge_is_awaited():
+    """The cancelled request has finished its cleanup by the time call() returns"""
+    pool = ProviderPool(["openai", "claude"], min_delay=0.05, max_delay=0.05)
+    cleaned = []
+
+    async def request(provider):
+        try:
+            await asyncio.sleep(1.0 if provider == "openai" else 0.01)
+            return provider
+        finally:
+            cleaned.append(provider)
+
+    assert await pool.call(request) == "claude"
+    assert sorted(cleaned) == ["claude", "openai"]
+
+
+@pytest.mark.asyncio
+async def test_stream_failover_stops_after_first_delta():
+    """Streams fail over only while nothing was shown to the user"""
+    pool = ProviderPool(["openai", "claude"])
+    request, calls = make_request({"openai": 0, "claude": 0}, errors={"openai"})
+
+    with pytest.raises(RuntimeError):
+        await pool.failover(request, can_retry=lambda: False)
+    assert calls == ["openai"]
+
+
+def test_ewma_p95_tracks_latency_spread():
+    stats = ProviderStats("openai")
+    for latency in [1.0, 1.2, 0.8, 1.1, 0.9] * 10:
+        stats.observe_latency(latency)
+
+    assert 0.9 < stats.latency_ewma < 1.1
+    assert stats.p95 > stats.latency_ewma
@@ -0,0 +1,211 @@
+"""Tests for AI service (stub clients, no real API)"""
+import os
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from ai_service import AIService
+from ai_provider_pool import ProviderPool
+from ai_usage import RequestUsage, UsageTracker
+from prompts import build_openai_messages, build_claude_request
+from utils.message_stream import ThrottledMessageEditor
+
+
+class StubStream:
+    """Async iterator over recorded stream chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def openai_chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def tool_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def make_service(provider):
+    service = AIService.__new__(AIService)
+    service.pool = ProviderPool([provider], hedging=False)
+    service.memory = None
+    service.openai_client = MagicMock()
+    service.claude_client = MagicMock()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_stream_openai_text_deltas():
+    """Text deltas are accumulated and reported progressively"""
+    service = make_service('openai')
+    service.openai_client.chat.completions.create = AsyncMock(return_value=StubStream([
+        openai_chunk("Ты не "), openai_chunk("лентяй"), openai_chunk(" 💛"),
+    ]))
+    seen = []
+
+    async def on_delta(text):
+        seen.append(text)
+
+    result = await service.process_message_stream("привет", 1, None, on_delta=on_delta)
+
+    assert result == "Ты не лентяй 💛"
+    assert seen == ["Ты не ", "Ты не лентяй", "Ты не лентяй 💛"]
+
+
+@pytest.mark.asyncio
+async def test_stream_openai_tool_call_deltas_dispatched():
+    """Fragmented tool call arguments are assembled per index and dispatched"""
+    service = make_service('openai')
+    service.openai_client.chat.completions.create = AsyncMock(return_value=StubStream([
+        openai_chunk(tool_calls=[tool_delta(0, id="call_a", name="add_note", arguments='{"te')]),
+        openai_chunk(tool_calls=[tool_delta(1, id="call_b", name="add_note", arguments='{"text": "хлеб"}')]),
+        openai_chunk(tool_calls=[tool_delta(0, arguments='xt": "молоко"}')]),
+    ]))
+    handler = MagicMock()
+    handler.handle_function_call = AsyncMock(side_effect=[
+        {"success": True, "message": "✅ молоко"},
+        {"success": True, "message": "✅ хлеб"},
+    ])
+
+    with patch('ai_functions.function_handler', handler), \
+            patch('identity.resolve_user_id', AsyncMock(return_value=15)):
+        result = await service.process_message_stream("запиши молоко и хлеб", 42)
+
+    calls = handler.handle_function_call.call_args_list
+    assert [c.args[:2] for c in calls] == [
+        ("add_note", {"text": "молоко"}),
+        ("add_note", {"text": "хлеб"}),
+    ]
+    assert result == "✅ молоко\n✅ хлеб"
+
+
+@pytest.mark.asyncio
+async def test_stream_claude_text_deltas():
+    """Claude text_delta events are accumulated"""
+    service = make_service('claude')
+    events = [
+        SimpleNamespace(type="message_start"),
+        SimpleNamespace(type="content_block_start", index=0, content_block=SimpleNamespace(type="text")),
+        SimpleNamespace(type="content_block_delta", index=0, delta=SimpleNamespace(type="text_delta", text="Привет")),
+        SimpleNamespace(type="content_block_delta", index=0, delta=SimpleNamespace(type="text_delta", text="!")),
+        SimpleNamespace(type="message_stop"),
+    ]
+    service.claude_client.messages.create = AsyncMock(return_value=StubStream(events))
+
+    result = await service.process_message_stream("привет", 1)
+
+    assert result == "Привет!"
+
+
+@pytest.mark.asyncio
+async def test_claude_tool_use_single_round_trip():
+    """Recorded Claude tool_use response is dispatched without a second model call"""
+    service = make_service('claude')
+    recorded = SimpleNamespace(
+        content=[
+            SimpleNamespace(type="text", text="Записываю"),
+            SimpleNamespace(type="tool_use", id="toolu_1", name="add_note", input={"text": "купить молоко"}),
+        ],
+        usage=SimpleNamespace(input_tokens=30, cache_read_input_tokens=1200,
+                              cache_creation_input_tokens=0, output_tokens=40),
+        stop_reason="tool_use"
+    )
+    service.claude_client.messages.create = AsyncMock(return_value=recorded)
+    handler = MagicMock()
+    handler.handle_function_call = AsyncMock(return_value={"success": True, "message": "✅ Заметка сохранена: купить молоко"})
+
+    with patch('ai_functions.function_handler', handler), \
+            patch('identity.resolve_user_id', AsyncMock(return_value=15)) as resolve:
+        result = await service.process_message("запиши купить молоко", 7)
+
+    assert result == "✅ Заметка сохранена: купить молоко"
+    assert service.claude_client.messages.create.await_count == 1
+    tools = service.claude_client.messages.create.call_args.kwargs["tools"]
+    assert {t["name"] for t in tools} >= {"add_note", "create_reminder"}
+    assert all("input_schema" in t and "parameters" not in t for t in tools)
+    # Обработчику - users.id и Telegram ID (chat_id), а не один ID дважды
+    resolve.assert_awaited_once_with(7)
+    handler.handle_function_call.assert_awaited_once_with("add_note", {"text": "купить молоко"}, 15, 7)
+
+
+@pytest.mark.asyncio
+async def test_throttled_editor_drops_fast_updates():
+    """Only throttled intermediate edits are sent, final text always lands"""
+    message = MagicMock()
+    message.text = "💭 ..."
+    message.edit_text = AsyncMock()
+    editor = ThrottledMessageEditor(message, min_interval=60, min_delta_chars=1)
+
+    for i in range(1, 50):
+        await editor.update("x" * i)
+    await editor.finish("готово")
+
+    sent = [c.args[0] for c in message.edit_text.call_args_list]
+    assert len(sent) == 2
+    assert sent[-1] == "готово"
+
+
+def test_prompt_prefix_stable_and_date_injected_per_request():
+    """Static prefix is identical across days, only the date block changes"""
+    day1 = build_openai_messages("привет", today=date(2025, 1, 1))
+    day2 = build_openai_messages("привет", 20, today=date(2025, 1, 2))
+
+    assert day1[:5] == day2[:5]
+    assert "2025" not in day1[0]["content"]
+    assert "01.01.2025" in day1[5]["content"]
+    assert "02.01.2025" in day2[5]["content"]
+    assert day2[-1] == {"role": "user", "content": "привет"}
+    assert len(day2) == len(day1) + 1  # low energy context
+
+
+def test_claude_request_marks_static_system_for_caching():
+    """Static system prompt carries cache_control, dynamic blocks follow it"""
+    system, messages = build_claude_request("привет", today=date(2025, 1, 1))
+
+    assert system[0]["cache_control"] == {"type": "ephemeral"}
+    assert all("cache_control" not in block for block in system[1:])
+    assert "01.01.2025" in system[1]["text"]
+    assert all(m["role"] != "system" for m in messages)
+
+
+def test_usage_accounting_reports_cache_saving():
+    """Cached prompt tokens are billed cheaper and the saving is tracked"""
+    usage = SimpleNamespace(
+        input_tokens=100, cache_read_input_tokens=1000,
+        cache_creation_input_tokens=0, output_tokens=50
+    )
+    tracker = UsageTracker()
+    tracker.record(RequestUsage.from_anthropic("claude-3-haiku-20240307", usage))
+
+    summary = tracker.summary()
+    assert summary["cached_tokens"] == 1000
+    assert summary["saved_usd"] == pytest.approx(1000 * (0.25 - 0.03) / 1_000_000)
+    assert summary["cost_usd"] < tracker.last.uncached_cost
+
+
+def test_clients_created_on_first_use(monkeypatch):
+    """SDK clients are built lazily, once, with the keys read at construction"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-lazy")
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    service = AIService()
+    assert service.pool.providers == ['openai']
+    assert 'openai_client' not in vars(service)
+
+    client = service.openai_client
+    assert client is service.openai_client
+    assert client.api_key == "sk-lazy"
+    assert service.claude_client is None
@@ -0,0 +1,97 @@
+"""Tests for vectorized energy and productivity trends"""
+import numpy as np
+import pytest
+from sqlalchemy import delete
+
+from analytics import (
+    calendar_series, correlation, day_keys_to_dates, get_trends, history_from_rows, rolling_mean, trend_report,
+    weekday_profile
+)
+from database import async_session, init_db, DailyRollup
+from db_helpers import get_or_create_user
+from services.analytics_service import AnalyticsService
+from user_time import shift_day, user_local_day
+
+
+def test_day_keys_to_dates():
+    keys = np.array([20240101, 20240229, 20261019])
+    assert day_keys_to_dates(keys).tolist() == [
+        np.datetime64('2024-01-01', 'D').item(), np.datetime64('2024-02-29', 'D').item(),
+        np.datetime64('2026-10-19', 'D').item(),
+    ]
+
+
+def test_rolling_mean_skips_missing_days():
+    series = np.array([40, np.nan, 80, np.nan, np.nan, np.nan, np.nan, np.nan, 60])
+    rolling = rolling_mean(series, 3)
+    assert rolling[0] == 40 and rolling[2] == 60  # (40 + 80) / 2
+    assert np.isnan(rolling[5]) and rolling[8] == 60
+
+
+def test_weekday_profile_and_calendar():
+    days = day_keys_to_dates([20241014, 20241015, 20241021])  # пн, вт, пн
+    energy = np.array([40.0, 80.0, 60.0])
+    profile = weekday_profile(days, energy)
+    assert profile[0] == 50 and profile[1] == 80 and np.isnan(profile[6])
+    series = calendar_series(days, energy, days[0], days[-1])
+    assert len(series) == 8 and series[7] == 60 and np.isnan(series[3])
+
+
+def test_correlation_needs_points_and_variance():
+    x = np.array([40, 60, 80, 40, 80, np.nan])
+    assert correlation(x, x * 0.01) == pytest.approx(1.0)
+    assert correlation(x, np.full(6, 0.5)) is None
+    assert correlation(x[:3], x[:3]) is None
+
+
+def test_trend_report_matches_loops():
+    """Vectorized metrics agree with a plain per-day computation"""
+    rng = np.random.default_rng(48)
+    rows = []
+    for offset in range(120):
+        key = int(str(np.datetime64('2024-03-01') + offset).replace('-', ''))
+        energy = int(rng.choice([40, 60, 80]))
+        total = int(rng.integers(0, 5))
+        estimated = int(rng.integers(0, 6)) or None
+        rows.append((key, energy, 1, total, int(rng.integers(0, total + 1)), estimated,
+                     int(rng.integers(0, 6)) if estimated else None, None))
+    report = trend_report(history_from_rows(rows))
+
+    energies = [row[1] for row in rows]
+    assert report.energy_avg == pytest.approx(sum(energies) / len(energies))
+    assert report.energy_week == pytest.approx(sum(energies[-7:]) / 7)
+    done, total = sum(row[4] for row in rows), sum(row[3] for row in rows)
+    assert report.plan_completion == pytest.approx(done / total)
+    ratios = sorted(row[6] / row[5] for row in rows if row[5])
+    assert report.pomodoro_ratio == pytest.approx(float(np.median(ratios)))
+    assert report.pomodoro_on_target == pytest.approx(sum(abs(r - 1) <= 0.25 for r in ratios) / len(ratios))
+
+
+def test_empty_history():
+    report = trend_report(history_from_rows([]))
+    assert report.days_tracked == 0 and report.energy_avg is None and report.plan_completion is None
+
+
+@pytest.mark.asyncio
+async def test_get_trends_and_format():
+    """Trends come from daily_rollups; /stats text renders them"""
+    await init_db()
+    user = await get_or_create_user(777490, "tester", "Test User", "ru")
+    today = await user_local_day(user.id)
+    async with async_session() as session:
+        await session.execute(delete(DailyRollup).where(DailyRollup.user_id == user.id))
+        session.add_all([
+            DailyRollup(user_id=user.id, local_day=shift_day(today, -offset), energy_sum=level, energy_count=1,
+                        plan_total=4, plan_done=level // 20, estimated_pomodoros=4, completed_pomodoros=4)
+            for offset, level in enumerate([80, 40, 60, 80, 40, 60, 80, 40, 60, 80])
+        ])
+        await session.commit()
+
+    report = await AnalyticsService.get_trends(user.id, days=30)
+    assert report.days_tracked == 10
+    assert report.energy_plan_correlation == pytest.approx(1.0)
+    assert report.pomodoro_on_target == 1.0
+    text = await AnalyticsService.format_report(report, 'ru', days=30)
+    assert "30 дней" in text and "помидоров" in text
+
+    assert (await get_trends(user.id, days=1)).days_tracked == 1
@@ -0,0 +1,108 @@
+"""Tests for main menu button dispatch and filter profiling"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram import Dispatcher
+from aiogram.filters import Command
+
+from buttons import Button, ButtonRouter, button_texts
+from keyboards import get_main_keyboard
+from translations import TRANSLATIONS
+from utils.filter_profiler import FilterProfiler
+
+
+def make_router(*buttons):
+    router = ButtonRouter()
+    calls = []
+
+    for button in buttons:
+        @router.handler(button)
+        async def handler(message, state, button=button):
+            calls.append((button, message.text, state))
+
+    router.build()
+    return router, calls
+
+
+async def test_table_covers_main_keyboard_and_languages():
+    router, _ = make_router(*[value for name, value in vars(Button).items() if name.isupper()])
+    for row in get_main_keyboard("ru").keyboard:
+        for button in row:
+            assert await router.match(MagicMock(text=button.text))
+    assert await router.match(MagicMock(text=TRANSLATIONS[Button.PLAN]["en"])) == {"button": Button.PLAN}
+    # Без эмодзи тоже кнопка (так проверяли старые фильтры)
+    assert "Главная цель" in button_texts(Button.GOAL)
+
+
+async def test_free_text_is_not_a_button():
+    router, _ = make_router(Button.PLAN, Button.FOCUS)
+    for text in ("Какой у меня план на завтра?", "📋 План на неделю", "", None):
+        assert await router.match(MagicMock(text=text)) is False
+
+
+async def test_dispatch_passes_state():
+    router, calls = make_router(Button.NOTES)
+    message = MagicMock(text="📝 Заметки")
+    state = object()
+    kwargs = await router.match(message)
+    await router.dispatch(message, state, **kwargs)
+    assert calls == [(Button.NOTES, "📝 Заметки", state)]
+
+
+def test_build_rejects_shared_text(monkeypatch):
+    monkeypatch.setitem(TRANSLATIONS, "menu_test_dup", {"en": "📋 Plan"})
+    router = ButtonRouter()
+    router.handler(Button.PLAN, "menu_test_dup")(MagicMock())
+    with pytest.raises(ValueError):
+        router.build()
+
+
+def test_router_rejects_duplicate_button():
+    router = ButtonRouter()
+
+    async def cmd_plan(message):
+        pass
+
+    router.handler(Button.PLAN)(cmd_plan)
+    with pytest.raises(ValueError, match="cmd_plan"):
+        router.handler(Button.PLAN)(cmd_plan)
+
+
+async def test_bot_main_buttons_use_main_state(bot_main):
+    """Under `python bot.py` menu buttons run __main__'s handlers and see its timers"""
+    dp, namespace = bot_main
+    router = dp["button_router"]
+    message = MagicMock(text=TRANSLATIONS[Button.FOCUS]["ru"])
+    message.from_user.id = 777601
+    message.answer = AsyncMock()
+    namespace["active_pomodoros"][777601] = True  # таймер уже идёт
+    try:
+        await router.dispatch(message, MagicMock(), **await router.match(message))
+    finally:
+        del namespace["active_pomodoros"][777601]
+
+    assert router._handlers[Button.FOCUS][0] is namespace["cmd_focus"]
+    assert "уже есть активный таймер" in message.answer.await_args.args[0]
+
+
+async def test_filter_profiler_counts_calls_and_matches():
+    dp = Dispatcher()
+
+    async def handler(message):
+        pass
+
+    dp.message.register(handler, Command("start"))
+    dp.message.register(handler, lambda m: m.text == "b")
+    profiler = FilterProfiler()
+    assert profiler.instrument(dp) == 2
+    assert profiler.instrument(dp) == 0  # повторно не оборачивает
+
+    lambda_filter = dp.message.handlers[1].filters[0]
+    for text in ("a", "b", "b", "/start"):
+        await lambda_filter.call(MagicMock(text=text))
+
+    assert len(profiler.stats) == 2
+    lambda_stats = next(s for s in profiler.stats.values() if "lambda@test_buttons.py" in s.name)
+    assert lambda_stats.calls == 4 and lambda_stats.matches == 2
+    assert lambda_stats.match_rate == 0.5
+    assert "lambda@test_buttons.py" in profiler.report()
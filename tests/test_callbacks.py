@@ -0,0 +1,86 @@
+"""Tests for callback data codec and dispatch"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from callbacks import Action, CallbackRouter, pack, unpack
+
+
+def test_pack_unpack_roundtrip():
+    assert pack(Action.REMINDER_DONE, 95) == "1rd:2n"
+    assert unpack("1rd:2n") == (Action.REMINDER_DONE, (95,))
+    assert unpack(pack(Action.PLAN_NEXT, "4x.1b")) == (Action.PLAN_NEXT, ("4x.1b",))
+    assert unpack(pack(Action.GOAL_DONE)) == (Action.GOAL_DONE, ())
+    # Неверное число аргументов или неизвестное действие
+    assert unpack("1rd") is None
+    assert unpack("1zz") is None
+    assert unpack("2rd:1") is None
+
+
+@pytest.mark.parametrize("data, expected", [
+    ("pomodoro_continue", (Action.POMODORO_CONTINUE, ())),
+    ("quick_quiet", (Action.QUICK_QUIET, ())),
+    ("rem_95_done", (Action.REMINDER_DONE, (95,))),
+    ("rem_95_delete_confirm", (Action.REMINDER_DELETE_CONFIRM, (95,))),
+    ("rem_95_delete", (Action.REMINDER_DELETE, (95,))),
+    ("plan_7_done", (Action.PLAN_DONE, (7,))),
+    ("rem_view_12", (Action.REMINDER_VIEW, (12,))),
+    ("rem_list_0", (Action.REMINDER_LIST, ())),
+    ("rem_list_n_abc.1", (Action.REMINDER_NEXT, ("abc.1",))),
+    ("plan_list", (Action.PLAN_LIST, ())),
+    ("plan_list_p_3.9", (Action.PLAN_PREV, ("3.9",))),
+    ("something_else", None),
+])
+def test_legacy_callback_data(data, expected):
+    """Buttons sent before the versioned format still resolve to the right action"""
+    assert unpack(data) == expected
+
+
+@pytest.mark.asyncio
+async def test_router_dispatches_by_action():
+    router = CallbackRouter()
+    calls = []
+
+    @router.handler(Action.PLAN_DONE)
+    async def plan_done(callback, item_id):
+        calls.append(("done", item_id))
+
+    @router.handler(Action.QUICK_GOAL, Action.QUICK_PLAN)
+    async def quick(callback, state, action):
+        calls.append((action, state))
+
+    callback = MagicMock()
+    callback.answer = AsyncMock()
+    state = object()
+    for data in ("1pd:a", "plan_3_done", "1qp", "1rd:1"):
+        callback.data = data
+        await router.dispatch(callback, state)
+
+    assert calls == [("done", 10), ("done", 3), (Action.QUICK_PLAN, state)]
+    callback.answer.assert_awaited_once()  # кнопка без обработчика только гасит «часики»
+
+
+def test_router_rejects_duplicate_action():
+    router = CallbackRouter()
+
+    async def plan_done(callback, item_id):
+        pass
+
+    router.handler(Action.PLAN_DONE)(plan_done)
+    with pytest.raises(ValueError, match="plan_done"):
+        router.handler(Action.PLAN_LIST, Action.PLAN_DONE)(plan_done)
+
+
+async def test_bot_main_dispatches_to_its_own_handlers(bot_main):
+    """Under `python bot.py` the polled dispatcher runs __main__'s handlers and their state"""
+    dp, namespace = bot_main
+    router = dp["callback_router"]
+    assert router._handlers[Action.POMODORO_STOP][0] is namespace["pomodoro_stop"]
+
+    namespace["active_pomodoros"][777600] = True  # таймер, запущенный /focus
+    callback = MagicMock(data=pack(Action.POMODORO_STOP))
+    callback.from_user.id = 777600
+    callback.answer = AsyncMock()
+    callback.message.edit_text = AsyncMock()
+    await router.dispatch(callback, MagicMock())
+
+    assert 777600 not in namespace["active_pomodoros"]
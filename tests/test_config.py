@@ -23,3 +23,23 @@ def test_database_url_format():
     # Should be valid SQLAlchemy URL
     assert "://" in DATABASE_URL
 
+
+
+def test_validate_config_requires_token(monkeypatch):
+    """Missing settings fail on app startup, not on import"""
+    import config
+    config.validate_config()
+    monkeypatch.setattr(config, "BOT_TOKEN", None)
+    with pytest.raises(ValueError):
+        config.validate_config()
+
+
+def test_services_import_without_bot_and_ai_sdks():
+    """Services and AI service do not pull in bot.py handlers or provider SDKs"""
+    import subprocess
+    import sys
+    code = ("import sys, ai_service, services.reminder_service; "
+            "print(sorted({'bot', 'openai', 'anthropic'} & set(sys.modules)))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
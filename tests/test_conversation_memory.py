@@ -0,0 +1,69 @@
+"""Tests for per-user conversation memory"""
+import pytest
+
+from conversation_memory import DialogMemory, MemoryStore, estimate_tokens
+from database import init_db
+
+
+def test_ring_buffer_folds_oldest_turns_into_summary():
+    memory = DialogMemory(max_turns=4, token_budget=10_000, summary_tokens=10_000)
+    for i in range(4):
+        memory.add_exchange(f"вопрос {i}", f"ответ {i}")
+
+    assert [t["content"] for t in memory.history()] == ["вопрос 2", "ответ 2", "вопрос 3", "ответ 3"]
+    assert memory.history()[0]["role"] == "user"
+    assert "Пользователь: вопрос 0" in memory.summary
+    assert "Ты: ответ 1" in memory.summary
+
+
+def test_token_budget_bounds_memory():
+    memory = DialogMemory(max_turns=50, token_budget=200, summary_tokens=60)
+    for i in range(30):
+        memory.add_exchange("расскажи " + "очень " * 20 + str(i), "конечно " * 20)
+
+    assert memory.tokens <= 200
+    assert estimate_tokens(memory.summary) <= 60
+    assert memory.history()[-1]["role"] == "assistant"
+    assert memory.history()[0]["role"] == "user"
+
+
+@pytest.mark.asyncio
+async def test_store_persists_and_caps_process_cache():
+    await init_db()
+    store = MemoryStore(max_users=2)
+    memory = await store.get(900001)
+    memory.add_exchange("меня зовут Аня", "Приятно познакомиться, Аня 💛")
+    await store.save(900001, memory)
+    await store.get(900002)
+    await store.get(900003)
+
+    assert len(store._cache) == 2
+    assert 900001 not in store._cache
+
+    reloaded = await store.get(900001)
+    assert reloaded.history()[0]["content"] == "меня зовут Аня"
+    assert store.misses == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_saves_do_not_lose_memory():
+    """Two first saves of one user (or a save after eviction) update the row instead of failing"""
+    import asyncio
+    from sqlalchemy import delete
+    from database import async_session, ConversationMemory
+
+    await init_db()
+    async with async_session() as session:
+        await session.execute(delete(ConversationMemory).where(ConversationMemory.user_id == 900010))
+        await session.commit()
+    first, second = DialogMemory(), DialogMemory()
+    first.add_exchange("первое", "ок")
+    second.add_exchange("второе", "ок")
+    await asyncio.gather(MemoryStore().save(900010, first), MemoryStore().save(900010, second))
+
+    store = MemoryStore(max_users=1)
+    third = DialogMemory()
+    third.add_exchange("третье", "ок")
+    await store.save(900010, third)
+    await store.get(900011)  # 900010 вытеснен из кэша
+    assert (await store.get(900010)).history()[0]["content"] == "третье"
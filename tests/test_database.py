@@ -103,3 +103,186 @@ async def test_delete_notes():
     notes = await get_user_notes(user.id)
     assert len(notes) == 0
 
+
+
+@pytest.mark.asyncio
+async def test_reminders_keyset_pages():
+    """Pages follow cursors from callback_data both ways, ties on time included"""
+    from sqlalchemy import delete
+    from database import async_session, init_db
+    from db_helpers import get_reminders_page
+    from keyboards import get_reminders_list_keyboard
+    from callbacks import Action, unpack
+    from utils.pagination import decode_cursor
+    await init_db()
+    async with async_session() as session:
+        await session.execute(delete(Reminder).where(Reminder.user_id == 777001))
+        await session.commit()
+    base = datetime(2030, 1, 1, 9, 0, 0, 123456)
+    for i in range(12):
+        await create_reminder(777001, f"r{i}", base + timedelta(hours=i // 2))  # по два на одно время
+
+    def follow(page, arrow):
+        keyboard = get_reminders_list_keyboard(page.items, page.has_prev, page.has_next)
+        data = next(b.callback_data for row in keyboard.inline_keyboard for b in row if b.text == arrow)
+        action, (cursor,) = unpack(data)
+        key = decode_cursor(cursor, datetime, int)
+        if action == Action.REMINDER_NEXT:
+            return get_reminders_page(777001, after=key, page_size=5)
+        return get_reminders_page(777001, before=key, page_size=5)
+
+    seen = []
+    page = await get_reminders_page(777001, page_size=5)
+    assert page.total == 12 and not page.has_prev
+    while True:
+        seen += [r.text for r in page.items]
+        if not page.has_next:
+            break
+        page = await follow(page, "➡️")
+    assert seen == [f"r{i}" for i in range(12)]
+
+    page = await follow(page, "⬅️")
+    assert [r.text for r in page.items] == [f"r{i}" for i in range(5, 10)]
+    assert page.has_prev and page.has_next
+
+
+@pytest.mark.asyncio
+async def test_sqlite_connections_tuned(tmp_path):
+    """Every new SQLite connection gets WAL and the configured PRAGMAs"""
+    from database import tune_sqlite
+    from config import SQLITE_BUSY_TIMEOUT_MS
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}")
+    tune_sqlite(engine)
+    async with engine.connect() as conn:
+        assert (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+        assert (await conn.exec_driver_sql("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar() == SQLITE_BUSY_TIMEOUT_MS
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_group_commit_batches_concurrent_writes(tmp_path):
+    """Concurrent writes share transactions; a failing write fails alone"""
+    from utils.group_commit import GroupCommitWriter
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'writes.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    writer = GroupCommitWriter(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+
+    def add_note(text):
+        async def write(session):
+            note = Note(user_id=1, text=text)
+            session.add(note)
+            await session.flush()
+            return note
+        return write
+
+    async def broken(session):
+        session.add(Note(user_id=1, text=None))  # text NOT NULL
+        await session.flush()
+
+    ops = [add_note(f"n{i}") for i in range(20)]
+    results = await asyncio.gather(*(writer.submit(op) for op in ops[:10]), writer.submit(broken),
+                                   *(writer.submit(op) for op in ops[10:]), return_exceptions=True)
+    notes = results[:10] + results[11:]
+    assert isinstance(results[10], Exception)
+    assert [n.text for n in notes] == [f"n{i}" for i in range(20)]
+    assert len({n.id for n in notes}) == 20
+
+    async with engine.connect() as conn:
+        texts = (await conn.execute(select(Note.text).order_by(Note.id))).scalars().all()
+    assert texts == [f"n{i}" for i in range(20)]
+
+    batches = writer.batches
+    await asyncio.gather(*(writer.submit(add_note(f"m{i}")) for i in range(30)))
+    assert writer.batches - batches < 30  # пачками, а не по коммиту на запись
+    await engine.dispose()
+
+
+def test_postgres_engine_options():
+    """Pool from config, no pre-ping round-trip, asyncpg statement cache"""
+    from database import engine_options
+    from config import DB_POOL_SIZE, DB_STATEMENT_CACHE_SIZE
+    from utils.pool_metrics import MeasuredQueuePool
+    options = engine_options(postgres=True)
+    assert options["poolclass"] is MeasuredQueuePool
+    assert options["pool_size"] == DB_POOL_SIZE
+    assert options["pool_pre_ping"] is False
+    assert options["connect_args"] == {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    assert engine_options(postgres=False)["pool_pre_ping"] is True
+
+
+@pytest.mark.asyncio
+async def test_retry_on_disconnect():
+    """One retry after a lost connection; other database errors are raised"""
+    from sqlalchemy.exc import DBAPIError
+    from database import retry_on_disconnect
+    calls = []
+
+    @retry_on_disconnect
+    async def query(invalidated):
+        calls.append(invalidated)
+        if len(calls) == 1:
+            raise DBAPIError("SELECT 1", {}, Exception("boom"), connection_invalidated=invalidated)
+        return "ok"
+
+    assert await query(True) == "ok"
+    assert len(calls) == 2
+    calls.clear()
+    with pytest.raises(DBAPIError):
+        await query(False)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_measured_pool_counts_checkouts(tmp_path):
+    """Every checkout is counted with its wait time"""
+    from utils.pool_metrics import MeasuredQueuePool, PoolMetrics
+    metrics = PoolMetrics()
+    pool_class = type("TestPool", (MeasuredQueuePool,), {"metrics": metrics})
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", poolclass=pool_class, pool_size=2)
+    for _ in range(3):
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+    await engine.dispose()
+    assert metrics.checkouts == 3
+    assert metrics.max_wait_seconds >= metrics.wait_seconds / 3
+    assert metrics.snapshot()["checkouts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_parallel_first_contact_one_user():
+    """50 simultaneous first messages from one user: one row, no constraint errors"""
+    from sqlalchemy import delete, func
+    from database import async_session, init_db, UserState
+    from db_helpers import get_user_state, set_quiet_mode
+    await init_db()
+    telegram_id = 777043
+    async with async_session() as session:
+        await session.execute(delete(User).where(User.telegram_id == telegram_id))
+        await session.commit()
+
+    users = await asyncio.gather(*(
+        get_or_create_user(telegram_id, "first", "First", ("ru", "es")[i % 2]) for i in range(50)
+    ))
+    assert len({user.id for user in users}) == 1
+    assert users[0].username == "first"
+    async with async_session() as session:
+        count = await session.scalar(select(func.count()).select_from(User).where(User.telegram_id == telegram_id))
+        stored = await session.scalar(select(User.language_code).where(User.telegram_id == telegram_id))
+    assert count == 1
+    assert stored in ("ru", "es")
+
+    # Язык обновляется тем же запросом; без языка - только чтение
+    assert (await get_or_create_user(telegram_id, language_code="uk")).language_code == "uk"
+    assert (await get_or_create_user(telegram_id, "other", "Other")).language_code == "uk"
+
+    user_id = users[0].id
+    async with async_session() as session:
+        await session.execute(delete(UserState).where(UserState.user_id == user_id))
+        await session.commit()
+    states = await asyncio.gather(*(get_user_state(user_id) for _ in range(50)))
+    assert len({state.id for state in states}) == 1
+    until = await set_quiet_mode(user_id, 600)
+    state = await get_user_state(user_id)
+    assert state.in_quiet_mode and state.quiet_mode_until == until
@@ -55,3 +55,59 @@ def test_past_date_rejection():
     assert past < now
     assert (now - past).total_seconds() > 0
 
+
+
+MADRID = pytz.timezone("Europe/Madrid")
+NOW = MADRID.localize(datetime(2025, 6, 1, 14, 30))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("через 10 минут", datetime(2025, 6, 1, 14, 40)),
+    ("Через 1 час 30 минут", datetime(2025, 6, 1, 16, 0)),
+    ("через полчаса", datetime(2025, 6, 1, 15, 0)),
+    ("через 2 години", datetime(2025, 6, 1, 16, 30)),
+    ("in an hour", datetime(2025, 6, 1, 15, 30)),
+    ("dentro de 10 minutos", datetime(2025, 6, 1, 14, 40)),
+    ("завтра в 15:00", datetime(2025, 6, 2, 15, 0)),
+    ("завтра о 15:00", datetime(2025, 6, 2, 15, 0)),
+    ("tomorrow at 3pm", datetime(2025, 6, 2, 15, 0)),
+    ("mañana a las 9", datetime(2025, 6, 2, 9, 0)),
+    ("в 16:30", datetime(2025, 6, 1, 16, 30)),
+    ("в 9:00", datetime(2025, 6, 2, 9, 0)),  # уже прошло сегодня - завтра
+    ("сегодня в 10:00", datetime(2025, 6, 1, 10, 0)),  # явно сегодня - не переносим
+])
+def test_fast_path_phrases(text, expected):
+    """Common phrases in all four languages are parsed without dateparser"""
+    from date_parsing import fast_spec, normalize, parse_when
+    assert fast_spec(normalize(text)) is not None
+    assert parse_when(text, "Europe/Madrid", now=NOW) == MADRID.localize(expected)
+
+
+def test_fast_path_cache_and_fallback():
+    """Repeated phrases hit the LRU cache; other forms go to dateparser"""
+    from date_parsing import fast_spec, normalize, parse_when
+    fast_spec.cache_clear()
+    parse_when("через 5 минут", "Europe/Madrid", now=NOW)
+    parse_when("Через  5 минут!", "Europe/Madrid", now=NOW)
+    assert fast_spec.cache_info().hits == 1
+
+    # Голое число и неверное время - не быстрый путь
+    assert fast_spec(normalize("15")) is None
+    assert fast_spec(normalize("в 25:00")) is None
+    parsed = parse_when("15 декабря в 10:00", "Europe/Madrid")
+    assert (parsed.month, parsed.day, parsed.hour) == (12, 15, 10)
+    assert parse_when("когда-нибудь потом", "Europe/Madrid") is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("завтра", datetime(2026, 3, 29, 23, 30)),
+    ("через 1 день", datetime(2026, 3, 29, 23, 30)),
+    ("in a week", datetime(2026, 4, 4, 23, 30)),
+    ("через 1 день и 2 часа", datetime(2026, 3, 30, 1, 30)),
+    ("через 3 часа", datetime(2026, 3, 29, 3, 30)),  # часы - абсолютные: в ночь перехода на час меньше по часам
+])
+def test_day_offsets_are_calendar_days_across_dst(text, expected):
+    """Days keep the wall-clock time over the spring-forward night; hours stay absolute"""
+    from date_parsing import parse_when
+    now = MADRID.localize(datetime(2026, 3, 28, 23, 30))
+    assert parse_when(text, "Europe/Madrid", now=now) == MADRID.localize(expected)
@@ -0,0 +1,114 @@
+"""Tests for Telegram ID <-> internal user ID resolution"""
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from database import init_db
+from db_helpers import get_or_create_user, get_reminders_page, create_reminder, set_quiet_mode
+from identity import (
+    InternalUserId, TelegramId, identities, internal_user_id, resolve_telegram_id, resolve_user, resolve_user_id
+)
+
+
+def telegram_user(telegram_id: int, language_code: str = "ru"):
+    return SimpleNamespace(id=telegram_id, username="tester", full_name="Test User", language_code=language_code)
+
+
+@pytest.mark.asyncio
+async def test_db_helpers_reject_telegram_id():
+    """A Telegram ID at the db_helpers boundary is a TypeError, not an empty result"""
+    with pytest.raises(TypeError, match="users.id"):
+        await get_reminders_page(TelegramId(123456789))
+    with pytest.raises(TypeError, match="users.id"):
+        await create_reminder(user_id=TelegramId(123456789), text="x", when_datetime=datetime.utcnow())
+    with pytest.raises(TypeError, match="Telegram ID"):
+        await get_or_create_user(InternalUserId(5))
+
+    @internal_user_id
+    async def helper(item_id: int, user_id: int):
+        return user_id
+
+    assert await helper(1, InternalUserId(5)) == 5
+    assert await helper(1, 5) == 5  # обычный int (user.id из БД) проходит
+
+
+@pytest.mark.asyncio
+async def test_resolve_user_from_memory_after_first_contact():
+    """First contact creates the user; later resolves need no database"""
+    await init_db()
+    identities.clear()
+    user = telegram_user(777044)
+    identity = await resolve_user(user)
+    assert identity.telegram_id == 777044 and identity.language_code == "ru"
+    assert isinstance(identity.id, InternalUserId)
+
+    with patch('db_helpers.get_or_create_user', AsyncMock(side_effect=AssertionError("DB lookup"))):
+        assert await resolve_user_id(user) == identity.id
+        assert await resolve_user_id(777044) == identity.id
+        assert await resolve_telegram_id(identity.id) == 777044
+
+
+@pytest.mark.asyncio
+async def test_resolve_user_updates_changed_language():
+    """A new language from Telegram goes to the database and the map"""
+    await init_db()
+    identity = await resolve_user(telegram_user(777045, "ru"))
+    updated = await resolve_user(telegram_user(777045, "es"))
+    assert updated.id == identity.id and updated.language_code == "es"
+    assert (await get_or_create_user(777045)).language_code == "es"
+
+
+@pytest.mark.asyncio
+async def test_warm_up_loads_users():
+    """warm_up fills both directions from the users table"""
+    await init_db()
+    user = await get_or_create_user(777046, "tester", "Test User", "uk")
+    identities.clear()
+    assert await identities.warm_up() >= 1
+    assert identities.internal_id(777046) == user.id
+    assert identities.telegram_id(user.id) == 777046
+    assert identities.get(777046).language_code == "uk"
+
+
+@pytest.mark.asyncio
+async def test_internal_ids_used_for_reminders_and_quiet_mode():
+    """Reminders created by internal ID are listed for the Telegram user; quiet mode restores by chat"""
+    from scheduler import ReminderScheduler
+    await init_db()
+    user_id = await resolve_user_id(telegram_user(777047))
+    await create_reminder(user_id, "identity check", datetime.utcnow() + timedelta(days=1))
+    page = await get_reminders_page(await resolve_user_id(telegram_user(777047)))
+    assert "identity check" in [r.text for r in page.items]
+
+    until = await set_quiet_mode(user_id, 600)
+    scheduler = ReminderScheduler(MagicMock())
+    await scheduler.load_quiet_modes()
+    assert scheduler.quiet_until.get(777047) == until
+
+
+@pytest.mark.asyncio
+async def test_init_db_remaps_rows_saved_under_telegram_id():
+    """Notes, goals and check-ins written before identity.py get the owner's users.id"""
+    from sqlalchemy import delete, select
+    from database import async_session, DailyGoal, EveningCheckIn, Note
+
+    await init_db()
+    user = await get_or_create_user(777044, "tester", "Test User", "ru")
+    async with async_session() as session:
+        for model in (Note, DailyGoal, EveningCheckIn):
+            await session.execute(delete(model).where(model.user_id.in_([user.id, 777044])))
+        session.add_all([
+            Note(user_id=777044, text="old note"),
+            DailyGoal(user_id=777044, goal_text="old goal", local_day=20260101),
+            EveningCheckIn(user_id=777044, what_worked="walk", local_day=20260101),
+        ])
+        await session.commit()
+
+    await init_db()
+    await init_db()  # повторный запуск ничего не трогает
+
+    async with async_session() as session:
+        for model in (Note, DailyGoal, EveningCheckIn):
+            owners = (await session.scalars(select(model.user_id).where(model.user_id.in_([user.id, 777044])))).all()
+            assert owners == [user.id], model.__tablename__
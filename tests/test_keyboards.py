@@ -0,0 +1,25 @@
+"""Tests for keyboards"""
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from keyboards import get_main_keyboard, get_cancel_keyboard, get_reminder_keyboard, get_plan_item_keyboard
+
+
+def test_static_keyboards_are_shared_per_language():
+    assert get_main_keyboard("ru") is get_main_keyboard("ru")
+    assert get_cancel_keyboard("en") is get_cancel_keyboard("en")
+    assert get_cancel_keyboard("en") is not get_cancel_keyboard("es")
+
+
+def test_item_keyboards_match_validated_models():
+    expected = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✅ Выполнено", callback_data="1rd:7"),
+         InlineKeyboardButton(text="✏️ Изменить", callback_data="1re:7")],
+        [InlineKeyboardButton(text="🗑️ Удалить", callback_data="1rc:7")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="1rl")],
+    ])
+
+    keyboard = get_reminder_keyboard(7)
+
+    assert keyboard == expected
+    assert keyboard.model_dump(exclude_none=True) == expected.model_dump(exclude_none=True)
+    assert get_plan_item_keyboard(3).inline_keyboard[0][0].callback_data == "1pd:3"
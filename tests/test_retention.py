@@ -0,0 +1,127 @@
+"""Tests for retention: old rows move to archive tables, reads fall through"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from database import (
+    ARCHIVES, async_session, init_db, DailyGoal, DailyPlanItem, DailyRollup, EnergyLog, EveningCheckIn, Note,
+    Reminder
+)
+from db_helpers import (
+    delete_all_notes, delete_note, get_all_reminders, get_daily_summary, get_days_history, get_or_create_user,
+    get_user_notes
+)
+from rollups import check_rollups, rebuild_rollups
+from retention import run_retention
+from services.note_service import NoteService
+from user_time import day_key, key_to_date
+
+
+async def fresh_user(telegram_id: int) -> int:
+    await init_db()
+    user = await get_or_create_user(telegram_id, "tester", "Test User", "ru")
+    async with async_session() as session:  # база тестов общая между запусками
+        for model in (DailyGoal, DailyRollup, *ARCHIVES, *ARCHIVES.values()):
+            await session.execute(delete(model).where(model.user_id == user.id))
+        await session.commit()
+    return user.id
+
+
+async def count(model, user_id: int) -> int:
+    async with async_session() as session:
+        return await session.scalar(select(func.count(model.id)).where(model.user_id == user_id))
+
+
+@pytest.mark.asyncio
+async def test_old_rows_move_to_archive_and_reads_fall_through():
+    user_id = await fresh_user(777500)
+    now = datetime.utcnow()
+    old = now - timedelta(days=400)
+    old_day = day_key(old.date())
+    async with async_session() as session:
+        session.add_all([
+            Note(user_id=user_id, text="Старая Идея про сад", created_at=old),
+            Note(user_id=user_id, text="old shopping list", created_at=old + timedelta(minutes=1)),
+            Note(user_id=user_id, text="свежая идея", created_at=now),
+            DailyGoal(user_id=user_id, goal_text="old goal", completed=True, local_day=old_day),
+            DailyPlanItem(user_id=user_id, text="first", completed=True, order=0, local_day=old_day),
+            DailyPlanItem(user_id=user_id, text="second", completed=False, order=1, local_day=old_day),
+            EnergyLog(user_id=user_id, energy_level=60, date=old, local_day=old_day),
+            EveningCheckIn(user_id=user_id, what_worked="walk", date=old, local_day=old_day),
+            Reminder(user_id=user_id, text="done long ago", when_datetime=old, completed=True),
+            Reminder(user_id=user_id, text="missed long ago", when_datetime=old, completed=False),
+            Reminder(user_id=user_id, text="done recently", when_datetime=now - timedelta(days=1), completed=True),
+        ])
+        await session.commit()
+    await rebuild_rollups(user_ids=[user_id])
+
+    await run_retention(days=365, batch_rows=1)
+
+    assert (await count(Note, user_id), await count(ARCHIVES[Note], user_id)) == (1, 2)
+    for model in (DailyPlanItem, EnergyLog, EveningCheckIn):
+        assert await count(model, user_id) == 0 and await count(ARCHIVES[model], user_id) > 0
+    assert (await count(Reminder, user_id), await count(ARCHIVES[Reminder], user_id)) == (2, 1)
+    assert await count(DailyGoal, user_id) == 1  # цели не архивируются
+
+    summary = await get_daily_summary(user_id, datetime.combine(key_to_date(old_day), datetime.min.time()))
+    assert summary['goal'].goal_text == "old goal" and summary['energy'] == 60
+    assert [item.text for item in summary['plan_items']] == ["first", "second"]
+    assert summary['checkin'].what_worked == "walk"
+
+    [day] = await get_days_history(user_id)
+    assert (day['plan_count'], day['plan_completed']) == (2, 1)
+    assert await check_rollups(user_ids=[user_id]) == []  # сводки считаются вместе с архивом
+
+    assert [note.text for note in await get_user_notes(user_id)] == [
+        "свежая идея", "old shopping list", "Старая Идея про сад"
+    ]
+    assert [note.text for note in await NoteService.search(user_id, "идея")] == [
+        "свежая идея", "Старая Идея про сад"
+    ]
+    done = await get_all_reminders(user_id, completed=True)
+    assert [reminder.text for reminder in done] == ["done long ago", "done recently"]
+    assert [reminder.text for reminder in await get_all_reminders(user_id, completed=True, limit=1)] == [
+        "done long ago"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_archived_notes_can_be_deleted():
+    user_id = await fresh_user(777501)
+    old = datetime.utcnow() - timedelta(days=400)
+    async with async_session() as session:
+        session.add_all([Note(user_id=user_id, text=f"old {i}", created_at=old) for i in range(3)])
+        session.add(Note(user_id=user_id, text="new"))
+        await session.commit()
+    await run_retention(days=365)
+
+    archived = (await get_user_notes(user_id))[-1]
+    assert await delete_note(archived.id, user_id)
+    assert not await delete_note(archived.id, user_id)
+    assert await delete_all_notes(user_id) == 3
+    assert await get_user_notes(user_id) == []
+
+
+@pytest.mark.asyncio
+async def test_retention_disabled():
+    assert await run_retention(days=0) == {}
+
+
+@pytest.mark.asyncio
+async def test_archived_ids_are_not_reused():
+    """A new row never gets the id of a row moved to the archive (SQLite AUTOINCREMENT)"""
+    user_id = await fresh_user(777502)
+    async with async_session() as session:
+        newest = Note(user_id=user_id, text="newest, then archived", created_at=datetime.utcnow() - timedelta(days=400))
+        session.add(newest)
+        await session.commit()
+    await run_retention(days=365)
+
+    async with async_session() as session:
+        note = Note(user_id=user_id, text="after")
+        session.add(note)
+        await session.commit()
+    assert note.id > newest.id
+    await run_retention(days=365)  # следующий проход не упирается в занятый id архива
+    assert await delete_note(newest.id, user_id) and await count(Note, user_id) == 1
@@ -0,0 +1,82 @@
+"""Tests for the per-day rollup table (daily_rollups)"""
+import pytest
+from sqlalchemy import delete, update
+
+from database import async_session, init_db, DailyGoal, DailyPlanItem, DailyRollup, EnergyLog, EveningCheckIn
+from db_helpers import (
+    add_plan_item, complete_goal, delete_plan_item, get_days_history, get_energy_stats_week, get_or_create_user,
+    save_energy_level, save_goal, set_day_rating, toggle_plan_item, update_goal_pomodoros
+)
+from rollups import check_rollups, rebuild_rollups
+from user_time import shift_day, user_local_day
+
+
+async def fresh_user(telegram_id: int) -> int:
+    await init_db()
+    user = await get_or_create_user(telegram_id, "tester", "Test User", "ru")
+    async with async_session() as session:  # база тестов общая между запусками
+        for model in (DailyGoal, DailyPlanItem, EnergyLog, EveningCheckIn, DailyRollup):
+            await session.execute(delete(model).where(model.user_id == user.id))
+        await session.commit()
+    return user.id
+
+
+@pytest.mark.asyncio
+async def test_write_helpers_keep_rollup_current():
+    """Every write updates today's row; history reads it back"""
+    user_id = await fresh_user(777480)
+    goal = await save_goal(user_id, "rollup goal", 4)
+    await update_goal_pomodoros(goal.id, completed=2)
+    await complete_goal(goal.id)
+    await set_day_rating(user_id, rating=8)
+    first = await add_plan_item(user_id, "one")
+    second = await add_plan_item(user_id, "two")
+    await add_plan_item(user_id, "three")
+    await toggle_plan_item(first.id, user_id)
+    await delete_plan_item(second.id, user_id)
+    await save_energy_level(user_id, 60)
+
+    assert await check_rollups(user_ids=[user_id]) == []
+    [day] = await get_days_history(user_id)
+    assert day['goal'] == "rollup goal" and day['goal_completed'] and day['rating'] == 8
+    assert day['pomodoros'] == "2/4"
+    assert (day['plan_count'], day['plan_completed']) == (2, 1)
+    assert await get_energy_stats_week(user_id) == {'avg_energy': 60, 'days_count': 1}
+
+
+@pytest.mark.asyncio
+async def test_history_from_rebuilt_rollups():
+    """Rows written around the helpers show up after a rebuild; energy-only days stay out of history"""
+    user_id = await fresh_user(777481)
+    today = await user_local_day(user_id)
+    async with async_session() as session:
+        session.add_all([
+            DailyGoal(user_id=user_id, goal_text="", day_rating=6, local_day=shift_day(today, -2)),
+            DailyGoal(user_id=user_id, goal_text="later goal", local_day=shift_day(today, -2)),
+            DailyPlanItem(user_id=user_id, text="plan only", completed=True, local_day=shift_day(today, -1)),
+            EnergyLog(user_id=user_id, energy_level=40, local_day=shift_day(today, -1)),
+            EnergyLog(user_id=user_id, energy_level=80, local_day=shift_day(today, -3)),
+        ])
+        await session.commit()
+    assert len(await check_rollups(user_ids=[user_id])) == 3
+
+    assert await rebuild_rollups(user_ids=[user_id]) == 3
+    history = await get_days_history(user_id)
+    assert [(day['goal'], day['rating'], day['plan_count']) for day in history] == [
+        (None, None, 1), ("later goal", 6, 0)
+    ]
+    assert await get_energy_stats_week(user_id) == {'avg_energy': 60, 'days_count': 2}
+
+
+@pytest.mark.asyncio
+async def test_check_finds_and_fixes_drift():
+    user_id = await fresh_user(777482)
+    await save_goal(user_id, "drift")
+    await add_plan_item(user_id, "item")
+    async with async_session() as session:
+        await session.execute(update(DailyRollup).where(DailyRollup.user_id == user_id).values(plan_total=5))
+        await session.commit()
+
+    [mismatch] = await check_rollups(fix=True, user_ids=[user_id])
+    assert mismatch.stored['plan_total'] == 5 and mismatch.expected['plan_total'] == 1
+    assert await check_rollups(user_ids=[user_id]) == []
@@ -63,3 +63,112 @@ async def test_send_reminder(scheduler):
     assert call_args[1]["chat_id"] == 12345
     assert "Test reminder" in call_args[1]["text"]
 
+
+
+@pytest.mark.asyncio
+async def test_quiet_mode_defers_and_flushes_in_one_batch(scheduler):
+    """Messages during quiet mode are deferred and delivered together at the end"""
+    from unittest.mock import patch
+    from database import init_db
+    await init_db()
+    scheduler.start_quiet_mode(12345, 12345, datetime.utcnow() + timedelta(minutes=30))
+    
+    await scheduler.send_reminder(12345, "Выпить воды")
+    await scheduler.send_evening_checkin(12345)
+    scheduler.bot.send_message.assert_not_called()
+    assert scheduler.scheduler.get_job("quiet_end_12345") is not None
+    
+    with patch('db_helpers.disable_quiet_mode', AsyncMock()) as disable:
+        await scheduler.end_quiet_mode(12345, 12345)
+    
+    disable.assert_awaited_once_with(12345)
+    scheduler.bot.send_message.assert_called_once()
+    text = scheduler.bot.send_message.call_args[1]["text"]
+    assert "Выпить воды" in text and "вечернего чек-ина" in text
+    assert not scheduler.is_quiet(12345)
+
+
+@pytest.mark.asyncio
+async def test_deferred_messages_survive_restart(mock_bot):
+    """A reminder deferred by quiet mode is delivered by a new scheduler after a restart"""
+    from unittest.mock import patch
+    from database import init_db
+    await init_db()
+    before = ReminderScheduler(mock_bot)
+    before.start_quiet_mode(54321, 54321, datetime.utcnow() + timedelta(minutes=30))
+    await before.send_reminder(54321, "Позвонить врачу")
+    mock_bot.send_message.assert_not_called()
+    
+    after = ReminderScheduler(mock_bot)  # процесс перезапущен: памяти прошлого планировщика нет
+    with patch('db_helpers.disable_quiet_mode', AsyncMock()):
+        await after.end_quiet_mode(54321, 54321)
+        await after.end_quiet_mode(54321, 54321)
+    
+    first, second = [call[1]["text"] for call in mock_bot.send_message.call_args_list]
+    assert "Позвонить врачу" in first and "Позвонить врачу" not in second
+
+
+@pytest.mark.asyncio
+async def test_expired_quiet_window_does_not_defer(scheduler):
+    scheduler.quiet_until[12345] = datetime.utcnow() - timedelta(seconds=1)
+    
+    assert await scheduler.send(12345, "привет")
+    scheduler.bot.send_message.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_evening_fanout_sends_only_to_due_users(scheduler):
+    """One job for everyone; only users in due timezones who have not checked in get the prompt"""
+    from database import init_db, async_session, EveningCheckIn
+    from db_helpers import get_or_create_user
+    from user_time import set_user_timezone, local_day
+    await init_db()
+    
+    now_utc = datetime(2025, 6, 1, 14, 20)  # 20:05 в Катманду (UTC+5:45)
+    due, checked_in, quiet, other = [
+        await get_or_create_user(telegram_id, f"fanout_{telegram_id}", "Fanout")
+        for telegram_id in (770001, 770002, 770003, 770004)
+    ]
+    for user in (due, checked_in, quiet):
+        await set_user_timezone(user.id, "Asia/Kathmandu")
+    await set_user_timezone(other.id, "America/New_York")
+    async with async_session() as session:
+        session.add(EveningCheckIn(user_id=checked_in.id, local_day=local_day("Asia/Kathmandu", now_utc)))
+        await session.commit()
+    scheduler.quiet_until[770003] = datetime.utcnow() + timedelta(minutes=30)
+    
+    scheduler.schedule_evening_checkins(hour=20, minute=0)
+    sender = MagicMock()
+    sender.send = AsyncMock(return_value=True)
+    stats = await scheduler.run_evening_fanout(now_utc=now_utc, sender=sender)
+    
+    assert [job.id for job in scheduler.scheduler.get_jobs()] == ["evening_fanout"]
+    sent_to = [call.args[0] for call in sender.send.call_args_list]
+    assert 770001 in sent_to
+    assert not {770002, 770003, 770004} & set(sent_to)
+    assert stats["skipped_quiet"] == 1
+
+
+@pytest.mark.asyncio
+async def test_evening_fanout_pages_users(scheduler, monkeypatch):
+    """Users of a due timezone are read page by page; the tick tolerates a late start"""
+    import scheduler as scheduler_module
+    from database import init_db
+    from db_helpers import get_or_create_user
+    from user_time import set_user_timezone
+    await init_db()
+    monkeypatch.setattr(scheduler_module, "EVENING_PAGE_SIZE", 1)
+    
+    now_utc = datetime(2025, 6, 1, 15, 35)  # 20:05 в Кабуле (UTC+4:30)
+    for telegram_id in (770011, 770012, 770013):
+        user = await get_or_create_user(telegram_id, f"fanout_{telegram_id}", "Fanout")
+        await set_user_timezone(user.id, "Asia/Kabul")
+    
+    scheduler.schedule_evening_checkins(hour=20, minute=0)
+    sender = MagicMock()
+    sender.send = AsyncMock(return_value=True)
+    await scheduler.run_evening_fanout(now_utc=now_utc, sender=sender)
+    
+    sent_to = [call.args[0] for call in sender.send.call_args_list]
+    assert {770011, 770012, 770013} <= set(sent_to) and len(sent_to) == len(set(sent_to))
+    assert scheduler.scheduler.get_job("evening_fanout").misfire_grace_time == 15 * 60
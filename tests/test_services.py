@@ -210,7 +210,8 @@ async def test_reminder_service_create():
     
     with patch('services.reminder_service.create_reminder', return_value=mock_reminder):
         with patch('services.reminder_service.get_user_language_code', return_value='en'):
-            with patch('bot.scheduler') as mock_scheduler_instance:
+            with patch('services.reminder_service.get_scheduler') as get_scheduler:
+                mock_scheduler_instance = get_scheduler.return_value
                 mock_scheduler_instance.add_reminder = AsyncMock()
                 
                 reminder = await ReminderService.create(1, "Test reminder", when, 123)
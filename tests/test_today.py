@@ -0,0 +1,127 @@
+"""Tests for the per-user "today" snapshot cache"""
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import delete
+
+from database import async_session, init_db, DailyGoal, DailyPlanItem, EnergyLog, EveningCheckIn
+from db_helpers import (
+    add_plan_item, complete_goal, delete_plan_item, get_daily_summary, get_or_create_user, get_plan_items,
+    get_todays_energy, get_todays_goal, save_energy_level, save_goal, toggle_plan_item
+)
+from today import TodayCache, today_cache
+from user_time import key_to_date, shift_day, user_local_day
+from utils.pool_metrics import pool_metrics
+
+
+async def fresh_user(telegram_id: int) -> int:
+    await init_db()
+    user = await get_or_create_user(telegram_id, "tester", "Test User", "ru")
+    async with async_session() as session:  # база тестов общая между запусками
+        for model in (DailyGoal, DailyPlanItem, EnergyLog, EveningCheckIn):
+            await session.execute(delete(model).where(model.user_id == user.id))
+        await session.commit()
+    today_cache.invalidate(user.id)
+    return user.id
+
+
+@pytest.mark.asyncio
+async def test_snapshot_loads_in_one_query():
+    """Goal, energy and plan come from a single statement, repeated reads from memory"""
+    user_id = await fresh_user(777450)
+    await save_goal(user_id, "snapshot goal", 2)
+    await save_energy_level(user_id, 4)
+    await add_plan_item(user_id, "first")
+    await add_plan_item(user_id, "second")
+    today_cache.invalidate(user_id)
+
+    cache = TodayCache()
+    queries = pool_metrics.queries
+    snapshot = await cache.get(user_id)
+    assert pool_metrics.queries - queries <= 2  # снимок + часовой пояс, если его нет в памяти
+    assert snapshot.goal.goal_text == "snapshot goal"
+    assert snapshot.energy == 4
+    assert [item.text for item in snapshot.plan_items] == ["first", "second"]
+
+    queries = pool_metrics.queries
+    assert await cache.get(user_id) is snapshot
+    assert pool_metrics.queries == queries
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_empty_day_snapshot():
+    user_id = await fresh_user(777451)
+    snapshot = await TodayCache().get(user_id)
+    assert snapshot.goal is None and snapshot.energy is None and snapshot.plan_items == []
+
+
+@pytest.mark.asyncio
+async def test_writes_go_through_to_snapshot():
+    """After the first load, writes update the snapshot instead of invalidating it"""
+    user_id = await fresh_user(777452)
+    await get_todays_goal(user_id)
+
+    with patch.object(TodayCache, '_load', AsyncMock(side_effect=AssertionError("reload"))):
+        goal = await save_goal(user_id, "write-through goal")
+        assert (await get_todays_goal(user_id)).id == goal.id
+        await complete_goal(goal.id)
+        assert (await get_todays_goal(user_id)).completed
+
+        await save_energy_level(user_id, 2)
+        assert await get_todays_energy(user_id) == 2
+
+        first = await add_plan_item(user_id, "one")
+        second = await add_plan_item(user_id, "two")
+        await toggle_plan_item(first.id, user_id)
+        assert [item.text for item in await get_plan_items(user_id, completed=False)] == ["two"]
+        assert [item.text for item in await get_plan_items(user_id, completed=True)] == ["one"]
+
+        await delete_plan_item(second.id, user_id)
+        assert [item.id for item in await get_plan_items(user_id)] == [first.id]
+
+
+@pytest.mark.asyncio
+async def test_new_local_day_reloads():
+    """A snapshot of yesterday is a miss"""
+    user_id = await fresh_user(777453)
+    cache = TodayCache()
+    snapshot = await cache.get(user_id)
+    snapshot.local_day -= 1
+    assert await cache.get(user_id) is not snapshot
+    assert cache.stats.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_bound():
+    cache = TodayCache(max_users=2)
+    users = [await fresh_user(777460 + i) for i in range(3)]
+    for user_id in users:
+        await cache.get(user_id)
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_past_day_summary_one_query():
+    """"детали <дата>": goal, plan and check-in of a past day in a single statement"""
+    user_id = await fresh_user(777470)
+    day = shift_day(await user_local_day(user_id), -3)
+    async with async_session() as session:
+        session.add_all([
+            DailyGoal(user_id=user_id, goal_text="old goal", local_day=day),
+            DailyPlanItem(user_id=user_id, text="b", order=2, local_day=day),
+            DailyPlanItem(user_id=user_id, text="a", order=1, local_day=day),
+            EveningCheckIn(user_id=user_id, what_worked="old checkin", local_day=day),
+        ])
+        await session.commit()
+
+    queries = pool_metrics.queries
+    summary = await get_daily_summary(user_id, key_to_date(day))
+    assert pool_metrics.queries - queries == 1
+    assert summary['goal'].goal_text == "old goal"
+    assert [item.text for item in summary['plan_items']] == ["a", "b"]
+    assert summary['checkin'].what_worked == "old checkin"
+    assert summary['date'].date() == key_to_date(day)
+
+    empty = await get_daily_summary(user_id, key_to_date(shift_day(day, -1)))
+    assert empty['goal'] is None and empty['plan_items'] == [] and empty['checkin'] is None
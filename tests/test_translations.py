@@ -0,0 +1,54 @@
+"""Tests for translations lookup"""
+import pytest
+
+from translations import TRANSLATIONS, translate, compile_translations, get_language_code
+
+
+def test_translate_matches_source_table():
+    """Every key and language renders as in TRANSLATIONS, with English fallback"""
+    for key, translations in TRANSLATIONS.items():
+        for lang in ("en", "es", "ru", "uk", "de"):
+            assert translate(key, lang) == translations.get(lang, translations.get("en", key))
+
+    assert translate("no_such_key", "ru") == "no_such_key"
+    assert get_language_code("uk-UA") == "uk"
+    assert get_language_code(None) == "en"
+
+
+def test_translate_formats_and_caches_rendered_strings():
+    assert translate("goal_understood", "ru-RU", goal="Полить цветы") == "Понял! 🎯\n\nПолить цветы"
+    assert translate("goal_understood", "ru", goal="Полить цветы") == "Понял! 🎯\n\nПолить цветы"
+    # Не хватает аргумента - шаблон возвращается как есть
+    assert translate("goal_understood", "en", other=1) == "Got it! 🎯\n\n{goal}"
+    # Изменяемые аргументы не кешируются
+    goals = ["a"]
+    first = translate("goal_understood", "en", goal=goals)
+    goals.append("b")
+    assert translate("goal_understood", "en", goal=goals) != first
+
+
+def test_render_cache_keeps_argument_types_apart():
+    """1, True and 1.0 are equal keys for a plain cache but format differently"""
+    assert translate("in_minutes", "en", minutes=1) == "in 1 minutes"
+    assert translate("in_minutes", "en", minutes=True) == "in True minutes"
+    assert translate("in_minutes", "en", minutes=1.0) == "in 1.0 minutes"
+
+    TRANSLATIONS["test_format_spec"] = {"en": "{count:d} left"}
+    try:
+        compile_translations()
+        assert translate("test_format_spec", "en", count=1) == "1 left"
+        with pytest.raises(ValueError):  # как без кэша: float не форматируется через :d
+            translate("test_format_spec", "en", count=1.0)
+    finally:
+        del TRANSLATIONS["test_format_spec"]
+        compile_translations()
+
+
+def test_compile_translations_picks_up_runtime_changes():
+    TRANSLATIONS["test_runtime_key"] = {"en": "Hi {name}"}
+    try:
+        compile_translations()
+        assert translate("test_runtime_key", "es", name="Ana") == "Hi Ana"
+    finally:
+        del TRANSLATIONS["test_runtime_key"]
+        compile_translations()
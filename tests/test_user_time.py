@@ -0,0 +1,38 @@
+"""Tests for per-user timezone and local day boundaries"""
+import pytest
+from datetime import date, datetime
+
+from user_time import day_key, key_to_date, shift_day, local_day, set_user_timezone, user_local_day
+from database import init_db
+from db_helpers import get_or_create_user, add_plan_item, get_plan_items
+
+
+def test_day_key_roundtrip():
+    assert day_key(date(2025, 3, 9)) == 20250309
+    assert key_to_date(20250309) == date(2025, 3, 9)
+    assert shift_day(20250301, -1) == 20250228
+    assert shift_day(20241231, 1) == 20250101
+
+
+def test_local_day_depends_on_timezone():
+    """Same UTC instant falls on different local days"""
+    at = datetime(2025, 6, 1, 23, 30)  # UTC
+
+    assert local_day("Europe/Madrid", at) == 20250602
+    assert local_day("America/New_York", at) == 20250601
+    assert local_day("UTC", at) == 20250601
+
+
+@pytest.mark.asyncio
+async def test_plan_items_bucketed_by_user_local_day():
+    await init_db()
+    user = await get_or_create_user(880001, "tz_user", "Tz")
+    await set_user_timezone(user.id, "Pacific/Kiritimati")  # UTC+14
+
+    item = await add_plan_item(user.id, "Полить цветы")
+    today = await user_local_day(user.id)
+
+    assert item.local_day == today
+    items = await get_plan_items(user.id, date=key_to_date(today))
+    assert item.id in [i.id for i in items]
+    assert await get_plan_items(user.id, date=key_to_date(shift_day(today, -1))) == []
@@ -0,0 +1,188 @@
+"""Снимок «сегодня» на пользователя: цель, энергия, план и чек-ин
+
+Экраны бота (помощь, цель, фокус, план) читают одно и то же: цель дня,
+энергию, пункты плана. Снимок загружается одним запросом и живёт в памяти
+процесса; изменяющие функции db_helpers обновляют его сразу после коммита
+(write-through), а смена локального дня пользователя делает его устаревшим.
+Один процесс бота - единственный писатель, поэтому кэш не расходится с БД.
+"""
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy import Integer, and_, bindparam, literal_column, select, true
+from sqlalchemy.orm import aliased
+
+from config import TODAY_CACHE_USERS
+from database import ARCHIVES, async_session, DailyGoal, DailyPlanItem, EnergyLog, EveningCheckIn
+from user_time import user_local_day
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TodaySnapshot:
+    local_day: int
+    goal: Optional[DailyGoal] = None
+    energy: Optional[int] = None
+    plan_items: List[DailyPlanItem] = field(default_factory=list)  # по (order, id)
+    checkin: Optional[EveningCheckIn] = None
+
+
+@dataclass
+class TodayCacheStats:
+    hits: int = 0
+    misses: int = 0  # каждый промах - один запрос в БД
+    writes: int = 0  # обновления снимка после записи
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 3),
+                "writes": self.writes}
+
+
+def _latest(model, user_id: int, day: int, *order):
+    """Последняя строка model за день как сущность из подзапроса (для LEFT JOIN ... ON true)"""
+    return aliased(model, select(model).where(model.user_id == user_id, model.local_day == day)
+                   .order_by(*order).limit(1).subquery())
+
+
+def snapshot_query(user_id, day, archived: bool = False):
+    """
+    One statement for the whole snapshot of a day: a row per plan item (at
+    least one), the day's goal, energy log and check-in joined to every row.
+    Every part is a lookup on the (user_id, local_day) index. archived=True
+    reads plan, energy and check-in from their archive tables (goals stay).
+    """
+    source = ARCHIVES.get if archived else (lambda model: model)
+    plan_item, energy_log, evening_checkin = source(DailyPlanItem), source(EnergyLog), source(EveningCheckIn)
+    goal = _latest(DailyGoal, user_id, day, DailyGoal.id.desc())
+    energy = _latest(energy_log, user_id, day, energy_log.date.desc())
+    checkin = _latest(evening_checkin, user_id, day, evening_checkin.id.desc())
+    anchor = select(literal_column("1").label("one")).subquery()
+    return (
+        select(goal, energy, checkin, plan_item)
+        .select_from(anchor)
+        .outerjoin(goal, true())
+        .outerjoin(energy, true())
+        .outerjoin(checkin, true())
+        .outerjoin(plan_item, and_(plan_item.user_id == user_id, plan_item.local_day == day))
+        .order_by(plan_item.order, plan_item.id)
+    )
+
+
+# Собрать запрос с подзапросами дороже, чем выполнить: строим один раз
+SNAPSHOT_STATEMENT = snapshot_query(bindparam("user_id", type_=Integer), bindparam("day", type_=Integer))
+ARCHIVE_SNAPSHOT_STATEMENT = snapshot_query(
+    bindparam("user_id", type_=Integer), bindparam("day", type_=Integer), archived=True
+)
+
+
+async def load_snapshot(user_id: int, day: int, archived: bool = False) -> TodaySnapshot:
+    """Snapshot of any local day in one round-trip (not cached: past days come from here)"""
+    statement = ARCHIVE_SNAPSHOT_STATEMENT if archived else SNAPSHOT_STATEMENT
+    async with async_session() as session:
+        rows = (await session.execute(statement, {"user_id": user_id, "day": day})).all()
+    goal, energy, checkin, _ = rows[0]
+    return TodaySnapshot(
+        local_day=day,
+        goal=goal,
+        energy=energy.energy_level if energy else None,
+        plan_items=[item for *_, item in rows if item is not None],
+        checkin=checkin,
+    )
+
+
+async def load_day(user_id: int, day: int) -> TodaySnapshot:
+    """
+    Snapshot of a past day: the working tables, then the archive if the day
+    has neither plan, energy nor check-in there (moved by retention.py)
+    """
+    snapshot = await load_snapshot(user_id, day)
+    if snapshot.plan_items or snapshot.energy is not None or snapshot.checkin is not None:
+        return snapshot
+    return await load_snapshot(user_id, day, archived=True)
+
+
+class TodayCache:
+    """Per-user TodaySnapshot, LRU-bounded, read-through and write-through"""
+
+    def __init__(self, max_users: int = TODAY_CACHE_USERS):
+        self.max_users = max_users
+        self._snapshots: "OrderedDict[int, TodaySnapshot]" = OrderedDict()
+        self.stats = TodayCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    async def get(self, user_id: int) -> TodaySnapshot:
+        day = await user_local_day(user_id)
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is not None and snapshot.local_day == day:
+            self.stats.hits += 1
+            self._snapshots.move_to_end(user_id)
+            return snapshot
+        self.stats.misses += 1
+        snapshot = await self._load(user_id, day)
+        self._snapshots[user_id] = snapshot
+        self._snapshots.move_to_end(user_id)
+        while len(self._snapshots) > self.max_users:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    async def _load(self, user_id: int, day: int) -> TodaySnapshot:
+        return await load_snapshot(user_id, day)
+
+    def _current(self, user_id: int, day: int) -> Optional[TodaySnapshot]:
+        """Cached snapshot of that day, None if there is nothing to update"""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None or snapshot.local_day != day:
+            return None
+        self.stats.writes += 1
+        return snapshot
+
+    # Write-through: вызываются из db_helpers после коммита
+
+    def set_goal(self, goal: DailyGoal):
+        snapshot = self._current(goal.user_id, goal.local_day)
+        if snapshot and (snapshot.goal is None or goal.id >= snapshot.goal.id):
+            snapshot.goal = goal
+
+    def set_energy(self, user_id: int, day: int, energy_level: int):
+        snapshot = self._current(user_id, day)
+        if snapshot:
+            snapshot.energy = energy_level
+
+    def set_checkin(self, checkin: EveningCheckIn):
+        snapshot = self._current(checkin.user_id, checkin.local_day)
+        if snapshot:
+            snapshot.checkin = checkin
+
+    def put_plan_item(self, item: DailyPlanItem):
+        """Added or changed plan item"""
+        snapshot = self._current(item.user_id, item.local_day)
+        if snapshot:
+            items = [other for other in snapshot.plan_items if other.id != item.id] + [item]
+            snapshot.plan_items = sorted(items, key=lambda other: (other.order or 0, other.id))
+
+    def remove_plan_item(self, item: DailyPlanItem):
+        snapshot = self._current(item.user_id, item.local_day)
+        if snapshot:
+            snapshot.plan_items = [other for other in snapshot.plan_items if other.id != item.id]
+
+    def invalidate(self, user_id: int):
+        self._snapshots.pop(user_id, None)
+
+    def clear(self):
+        self._snapshots.clear()
+
+    def log_report(self):
+        logger.info(f"Today cache: {self.stats.snapshot()}, users cached: {len(self)}")
+
+
+today_cache = TodayCache()
@@ -1,4 +1,6 @@
 """Translation system for the bot - supports English, Spanish, Russian, Ukrainian"""
+from functools import lru_cache
+from typing import Dict, Tuple
 
 # Translation dictionary: key -> {lang_code: translation}
 TRANSLATIONS = {
@@ -183,6 +185,12 @@ TRANSLATIONS = {
         "ru": "Итак, как прошёл день? 🌙\n\nЧто получилось сделать?\n\n(Или нажми ❌ Отмена)",
         "uk": "Отже, як пройшов день? 🌙\n\nЩо вдалося зробити?\n\n(Або натисни ❌ Скасувати)",
     },
+    "evening_checkin_prompt": {
+        "en": "🌙 Hi! How was your day?\n\nTime for the evening check-in 💛 /evening",
+        "es": "🌙 ¡Hola! ¿Cómo fue tu día?\n\nEs hora del chequeo de la noche 💛 /evening",
+        "ru": "🌙 Привет! Как прошёл день?\n\nВремя для вечернего чек-ина 💛 /evening",
+        "uk": "🌙 Привіт! Як пройшов день?\n\nЧас для вечірнього чек-іну 💛 /evening",
+    },
     "evening_thanks": {
         "en": "💫 Thanks for the check-in!\n\nHow would you rate this day? (1-10)\n\nJust write a number, for example: 7",
         "es": "💫 ¡Gracias por el chequeo!\n\n¿Cómo calificarías este día? (1-10)\n\nSolo escribe un número, por ejemplo: 7",
@@ -190,6 +198,44 @@ TRANSLATIONS = {
         "uk": "💫 Дякую за чек-ін!\n\nЯк оціниш цей день? (від 1 до 10)\n\nПросто напиши число, наприклад: 7",
     },
     
+    # Main menu buttons (get_main_keyboard); exact texts are dispatched by buttons.py
+    "menu_help_now": {
+        "en": "💚 Help now",
+        "es": "💚 Ayuda ahora",
+        "ru": "💚 Помощь сейчас",
+        "uk": "💚 Допомога зараз",
+    },
+    "menu_goal": {
+        "en": "🎯 Main goal",
+        "es": "🎯 Meta principal",
+        "ru": "🎯 Главная цель",
+        "uk": "🎯 Головна ціль",
+    },
+    "menu_plan": {
+        "en": "📋 Plan",
+        "es": "📋 Plan",
+        "ru": "📋 План",
+        "uk": "📋 План",
+    },
+    "menu_focus": {
+        "en": "🍅 Focus",
+        "es": "🍅 Enfoque",
+        "ru": "🍅 Фокус",
+        "uk": "🍅 Фокус",
+    },
+    "menu_notes": {
+        "en": "📝 Notes",
+        "es": "📝 Notas",
+        "ru": "📝 Заметки",
+        "uk": "📝 Нотатки",
+    },
+    "menu_energy": {
+        "en": "🔋 Energy",
+        "es": "🔋 Energía",
+        "ru": "🔋 Энергия",
+        "uk": "🔋 Енергія",
+    },
+    
     # Common buttons
     "cancel": {
         "en": "❌ Cancel",
@@ -259,6 +305,68 @@ TRANSLATIONS = {
         "ru": "💡 Напиши 'детали 01.11' для подробностей о дне\nИли напиши 'длинно' для полного формата",
         "uk": "💡 Напиши 'деталі 01.11' для деталей дня\nАбо напиши 'довго' для повного формату",
     },
+    
+    # Stats (/stats)
+    "stats_empty": {
+        "en": "Not enough data for trends yet 📈\n\nMark your energy in the morning and keep a plan - trends will appear here.",
+        "es": "Aún no hay datos suficientes para tendencias 📈\n\nMarca tu energía por la mañana y lleva un plan: las tendencias aparecerán aquí.",
+        "ru": "Пока мало данных для трендов 📈\n\nОтмечай энергию утром и веди план - тренды появятся здесь.",
+        "uk": "Поки що замало даних для трендів 📈\n\nВідмічай енергію вранці та веди план - тренди з'являться тут.",
+    },
+    "stats_title": {
+        "en": "📈 Your trends (last {days} days)",
+        "es": "📈 Tus tendencias (últimos {days} días)",
+        "ru": "📈 Твои тренды (последние {days} дней)",
+        "uk": "📈 Твої тренди (останні {days} днів)",
+    },
+    "stats_energy": {
+        "en": "⚡ Energy: {avg}% on average, {week} this week (tracked {count} days)",
+        "es": "⚡ Energía: {avg}% de media, {week} esta semana ({count} días registrados)",
+        "ru": "⚡ Энергия: в среднем {avg}%, за неделю {week} (отмечено дней: {count})",
+        "uk": "⚡ Енергія: в середньому {avg}%, за тиждень {week} (відмічено днів: {count})",
+    },
+    "stats_energy_trend": {
+        "en": "{arrow} Last 4 weeks: {change}% per week",
+        "es": "{arrow} Últimas 4 semanas: {change}% por semana",
+        "ru": "{arrow} Последние 4 недели: {change}% в неделю",
+        "uk": "{arrow} Останні 4 тижні: {change}% на тиждень",
+    },
+    "stats_weekdays": {
+        "en": "📅 Most energy on {best}, least on {worst}",
+        "es": "📅 Más energía el {best}, menos el {worst}",
+        "ru": "📅 Больше всего энергии: {best}, меньше всего: {worst}",
+        "uk": "📅 Найбільше енергії: {best}, найменше: {worst}",
+    },
+    "weekdays_short": {
+        "en": "Mon,Tue,Wed,Thu,Fri,Sat,Sun",
+        "es": "lun,mar,mié,jue,vie,sáb,dom",
+        "ru": "пн,вт,ср,чт,пт,сб,вс",
+        "uk": "пн,вт,ср,чт,пт,сб,нд",
+    },
+    "stats_plan": {
+        "en": "📋 Plan items done: {rate}%",
+        "es": "📋 Tareas del plan hechas: {rate}%",
+        "ru": "📋 Выполнено пунктов плана: {rate}%",
+        "uk": "📋 Виконано пунктів плану: {rate}%",
+    },
+    "stats_energy_plan_linked": {
+        "en": "🔗 On higher-energy days you get more of the plan done (r = {r}) - plan smaller on low days 💛",
+        "es": "🔗 Los días con más energía completas más del plan (r = {r}): planea menos en días bajos 💛",
+        "ru": "🔗 В дни с высокой энергией ты выполняешь больше плана (r = {r}) - в низкие дни планируй меньше 💛",
+        "uk": "🔗 У дні з високою енергією ти виконуєш більше плану (r = {r}) - у низькі дні плануй менше 💛",
+    },
+    "stats_energy_plan_unlinked": {
+        "en": "🔗 Plan completion barely depends on energy (r = {r})",
+        "es": "🔗 Completar el plan casi no depende de la energía (r = {r})",
+        "ru": "🔗 Выполнение плана почти не зависит от энергии (r = {r})",
+        "uk": "🔗 Виконання плану майже не залежить від енергії (r = {r})",
+    },
+    "stats_pomodoros": {
+        "en": "🍅 You finish {ratio}% of estimated pomodoros; estimate hits the mark on {on_target}% of days",
+        "es": "🍅 Completas el {ratio}% de los pomodoros estimados; la estimación acierta el {on_target}% de los días",
+        "ru": "🍅 Ты делаешь {ratio}% запланированных помидоров; оценка точна в {on_target}% дней",
+        "uk": "🍅 Ти робиш {ratio}% запланованих помідорів; оцінка точна в {on_target}% днів",
+    },
     "already_rated": {
         "en": "You already rated today: {rating}/10 ⭐\n\nWant to change? Just write a new number (1-10).",
         "es": "Ya calificaste hoy: {rating}/10 ⭐\n\n¿Quieres cambiar? Solo escribe un nuevo número (1-10).",
@@ -310,6 +418,23 @@ TRANSLATIONS = {
 }
 
 
+# Map supported languages
+SUPPORTED_LANGUAGES = {
+    'en': 'en',
+    'es': 'es',
+    'ru': 'ru',
+    'uk': 'uk',
+    'ua': 'uk',  # Alternative code for Ukrainian
+}
+
+# Скомпилированные таблицы: язык -> ключ -> (текст, нужен ли format)
+_TABLES: Dict[str, Dict[str, Tuple[str, bool]]] = {}
+
+# Типы аргументов, для которых готовую строку можно кешировать
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, type(None))
+
+
+@lru_cache(maxsize=256)
 def get_language_code(telegram_lang_code: str = None) -> str:
     """
     Get language code from Telegram settings.
@@ -328,16 +453,7 @@ def get_language_code(telegram_lang_code: str = None) -> str:
     # Normalize language code (e.g., 'en-US' -> 'en', 'es-ES' -> 'es')
     lang = telegram_lang_code.lower().split('-')[0]
     
-    # Map supported languages
-    supported = {
-        'en': 'en',
-        'es': 'es',
-        'ru': 'ru',
-        'uk': 'uk',
-        'ua': 'uk',  # Alternative code for Ukrainian
-    }
-    
-    return supported.get(lang, 'en')  # Default to English if not supported
+    return SUPPORTED_LANGUAGES.get(lang, 'en')  # Default to English if not supported
 
 
 def translate(key: str, lang_code: str = 'en', **kwargs) -> str:
@@ -354,18 +470,51 @@ def translate(key: str, lang_code: str = 'en', **kwargs) -> str:
     """
     lang_code = get_language_code(lang_code)
     
-    translations = TRANSLATIONS.get(key, {})
-    text = translations.get(lang_code, translations.get('en', key))
+    entry = _TABLES[lang_code].get(key)
+    if entry is None:
+        return key
+    text, needs_format = entry
     
     # Format if kwargs provided
-    if kwargs:
-        try:
-            text = text.format(**kwargs)
-        except KeyError:
-            # If formatting fails, return text as is
-            pass
+    if not kwargs or not needs_format:
+        return text
+    if all(type(value) in _IMMUTABLE_ARG_TYPES for value in kwargs.values()):
+        # Тип - часть ключа: 1 == True == 1.0 и хешируются одинаково, а форматируются по-разному
+        return _render(lang_code, key, tuple((name, type(value), value) for name, value in kwargs.items()))
+    return _format(text, kwargs)
+
+
+def _format(text: str, kwargs: dict) -> str:
+    try:
+        return text.format(**kwargs)
+    except KeyError:
+        # If formatting fails, return text as is
+        return text
+
+
+@lru_cache(maxsize=4096)
+def _render(lang_code: str, key: str, items: Tuple[Tuple[str, type, object], ...]) -> str:
+    """Rendered string for immutable arguments (cached)"""
+    return _format(_TABLES[lang_code][key][0], {name: value for name, _, value in items})
+
+
+def compile_translations():
+    """
+    Build flat per-language lookup tables from TRANSLATIONS.
     
-    return text
+    Called once at import; call again if TRANSLATIONS is changed at runtime.
+    """
+    tables = {}
+    for lang_code in set(SUPPORTED_LANGUAGES.values()):
+        table = {}
+        for key, translations in TRANSLATIONS.items():
+            text = translations.get(lang_code, translations.get('en', key))
+            # Без фигурных скобок format ничего не меняет - пропускаем его
+            table[key] = (text, '{' in text or '}' in text)
+        tables[lang_code] = table
+    _TABLES.clear()
+    _TABLES.update(tables)
+    _render.cache_clear()
 
 
 def get_user_language(telegram_user) -> str:
@@ -630,5 +779,27 @@ TRANSLATIONS.update({
         "ru": "Как оценишь сегодняшний день? (от 1 до 10)\n\nПросто напиши число, например: 7\n\nИли напиши 'пропустить'",
         "uk": "Як оціниш сьогоднішній день? (від 1 до 10)\n\nПросто напиши число, наприклад: 7\n\nАбо напиши 'пропустити'",
     },
+    
+    # Timezone
+    "timezone_current": {
+        "en": "🕐 Your timezone: {tz} (now {time})\n\nTo change it: /timezone Europe/London",
+        "es": "🕐 Tu zona horaria: {tz} (ahora {time})\n\nPara cambiarla: /timezone Europe/Madrid",
+        "ru": "🕐 Твой часовой пояс: {tz} (сейчас {time})\n\nЧтобы сменить: /timezone Europe/Moscow",
+        "uk": "🕐 Твій часовий пояс: {tz} (зараз {time})\n\nЩоб змінити: /timezone Europe/Kyiv",
+    },
+    "timezone_set": {
+        "en": "✅ Timezone saved: {tz} (now {time})\n\nYour day now starts and ends at your local midnight 💛",
+        "es": "✅ Zona horaria guardada: {tz} (ahora {time})\n\nTu día ahora empieza y termina a tu medianoche local 💛",
+        "ru": "✅ Часовой пояс сохранён: {tz} (сейчас {time})\n\nТеперь день начинается и заканчивается в твою полночь 💛",
+        "uk": "✅ Часовий пояс збережено: {tz} (зараз {time})\n\nТепер день починається і закінчується у твою північ 💛",
+    },
+    "timezone_invalid": {
+        "en": "Hmm, I don't know the timezone '{tz}' 🤔\n\nTry a name like Europe/Madrid or America/New_York",
+        "es": "Hmm, no conozco la zona horaria '{tz}' 🤔\n\nPrueba un nombre como Europe/Madrid o America/New_York",
+        "ru": "Хм, не знаю часовой пояс '{tz}' 🤔\n\nПопробуй название вроде Europe/Moscow или Asia/Almaty",
+        "uk": "Хм, не знаю часовий пояс '{tz}' 🤔\n\nСпробуй назву на кшталт Europe/Kyiv або Europe/Warsaw",
+    },
 })
 
+
+compile_translations()
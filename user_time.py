@@ -0,0 +1,79 @@
+"""Per-user timezone and local day boundaries"""
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional
+import pytz
+from sqlalchemy import select, update
+from config import USER_TIMEZONE
+from database import async_session, User
+
+# Кеш таймзон: внутренний user_id -> имя таймзоны
+_user_timezones: Dict[int, str] = {}
+
+
+@lru_cache(maxsize=None)
+def get_tz(tz_name: str):
+    """pytz timezone by name (cached, falls back to USER_TIMEZONE)"""
+    try:
+        return pytz.timezone(tz_name)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(USER_TIMEZONE)
+
+
+def is_valid_timezone(tz_name: str) -> bool:
+    return tz_name in pytz.all_timezones_set
+
+
+def day_key(d: date) -> int:
+    """Date -> integer local day key YYYYMMDD"""
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def key_to_date(key: int) -> date:
+    """Integer local day key YYYYMMDD -> date"""
+    return date(key // 10000, key // 100 % 100, key % 100)
+
+
+def shift_day(key: int, days: int) -> int:
+    """Local day key moved by N days"""
+    return day_key(key_to_date(key) + timedelta(days=days))
+
+
+def local_now(tz_name: str, at_utc: Optional[datetime] = None) -> datetime:
+    """Local time in tz for a naive UTC datetime (default: now)"""
+    at_utc = at_utc or datetime.utcnow()
+    return pytz.UTC.localize(at_utc).astimezone(get_tz(tz_name))
+
+
+def local_day(tz_name: str, at_utc: Optional[datetime] = None) -> int:
+    """Local day key in tz for a naive UTC datetime (default: now)"""
+    return day_key(local_now(tz_name, at_utc).date())
+
+
+async def get_user_timezone(user_id: int) -> str:
+    """Timezone of the user (internal ID), cached after the first lookup"""
+    tz_name = _user_timezones.get(user_id)
+    if tz_name is None:
+        async with async_session() as session:
+            result = await session.execute(select(User.timezone).where(User.id == user_id))
+            tz_name = result.scalar_one_or_none() or USER_TIMEZONE
+        _user_timezones[user_id] = tz_name
+    return tz_name
+
+
+async def set_user_timezone(user_id: int, tz_name: str):
+    """Save the user's timezone (internal ID)"""
+    async with async_session() as session:
+        await session.execute(update(User).where(User.id == user_id).values(timezone=tz_name))
+        await session.commit()
+    _user_timezones[user_id] = tz_name
+
+
+async def user_local_day(user_id: int, at_utc: Optional[datetime] = None) -> int:
+    """Local day key of the user for a naive UTC datetime (default: now)"""
+    return local_day(await get_user_timezone(user_id), at_utc)
+
+
+def remember_timezone(user_id: int, tz_name: Optional[str]):
+    """Prime the cache from an already loaded User row"""
+    _user_timezones[user_id] = tz_name or USER_TIMEZONE
@@ -0,0 +1,61 @@
+"""Rate-limited sending for bulk notifications"""
+import asyncio
+import time
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter, TelegramBadRequest
+from config import BROADCAST_RATE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedSender:
+    """
+    Sends messages no faster than `rate` per second (token bucket).
+
+    Telegram allows about 30 messages per second per bot; above that it
+    answers 429 and the whole bot gets throttled. On RetryAfter the sender
+    pauses for everyone and retries once. Users who blocked the bot are skipped.
+    """
+
+    def __init__(self, bot, rate: float = BROADCAST_RATE):
+        self.bot = bot
+        self.rate = rate
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    async def _acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(1.0, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+    async def send(self, chat_id: int, text: str, **kwargs) -> bool:
+        """Send one message; returns False if it could not be delivered"""
+        for attempt in range(2):
+            await self._acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                self.sent += 1
+                return True
+            except TelegramRetryAfter as e:
+                logger.warning(f"Broadcast throttled by Telegram for {e.retry_after}s")
+                async with self._lock:
+                    # Держим lock, чтобы пауза действовала на все отправки
+                    await asyncio.sleep(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Бот заблокирован или чат удалён - повтор не поможет
+                logger.debug(f"Broadcast to {chat_id} skipped: {e}")
+                break
+            except Exception as e:
+                logger.error(f"Broadcast to {chat_id} failed: {e}")
+                break
+        self.failed += 1
+        return False
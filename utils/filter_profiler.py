@@ -0,0 +1,109 @@
+"""Per-filter evaluation time and match rate for aiogram handlers"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import FilterObject
+from aiogram.filters.base import Filter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FilterStats:
+    name: str
+    calls: int = 0
+    matches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def match_rate(self) -> float:
+        return self.matches / self.calls if self.calls else 0.0
+
+    @property
+    def avg_us(self) -> float:
+        return self.seconds / self.calls * 1e6 if self.calls else 0.0
+
+
+def describe_filter(filter_object: FilterObject) -> str:
+    """Читаемое имя фильтра: lambda - по месту в коде, Filter - его repr"""
+    callback = filter_object.callback
+    if filter_object.magic is not None:
+        return "F"
+    if isinstance(callback, Filter):
+        return str(callback)
+    code = getattr(callback, "__code__", None)
+    if code is not None and callback.__name__ == "<lambda>":
+        return f"lambda@{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+    return getattr(callback, "__qualname__", type(callback).__name__)
+
+
+class FilterProfiler:
+    """
+    Wraps every filter of a router tree to count calls, matches and time.
+
+    Only the filter check is measured, not the handler. Instrumenting twice is
+    a no-op, so it is safe to call after late handler registration.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, FilterStats] = {}
+        self._wrapped = set()
+
+    def instrument(self, router: Router) -> int:
+        """Обернуть фильтры router и всех вложенных роутеров; вернуть число новых"""
+        count = 0
+        for current in router.chain_tail:
+            for event_name, observer in current.observers.items():
+                for handler in observer.handlers:
+                    handler_name = getattr(handler.callback, "__name__", repr(handler.callback))
+                    for index, filter_object in enumerate(handler.filters or ()):
+                        if id(filter_object) in self._wrapped:
+                            continue
+                        name = f"{event_name}:{handler_name}[{index}] {describe_filter(filter_object)}"
+                        self._wrap(filter_object, self.stats.setdefault(name, FilterStats(name)))
+                        self._wrapped.add(id(filter_object))
+                        count += 1
+        return count
+
+    @staticmethod
+    def _wrap(filter_object: FilterObject, stats: FilterStats):
+        call = filter_object.call
+
+        async def timed_call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await call(*args, **kwargs)
+            finally:
+                stats.calls += 1
+                stats.seconds += time.perf_counter() - started
+            if result:
+                stats.matches += 1
+            return result
+
+        filter_object.call = timed_call
+
+    def top(self, limit: int = 20) -> List[FilterStats]:
+        """Фильтры с наибольшим суммарным временем"""
+        return sorted(self.stats.values(), key=lambda s: s.seconds, reverse=True)[:limit]
+
+    def report(self, limit: int = 20) -> str:
+        lines = [f"{'total ms':>9} {'avg µs':>8} {'calls':>8} {'match':>6}  filter"]
+        for stats in self.top(limit):
+            lines.append(f"{stats.seconds * 1e3:9.1f} {stats.avg_us:8.1f} {stats.calls:8d} "
+                         f"{stats.match_rate:6.1%}  {stats.name}")
+        return "\n".join(lines)
+
+    def log_report(self, limit: int = 20):
+        logger.info("Handler filter profile:\n" + self.report(limit))
+
+    def reset(self):
+        for stats in self.stats.values():
+            stats.calls = stats.matches = 0
+            stats.seconds = 0.0
+
+
+filter_profiler = FilterProfiler()
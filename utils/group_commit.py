@@ -0,0 +1,68 @@
+"""Single writer with group commit for small SQLite writes"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOp = Callable[["AsyncSession"], Awaitable[T]]  # noqa: F821 - sqlalchemy.ext.asyncio.AsyncSession
+
+
+class GroupCommitWriter:
+    """
+    Runs small writes one transaction at a time, several writes per transaction.
+
+    SQLite takes one writer at a time and every commit is an fsync. Writes
+    submitted while a commit is in flight queue up and go out together in the
+    next transaction: one session, one commit, one fsync for the whole batch.
+    A write is an `async def op(session)` that adds or changes rows and does
+    not commit; submit() returns its result once the batch is committed.
+
+    If a batch fails, its writes are replayed one per transaction, so a bad
+    write fails alone and the others still land.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 100):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self._pending: List[Tuple[WriteOp, asyncio.Future]] = []
+        self._flusher = None
+        self.batches = 0
+        self.writes = 0
+
+    async def submit(self, op: WriteOp) -> T:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((op, future))
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._flusher = loop.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        # Один проход цикла событий: одновременные записи успевают встать в очередь
+        await asyncio.sleep(0)
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[WriteOp, asyncio.Future]]):
+        try:
+            async with self.session_factory() as session:
+                results = [await op(session) for op, _ in batch]
+                await session.commit()
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            logger.warning(f"Group commit of {len(batch)} writes failed ({e}), replaying one by one")
+            for item in batch:
+                await self._commit([item])
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,84 @@
+"""Progressive message edits for streamed AI answers"""
+import asyncio
+import time
+from typing import Optional
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+from config import STREAM_EDIT_INTERVAL, STREAM_EDIT_MIN_CHARS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Telegram message text limit
+MAX_MESSAGE_LENGTH = 4096
+STREAM_CURSOR = " ▌"
+
+
+class ThrottledMessageEditor:
+    """
+    Edits a placeholder message as text streams in.
+
+    Telegram rejects frequent edits (429 Too Many Requests), so intermediate
+    updates are dropped unless enough time and text have accumulated.
+    The final text is always delivered by finish().
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        min_interval: float = STREAM_EDIT_INTERVAL,
+        min_delta_chars: int = STREAM_EDIT_MIN_CHARS
+    ):
+        self.message = message
+        self.min_interval = min_interval
+        self.min_delta_chars = min_delta_chars
+        self.edits = 0
+        self._shown_text = message.text or ""
+        self._last_edit_at = 0.0
+        self._blocked_until = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def update(self, text: str):
+        """Show partial text if the throttle allows it (never blocks the stream)"""
+        now = time.monotonic()
+        if now < self._blocked_until or now - self._last_edit_at < self.min_interval:
+            return
+        if len(text) - len(self._shown_text) < self.min_delta_chars:
+            return
+        if self._inflight and not self._inflight.done():
+            return
+
+        self._last_edit_at = now
+        self._inflight = asyncio.create_task(self._edit(text + STREAM_CURSOR))
+
+    async def finish(self, text: str):
+        """Show the final text, waiting for any in-flight edit first"""
+        if self._inflight and not self._inflight.done():
+            await self._inflight
+
+        # Финальный текст обязателен: после 429 ждём и пробуем ещё раз
+        for _ in range(2):
+            delay = self._blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if await self._edit(text):
+                return
+
+    async def _edit(self, text: str) -> bool:
+        """Edit the message; returns False only when Telegram asked to retry later"""
+        text = text[:MAX_MESSAGE_LENGTH]
+        if not text.strip() or text == self._shown_text:
+            return True
+
+        try:
+            await self.message.edit_text(text)
+            self._shown_text = text
+            self.edits += 1
+        except TelegramRetryAfter as e:
+            self._blocked_until = time.monotonic() + e.retry_after
+            logger.warning(f"Stream edit throttled by Telegram for {e.retry_after}s")
+            return False
+        except TelegramBadRequest as e:
+            # "message is not modified" и т.п. - не критично для стриминга
+            logger.debug(f"Stream edit skipped: {e}")
+        return True
@@ -0,0 +1,44 @@
+"""Keyset pagination cursors packed into callback_data"""
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+# callback_data ограничен 64 байтами, поэтому курсор - числа в base36 через точку
+_EPOCH = datetime(1970, 1, 1)
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def to_base36(number: int) -> str:
+    if number < 0:
+        return "-" + to_base36(-number)
+    digits = ""
+    while True:
+        number, rem = divmod(number, 36)
+        digits = _DIGITS[rem] + digits
+        if not number:
+            return digits
+
+
+def encode_cursor(*values) -> str:
+    """Cursor from sort key values (int or naive datetime, exact to microseconds)"""
+    parts = []
+    for value in values:
+        if isinstance(value, datetime):
+            value = (value - _EPOCH) // timedelta(microseconds=1)
+        parts.append(to_base36(value or 0))
+    return ".".join(parts)
+
+
+def decode_cursor(cursor: str, *types) -> Optional[Tuple]:
+    """Sort key values back from a cursor; None if it is malformed"""
+    parts = cursor.split(".")
+    if len(parts) != len(types):
+        return None
+    values = []
+    try:
+        for part, value_type in zip(parts, types):
+            number = int(part, 36)
+            values.append(_EPOCH + timedelta(microseconds=number) if value_type is datetime else number)
+    except (ValueError, OverflowError):
+        return None
+    return tuple(values)
+
@@ -0,0 +1,70 @@
+"""Connection pool checkout counts and wait time"""
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    disconnects: int = 0  # запросы, повторённые после разрыва соединения
+    queries: int = 0  # SQL-запросы движка (любой бэкенд)
+    updates: int = 0  # апдейты Telegram за то же время
+
+    @property
+    def queries_per_update(self) -> float:
+        return self.queries / self.updates if self.updates else 0.0
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.wait_seconds / self.checkouts * 1e3 if self.checkouts else 0.0
+
+    def record(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "avg_wait_ms": round(self.avg_wait_ms, 3),
+            "max_wait_ms": round(self.max_wait_seconds * 1e3, 3),
+            "disconnects": self.disconnects,
+            "queries": self.queries,
+            "queries_per_update": round(self.queries_per_update, 2),
+        }
+
+    def log_report(self, pool=None):
+        status = f", {pool.status()}" if pool is not None else ""
+        logger.info(f"DB pool: {self.snapshot()}{status}")
+
+    def reset(self):
+        self.checkouts = self.disconnects = self.queries = self.updates = 0
+        self.wait_seconds = self.max_wait_seconds = 0.0
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records every checkout in pool_metrics.
+
+    The time covers waiting for a free connection (pool exhausted) and opening
+    a new one, i.e. everything between asking for a connection and getting it.
+    """
+
+    metrics = pool_metrics
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.metrics.record(time.perf_counter() - started)